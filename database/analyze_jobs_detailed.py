@@ -4,6 +4,7 @@ Script d'analyse détaillée des offres d'emploi avec OpenAI
 Sauvegarde incrémentale + extraction des preuves
 """
 
+import argparse
 import json
 import asyncio
 import sys
@@ -12,6 +13,14 @@ from datetime import datetime
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+import jobs_loader
+import lazy_report
+import parallel
+import prompt_cache
+import tracing
+from models import Job
+from storage import read_json, write_json_atomic
+
 sys.stdout.reconfigure(line_buffering=True)
 
 # Charger les variables d'environnement depuis .env
@@ -62,46 +71,53 @@ Réponds UNIQUEMENT en JSON valide avec cette structure :
     "sales_recommendation": "approche commerciale recommandée en 2-3 phrases"
 }"""
 
-USER_PROMPT = """Analyse cette description de poste:
+INSTRUCTIONS = """Analyse chaque description de poste fournie.
+Extrais les informations avec des citations exactes comme preuves."""
+
+# Préfixe identique pour tous les appels (cache de prompt), puis entreprise, puis offre
+PROMPT_PREFIX = prompt_cache.static_prefix(SYSTEM_PROMPT, INSTRUCTIONS)
+
+COMPANY_CONTEXT = "ENTREPRISE: {company}"
 
-ENTREPRISE: {company}
-TITRE: {title}
+JOB_PROMPT = """TITRE: {title}
 LOCALISATION: {location}
 
 DESCRIPTION COMPLÈTE:
-{description}
-
-Extrais les informations avec des citations exactes comme preuves."""
+{description}"""
 
 
 async def analyze_job(job_data, semaphore):
     """Analyse un job avec OpenAI"""
-    async with semaphore:
-        try:
-            response = await client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": USER_PROMPT.format(
-                        company=job_data['company_name'],
-                        title=job_data['job_title'],
-                        location=job_data.get('location', 'N/A'),
-                        description=job_data['description'][:10000]
-                    )}
-                ],
-                temperature=0.2,
-                max_tokens=2500,
-                response_format={"type": "json_object"}
-            )
-            
-            analysis = json.loads(response.choices[0].message.content)
-            return {
-                'success': True,
-                'analysis': analysis,
-                'tokens': response.usage.total_tokens
-            }
-        except Exception as e:
-            return {'success': False, 'error': str(e), 'analysis': None}
+    with tracing.span(job_data['job_title'], kind="job", company=job_data['company_name']):
+        async with tracing.queued(semaphore, api="openai.chat"):
+            try:
+                with tracing.span("chat.completions", kind="api", api="openai.chat", model="gpt-4o-mini") as api_span:
+                    response = await client.chat.completions.create(
+                        model="gpt-4o-mini",
+                        messages=prompt_cache.messages(
+                            PROMPT_PREFIX,
+                            COMPANY_CONTEXT.format(company=job_data['company_name']),
+                            JOB_PROMPT.format(
+                                title=job_data['job_title'],
+                                location=job_data.get('location', 'N/A'),
+                                description=job_data['description'][:10000]
+                            )
+                        ),
+                        temperature=0.2,
+                        max_tokens=2500,
+                        response_format={"type": "json_object"}
+                    )
+                    usage = prompt_cache.usage_attrs(response.usage)
+                    api_span.set(**usage)
+                
+                analysis = json.loads(response.choices[0].message.content)
+                return {
+                    'success': True,
+                    'analysis': analysis,
+                    **usage
+                }
+            except Exception as e:
+                return {'success': False, 'error': str(e), 'analysis': None}
 
 
 async def process_and_save(jobs, output_file):
@@ -111,8 +127,8 @@ async def process_and_save(jobs, output_file):
     # Charger les résultats existants si présents
     results = {'companies': {}, 'metadata': {'started': datetime.now().isoformat()}}
     if os.path.exists(output_file):
-        with open(output_file, 'r') as f:
-            results = json.load(f)
+        with tracing.span("load_results", kind="load", path=output_file):
+            results = read_json(output_file)
         print(f"📂 Reprise depuis {len(results.get('companies', {}))} entreprises existantes")
     
     # Identifier les jobs déjà analysés
@@ -131,11 +147,15 @@ async def process_and_save(jobs, output_file):
     
     total = len(jobs_to_analyze)
     completed = 0
+    tokens = {'total': 0, 'cached': 0}
+    print(prompt_cache.describe(PROMPT_PREFIX))
     
     async def process_job(job):
         nonlocal completed
         result = await analyze_job(job, semaphore)
         completed += 1
+        tokens['total'] += result.get('tokens', 0)
+        tokens['cached'] += result.get('cached_tokens', 0)
         
         company = job['company_name']
         if company not in results['companies']:
@@ -153,16 +173,20 @@ async def process_and_save(jobs, output_file):
             'job_board': job.get('job_board', ''),
             'location': job.get('location', ''),
             'date': job.get('date', ''),
-            'description': job['description'],
             'analysis': result.get('analysis'),
             'success': result['success']
         }
         
+        # Description : hash vers le store si elle y est déjà, sinon en clair
+        if job.get('description_hash'):
+            job_result['description_hash'] = job['description_hash']
+        else:
+            job_result['description'] = job['description']
         results['companies'][company]['jobs'].append(job_result)
         
         # Sauvegarder après chaque job
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        with tracing.span("save_results", kind="save", path=output_file):
+            write_json_atomic(output_file, results)
         
         if result['success']:
             score = result['analysis'].get('relevance_score', 0)
@@ -179,17 +203,222 @@ async def process_and_save(jobs, output_file):
         await asyncio.gather(*[process_job(job) for job in batch])
         await asyncio.sleep(0.5)  # Pause entre batches
     
+    print(f"📊 Tokens : {tokens['total']:,} (dont {tokens['cached']:,} servis depuis le cache)")
     results['metadata']['completed'] = datetime.now().isoformat()
     results['metadata']['total_jobs'] = sum(len(c['jobs']) for c in results['companies'].values())
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    with tracing.span("save_results", kind="save", path=output_file):
+        write_json_atomic(output_file, results)
     
     return results
 
 
-def generate_html_report(results, output_path):
-    """Génère le rapport HTML détaillé avec une page par entreprise"""
+def render_company_content(name, data, avg):
+    """Contenu HTML d'une entreprise (en-tête + offres triées par score)"""
+    key = lazy_report.payload_key(name)
+    html = f'''
+        <div class="company-header">
+            <h1 class="company-name">{name}</h1>
+            <div class="company-meta">
+                <span>🏢 {data.get('industry', 'N/A')}</span>
+                <span>👥 {data.get('employees', 'N/A')} employees</span>
+                <span>🌐 <a href="{data.get('website', '#')}" target="_blank" style="color: var(--accent-blue);">{data.get('website', 'N/A')[:40]}</a></span>
+                <span>⭐ Avg Score: {avg:.1f}/10</span>
+            </div>
+        </div>
+        <button class="toggle-all" onclick="toggleAllJobs('{key}')">📂 Expand/Collapse All Jobs</button>
+'''
+    
+    # Trier les jobs par score
+    sorted_jobs = sorted(data['jobs'], key=lambda x: x.get('analysis', {}).get('relevance_score', 0), reverse=True)
+    
+    for j, job in enumerate(sorted_jobs):
+        analysis = job.get('analysis', {})
+        score = analysis.get('relevance_score', 0)
+        score_class = 'score-high' if score >= 8 else ('score-medium' if score >= 6 else 'score-low')
+        job_id = f"{key}-job-{j}"
+        
+        html += f'''
+        <div class="job-card" data-company="{key}">
+            <div class="job-header" onclick="toggleJob('{job_id}')">
+                <div>
+                    <div class="job-title">
+                        <a href="{job.get('job_url', '#')}" target="_blank" onclick="event.stopPropagation();">{job.get('job_title', 'N/A')}</a>
+                    </div>
+                    <div style="color: var(--text-secondary); font-size: 0.9rem; margin-top: 0.25rem;">
+                        📍 {job.get('location', 'N/A')} • 🌐 {job.get('job_board', 'N/A')} • 📅 {job.get('date', 'N/A')[:10] if job.get('date') else 'N/A'}
+                    </div>
+                </div>
+                <div class="score-badge {score_class}">⭐ {score}/10</div>
+            </div>
+            <div class="job-details" id="{job_id}">
+                <div class="analysis-grid">
+'''
+        
+        # Section Value Proposition
+        missions = analysis.get('missions_fit', {})
+        html += '''
+                    <div class="analysis-section">
+                        <div class="section-title value">🎯 Value Proposition Fit</div>
+'''
+        
+        # Key personas
+        personas = missions.get('key_personas', [])
+        if personas:
+            html += '<div class="evidence-label">Key Personas</div>'
+            for p in personas[:5]:
+                if isinstance(p, dict):
+                    html += f'''<div class="evidence-item">
+                        <strong>{p.get('name', 'N/A')}</strong>
+                        <div class="evidence-quote">"{p.get('evidence', 'No evidence')[:200]}"</div>
+                    </div>'''
+        
+        # Relevant missions
+        relevant = missions.get('relevant_missions', [])
+        if relevant:
+            html += '<div class="evidence-label" style="margin-top: 1rem;">Relevant Missions</div>'
+            for m in relevant[:3]:
+                if isinstance(m, dict):
+                    html += f'''<div class="evidence-item">
+                        <strong>{m.get('mission', 'N/A')[:100]}</strong>
+                        <div class="evidence-quote">"{m.get('evidence', 'No evidence')[:200]}"</div>
+                    </div>'''
+        
+        # Pain points
+        pains = missions.get('pain_points', [])
+        if pains:
+            html += '<div class="evidence-label" style="margin-top: 1rem;">Pain Points</div>'
+            for p in pains[:3]:
+                if isinstance(p, dict):
+                    html += f'''<div class="evidence-item">
+                        <strong>{p.get('pain', 'N/A')}</strong>
+                        <div class="evidence-quote">"{p.get('evidence', 'No evidence')[:200]}"</div>
+                    </div>'''
+        
+        if not personas and not relevant and not pains:
+            html += '<div class="no-data">No value proposition insights found</div>'
+        
+        html += '</div>'
+        
+        # Section Team Structure
+        team = analysis.get('team_structure', {})
+        html += '''
+                    <div class="analysis-section">
+                        <div class="section-title team">👥 Team Structure</div>
+'''
+        
+        reports = team.get('reports_to', {})
+        if reports and isinstance(reports, dict) and reports.get('role'):
+            html += f'''<div class="evidence-item">
+                <div class="evidence-label">Reports To</div>
+                <strong>{reports.get('role', 'N/A')}</strong>
+                <div class="evidence-quote">"{reports.get('evidence', 'No evidence')[:200]}"</div>
+            </div>'''
+        
+        collabs = team.get('collaborates_with', [])
+        if collabs:
+            html += '<div class="evidence-label" style="margin-top: 1rem;">Collaborates With</div>'
+            for c in collabs[:5]:
+                if isinstance(c, dict):
+                    html += f'''<div class="evidence-item">
+                        <strong>{c.get('team', 'N/A')}</strong>
+                        <div class="evidence-quote">"{c.get('evidence', 'No evidence')[:200]}"</div>
+                    </div>'''
+        
+        makers = team.get('decision_makers', [])
+        if makers:
+            html += '<div class="evidence-label" style="margin-top: 1rem;">🎯 Decision Makers</div>'
+            for d in makers[:5]:
+                if isinstance(d, dict):
+                    html += f'''<div class="evidence-item">
+                        <strong>{d.get('role', 'N/A')}</strong>
+                        <div class="evidence-quote">"{d.get('evidence', 'No evidence')[:200]}"</div>
+                    </div>'''
+        
+        if not reports and not collabs and not makers:
+            html += '<div class="no-data">No team structure insights found</div>'
+        
+        html += '</div>'
+        
+        # Section Tools
+        tools = analysis.get('tools_ecosystem', {})
+        html += '''
+                    <div class="analysis-section">
+                        <div class="section-title tools">🛠️ Tools Ecosystem</div>
+'''
+        
+        design_tools = tools.get('design_tools', [])
+        if design_tools:
+            html += '<div class="evidence-label">Design Tools</div>'
+            for t in design_tools[:5]:
+                if isinstance(t, dict):
+                    html += f'''<div class="evidence-item">
+                        <strong>{t.get('tool', 'N/A')}</strong>
+                        <div class="evidence-quote">"{t.get('evidence', 'No evidence')[:200]}"</div>
+                    </div>'''
+        
+        tools_3d = tools.get('3d_tools', [])
+        if tools_3d:
+            html += '<div class="evidence-label" style="margin-top: 1rem;">3D Tools</div>'
+            for t in tools_3d[:5]:
+                if isinstance(t, dict):
+                    html += f'''<div class="evidence-item">
+                        <strong>{t.get('tool', 'N/A')}</strong>
+                        <div class="evidence-quote">"{t.get('evidence', 'No evidence')[:200]}"</div>
+                    </div>'''
+        
+        ecom = tools.get('ecommerce_platforms', [])
+        if ecom:
+            html += '<div class="evidence-label" style="margin-top: 1rem;">E-commerce</div>'
+            for e in ecom[:5]:
+                if isinstance(e, dict):
+                    html += f'''<div class="evidence-item">
+                        <strong>{e.get('platform', 'N/A')}</strong>
+                        <div class="evidence-quote">"{e.get('evidence', 'No evidence')[:200]}"</div>
+                    </div>'''
+        
+        other = tools.get('other_tools', [])
+        if other:
+            html += '<div class="evidence-label" style="margin-top: 1rem;">Other Tools</div>'
+            for o in other[:5]:
+                if isinstance(o, dict):
+                    html += f'''<div class="evidence-item">
+                        <strong>{o.get('tool', 'N/A')}</strong>
+                        <div class="evidence-quote">"{o.get('evidence', 'No evidence')[:200]}"</div>
+                    </div>'''
+        
+        if not design_tools and not tools_3d and not ecom and not other:
+            html += '<div class="no-data">No tools insights found</div>'
+        
+        html += '</div>'
+        
+        html += '''
+                </div>
+'''
+        
+        # Recommendation
+        rec = analysis.get('sales_recommendation', '')
+        if rec:
+            html += f'''
+                <div class="recommendation-box">
+                    <div class="recommendation-title">💡 Sales Recommendation</div>
+                    <p>{rec}</p>
+                </div>
+'''
+        
+        html += '''
+            </div>
+        </div>
+'''
+    return html
+
+
+def generate_html_report(results, output_path, lazy=True):
+    """Génère le rapport HTML détaillé avec une page par entreprise
+    
+    lazy : coquille légère + un fichier de données par entreprise, chargé à l'affichage (lazy_report) ;
+    sinon un seul fichier autonome avec toutes les analyses
+    """
     
     companies = results.get('companies', {})
     total_jobs = sum(len(c['jobs']) for c in companies.values())
@@ -445,7 +674,7 @@ def generate_html_report(results, output_path):
         active = 'active' if i == 0 else ''
         html += f'''
             <li>
-                <a href="#" class="company-link {active}" onclick="showCompany('{name.replace("'", "\\'")}'); return false;">
+                <a href="#" class="company-link {active}" onclick="showCompany('{lazy_report.payload_key(name)}', this); return false;">
                     {name[:25]}{'...' if len(name) > 25 else ''}
                     <span class="job-count">{job_count}</span>
                 </a>
@@ -458,221 +687,56 @@ def generate_html_report(results, output_path):
     <div class="main-content">
 '''
     
-    # Générer une section pour chaque entreprise
+    # Rendu des entreprises réparti sur les cœurs (ordre conservé)
+    contents = parallel.map_ordered(
+        render_company_content, [(name, data, avg) for name, data, avg, _ in company_scores],
+        star=True, name="render_companies"
+    )
+    
+    # Générer une section pour chaque entreprise (vide en mode différé : chargée au clic)
+    if lazy:
+        sources = lazy_report.write_payloads(output_path, {
+            lazy_report.payload_key(name): content
+            for (name, data, avg, job_count), content in zip(company_scores, contents)
+        })
     for i, (name, data, avg, job_count) in enumerate(company_scores):
         active = 'active' if i == 0 else ''
-        html += f'''
-        <div class="company-section {active}" id="company-{name.replace(' ', '-').replace("'", '')}">
-            <div class="company-header">
-                <h1 class="company-name">{name}</h1>
-                <div class="company-meta">
-                    <span>🏢 {data.get('industry', 'N/A')}</span>
-                    <span>👥 {data.get('employees', 'N/A')} employees</span>
-                    <span>🌐 <a href="{data.get('website', '#')}" target="_blank" style="color: var(--accent-blue);">{data.get('website', 'N/A')[:40]}</a></span>
-                    <span>⭐ Avg Score: {avg:.1f}/10</span>
-                </div>
-            </div>
-            <button class="toggle-all" onclick="toggleAllJobs('{name.replace("'", "\\'")}')">📂 Expand/Collapse All Jobs</button>
-'''
-        
-        # Trier les jobs par score
-        sorted_jobs = sorted(data['jobs'], key=lambda x: x.get('analysis', {}).get('relevance_score', 0), reverse=True)
-        
-        for j, job in enumerate(sorted_jobs):
-            analysis = job.get('analysis', {})
-            score = analysis.get('relevance_score', 0)
-            score_class = 'score-high' if score >= 8 else ('score-medium' if score >= 6 else 'score-low')
-            job_id = f"{name.replace(' ', '-')}-job-{j}"
-            
+        key = lazy_report.payload_key(name)
+        if lazy:
             html += f'''
-            <div class="job-card" data-company="{name}">
-                <div class="job-header" onclick="toggleJob('{job_id}')">
-                    <div>
-                        <div class="job-title">
-                            <a href="{job.get('job_url', '#')}" target="_blank" onclick="event.stopPropagation();">{job.get('job_title', 'N/A')}</a>
-                        </div>
-                        <div style="color: var(--text-secondary); font-size: 0.9rem; margin-top: 0.25rem;">
-                            📍 {job.get('location', 'N/A')} • 🌐 {job.get('job_board', 'N/A')} • 📅 {job.get('date', 'N/A')[:10] if job.get('date') else 'N/A'}
-                        </div>
-                    </div>
-                    <div class="score-badge {score_class}">⭐ {score}/10</div>
-                </div>
-                <div class="job-details" id="{job_id}">
-                    <div class="analysis-grid">
-'''
-            
-            # Section Value Proposition
-            missions = analysis.get('missions_fit', {})
-            html += '''
-                        <div class="analysis-section">
-                            <div class="section-title value">🎯 Value Proposition Fit</div>
-'''
-            
-            # Key personas
-            personas = missions.get('key_personas', [])
-            if personas:
-                html += '<div class="evidence-label">Key Personas</div>'
-                for p in personas[:5]:
-                    if isinstance(p, dict):
-                        html += f'''<div class="evidence-item">
-                            <strong>{p.get('name', 'N/A')}</strong>
-                            <div class="evidence-quote">"{p.get('evidence', 'No evidence')[:200]}"</div>
-                        </div>'''
-            
-            # Relevant missions
-            relevant = missions.get('relevant_missions', [])
-            if relevant:
-                html += '<div class="evidence-label" style="margin-top: 1rem;">Relevant Missions</div>'
-                for m in relevant[:3]:
-                    if isinstance(m, dict):
-                        html += f'''<div class="evidence-item">
-                            <strong>{m.get('mission', 'N/A')[:100]}</strong>
-                            <div class="evidence-quote">"{m.get('evidence', 'No evidence')[:200]}"</div>
-                        </div>'''
-            
-            # Pain points
-            pains = missions.get('pain_points', [])
-            if pains:
-                html += '<div class="evidence-label" style="margin-top: 1rem;">Pain Points</div>'
-                for p in pains[:3]:
-                    if isinstance(p, dict):
-                        html += f'''<div class="evidence-item">
-                            <strong>{p.get('pain', 'N/A')}</strong>
-                            <div class="evidence-quote">"{p.get('evidence', 'No evidence')[:200]}"</div>
-                        </div>'''
-            
-            if not personas and not relevant and not pains:
-                html += '<div class="no-data">No value proposition insights found</div>'
-            
-            html += '</div>'
-            
-            # Section Team Structure
-            team = analysis.get('team_structure', {})
-            html += '''
-                        <div class="analysis-section">
-                            <div class="section-title team">👥 Team Structure</div>
-'''
-            
-            reports = team.get('reports_to', {})
-            if reports and isinstance(reports, dict) and reports.get('role'):
-                html += f'''<div class="evidence-item">
-                    <div class="evidence-label">Reports To</div>
-                    <strong>{reports.get('role', 'N/A')}</strong>
-                    <div class="evidence-quote">"{reports.get('evidence', 'No evidence')[:200]}"</div>
-                </div>'''
-            
-            collabs = team.get('collaborates_with', [])
-            if collabs:
-                html += '<div class="evidence-label" style="margin-top: 1rem;">Collaborates With</div>'
-                for c in collabs[:5]:
-                    if isinstance(c, dict):
-                        html += f'''<div class="evidence-item">
-                            <strong>{c.get('team', 'N/A')}</strong>
-                            <div class="evidence-quote">"{c.get('evidence', 'No evidence')[:200]}"</div>
-                        </div>'''
-            
-            makers = team.get('decision_makers', [])
-            if makers:
-                html += '<div class="evidence-label" style="margin-top: 1rem;">🎯 Decision Makers</div>'
-                for d in makers[:5]:
-                    if isinstance(d, dict):
-                        html += f'''<div class="evidence-item">
-                            <strong>{d.get('role', 'N/A')}</strong>
-                            <div class="evidence-quote">"{d.get('evidence', 'No evidence')[:200]}"</div>
-                        </div>'''
-            
-            if not reports and not collabs and not makers:
-                html += '<div class="no-data">No team structure insights found</div>'
-            
-            html += '</div>'
-            
-            # Section Tools
-            tools = analysis.get('tools_ecosystem', {})
-            html += '''
-                        <div class="analysis-section">
-                            <div class="section-title tools">🛠️ Tools Ecosystem</div>
-'''
-            
-            design_tools = tools.get('design_tools', [])
-            if design_tools:
-                html += '<div class="evidence-label">Design Tools</div>'
-                for t in design_tools[:5]:
-                    if isinstance(t, dict):
-                        html += f'''<div class="evidence-item">
-                            <strong>{t.get('tool', 'N/A')}</strong>
-                            <div class="evidence-quote">"{t.get('evidence', 'No evidence')[:200]}"</div>
-                        </div>'''
-            
-            tools_3d = tools.get('3d_tools', [])
-            if tools_3d:
-                html += '<div class="evidence-label" style="margin-top: 1rem;">3D Tools</div>'
-                for t in tools_3d[:5]:
-                    if isinstance(t, dict):
-                        html += f'''<div class="evidence-item">
-                            <strong>{t.get('tool', 'N/A')}</strong>
-                            <div class="evidence-quote">"{t.get('evidence', 'No evidence')[:200]}"</div>
-                        </div>'''
-            
-            ecom = tools.get('ecommerce_platforms', [])
-            if ecom:
-                html += '<div class="evidence-label" style="margin-top: 1rem;">E-commerce</div>'
-                for e in ecom[:5]:
-                    if isinstance(e, dict):
-                        html += f'''<div class="evidence-item">
-                            <strong>{e.get('platform', 'N/A')}</strong>
-                            <div class="evidence-quote">"{e.get('evidence', 'No evidence')[:200]}"</div>
-                        </div>'''
-            
-            other = tools.get('other_tools', [])
-            if other:
-                html += '<div class="evidence-label" style="margin-top: 1rem;">Other Tools</div>'
-                for o in other[:5]:
-                    if isinstance(o, dict):
-                        html += f'''<div class="evidence-item">
-                            <strong>{o.get('tool', 'N/A')}</strong>
-                            <div class="evidence-quote">"{o.get('evidence', 'No evidence')[:200]}"</div>
-                        </div>'''
-            
-            if not design_tools and not tools_3d and not ecom and not other:
-                html += '<div class="no-data">No tools insights found</div>'
-            
-            html += '</div>'
-            
-            html += '''
-                    </div>
-'''
-            
-            # Recommendation
-            rec = analysis.get('sales_recommendation', '')
-            if rec:
-                html += f'''
-                    <div class="recommendation-box">
-                        <div class="recommendation-title">💡 Sales Recommendation</div>
-                        <p>{rec}</p>
-                    </div>
+        <div class="company-section {active}" id="company-{key}" data-src="{sources[key]}"></div>
 '''
-            
-            html += '''
-                </div>
-            </div>
-'''
-        
-        html += '''
+        else:
+            html += f'''
+        <div class="company-section {active}" id="company-{key}">{contents[i]}
         </div>
 '''
     
     html += '''
     </div>
-    <script>
-        function showCompany(name) {
+    <script>''' + lazy_report.LOADER_JS + '''
+        function showCompany(key, link) {
             document.querySelectorAll('.company-section').forEach(s => s.classList.remove('active'));
             document.querySelectorAll('.company-link').forEach(l => l.classList.remove('active'));
             
-            const id = 'company-' + name.replace(/ /g, '-').replace(/'/g, '');
-            document.getElementById(id).classList.add('active');
-            event.target.classList.add('active');
+            const section = document.getElementById('company-' + key);
+            section.classList.add('active');
+            if (link) link.classList.add('active');
+            if (section.dataset.src && !section.dataset.loaded) {
+                section.dataset.loaded = '1';
+                section.innerHTML = '<div class="no-data">Loading...</div>';
+                loadPayload(key, section.dataset.src)
+                    .then(content => { section.innerHTML = content; })
+                    .catch(() => {
+                        delete section.dataset.loaded;
+                        section.innerHTML = '<div class="no-data">Could not load company data</div>';
+                    });
+            }
         }
         
+        const firstSection = document.querySelector('.company-section.active');
+        if (firstSection) showCompany(firstSection.id.replace('company-', ''));
+        
         function toggleJob(id) {
             document.getElementById(id).classList.toggle('open');
         }
@@ -690,27 +754,36 @@ def generate_html_report(results, output_path):
 </html>
 '''
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html)
+    with tracing.span("write_html_report", kind="save", path=output_path, size=len(html)):
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(html)
     print(f"✅ HTML report saved: {output_path}")
 
 
-async def main():
+async def main(single_file=False, report_only=False):
     print("=" * 60)
     print("🎯 presti.ai - Detailed Job Analysis")
     print(f"🚀 {NUM_WORKERS} parallel workers")
     print("=" * 60)
+    tracing.init("analyze_detailed")
+    
+    if report_only:
+        with tracing.span("load_results", kind="load", path=OUTPUT_FILE):
+            results = read_json(OUTPUT_FILE)
+        with tracing.span("html_report"):
+            generate_html_report(results, 'jobs_analysis_detailed.html', lazy=not single_file)
+        tracing.finish()
+        return
     
     # Charger les données
-    with open('jobs_data.json', 'r') as f:
-        data = json.load(f)
     
     jobs = []
-    for company_data in data['companies']:
+    # Lecture en flux : une seule entreprise de jobs_data.json décodée à la fois
+    for company_data in jobs_loader.iter_companies('jobs_data.json'):
         if company_data.get('success') and company_data.get('nb_jobs', 0) > 0:
             company = company_data['company']
             for job in company_data['jobs']:
-                jobs.append({
+                jobs.append(Job.from_dict({
                     'company_name': company['name'],
                     'industry': company['industry'],
                     'employees': company['employees'],
@@ -720,22 +793,33 @@ async def main():
                     'job_board': job.get('job_board', ''),
                     'location': job.get('location', ''),
                     'date': job.get('date_creation', ''),
-                    'description': job.get('description', '')
-                })
+                    'description': job.get('description', ''),
+                    'description_hash': job.get('description_hash'),
+                }))
     
     print(f"📊 {len(jobs)} jobs to analyze")
     
     # Analyser et sauvegarder
-    results = await process_and_save(jobs, OUTPUT_FILE)
+    with tracing.span("analyze_jobs", jobs=len(jobs)):
+        results = await process_and_save(jobs, OUTPUT_FILE)
     
     # Générer le rapport HTML
     print("\n📊 Generating HTML report...")
-    generate_html_report(results, 'jobs_analysis_detailed.html')
+    with tracing.span("html_report"):
+        generate_html_report(results, 'jobs_analysis_detailed.html', lazy=not single_file)
     
     print("\n" + "=" * 60)
     print("✅ DONE!")
     print("=" * 60)
+    
+    tracing.finish()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Analyse détaillée des offres et rapport HTML")
+    parser.add_argument('--single-file', action='store_true',
+                        help="Rapport autonome (toutes les analyses dans le HTML) au lieu du chargement différé")
+    parser.add_argument('--report-only', action='store_true',
+                        help=f"Régénère seulement le rapport depuis {OUTPUT_FILE}")
+    args = parser.parse_args()
+    asyncio.run(main(single_file=args.single_file, report_only=args.report_only))
 
@@ -15,6 +15,13 @@ import html
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+import jobs_loader
+import parallel
+import prompt_cache
+import tracing
+from models import Job
+from storage import write_json_atomic
+
 # Force unbuffered output
 sys.stdout.reconfigure(line_buffering=True)
 
@@ -70,53 +77,60 @@ Tu dois répondre UNIQUEMENT en JSON valide, sans markdown, avec la structure ex
     }
 }"""
 
-USER_PROMPT_TEMPLATE = """Analyse cette description de poste pour l'entreprise "{company_name}" (industrie: {industry}).
+INSTRUCTIONS = """Pour chaque description de poste, extrais les informations selon les 3 catégories (missions_fit, team_structure, tools_ecosystem) + insights commerciaux.
+Réponds UNIQUEMENT en JSON valide."""
+
+# Préfixe identique pour tous les appels (cache de prompt), puis entreprise, puis offre
+PROMPT_PREFIX = prompt_cache.static_prefix(SYSTEM_PROMPT, INSTRUCTIONS)
 
-TITRE DU POSTE : {job_title}
+COMPANY_CONTEXT = 'ENTREPRISE : "{company_name}" (industrie: {industry})'
+
+JOB_PROMPT = """TITRE DU POSTE : {job_title}
 LOCALISATION : {location}
 
 DESCRIPTION :
-{description}
-
-Extrais les informations selon les 3 catégories (missions_fit, team_structure, tools_ecosystem) + insights commerciaux.
-Réponds UNIQUEMENT en JSON valide."""
+{description}"""
 
 
 async def analyze_job_with_openai(job, company_info, semaphore, retry_count=3):
     """Analyse une offre d'emploi avec OpenAI GPT-4 (async)"""
     
-    user_prompt = USER_PROMPT_TEMPLATE.format(
-        company_name=company_info['name'],
-        industry=company_info['industry'],
-        job_title=job.get('job_title', 'N/A'),
-        location=job.get('location', 'N/A'),
-        description=job.get('description', 'N/A')[:8000]
+    messages = prompt_cache.messages(
+        PROMPT_PREFIX,
+        COMPANY_CONTEXT.format(company_name=company_info['name'], industry=company_info['industry']),
+        JOB_PROMPT.format(
+            job_title=job.get('job_title', 'N/A'),
+            location=job.get('location', 'N/A'),
+            description=job.get('description', 'N/A')[:8000]
+        )
     )
     
-    async with semaphore:  # Limite le nombre de requêtes simultanées
+    async with tracing.queued(semaphore, api="openai.chat"):  # Limite le nombre de requêtes simultanées
         for attempt in range(retry_count):
             try:
-                response = await client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": SYSTEM_PROMPT},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    temperature=0.3,
-                    max_tokens=2000,
-                    response_format={"type": "json_object"}
-                )
+                with tracing.span("chat.completions", kind="api", api="openai.chat", model="gpt-4o-mini", attempt=attempt) as api_span:
+                    response = await client.chat.completions.create(
+                        model="gpt-4o-mini",
+                        messages=messages,
+                        temperature=0.3,
+                        max_tokens=2000,
+                        response_format={"type": "json_object"}
+                    )
+                    usage = prompt_cache.usage_attrs(response.usage)
+                    api_span.set(**usage)
                 
                 result = json.loads(response.choices[0].message.content)
                 return {
                     'success': True,
                     'analysis': result,
-                    'tokens_used': response.usage.total_tokens
+                    'tokens_used': usage['tokens'],
+                    'cached_tokens': usage['cached_tokens']
                 }
                 
             except json.JSONDecodeError as e:
                 if attempt < retry_count - 1:
-                    await asyncio.sleep(1)
+                    with tracing.span("retry_backoff", kind="retry", api="openai.chat", attempt=attempt, reason="json"):
+                        await asyncio.sleep(1)
                     continue
                 return {
                     'success': False,
@@ -125,7 +139,8 @@ async def analyze_job_with_openai(job, company_info, semaphore, retry_count=3):
                 }
             except Exception as e:
                 if attempt < retry_count - 1:
-                    await asyncio.sleep(2)
+                    with tracing.span("retry_backoff", kind="retry", api="openai.chat", attempt=attempt, reason=type(e).__name__):
+                        await asyncio.sleep(2)
                     continue
                 return {
                     'success': False,
@@ -138,16 +153,19 @@ async def analyze_job_with_openai(job, company_info, semaphore, retry_count=3):
 
 async def process_job(job_data, semaphore, progress_counter, total_jobs):
     """Traite un job et met à jour le compteur de progression"""
-    result = await analyze_job_with_openai(
-        {'job_title': job_data['job_title'], 'location': job_data['location'], 'description': job_data['description']},
-        {'name': job_data['company_name'], 'industry': job_data['industry']},
-        semaphore
-    )
+    with tracing.span(job_data['job_title'], kind="job", company=job_data['company_name']):
+        result = await analyze_job_with_openai(
+            {'job_title': job_data['job_title'], 'location': job_data['location'], 'description': job_data['description']},
+            {'name': job_data['company_name'], 'industry': job_data['industry']},
+            semaphore
+        )
     
-    job_result = job_data.copy()
+    # L'offre (models.Job) est complétée en place : pas de copie par job
+    job_result = job_data
     job_result['analysis_success'] = result['success']
     job_result['analysis'] = result.get('analysis')
     job_result['tokens_used'] = result.get('tokens_used', 0)
+    job_result['cached_tokens'] = result.get('cached_tokens', 0)
     
     # Mise à jour du compteur
     progress_counter['count'] += 1
@@ -178,6 +196,101 @@ def format_list_html(items):
     return '<ul class="tag-list">' + ''.join(f'<li>{escape_html(item)}</li>' for item in items if item) + '</ul>'
 
 
+def render_job_card(job_data):
+    """Carte HTML d'une offre analysée (chaîne vide si pas d'analyse)"""
+    analysis = job_data.get('analysis', {})
+    if not analysis:
+        return ''
+    
+    relevance = analysis.get('relevance_score', 0)
+    relevance_class = 'high' if relevance >= 7 else ('medium' if relevance >= 4 else 'low')
+    
+    missions = analysis.get('missions_fit', {})
+    team = analysis.get('team_structure', {})
+    tools = analysis.get('tools_ecosystem', {})
+    sales = analysis.get('sales_insights', {})
+    
+    return f'''
+            <div class="job-card" data-relevance="{relevance}" data-company="{escape_html(job_data.get('company_name', '').lower())}" data-title="{escape_html(job_data.get('job_title', '').lower())}">
+                <div class="job-header">
+                    <div>
+                        <div class="job-title">
+                            <a href="{escape_html(job_data.get('job_url', '#'))}" target="_blank">{escape_html(job_data.get('job_title', 'N/A'))}</a>
+                        </div>
+                        <div class="company-name">🏢 {escape_html(job_data.get('company_name', 'N/A'))} • {escape_html(job_data.get('industry', 'N/A'))}</div>
+                        <div class="job-meta">
+                            <span>📍 {escape_html(job_data.get('location', 'N/A'))}</span>
+                            <span>🌐 {escape_html(job_data.get('job_board', 'N/A'))}</span>
+                            <span>📅 {escape_html(job_data.get('date', 'N/A'))}</span>
+                        </div>
+                    </div>
+                    <div class="relevance-badge relevance-{relevance_class}">
+                        ⭐ {relevance}/10
+                    </div>
+                </div>
+                
+                <div class="analysis-grid">
+                    <div class="analysis-section">
+                        <div class="section-title missions">🎯 Missions & Value Fit</div>
+                        <div class="field-label">Key Personas Mentioned</div>
+                        <div class="field-value">{format_list_html(missions.get('key_personas_mentioned', []))}</div>
+                        <div class="field-label">Relevant Missions</div>
+                        <div class="field-value">{format_list_html(missions.get('relevant_missions', []))}</div>
+                        <div class="field-label">Pain Points Identified</div>
+                        <div class="field-value">{format_list_html(missions.get('pain_points', []))}</div>
+                        <div class="insight-box">
+                            <h4>💡 Summary</h4>
+                            <p>{escape_html(missions.get('summary', 'No summary available'))}</p>
+                        </div>
+                    </div>
+                    
+                    <div class="analysis-section">
+                        <div class="section-title team">👥 Team Structure</div>
+                        <div class="field-label">Reports To</div>
+                        <div class="field-value">{escape_html(team.get('reports_to', 'Not mentioned')) or '<span class="no-data">Not mentioned</span>'}</div>
+                        <div class="field-label">Collaborates With</div>
+                        <div class="field-value">{format_list_html(team.get('collaborates_with', []))}</div>
+                        <div class="field-label">🎯 Decision Makers</div>
+                        <div class="field-value">{format_list_html(team.get('decision_makers', []))}</div>
+                        <div class="field-label">Team Size</div>
+                        <div class="field-value">{escape_html(team.get('team_size_hint', 'Not mentioned')) or '<span class="no-data">Not mentioned</span>'}</div>
+                    </div>
+                    
+                    <div class="analysis-section">
+                        <div class="section-title tools">🛠️ Tools Ecosystem</div>
+                        <div class="field-label">Design Tools</div>
+                        <div class="field-value">{format_list_html(tools.get('design_tools', []))}</div>
+                        <div class="field-label">3D Tools</div>
+                        <div class="field-value">{format_list_html(tools.get('3d_tools', []))}</div>
+                        <div class="field-label">E-commerce Platforms</div>
+                        <div class="field-value">{format_list_html(tools.get('ecommerce_platforms', []))}</div>
+                        <div class="field-label">DAM/PIM Tools</div>
+                        <div class="field-value">{format_list_html(tools.get('dam_pim_tools', []))}</div>
+                        <div class="field-label">Competitor Hints</div>
+                        <div class="field-value">{format_list_html(tools.get('competitors_hints', []))}</div>
+                    </div>
+                    
+                    <div class="analysis-section">
+                        <div class="section-title sales">💰 Sales Insights</div>
+                        <div class="field-label">Buying Signals</div>
+                        <div class="field-value">{format_list_html(sales.get('buying_signals', []))}</div>
+                        <div class="insight-box" style="background: rgba(247, 37, 133, 0.1); border-left-color: var(--accent-pink);">
+                            <h4>🚀 Recommended Approach</h4>
+                            <p>{escape_html(sales.get('recommended_approach', 'No recommendation'))}</p>
+                        </div>
+                        <div class="talking-points">
+                            <h4>💬 Key Talking Points</h4>
+                            <ol>
+                                {''.join(f'<li>{escape_html(point)}</li>' for point in sales.get('key_talking_points', []) if point)}
+                            </ol>
+                        </div>
+                    </div>
+                </div>
+            </div>
+'''
+
+
+
 def generate_analysis_report(analyzed_data, output_path):
     """Génère le rapport HTML d'analyse"""
     
@@ -564,98 +677,8 @@ def generate_analysis_report(analyzed_data, output_path):
         reverse=True
     )
     
-    for job_data in sorted_jobs:
-        analysis = job_data.get('analysis', {})
-        if not analysis:
-            continue
-            
-        relevance = analysis.get('relevance_score', 0)
-        relevance_class = 'high' if relevance >= 7 else ('medium' if relevance >= 4 else 'low')
-        
-        missions = analysis.get('missions_fit', {})
-        team = analysis.get('team_structure', {})
-        tools = analysis.get('tools_ecosystem', {})
-        sales = analysis.get('sales_insights', {})
-        
-        html_content += f'''
-            <div class="job-card" data-relevance="{relevance}" data-company="{escape_html(job_data.get('company_name', '').lower())}" data-title="{escape_html(job_data.get('job_title', '').lower())}">
-                <div class="job-header">
-                    <div>
-                        <div class="job-title">
-                            <a href="{escape_html(job_data.get('job_url', '#'))}" target="_blank">{escape_html(job_data.get('job_title', 'N/A'))}</a>
-                        </div>
-                        <div class="company-name">🏢 {escape_html(job_data.get('company_name', 'N/A'))} • {escape_html(job_data.get('industry', 'N/A'))}</div>
-                        <div class="job-meta">
-                            <span>📍 {escape_html(job_data.get('location', 'N/A'))}</span>
-                            <span>🌐 {escape_html(job_data.get('job_board', 'N/A'))}</span>
-                            <span>📅 {escape_html(job_data.get('date', 'N/A'))}</span>
-                        </div>
-                    </div>
-                    <div class="relevance-badge relevance-{relevance_class}">
-                        ⭐ {relevance}/10
-                    </div>
-                </div>
-                
-                <div class="analysis-grid">
-                    <div class="analysis-section">
-                        <div class="section-title missions">🎯 Missions & Value Fit</div>
-                        <div class="field-label">Key Personas Mentioned</div>
-                        <div class="field-value">{format_list_html(missions.get('key_personas_mentioned', []))}</div>
-                        <div class="field-label">Relevant Missions</div>
-                        <div class="field-value">{format_list_html(missions.get('relevant_missions', []))}</div>
-                        <div class="field-label">Pain Points Identified</div>
-                        <div class="field-value">{format_list_html(missions.get('pain_points', []))}</div>
-                        <div class="insight-box">
-                            <h4>💡 Summary</h4>
-                            <p>{escape_html(missions.get('summary', 'No summary available'))}</p>
-                        </div>
-                    </div>
-                    
-                    <div class="analysis-section">
-                        <div class="section-title team">👥 Team Structure</div>
-                        <div class="field-label">Reports To</div>
-                        <div class="field-value">{escape_html(team.get('reports_to', 'Not mentioned')) or '<span class="no-data">Not mentioned</span>'}</div>
-                        <div class="field-label">Collaborates With</div>
-                        <div class="field-value">{format_list_html(team.get('collaborates_with', []))}</div>
-                        <div class="field-label">🎯 Decision Makers</div>
-                        <div class="field-value">{format_list_html(team.get('decision_makers', []))}</div>
-                        <div class="field-label">Team Size</div>
-                        <div class="field-value">{escape_html(team.get('team_size_hint', 'Not mentioned')) or '<span class="no-data">Not mentioned</span>'}</div>
-                    </div>
-                    
-                    <div class="analysis-section">
-                        <div class="section-title tools">🛠️ Tools Ecosystem</div>
-                        <div class="field-label">Design Tools</div>
-                        <div class="field-value">{format_list_html(tools.get('design_tools', []))}</div>
-                        <div class="field-label">3D Tools</div>
-                        <div class="field-value">{format_list_html(tools.get('3d_tools', []))}</div>
-                        <div class="field-label">E-commerce Platforms</div>
-                        <div class="field-value">{format_list_html(tools.get('ecommerce_platforms', []))}</div>
-                        <div class="field-label">DAM/PIM Tools</div>
-                        <div class="field-value">{format_list_html(tools.get('dam_pim_tools', []))}</div>
-                        <div class="field-label">Competitor Hints</div>
-                        <div class="field-value">{format_list_html(tools.get('competitors_hints', []))}</div>
-                    </div>
-                    
-                    <div class="analysis-section">
-                        <div class="section-title sales">💰 Sales Insights</div>
-                        <div class="field-label">Buying Signals</div>
-                        <div class="field-value">{format_list_html(sales.get('buying_signals', []))}</div>
-                        <div class="insight-box" style="background: rgba(247, 37, 133, 0.1); border-left-color: var(--accent-pink);">
-                            <h4>🚀 Recommended Approach</h4>
-                            <p>{escape_html(sales.get('recommended_approach', 'No recommendation'))}</p>
-                        </div>
-                        <div class="talking-points">
-                            <h4>💬 Key Talking Points</h4>
-                            <ol>
-                                {''.join(f'<li>{escape_html(point)}</li>' for point in sales.get('key_talking_points', []) if point)}
-                            </ol>
-                        </div>
-                    </div>
-                </div>
-            </div>
-'''
-
+    # Rendu des cartes réparti sur les cœurs (ordre de pertinence conservé)
+    html_content += ''.join(parallel.map_ordered(render_job_card, sorted_jobs, name="render_job_cards"))
     html_content += '''
         </div>
     </div>
@@ -702,8 +725,9 @@ def generate_analysis_report(analyzed_data, output_path):
 </html>
 '''
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    with tracing.span("write_html_report", kind="save", path=output_path, size=len(html_content)):
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(html_content)
     
     print(f"✅ Analysis report generated: {output_path}")
 
@@ -715,19 +739,19 @@ async def main():
     print("=" * 60)
     
     start_time = time.time()
+    tracing.init("analyze_openai")
     
     # Charger les données collectées
     print("\n📂 Loading collected job data...")
-    with open('jobs_data.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
     
     # Préparer les données pour l'analyse
     jobs_to_analyze = []
-    for company_data in data['companies']:
+    # Lecture en flux : une seule entreprise de jobs_data.json décodée à la fois
+    for company_data in jobs_loader.iter_companies('jobs_data.json'):
         if company_data.get('success') and company_data.get('nb_jobs', 0) > 0:
             company = company_data['company']
             for job in company_data['jobs']:
-                jobs_to_analyze.append({
+                jobs_to_analyze.append(Job.from_dict({
                     'company_name': company['name'],
                     'industry': company['industry'],
                     'employees': company['employees'],
@@ -738,7 +762,7 @@ async def main():
                     'location': job.get('location', ''),
                     'date': job.get('date_creation', '')[:10] if job.get('date_creation') else '',
                     'description': job.get('description', '')
-                })
+                }))
     
     print(f"✅ Found {len(jobs_to_analyze)} jobs to analyze")
     
@@ -748,6 +772,7 @@ async def main():
     
     # Analyser tous les jobs en parallèle
     print(f"\n🤖 Analyzing jobs with OpenAI GPT-4o-mini ({NUM_WORKERS} workers)...")
+    print(prompt_cache.describe(PROMPT_PREFIX))
     print("-" * 60)
     
     tasks = [
@@ -755,12 +780,14 @@ async def main():
         for job in jobs_to_analyze
     ]
     
-    analyzed_jobs = await asyncio.gather(*tasks)
+    with tracing.span("analyze_jobs", jobs=len(tasks)):
+        analyzed_jobs = await asyncio.gather(*tasks)
     
     elapsed_time = time.time() - start_time
     
     # Calculer les stats
     total_tokens = sum(j.get('tokens_used', 0) for j in analyzed_jobs)
+    cached_tokens = sum(j.get('cached_tokens', 0) for j in analyzed_jobs)
     successful = sum(1 for j in analyzed_jobs if j.get('analysis_success'))
     high_relevance = sum(1 for j in analyzed_jobs if j.get('analysis') and j['analysis'].get('relevance_score', 0) >= 7)
     
@@ -769,19 +796,21 @@ async def main():
         'generated_at': datetime.now().isoformat(),
         'total_jobs': len(jobs_to_analyze),
         'total_tokens': total_tokens,
+        'cached_tokens': cached_tokens,
         'jobs': analyzed_jobs
     }
     
     # Sauvegarder en JSON
     json_path = 'jobs_analysis_results.json'
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(analyzed_data, f, ensure_ascii=False, indent=2)
+    with tracing.span("save_results", kind="save", path=json_path):
+        write_json_atomic(json_path, analyzed_data)
     print(f"\n✅ JSON results saved: {json_path}")
     
     # Générer le rapport HTML
     print("\n📊 Generating HTML report...")
     html_path = 'jobs_analysis_report.html'
-    generate_analysis_report(analyzed_data, html_path)
+    with tracing.span("html_report"):
+        generate_analysis_report(analyzed_data, html_path)
     
     # Résumé
     print("\n" + "=" * 60)
@@ -790,13 +819,15 @@ async def main():
     print(f"   Jobs analyzed: {len(jobs_to_analyze)}")
     print(f"   Successful analyses: {successful}")
     print(f"   High relevance (≥7/10): {high_relevance}")
-    print(f"   Total tokens used: {total_tokens:,}")
-    print(f"   Estimated cost: ${total_tokens * 0.00015:.2f}")
+    print(f"   Total tokens used: {total_tokens:,} ({cached_tokens:,} served from the prompt cache)")
+    print(f"   Estimated cost: ${(total_tokens - cached_tokens / 2) * 0.00015:.2f}")
     print(f"   ⏱️  Total time: {elapsed_time:.1f}s ({elapsed_time/len(jobs_to_analyze):.2f}s/job)")
     print(f"\n   Reports saved:")
     print(f"   - {json_path}")
     print(f"   - {html_path}")
     print("=" * 60)
+    
+    tracing.finish()
 
 
 if __name__ == "__main__":
@@ -4,14 +4,25 @@ Script d'analyse V2 - Approche exhaustive et structurée
 Extraction large avec organisation intelligente
 """
 
+import argparse
 import json
 import asyncio
 import sys
 import os
+import time
 from datetime import datetime
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+import blob_store
+import cascade
+import company_selection
+import jobs_loader
+import prompt_cache
+import tracing
+from models import Job
+from storage import read_json, write_json_atomic
+
 sys.stdout.reconfigure(line_buffering=True)
 
 # Charger les variables d'environnement depuis .env
@@ -27,7 +38,7 @@ OUTPUT_FILE = "jobs_analysis_v2.json"
 
 client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
-SYSTEM_PROMPT = """You are an expert at analyzing job descriptions to identify B2B commercial opportunities.
+ROLE_CONTEXT = """You are an expert at analyzing job descriptions to identify B2B commercial opportunities.
 
 CONTEXT:
 presti.ai is an AI tool that allows furniture/home decor companies to generate realistic photostaging/photoshoot images from their product photos.
@@ -38,7 +49,9 @@ Value proposition:
 - Produce at scale across entire catalog
 - Speed of production and iteration
 - Reduce photo production costs
-- Improve e-commerce conversion through better images
+- Improve e-commerce conversion through better images"""
+
+SYSTEM_PROMPT = ROLE_CONTEXT + """
 
 OBJECTIVE:
 Analyze the job description EXHAUSTIVELY to extract all relevant information. Be generous in extraction - better to include than exclude.
@@ -164,139 +177,363 @@ CRITICAL RULES:
 ❌ Also reject: CRM (Salesforce, HubSpot), Microsoft Office, Jira, Slack, HR/finance tools
 """
 
-USER_PROMPT = """Analyse cette description de poste de manière EXHAUSTIVE :
+INSTRUCTIONS = """Analyse chaque description de poste de manière EXHAUSTIVE.
+Extrais toutes les informations pertinentes avec des citations exactes comme preuves. Sois généreux dans l'extraction."""
+
+# Préfixe identique pour tous les appels (cache de prompt), puis entreprise, puis offre
+PROMPT_PREFIX = prompt_cache.static_prefix(SYSTEM_PROMPT, INSTRUCTIONS)
+
+COMPANY_CONTEXT = "ENTREPRISE: {company}"
 
-ENTREPRISE: {company}
-TITRE: {title}
+JOB_PROMPT = """TITRE: {title}
 LOCALISATION: {location}
 
 DESCRIPTION COMPLÈTE:
-{description}
+{description}"""
 
-Extrais toutes les informations pertinentes avec des citations exactes comme preuves. Sois généreux dans l'extraction."""
+# Mode groupé (--pack N) : plusieurs offres courtes d'une même entreprise par appel
+SHORT_JOB_TOKENS = 1000     # au-delà (~4000 caractères), l'offre part seule
+PACK_INPUT_BUDGET = 5000    # tokens estimés de descriptions par appel groupé
+PACK_OUTPUT_TOKENS = 2500   # tokens de réponse prévus par offre (plafonné à 16000 par appel)
+
+PACK_INSTRUCTIONS = """PACKED MODE:
+Several job descriptions from the same company follow, each introduced by "=== JOB <id> ===".
+Analyze each job independently, exactly as if it were the only one provided.
+Respond ONLY with valid JSON of the form {"jobs": {"<id>": <analysis using the structure above>}} with one entry per job id."""
+
+PACKED_PREFIX = prompt_cache.static_prefix(SYSTEM_PROMPT, INSTRUCTIONS, PACK_INSTRUCTIONS)
+
+# Mode cascade (--cascade) : tri court sur le contexte presti.ai, analyse exhaustive au-dessus du seuil
+SCREEN_PREFIX = cascade.screen_prefix(ROLE_CONTEXT)
+
+
+def _job_prompt(job_data):
+    return JOB_PROMPT.format(
+        title=job_data['job_title'],
+        location=job_data.get('location', 'N/A'),
+        description=job_data['description'][:12000]
+    )
 
 
-async def analyze_job(job_data, semaphore):
+def _job_tokens(job_data):
+    """Taille estimée de l'offre (~4 caractères par token)"""
+    return len(job_data['description'][:12000]) // 4
+
+
+def iter_packs(keyed_jobs, max_jobs, budget=PACK_INPUT_BUDGET):
+    """
+    Regroupe des (clé, offre) consécutives d'une même entreprise : au plus max_jobs offres courtes et
+    `budget` tokens estimés par groupe. Les offres longues (et toutes si max_jobs <= 1) partent seules.
+    """
+    pack, size = [], 0
+    for job_key, job in keyed_jobs:
+        tokens = _job_tokens(job)
+        if max_jobs <= 1 or tokens > SHORT_JOB_TOKENS:
+            yield [(job_key, job)]
+            continue
+        if pack and (job['company_name'] != pack[0][1]['company_name']
+                     or len(pack) >= max_jobs or size + tokens > budget):
+            yield pack
+            pack, size = [], 0
+        pack.append((job_key, job))
+        size += tokens
+    if pack:
+        yield pack
+
+
+def parse_packed(content, ids):
+    """{id: analyse} pour les entrées valides d'une réponse groupée ; {} si la réponse est inexploitable"""
+    try:
+        data = json.loads(content)
+    except (TypeError, json.JSONDecodeError):
+        return {}
+    jobs = data.get('jobs') if isinstance(data, dict) else None
+    if not isinstance(jobs, dict):
+        return {}
+    return {
+        job_id: jobs[job_id] for job_id in ids
+        if isinstance(jobs.get(job_id), dict) and isinstance(jobs[job_id].get('relevance_score'), (int, float))
+    }
+
+
+async def analyze_job(job_data, semaphore, model="gpt-4o-mini"):
     """Analyse un job avec OpenAI"""
-    async with semaphore:
-        try:
-            response = await client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": USER_PROMPT.format(
-                        company=job_data['company_name'],
-                        title=job_data['job_title'],
-                        location=job_data.get('location', 'N/A'),
-                        description=job_data['description'][:12000]
-                    )}
-                ],
-                temperature=0.2,
-                max_tokens=3000,
-                response_format={"type": "json_object"}
+    with tracing.span(job_data['job_title'], kind="job", company=job_data['company_name']):
+        async with tracing.queued(semaphore, api="openai.chat"):
+            try:
+                with tracing.span("chat.completions", kind="api", api="openai.chat", model=model) as api_span:
+                    response = await client.chat.completions.create(
+                        model=model,
+                        messages=prompt_cache.messages(
+                            PROMPT_PREFIX,
+                            COMPANY_CONTEXT.format(company=job_data['company_name']),
+                            _job_prompt(job_data)
+                        ),
+                        temperature=0.2,
+                        max_tokens=3000,
+                        response_format={"type": "json_object"}
+                    )
+                    usage = prompt_cache.usage_attrs(response.usage)
+                    api_span.set(**usage)
+                
+                analysis = json.loads(response.choices[0].message.content)
+                return {
+                    'success': True,
+                    'analysis': analysis,
+                    **usage
+                }
+            except Exception as e:
+                return {'success': False, 'error': str(e), 'analysis': None}
+
+
+async def analyze_pack(batch, semaphore, model="gpt-4o-mini"):
+    """
+    Analyse plusieurs offres d'une même entreprise en un seul appel (réponse indexée par id d'offre).
+    Les offres absentes ou invalides dans la réponse (JSON tronqué, id manquant...) repartent en
+    appels unitaires. Retourne [(clé, offre, résultat)] dans l'ordre du groupe.
+    """
+    company = batch[0][1]['company_name']
+    ids = [f"J{i}" for i in range(1, len(batch) + 1)]
+    job_text = "\n\n".join(f"=== JOB {job_id} ===\n{_job_prompt(job)}" for job_id, (_, job) in zip(ids, batch))
+    analyses, usage = {}, None
+    
+    with tracing.span(f"pack of {len(batch)}", kind="job", company=company, jobs=len(batch)) as pack_span:
+        async with tracing.queued(semaphore, api="openai.chat"):
+            try:
+                with tracing.span("chat.completions", kind="api", api="openai.chat", model=model,
+                                  packed=len(batch)) as api_span:
+                    response = await client.chat.completions.create(
+                        model=model,
+                        messages=prompt_cache.messages(
+                            PACKED_PREFIX,
+                            COMPANY_CONTEXT.format(company=company),
+                            job_text
+                        ),
+                        temperature=0.2,
+                        max_tokens=min(16000, PACK_OUTPUT_TOKENS * len(batch)),
+                        response_format={"type": "json_object"}
+                    )
+                    usage = prompt_cache.usage_attrs(response.usage)
+                    api_span.set(**usage)
+                analyses = parse_packed(response.choices[0].message.content, ids)
+            except Exception as e:
+                pack_span.set(error=str(e)[:200])
+        pack_span.set(fallback=len(batch) - len(analyses))
+    
+    missing = [(job_key, job) for job_id, (job_key, job) in zip(ids, batch) if job_id not in analyses]
+    retried = await asyncio.gather(*[analyze_job(job, semaphore, model) for _, job in missing])
+    for result in retried:
+        result['fallback'] = True
+    retried = dict(zip([job_key for job_key, _ in missing], retried))
+    
+    # Consommation de l'appel groupé répartie sur toutes les offres du groupe, reprises comprises
+    shares = split_usage(usage, len(batch))
+    results = []
+    for job_id, (job_key, job), share in zip(ids, batch, shares):
+        if job_key in retried:
+            result = retried[job_key]
+            for key, value in share.items():
+                result[key] = result.get(key, 0) + value
+        else:
+            result = {'success': True, 'analysis': analyses[job_id], 'packed': True, **share}
+        results.append((job_key, job, result))
+    return results
+
+
+def split_usage(usage, count):
+    """Découpe une consommation (tokens, prompt_tokens, cached_tokens) en `count` parts entières"""
+    shares = [{} for _ in range(count)]
+    for key in ('tokens', 'prompt_tokens', 'cached_tokens'):
+        base, extra = divmod((usage or {}).get(key, 0), count)
+        for i, share in enumerate(shares):
+            share[key] = base + (i < extra)
+    return shares
+
+
+async def screen_job(job_data, semaphore, tiers):
+    """Passage de tri de la cascade (cascade.screen) sous le sémaphore des appels OpenAI"""
+    with tracing.span(job_data['job_title'], kind="job", company=job_data['company_name'], tier="screen"):
+        async with tracing.queued(semaphore, api="openai.chat"):
+            return await cascade.screen(
+                client, tiers, SCREEN_PREFIX,
+                COMPANY_CONTEXT.format(company=job_data['company_name']), _job_prompt(job_data)
             )
-            
-            analysis = json.loads(response.choices[0].message.content)
-            return {
-                'success': True,
-                'analysis': analysis,
-                'tokens': response.usage.total_tokens
-            }
-        except Exception as e:
-            return {'success': False, 'error': str(e), 'analysis': None}
-
-
-async def process_and_save(jobs, output_file):
-    """Traite tous les jobs avec sauvegarde incrémentale"""
+
+
+async def process_and_save(jobs, output_file, refresh_companies=None, pack=1, tiers=None):
+    """Traite tous les jobs avec sauvegarde incrémentale
+    
+    jobs : liste ou itérateur (jobs_loader.iter_jobs) ; au plus NUM_WORKERS * 2 appels sont en cours,
+    les premiers prompts partent pendant la lecture de jobs_data.json
+    refresh_companies : entreprises dont les analyses existantes sont écartées puis recalculées
+    pack : nombre maximal d'offres courtes d'une même entreprise par appel (1 = une offre par appel)
+    tiers : cascade.Cascade ; les offres sous le seuil de tri gardent une analyse minimale
+    """
     semaphore = asyncio.Semaphore(NUM_WORKERS)
     
     # Charger les résultats existants
     results = {}
     if os.path.exists(output_file):
-        with open(output_file, 'r', encoding='utf-8') as f:
-            results = json.load(f)
+        with tracing.span("load_results", kind="load", path=output_file):
+            results = {key: Job.from_dict(entry) for key, entry in read_json(output_file).items()}
         print(f"✓ {len(results)} analyses déjà complétées")
     
-    total = len(jobs)
+    if refresh_companies:
+        refresh_companies = set(refresh_companies)
+        results = {k: v for k, v in results.items() if v.get('company_name') not in refresh_companies}
+    
     completed = len(results)
+    total = completed  # analyses existantes + offres lues jusqu'ici
     total_tokens = 0
+    cached_tokens = 0
+    calls = {'single': 0, 'packed': 0, 'packed_jobs': 0, 'fallback': 0}
     
-    print(f"\n🚀 Démarrage de l'analyse : {total - completed} jobs à traiter")
-    print(f"⚙️  Workers : {NUM_WORKERS}")
+    print(f"\n🚀 Démarrage de l'analyse (lecture des offres en flux)")
+    print(f"⚙️  Workers : {NUM_WORKERS}" + (f" | jusqu'à {pack} offres courtes par appel" if pack > 1 else ""))
+    print(prompt_cache.describe(PROMPT_PREFIX))
+    if tiers is not None:
+        print(tiers.describe())
     print(f"💾 Sauvegarde : {output_file}\n")
     
-    tasks = []
-    job_keys = []
-    
-    for job in jobs:
-        job_key = f"{job['company_name']}_{job['job_title']}"
-        if job_key not in results:
-            tasks.append(analyze_job(job, semaphore))
-            job_keys.append((job_key, job))
+    async def analyze_full(batch, model="gpt-4o-mini"):
+        # Les tâches se terminent dans le désordre : on garde les clés avec les résultats
+        if len(batch) == 1:
+            job_key, job = batch[0]
+            calls['single'] += 1
+            return [(job_key, job, await analyze_job(job, semaphore, model))]
+        calls['packed'] += 1
+        return await analyze_pack(batch, semaphore, model)
     
-    if not tasks:
-        print("✅ Toutes les analyses sont déjà complétées !")
-        return results
+    async def analyze_batch(batch):
+        if tiers is None:
+            return await analyze_full(batch)
+        screens = await asyncio.gather(*[screen_job(job, semaphore, tiers) for _, job in batch])
+        done, escalated = [], []
+        for (job_key, job), screened in zip(batch, screens):
+            if screened['escalate']:
+                escalated.append((job_key, job, screened))
+            else:
+                done.append((job_key, job, {
+                    'success': True, 'analysis': cascade.screened_analysis(tiers, screened),
+                    'tokens': screened['tokens'], 'cached_tokens': screened['cached_tokens']
+                }))
+        if escalated:
+            started = time.perf_counter()
+            full = await analyze_full([(job_key, job) for job_key, job, _ in escalated], tiers.full_model)
+            cascade.stats(tiers.stage).add("full", sum(r.get('tokens', 0) for _, _, r in full),
+                                           (time.perf_counter() - started) * 1000, runs=len(escalated))
+            for (job_key, job, result), (_, _, screened) in zip(full, escalated):
+                if result['success']:
+                    cascade.mark_full(tiers, result['analysis'], screened)
+                result['tokens'] = result.get('tokens', 0) + screened['tokens']
+                result['cached_tokens'] = result.get('cached_tokens', 0) + screened['cached_tokens']
+                done.append((job_key, job, result))
+        return done
     
-    # Process jobs
-    for i, task in enumerate(asyncio.as_completed(tasks)):
-        result = await task
-        job_key, job = job_keys[i]
-        
+    def record(job_key, job, result):
+        nonlocal completed, total_tokens, cached_tokens
+        # Tokens comptés même en échec (part d'un appel groupé, tri de la cascade)
+        total_tokens += result.get('tokens', 0)
+        cached_tokens += result.get('cached_tokens', 0)
         if result['success']:
-            results[job_key] = {
-                **job,
+            results[job_key] = Job.from_dict({
+                **blob_store.strip_description(job),
                 'analysis': result['analysis'],
                 'analyzed_at': datetime.now().isoformat()
-            }
-            total_tokens += result['tokens']
+            })
             completed += 1
+            calls['packed_jobs'] += bool(result.get('packed'))
             
             # Sauvegarde incrémentale toutes les 5 analyses
             if completed % 5 == 0:
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(results, f, indent=2, ensure_ascii=False)
+                with tracing.span("save_results", kind="save", path=output_file, entries=len(results)):
+                    write_json_atomic(output_file, results)
             
             score = result['analysis'].get('relevance_score', 0)
             print(f"[{completed}/{total}] ✓ {job['company_name'][:25]:25} | {job['job_title'][:40]:40} | Score: {score}/10 | Tokens: {total_tokens:,}")
         else:
             print(f"[{completed}/{total}] ✗ {job['company_name'][:25]:25} | {job['job_title'][:40]:40} | Erreur: {result['error']}")
     
+    async def drain(pending, until):
+        # Attend qu'il reste au plus `until` tâches en cours
+        while len(pending) > until:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                for job_key, job, result in task.result():
+                    calls['fallback'] += bool(result.get('fallback'))
+                    record(job_key, job, result)
+        return pending
+    
+    def to_analyze():
+        nonlocal total
+        for job in jobs:
+            job_key = f"{job['company_name']}_{job['job_title']}"
+            if job_key in results:
+                continue
+            total += 1
+            yield job_key, job
+    
+    # Fenêtre bornée : seules les offres en cours gardent leur description en mémoire
+    window = NUM_WORKERS * 2
+    pending = set()
+    already = total
+    for batch in iter_packs(to_analyze(), pack):
+        pending.add(asyncio.ensure_future(analyze_batch(batch)))
+        if len(pending) >= window:
+            pending = await drain(pending, window - 1)
+    
+    if total == already:
+        print("✅ Toutes les analyses sont déjà complétées !")
+        return results
+    
+    await drain(pending, 0)
+    
     # Sauvegarde finale
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+    with tracing.span("save_results", kind="save", path=output_file, entries=len(results)):
+        write_json_atomic(output_file, results)
     
     print(f"\n✅ Analyse terminée !")
-    print(f"📊 Total tokens utilisés : {total_tokens:,}")
-    print(f"💰 Coût estimé : ${(total_tokens / 1000000) * 0.15:.2f}")
+    print(f"📊 Total tokens utilisés : {total_tokens:,} (dont {cached_tokens:,} servis depuis le cache)")
+    if tiers is not None:
+        cascade.stats(tiers.stage).print_summary()
+    if calls['packed']:
+        print(f"📦 Appels : {calls['single'] + calls['packed'] + calls['fallback']} "
+              f"({calls['packed']} groupés pour {calls['packed_jobs']} offres, {calls['fallback']} reprises en unitaire)")
+    # Les tokens d'entrée en cache sont facturés moitié prix
+    print(f"💰 Coût estimé : ${((total_tokens - cached_tokens / 2) / 1000000) * 0.15:.2f}")
     
     return results
 
 
-async def main():
-    # Charger les données
-    with open('jobs_data.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
+async def main(selection=None, output_file=OUTPUT_FILE, pack=1, tiers=None):
+    """
+    selection : company_selection.Selection (shard, filtres) ; output_file : un fichier par shard
+    pack : offres courtes d'une même entreprise par appel ; tiers : cascade.Cascade (tri puis analyse)
+    """
+    tracing.init("analyze_v2")
     
-    jobs = []
-    for company_data in data['companies']:
-        if not company_data.get('jobs'):
-            continue
-        
-        company_info = company_data['company']
-        for job in company_data['jobs']:
-            jobs.append({
-                'company_name': company_info['name'],
-                'company_website': company_info.get('website', ''),
-                'company_linkedin': company_info.get('linkedin', ''),
-                **job
-            })
+    # Offres lues en flux : l'analyse démarre avant la fin du parsing de jobs_data.json
+    jobs = jobs_loader.iter_jobs(selection=selection)
     
-    print(f"📁 {len(jobs)} offres d'emploi chargées")
+    with tracing.span("analyze_jobs") as span:
+        results = await process_and_save(jobs, output_file, pack=pack, tiers=tiers)
+        span.set(results=len(results))
+        if tiers is not None:
+            span.set(cascade=cascade.stats(tiers.stage).summary())
     
-    await process_and_save(jobs, OUTPUT_FILE)
+    tracing.finish()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Analyse V2 des offres d'emploi")
+    parser.add_argument('--output', default=OUTPUT_FILE, help="Fichier de sortie (un par shard)")
+    parser.add_argument('--pack', type=int, default=1, metavar='N',
+                        help="Analyse jusqu'à N offres courtes d'une même entreprise par appel (défaut : 1)")
+    parser.add_argument('--cascade', type=int, nargs='?', const=cascade.DEFAULT_THRESHOLD, metavar='SEUIL',
+                        help="Tri gpt-4o-mini court d'abord ; analyse complète seulement si score >= SEUIL "
+                             f"(défaut : {cascade.DEFAULT_THRESHOLD})")
+    company_selection.add_arguments(parser)
+    args = parser.parse_args()
+    tiers = cascade.Cascade.from_env("analyze_v2", args.cascade) if args.cascade is not None else None
+    asyncio.run(main(company_selection.from_args(args), args.output, args.pack, tiers))
 
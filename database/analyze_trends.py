@@ -5,6 +5,7 @@ Objectif : Détecter des signaux d'intention d'achat à partir des offres d'empl
 pour positionner presti.ai
 """
 
+import argparse
 import json
 import asyncio
 import sys
@@ -14,6 +15,15 @@ from openai import AsyncOpenAI
 from collections import defaultdict
 from dotenv import load_dotenv
 
+import blob_store
+import company_selection
+import dates
+import hiring_velocity
+import jobs_loader
+import prompt_cache
+import tracing
+from storage import read_json, write_json_atomic
+
 sys.stdout.reconfigure(line_buffering=True)
 
 # Charger les variables d'environnement depuis .env
@@ -54,41 +64,34 @@ B. VISUAL CONTENT & CREATIVE PRODUCTION
 Signals: roles related to visual creation, content, design, brand, photography
 Keywords: photos, visuals, assets, catalogs, product pages, content production, brand imagery, creative direction, photoshoots, 3D rendering
 
+HIRING METRICS (posting counts, acceleration, velocity, rate shifts) are computed exactly from ALL postings
+and given in the user message: use them as-is, never recount jobs from the excerpts.
+
 For each category, identify:
-- EVOLUTION: increase/decrease in job volume, changing focus areas
+- EVOLUTION: interpret the hiring metrics (volume changes, rate shifts) and the changing focus areas
 - NEW THEMES: emerging topics that weren't mentioned before
-- HIRING VELOCITY: sudden acceleration in specific areas
 
 IMPORTANT: All analysis must be in ENGLISH.
 
 Respond ONLY with valid JSON using this structure:
 {
     "company_name": "company name",
-    "analysis_period": {
-        "start_date": "YYYY-MM-DD",
-        "end_date": "YYYY-MM-DD",
-        "total_jobs": <number>
-    },
     "overall_signal_strength": <1-10>,
     "overall_summary": "1-2 concise sentences highlighting the main buying signal detected",
     
     "trends": {
         "digital_growth_product": {
             "signal_strength": <1-10>,
-            "job_count": <number>,
             "key_roles": ["list of relevant job titles"],
             "evolution": "description of evolution/changes over time",
             "new_themes": ["list of new themes appearing"],
-            "hiring_velocity": "slow/moderate/fast/accelerating",
             "evidence": ["key quotes from job descriptions"]
         },
         "visual_content_creative": {
             "signal_strength": <1-10>,
-            "job_count": <number>,
             "key_roles": ["list of relevant job titles"],
             "evolution": "description of evolution/changes over time",
             "new_themes": ["list of new themes appearing"],
-            "hiring_velocity": "slow/moderate/fast/accelerating",
             "evidence": ["key quotes from job descriptions"]
         }
     }
@@ -100,7 +103,10 @@ COMPANY INFO:
 - Industry: {industry}
 - Size: {employees}
 
-ALL JOB POSTINGS ({job_count} total):
+HIRING METRICS (computed from all {job_count} postings):
+{hiring_metrics}
+
+JOB POSTINGS ({shown_count} most recent of {job_count}):
 
 {jobs_summary}
 
@@ -111,80 +117,100 @@ B. Visual Content & Creative Production (visuals, content, design, photography,
 Look for patterns, evolution, and emerging themes that indicate business initiatives."""
 
 
-async def analyze_company_trends(company_data, semaphore):
-    """Analyse les tendances d'embauche pour une entreprise"""
-    async with semaphore:
-        try:
-            company_info = company_data['company']
-            jobs = company_data.get('jobs', [])
-            
-            if not jobs:
+async def analyze_company_trends(company_data, semaphore, metrics=None):
+    """Analyse les tendances d'embauche pour une entreprise
+    
+    metrics : vélocité calculée localement (hiring_velocity) ; ses chiffres remplacent ceux du modèle
+    """
+    with tracing.span(company_data['company']['name'], kind="company"):
+        async with tracing.queued(semaphore, api="openai.chat"):
+            try:
+                company_info = company_data['company']
+                jobs = company_data.get('jobs', [])
+                
+                if not jobs:
+                    return {
+                        'success': False,
+                        'company_name': company_info['name'],
+                        'error': 'No jobs to analyze'
+                    }
+                
+                # Extraits des offres les plus récentes (les volumes viennent des métriques, pas des extraits)
+                recent_jobs = sorted(jobs, key=lambda j: dates.normalize(j.get('date_creation')) or '', reverse=True)[:20]
+                jobs_summary = []
+                for i, job in enumerate(recent_jobs, 1):
+                    job_date = job.get('date_creation', '')[:10] if job.get('date_creation') else 'Unknown'
+                    jobs_summary.append(
+                        f"\n--- JOB {i} ---\n"
+                        f"Title: {job.get('job_title', 'N/A')}\n"
+                        f"Location: {job.get('location', 'N/A')}\n"
+                        f"Date: {job_date}\n"
+                        f"Description: {job.get('description', 'N/A')[:1500]}...\n"
+                    )
+                
+                user_prompt = USER_PROMPT_TEMPLATE.format(
+                    company_name=company_info['name'],
+                    industry=company_info['industry'],
+                    employees=company_info['employees'],
+                    job_count=len(jobs),
+                    shown_count=len(recent_jobs),
+                    hiring_metrics=hiring_velocity.prompt_section(metrics) if metrics else "Not available (no usable dates)",
+                    jobs_summary='\n'.join(jobs_summary)
+                )
+                
+                with tracing.span("chat.completions", kind="api", api="openai.chat", model="gpt-4o-mini") as api_span:
+                    response = await client.chat.completions.create(
+                        model="gpt-4o-mini",
+                        messages=[
+                            {"role": "system", "content": SYSTEM_PROMPT},
+                            {"role": "user", "content": user_prompt}
+                        ],
+                        temperature=0.3,
+                        max_tokens=3000,
+                        response_format={"type": "json_object"}
+                    )
+                    usage = prompt_cache.usage_attrs(response.usage)
+                    api_span.set(**usage)
+                
+                analysis = json.loads(response.choices[0].message.content)
+                if metrics:
+                    hiring_velocity.apply_to_analysis(analysis, metrics)
+                else:
+                    analysis.setdefault('analysis_period', {'total_jobs': len(jobs)})
+                
                 return {
-                    'success': False,
+                    'success': True,
                     'company_name': company_info['name'],
-                    'error': 'No jobs to analyze'
+                    'analysis': analysis,
+                    'tokens': usage['tokens']
+                }
+                
+            except Exception as e:
+                return {
+                    'success': False,
+                    'company_name': company_data['company']['name'],
+                    'error': str(e),
+                    'analysis': None
                 }
-            
-            # Préparer un résumé de tous les jobs
-            jobs_summary = []
-            for i, job in enumerate(jobs, 1):
-                job_date = job.get('date_creation', '')[:10] if job.get('date_creation') else 'Unknown'
-                jobs_summary.append(
-                    f"\n--- JOB {i} ---\n"
-                    f"Title: {job.get('job_title', 'N/A')}\n"
-                    f"Location: {job.get('location', 'N/A')}\n"
-                    f"Date: {job_date}\n"
-                    f"Description: {job.get('description', 'N/A')[:1500]}...\n"
-                )
-            
-            user_prompt = USER_PROMPT_TEMPLATE.format(
-                company_name=company_info['name'],
-                industry=company_info['industry'],
-                employees=company_info['employees'],
-                job_count=len(jobs),
-                jobs_summary='\n'.join(jobs_summary[:20])  # Limite pour éviter de dépasser le token limit
-            )
-            
-            response = await client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=3000,
-                response_format={"type": "json_object"}
-            )
-            
-            analysis = json.loads(response.choices[0].message.content)
-            
-            return {
-                'success': True,
-                'company_name': company_info['name'],
-                'analysis': analysis,
-                'tokens': response.usage.total_tokens
-            }
-            
-        except Exception as e:
-            return {
-                'success': False,
-                'company_name': company_data['company']['name'],
-                'error': str(e),
-                'analysis': None
-            }
 
 
-async def process_all_companies(data, output_file):
-    """Traite toutes les entreprises avec sauvegarde incrémentale"""
+async def process_all_companies(data, output_file, refresh_companies=None):
+    """Traite toutes les entreprises avec sauvegarde incrémentale
+    
+    refresh_companies : entreprises dont l'analyse existante est écartée puis recalculée
+    """
     semaphore = asyncio.Semaphore(NUM_WORKERS)
     
     # Charger les résultats existants
     results = {}
     if os.path.exists(output_file):
-        with open(output_file, 'r', encoding='utf-8') as f:
-            results = json.load(f)
+        with tracing.span("load_results", kind="load", path=output_file):
+            results = read_json(output_file)
         print(f"✓ {len(results)} analyses déjà complétées")
     
+    for company_name in refresh_companies or []:
+        results.pop(company_name, None)
+    
     # Filtrer les entreprises avec des jobs
     companies_with_jobs = [
         c for c in data['companies'] 
@@ -200,13 +226,20 @@ async def process_all_companies(data, output_file):
     print(f"⚙️  Workers : {NUM_WORKERS}")
     print(f"💾 Sauvegarde : {output_file}\n")
     
+    # Vélocité d'embauche : une seule passe NumPy sur toutes les offres de toutes les entreprises
+    with tracing.span("hiring_velocity", companies=len(companies_with_jobs)):
+        velocity = hiring_velocity.compute_all(companies_with_jobs)
+    
+    # Descriptions (store compressé) relues seulement pour les entreprises à analyser
+    blob_store.hydrate_companies([c for c in companies_with_jobs if c['company']['name'] not in results])
+    
     tasks = []
     company_names = []
     
     for company_data in companies_with_jobs:
         company_name = company_data['company']['name']
         if company_name not in results:
-            tasks.append(analyze_company_trends(company_data, semaphore))
+            tasks.append(analyze_company_trends(company_data, semaphore, velocity.get(company_name)))
             company_names.append(company_name)
     
     if not tasks:
@@ -227,18 +260,18 @@ async def process_all_companies(data, output_file):
             
             # Sauvegarde incrémentale toutes les 2 analyses
             if completed % 2 == 0:
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(results, f, indent=2, ensure_ascii=False)
+                with tracing.span("save_results", kind="save", path=output_file, entries=len(results)):
+                    write_json_atomic(output_file, results)
             
             signal = result['analysis'].get('overall_signal_strength', 0)
-            job_count = result['analysis']['analysis_period'].get('total_jobs', 0)
+            job_count = result['analysis'].get('analysis_period', {}).get('total_jobs', 0)
             print(f"[{completed}/{total}] ✓ {result['company_name'][:35]:35} | Jobs: {job_count:3} | Signal: {signal}/10 | Tokens: {total_tokens:,}")
         else:
             print(f"[{completed}/{total}] ✗ {result['company_name'][:35]:35} | Erreur: {result.get('error', 'Unknown')[:50]}")
     
     # Sauvegarde finale
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+    with tracing.span("save_results", kind="save", path=output_file, entries=len(results)):
+        write_json_atomic(output_file, results)
     
     print(f"\n✅ Analyse des tendances terminée !")
     print(f"📊 Total tokens utilisés : {total_tokens:,}")
@@ -247,20 +280,30 @@ async def process_all_companies(data, output_file):
     return results
 
 
-async def main():
+async def main(selection=None, output_file=OUTPUT_FILE):
+    """selection : company_selection.Selection (shard, filtres) ; output_file : un fichier par shard"""
     print("=" * 70)
     print("🎯 presti.ai - Analyse des Tendances sur 3 mois")
     print("=" * 70)
+    tracing.init("trends")
     
     # Charger les données
-    with open('jobs_data.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    # Lecture en flux : seules les entreprises sélectionnées restent en mémoire (descriptions relues plus tard)
+    with tracing.span("load_jobs_data", kind="load", path='jobs_data.json'):
+        data = {'companies': list(jobs_loader.iter_companies('jobs_data.json', selection, hydrate=False))}
     
     print(f"\n📁 {len(data['companies'])} entreprises chargées")
     
-    await process_all_companies(data, OUTPUT_FILE)
+    with tracing.span("analyze_trends"):
+        await process_all_companies(data, output_file)
+    
+    tracing.finish()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Analyse des tendances d'embauche par entreprise")
+    parser.add_argument('--output', default=OUTPUT_FILE, help="Fichier de sortie (un par shard)")
+    company_selection.add_arguments(parser)
+    args = parser.parse_args()
+    asyncio.run(main(company_selection.from_args(args), args.output))
 
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Stockage unique et compressé des descriptions d'offres (adressé par contenu)
+- Chaque description est stockée une seule fois dans blobs.sqlite, clé = description_hash (sha256 tronqué)
+- Les JSON locaux (jobs_data.json, jobs_analysis_v2.json) ne gardent que le hash ; jobs_analysis_detailed.json,
+  versionné, garde ses descriptions en clair (blobs.sqlite ne l'est pas)
+- Un hash absent du store est une erreur (store construit sur une autre machine) : export / import pour
+  transférer le store
+- Compression zstd avec un dictionnaire entraîné par entreprise (le boilerplate "About us", avantages,
+  mentions légales se répète d'une offre à l'autre) ; repli zlib + dictionnaire prédéfini sans zstandard
+- public/data.json garde les descriptions en clair : le frontend les lit directement
+
+Usage :
+    python blob_store.py migrate     # externalise les descriptions des JSON existants
+    python blob_store.py stats       # taille brute / compressée par entreprise
+    python blob_store.py export descriptions.jsonl.gz    # sur la machine qui a le store
+    python blob_store.py import descriptions.jsonl.gz    # ou directement : import autre/blobs.sqlite
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import sqlite3
+import zlib
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+import tracing
+from storage import read_json, write_json_atomic
+
+try:
+    import zstandard
+except ImportError:  # optionnel : zlib + dictionnaire prédéfini (ratio moindre)
+    zstandard = None
+
+STORE_FILE = "blobs.sqlite"
+CODEC = "zstd" if zstandard else "zlib"
+MIN_DICT_SAMPLES = 8          # en dessous, pas de dictionnaire (compression simple)
+DICT_SIZE = 16 * 1024
+ZLIB_DICT_SIZE = 32 * 1024    # fenêtre maximale de zlib
+ZSTD_LEVEL = 19
+# Échantillons trop petits ou trop homogènes pour entraîner un dictionnaire zstd
+_TRAIN_ERRORS = (zstandard.ZstdError,) if zstandard else ()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dictionaries (
+    id INTEGER PRIMARY KEY,
+    company TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    trained_on INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    company TEXT,
+    codec TEXT NOT NULL,
+    dict_id INTEGER REFERENCES dictionaries(id),
+    size INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_company ON blobs(company);
+"""
+
+
+def description_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def _zlib_dictionary(samples):
+    """Lignes répétées dans plusieurs descriptions, les plus rentables en fin de dictionnaire (zlib y cherche en priorité)"""
+    lines = Counter()
+    for sample in samples:
+        lines.update({line.strip() for line in sample.decode("utf-8").splitlines() if len(line.strip()) > 20})
+    repeated = sorted(((count * len(line), line) for line, count in lines.items() if count > 1))
+    chunks, size = [], 0
+    for _, line in reversed(repeated):
+        encoded = (line + "\n").encode("utf-8")
+        if size + len(encoded) > ZLIB_DICT_SIZE:
+            break
+        chunks.append(encoded)
+        size += len(encoded)
+    return b"".join(reversed(chunks))
+
+
+class BlobStore:
+    """Connexion au store ; une instance par thread (sqlite3)"""
+
+    def __init__(self, path=STORE_FILE):
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.executescript(_SCHEMA)
+        self._dictionaries = {}
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -- Compression ----------------------------------------------------------
+
+    def _dictionary(self, dict_id):
+        if dict_id not in self._dictionaries:
+            row = self.db.execute("SELECT codec, data FROM dictionaries WHERE id = ?", (dict_id,)).fetchone()
+            self._dictionaries[dict_id] = row
+        return self._dictionaries[dict_id]
+
+    def _compress(self, raw, dict_id):
+        dictionary = self._dictionary(dict_id)[1] if dict_id else None
+        if CODEC == "zstd":
+            zdict = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            return zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=zdict).compress(raw)
+        compressor = zlib.compressobj(9, zdict=dictionary) if dictionary else zlib.compressobj(9)
+        return compressor.compress(raw) + compressor.flush()
+
+    def _decompress(self, codec, dict_id, data):
+        dictionary = self._dictionary(dict_id)[1] if dict_id else None
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError(f"{self.path} contient des blobs zstd : pip install zstandard")
+            zdict = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            return zstandard.ZstdDecompressor(dict_data=zdict).decompress(data)
+        decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+        return decompressor.decompress(data) + decompressor.flush()
+
+    def _current_dictionary(self, company):
+        row = self.db.execute(
+            "SELECT id, trained_on FROM dictionaries WHERE company = ? AND codec = ? ORDER BY id DESC LIMIT 1",
+            (company, CODEC),
+        ).fetchone()
+        return row or (None, 0)
+
+    def train(self, company):
+        """Entraîne un dictionnaire sur toutes les descriptions de l'entreprise et recompresse ses blobs"""
+        hashes = [h for (h,) in self.db.execute("SELECT hash FROM blobs WHERE company = ?", (company,))]
+        texts = self.get_many(hashes)
+        samples = [texts[h].encode("utf-8") for h in hashes]
+        if len(samples) < MIN_DICT_SAMPLES:
+            return None
+        try:
+            if CODEC == "zstd":
+                data = zstandard.train_dictionary(min(DICT_SIZE, sum(map(len, samples)) // 4), samples).as_bytes()
+            else:
+                data = _zlib_dictionary(samples)
+        except _TRAIN_ERRORS:
+            return None
+        if not data:
+            return None
+
+        with self.db:
+            dict_id = self.db.execute(
+                "INSERT INTO dictionaries (company, codec, trained_on, data, created_at) VALUES (?, ?, ?, ?, ?)",
+                (company, CODEC, len(samples), data, datetime.now().isoformat()),
+            ).lastrowid
+            self.db.executemany(
+                "UPDATE blobs SET codec = ?, dict_id = ?, data = ? WHERE hash = ?",
+                [(CODEC, dict_id, self._compress(sample, dict_id), h) for h, sample in zip(hashes, samples)],
+            )
+            # Les anciens dictionnaires de l'entreprise ne sont plus référencés
+            self.db.execute(
+                "DELETE FROM dictionaries WHERE company = ? AND id != ? AND id NOT IN (SELECT DISTINCT dict_id FROM blobs WHERE dict_id IS NOT NULL)",
+                (company, dict_id),
+            )
+        return dict_id
+
+    # -- Lecture / écriture -----------------------------------------------------
+
+    def put_many(self, company, texts):
+        """
+        Stocke les textes absents du store ; retourne leurs hashes (dans l'ordre).
+        Le dictionnaire de l'entreprise est (ré)entraîné quand son nombre de blobs a doublé depuis le dernier.
+        """
+        hashes = [description_hash(text) for text in texts]
+        known = set()
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            known.update(h for (h,) in self.db.execute(
+                f"SELECT hash FROM blobs WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        new = {h: text for h, text in zip(hashes, texts) if h not in known}
+        if not new:
+            return hashes
+
+        dict_id, trained_on = self._current_dictionary(company)
+        with self.db:
+            self.db.executemany(
+                "INSERT OR IGNORE INTO blobs (hash, company, codec, dict_id, size, data) VALUES (?, ?, ?, ?, ?, ?)",
+                [(h, company, CODEC, dict_id, len(text.encode("utf-8")), self._compress(text.encode("utf-8"), dict_id))
+                 for h, text in new.items()],
+            )
+        count = self.db.execute("SELECT COUNT(*) FROM blobs WHERE company = ?", (company,)).fetchone()[0]
+        if count >= MIN_DICT_SAMPLES and count >= 2 * trained_on:
+            self.train(company)
+        return hashes
+
+    def get_many(self, hashes):
+        """{hash: texte} ; les hashes inconnus sont absents du résultat"""
+        texts = {}
+        hashes = list(dict.fromkeys(h for h in hashes if h))
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            rows = self.db.execute(
+                f"SELECT hash, codec, dict_id, data FROM blobs WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for h, codec, dict_id, data in rows:
+                texts[h] = self._decompress(codec, dict_id, data).decode("utf-8")
+        return texts
+
+    def sizes(self, hashes):
+        """{hash: taille en octets du texte} sans décompression"""
+        sizes = {}
+        hashes = list(dict.fromkeys(h for h in hashes if h))
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            sizes.update(self.db.execute(
+                f"SELECT hash, size FROM blobs WHERE hash IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        return sizes
+
+    def records(self):
+        """(hash, entreprise, texte) de tous les blobs, entreprise par entreprise"""
+        companies = [c for (c,) in self.db.execute("SELECT DISTINCT company FROM blobs ORDER BY company")]
+        for company in companies:
+            hashes = [h for (h,) in self.db.execute("SELECT hash FROM blobs WHERE company IS ? ORDER BY hash", (company,))]
+            texts = self.get_many(hashes)
+            for h in hashes:
+                yield h, company, texts[h]
+
+    def stats(self):
+        """[(entreprise, nb blobs, octets bruts, octets compressés dictionnaire compris)]"""
+        return self.db.execute("""
+            SELECT b.company, COUNT(*), SUM(b.size),
+                   SUM(LENGTH(b.data)) + COALESCE((SELECT SUM(LENGTH(d.data)) FROM dictionaries d WHERE d.company = b.company), 0)
+            FROM blobs b GROUP BY b.company ORDER BY SUM(b.size) DESC
+        """).fetchall()
+
+
+@contextmanager
+def _store(store):
+    if store is not None:
+        yield store
+    else:
+        with BlobStore() as own:
+            yield own
+
+
+def externalize(jobs, company, store=None):
+    """Copie des jobs où `description` est remplacée par `description_hash` (description stockée dans le store)"""
+    pending = [job for job in jobs if job.get("description")]
+    if not pending:
+        return [dict(job) for job in jobs]
+    with _store(store) as s, tracing.span("blob_put", kind="save", company=company, blobs=len(pending)):
+        hashes = iter(s.put_many(company, [job["description"] for job in pending]))
+    result = []
+    for job in jobs:
+        job = dict(job)
+        if job.get("description"):
+            job["description_hash"] = next(hashes)
+            del job["description"]
+        result.append(job)
+    return result
+
+
+def hydrate(jobs, store=None):
+    """
+    Renseigne (en place) `description` depuis `description_hash` ; sans effet sur les jobs déjà complets.
+    RuntimeError si des hashes sont absents du store (plutôt que des descriptions vides envoyées aux analyses)
+    """
+    missing = [job for job in jobs if job.get("description_hash") and "description" not in job]
+    if not missing:
+        return jobs
+    with _store(store) as s, tracing.span("blob_get", kind="load", blobs=len(missing)) as span:
+        texts = s.get_many(job["description_hash"] for job in missing)
+        unknown = {job["description_hash"] for job in missing} - set(texts)
+        span.set(unknown=len(unknown))
+        if unknown:
+            raise RuntimeError(
+                f"{len(unknown)} descriptions absentes de {s.path} (store construit sur une autre machine ?) : "
+                f"python blob_store.py export / import (company_selection.py merge --blobs pour les shards)"
+            )
+    for job in missing:
+        job["description"] = texts[job["description_hash"]]
+    return jobs
+
+
+def hydrate_companies(companies, store=None):
+    """hydrate() sur les jobs d'une liste d'entrées jobs_data.json (une seule connexion)"""
+    with _store(store) as s:
+        hydrate([job for company_data in companies for job in company_data.get("jobs") or []], s)
+    return companies
+
+
+def strip_description(job):
+    """Copie d'un job sans sa description si elle est déjà dans le store (description_hash présent)"""
+    if job.get("description_hash"):
+        return {k: v for k, v in job.items() if k != "description"}
+    return job
+
+
+def missing_hashes(hashes, store=None):
+    """Hashes absents du store"""
+    hashes = set(h for h in hashes if h)
+    with _store(store) as s:
+        return hashes - set(s.sizes(hashes))
+
+
+def _open_export(path, mode):
+    return gzip.open(path, mode + "t", encoding="utf-8") if path.endswith(".gz") else open(path, mode, encoding="utf-8")
+
+
+def export_store(path, store=None):
+    """Écrit les descriptions du store en JSONL ({hash, company, description}, gzip si .gz) ; retourne leur nombre"""
+    count = 0
+    with _store(store) as s, _open_export(path, "w") as f:
+        for h, company, text in s.records():
+            f.write(json.dumps({"hash": h, "company": company, "description": text}, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def import_store(path, store=None):
+    """
+    Ajoute au store les descriptions d'un export JSONL ou d'un autre blobs.sqlite (recompressées avec les
+    dictionnaires locaux) ; retourne le nb de descriptions lues
+    """
+    if path.endswith(".sqlite"):
+        with BlobStore(path) as other:
+            records = list(other.records())
+    else:
+        with _open_export(path, "r") as f:
+            records = [(r["hash"], r.get("company"), r["description"]) for r in map(json.loads, f) if r.get("description")]
+    by_company = {}
+    for h, company, text in records:
+        if description_hash(text) != h:
+            raise RuntimeError(f"{path} : description altérée ({h})")
+        by_company.setdefault(company, []).append(text)
+    with _store(store) as s, tracing.span("blob_import", kind="load", path=path, blobs=len(records)):
+        for company, texts in by_company.items():
+            s.put_many(company, texts)
+    return len(records)
+
+
+def migrate():
+    """
+    Externalise les descriptions de jobs_data.json et jobs_analysis_v2.json (fichiers locaux) ;
+    jobs_analysis_detailed.json est versionné et garde ses descriptions en clair
+    """
+    with BlobStore() as store:
+        data = read_json("jobs_data.json")
+        if data:
+            for company_data in data.get("companies", []):
+                company_data["jobs"] = externalize(company_data.get("jobs") or [], company_data["company"]["name"], store)
+            write_json_atomic("jobs_data.json", data)
+            print("✅ jobs_data.json")
+
+        v2 = read_json("jobs_analysis_v2.json")
+        if v2:
+            by_company = {}
+            for key, job in v2.items():
+                by_company.setdefault(job["company_name"], []).append(key)
+            for company, keys in by_company.items():
+                for key, job in zip(keys, externalize([v2[k] for k in keys], company, store)):
+                    v2[key] = job
+            write_json_atomic("jobs_analysis_v2.json", v2)
+            print("✅ jobs_analysis_v2.json")
+
+        store.db.execute("VACUUM")  # pages libérées par la recompression avec dictionnaire
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Store compressé des descriptions d'offres")
+    parser.add_argument("command", choices=["migrate", "stats", "export", "import"])
+    parser.add_argument("path", nargs="?", help="export / import : fichier JSONL (.jsonl, .jsonl.gz) ou autre blobs.sqlite")
+    args = parser.parse_args()
+    if args.command in ("export", "import") and not args.path:
+        parser.error(f"{args.command} : chemin requis")
+
+    if args.command == "migrate":
+        migrate()
+    elif args.command == "export":
+        print(f"✅ {export_store(args.path)} descriptions → {args.path}")
+        return
+    elif args.command == "import":
+        print(f"✅ {import_store(args.path)} descriptions lues depuis {args.path}")
+    with BlobStore() as store:
+        rows = store.stats()
+    raw = sum(r[2] for r in rows)
+    packed = sum(r[3] for r in rows)
+    for company, count, size, compressed in rows[:20] if args.command == "stats" else []:
+        print(f"   {company[:35]:35} | {count:5} descriptions | {size / 1024:8.1f} Ko -> {compressed / 1024:7.1f} Ko")
+    if raw:
+        print(f"📦 {sum(r[1] for r in rows)} descriptions ({CODEC}) : {raw / 1024:.0f} Ko -> {packed / 1024:.0f} Ko "
+              f"(x{raw / packed:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Cascade de modèles : un passage court et bon marché note la pertinence, seuls les éléments au-dessus
+du seuil reçoivent l'analyse complète (schéma exhaustif et/ou modèle plus fort)
+- Configuration par étape (Cascade) : modèle de tri, modèle complet, seuil ; surchargeable par variables
+  d'environnement CASCADE_<ÉTAPE>_SCREEN_MODEL / _FULL_MODEL / _THRESHOLD (ex. CASCADE_ANALYZE_V2_THRESHOLD=6)
+- Statistiques par étape (CascadeStats) : éléments triés / écartés / escaladés, tokens et latence par
+  niveau, analyses complètes évitées ; affichées en fin de run et ajoutées à la trace
+
+Usage :
+    python analyze_jobs_v2.py --cascade          # tri gpt-4o-mini, analyse complète si score >= 5
+    python analyze_jobs_v2.py --cascade 7
+"""
+
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import prompt_cache
+import tracing
+
+DEFAULT_THRESHOLD = 5
+
+SCREEN_INSTRUCTIONS = """SCREENING PASS:
+Do NOT produce the full analysis. Only rate how relevant the item is for presti.ai on the same 1-10 scale
+that the full analysis would use, and explain why in one short sentence.
+Respond ONLY with valid JSON: {"relevance_score": <1-10>, "reason": "one sentence"}"""
+
+# Variante pour une liste d'éléments extraits d'un texte de recherche (news, interviews du scraper hybride)
+LIST_SCREEN_INSTRUCTIONS = """SCREENING PASS:
+Do NOT produce the full structured output. List every item found in the search result with only the
+short fields below, and rate how relevant each one is on the same 1-10 scale that the full structuring
+would use (presti_score), with one short sentence explaining why.
+Respond ONLY with valid JSON:
+{"items": [{"ref": <citation number [n] of the item, or null>, "title": "...", "url": "...", "source": "...",
+"date": "YYYY-MM-DD or null", "executive": "name and title, or null", "relevance_score": <1-10>,
+"reason": "one sentence"}]}"""
+
+
+class Cascade:
+    """Configuration d'une étape : modèle de tri, modèle complet, seuil d'escalade (score >= seuil)"""
+
+    __slots__ = ("stage", "screen_model", "full_model", "threshold", "screen_chars")
+
+    def __init__(self, stage: str, screen_model: str = "gpt-4o-mini", full_model: str = "gpt-4o-mini",
+                 threshold: int = DEFAULT_THRESHOLD, screen_chars: int = 3000):
+        self.stage = stage
+        self.screen_model = screen_model
+        self.full_model = full_model
+        self.threshold = threshold
+        self.screen_chars = screen_chars  # texte envoyé au tri (le début d'une offre suffit à la noter)
+
+    @classmethod
+    def from_env(cls, stage: str, threshold: Optional[int] = None, **defaults) -> "Cascade":
+        """Défauts de l'étape, surchargés par CASCADE_<ÉTAPE>_* puis par `threshold` (option CLI)"""
+        prefix = f"CASCADE_{stage.upper()}_"
+        cascade = cls(stage, **defaults)
+        cascade.screen_model = os.getenv(prefix + "SCREEN_MODEL", cascade.screen_model)
+        cascade.full_model = os.getenv(prefix + "FULL_MODEL", cascade.full_model)
+        cascade.threshold = int(os.getenv(prefix + "THRESHOLD", cascade.threshold))
+        if threshold is not None:
+            cascade.threshold = threshold
+        return cascade
+
+    def escalates(self, score) -> bool:
+        return isinstance(score, (int, float)) and score >= self.threshold
+
+    def describe(self) -> str:
+        return (f"🪜 Cascade {self.stage} : tri {self.screen_model}, analyse complète "
+                f"{self.full_model} si score >= {self.threshold}")
+
+
+class CascadeStats:
+    """
+    Compteurs d'une étape. `full_runs` : analyses complètes faites (une par offre ou par article
+    escaladé) ; `avoided` : analyses complètes que le tri a rendues inutiles
+    """
+
+    __slots__ = ("stage", "screened", "escalated", "rejected", "errors", "tokens", "latency_ms",
+                 "full_runs", "avoided")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.screened = 0
+        self.escalated = 0
+        self.rejected = 0
+        self.errors = 0
+        self.tokens = {"screen": 0, "full": 0}
+        self.latency_ms = {"screen": 0.0, "full": 0.0}
+        self.full_runs = 0
+        self.avoided = 0
+
+    def add(self, tier: str, tokens: int, latency_ms: float, runs: int = 1):
+        """Consommation d'un appel ; pour le niveau complet, `runs` analyses complètes"""
+        self.tokens[tier] += tokens
+        self.latency_ms[tier] += latency_ms
+        if tier == "full":
+            self.full_runs += runs
+
+    def count(self, escalated: bool, n: int = 1):
+        """n éléments triés, escaladés ou écartés"""
+        self.screened += n
+        if escalated:
+            self.escalated += n
+        else:
+            self.rejected += n
+
+    def summary(self) -> Dict:
+        runs = self.full_runs
+        return {
+            "stage": self.stage,
+            "screened": self.screened,
+            "escalated": self.escalated,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "escalation_rate": round(self.escalated / self.screened, 3) if self.screened else None,
+            "tokens": dict(self.tokens),
+            "latency_ms": {k: round(v, 1) for k, v in self.latency_ms.items()},
+            "full_runs": runs,
+            "avoided": self.avoided,
+            # Estimation : chaque analyse évitée aurait coûté une analyse complète moyenne (tokens du
+            # modèle complet, à comparer aux tokens du tri, facturés au prix du modèle de tri)
+            "full_tokens_avoided": round(self.avoided * self.tokens["full"] / runs) if runs else None,
+            "full_latency_avoided_ms": round(self.avoided * self.latency_ms["full"] / runs, 1) if runs else None,
+        }
+
+    def print_summary(self):
+        s = self.summary()
+        if not s["screened"]:
+            return
+        print(f"\n🪜 Cascade {s['stage']} : {s['screened']} triés, {s['escalated']} escaladés, "
+              f"{s['rejected']} écartés ({s['errors']} erreurs de tri)")
+        print(f"   Tokens tri / complet : {s['tokens']['screen']:,} / {s['tokens']['full']:,}")
+        if s["full_tokens_avoided"] is not None:
+            print(f"   {s['avoided']} analyses complètes évitées : ~{s['full_tokens_avoided']:,} tokens du modèle complet, "
+                  f"~{s['full_latency_avoided_ms'] / 1000:.0f}s d'appels cumulés")
+
+
+_stats: Dict[str, CascadeStats] = {}
+
+
+def stats(stage: str) -> CascadeStats:
+    """Statistiques de l'étape (créées au premier appel)"""
+    return _stats.setdefault(stage, CascadeStats(stage))
+
+
+def screen_prefix(*static_parts: str, instructions: str = SCREEN_INSTRUCTIONS) -> str:
+    """Préfixe statique du tri : contexte de l'analyse complète puis consignes du passage court"""
+    return prompt_cache.static_prefix(*static_parts, instructions)
+
+
+async def screen(client, cascade: Cascade, prefix: str, context: str, text: str) -> Dict:
+    """
+    Passage de tri : {'relevance_score', 'reason', 'escalate', 'tokens', 'cached_tokens', ...}.
+    Une réponse inexploitable escalade (mieux vaut payer une analyse complète que perdre un signal).
+    """
+    step = stats(cascade.stage)
+    started = time.perf_counter()
+    result = {"relevance_score": None, "reason": "", "tokens": 0, "prompt_tokens": 0, "cached_tokens": 0}
+    try:
+        with tracing.span("chat.completions", kind="api", api="openai.chat", model=cascade.screen_model,
+                          tier="screen", stage=cascade.stage) as api_span:
+            response = await client.chat.completions.create(
+                model=cascade.screen_model,
+                messages=prompt_cache.messages(prefix, context, text[:cascade.screen_chars]),
+                temperature=0,
+                max_tokens=120,
+                response_format={"type": "json_object"}
+            )
+            usage = prompt_cache.usage_attrs(response.usage)
+            api_span.set(**usage)
+        result.update(usage)
+        data = json.loads(response.choices[0].message.content)
+        result["relevance_score"] = data.get("relevance_score")
+        result["reason"] = str(data.get("reason", ""))[:300]
+    except Exception as e:
+        step.errors += 1
+        result["reason"] = f"screen error: {str(e)[:200]}"
+    step.add("screen", result["tokens"], (time.perf_counter() - started) * 1000)
+
+    score = result["relevance_score"]
+    result["escalate"] = cascade.escalates(score) or not isinstance(score, (int, float))
+    step.count(result["escalate"])
+    if not result["escalate"]:
+        step.avoided += 1
+    return result
+
+
+async def screen_items(client, cascade: Cascade, prefix: str, context: str, text: str,
+                       max_tokens: int = 2000) -> Optional[List[Dict]]:
+    """
+    Passage de tri d'une liste : un appel court qui ne renvoie, pour chaque élément du texte, que ses
+    champs d'identification, 'relevance_score', 'reason' et 'escalate'. Compté élément par élément.
+    None si la réponse est inexploitable (l'appelant structure alors tout avec le modèle complet).
+    """
+    step = stats(cascade.stage)
+    started = time.perf_counter()
+    tokens = 0
+    try:
+        with tracing.span("chat.completions", kind="api", api="openai.chat", model=cascade.screen_model,
+                          tier="screen", stage=cascade.stage) as api_span:
+            response = await client.chat.completions.create(
+                model=cascade.screen_model,
+                messages=prompt_cache.messages(prefix, context, text),
+                temperature=0,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"}
+            )
+            usage = prompt_cache.usage_attrs(response.usage)
+            api_span.set(**usage)
+        tokens = usage["tokens"]
+        items = json.loads(response.choices[0].message.content).get("items")
+        if not isinstance(items, list):
+            raise ValueError("champ 'items' absent")
+    except Exception as e:
+        step.errors += 1
+        step.add("screen", tokens, (time.perf_counter() - started) * 1000)
+        print(f"⚠️ Tri {cascade.stage} inexploitable ({str(e)[:100]}) : structuration complète")
+        return None
+    step.add("screen", tokens, (time.perf_counter() - started) * 1000)
+
+    items = [item for item in items if isinstance(item, dict)]
+    for item in items:
+        score = item.get("relevance_score")
+        item["reason"] = str(item.get("reason") or "")[:300]
+        item["escalate"] = cascade.escalates(score) or not isinstance(score, (int, float))
+        step.count(item["escalate"])
+        if not item["escalate"]:
+            step.avoided += 1
+    return items
+
+
+def screened_analysis(cascade: Cascade, screened: Dict) -> Dict:
+    """Analyse minimale d'un élément écarté (les sections détaillées restent absentes)"""
+    return {
+        "relevance_score": screened["relevance_score"],
+        "cascade": {"tier": "screen", "model": cascade.screen_model, "reason": screened["reason"]},
+    }
+
+
+def mark_full(cascade: Cascade, analysis: Dict, screened: Dict) -> Dict:
+    """Trace du tri sur une analyse complète"""
+    analysis["cascade"] = {"tier": "full", "model": cascade.full_model, "screen_score": screened["relevance_score"]}
+    return analysis
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Préparation locale du texte Perplexity avant la structuration OpenAI
+- Citations : dédoublonnées (URL canonique) et retirées si l'article est déjà connu pour l'entreprise
+  (fichiers du frontend et résultats de scraping) ; liste compacte « [n] url » au lieu d'un JSON indenté,
+  numéros d'origine conservés pour que les renvois [n] du texte restent justes
+- Sections (paragraphes) : retirées si elles ne renvoient qu'à des articles déjà connus, ou si elles ne
+  citent ni l'entreprise ni aucune source (préambule, conclusion, hors sujet)
+- Budget : le texte de chaque recherche est coupé à un nombre de tokens estimé (~4 caractères par token)
+- Passages : sections liées à quelques éléments choisis (reprise par le modèle complet de la cascade)
+
+Usage :
+    python citation_filter.py --company "Arhaus" --file raw.txt     # aperçu du texte préparé
+"""
+
+import argparse
+import os
+import re
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+import news_dedup
+from storage import read_json
+
+CONTENT_TOKEN_BUDGET = 4000     # une recherche unique (scrapers hybrides)
+THEME_TOKEN_BUDGET = 1500       # par thème (scrape_news_multi : 5 thèmes news, 4 thèmes interviews)
+MIN_SECTION_WORDS = 8           # en dessous (titre de section, ligne vide), la section est gardée telle quelle
+
+KNOWN_FILES = {
+    "news": (("../public/news_data.json", "news_items"), ("company_news.json", "news_items")),
+    "interviews": (("../public/management_interviews.json", "management_items"),
+                   ("management_interviews.json", "management_items")),
+}
+
+# Mots trop génériques pour signaler qu'une section parle de l'entreprise
+GENERIC_NAME_WORDS = {
+    "the", "and", "inc", "llc", "ltd", "co", "corp", "company", "group", "home", "homes", "furniture",
+    "mattress", "design", "designs", "store", "stores", "outlet", "interiors", "decor", "living", "of",
+}
+
+_CITATION_REF = re.compile(r"\[(\d+)\]")
+_URL = re.compile(r"https?://[^\s)\]>\"']+")
+
+_known_cache: Dict[str, Tuple[float, Dict]] = {}
+
+
+def _load(path: str) -> Dict:
+    """Fichier JSON relu seulement s'il a changé (plusieurs entreprises par run)"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    cached = _known_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, read_json(path, {}))
+        _known_cache[path] = cached
+    return cached[1]
+
+
+def known_urls(company_name: str, search_type: str = "news") -> Set[str]:
+    """URL canoniques des articles déjà stockés pour l'entreprise"""
+    known = set()
+    for path, items_key in KNOWN_FILES[search_type]:
+        entry = _load(path).get(company_name)
+        if not isinstance(entry, dict):
+            continue
+        for item in entry.get(items_key) or []:
+            url = news_dedup.canonical_url(item.get("url"))
+            if url:
+                known.add(url)
+    return known
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+
+def _name_words(company_name: str) -> Set[str]:
+    all_words = set(news_dedup.words(company_name))
+    specific = {w for w in all_words if w not in GENERIC_NAME_WORDS and len(w) > 2}
+    return specific or all_words
+
+
+class Prepared:
+    """Texte et citations prêts pour le prompt, avec ce qui a été retiré"""
+
+    __slots__ = ("content", "citations", "original_chars", "known_citations", "duplicate_citations",
+                 "known_sections", "off_topic_sections", "trimmed_chars")
+
+    def __init__(self):
+        self.content = ""
+        self.citations: List[Tuple[int, str]] = []  # (numéro d'origine, url)
+        self.original_chars = 0
+        self.known_citations = 0
+        self.duplicate_citations = 0
+        self.known_sections = 0
+        self.off_topic_sections = 0
+        self.trimmed_chars = 0
+
+    @property
+    def urls(self) -> List[str]:
+        return [url for _, url in self.citations]
+
+    def citations_block(self) -> str:
+        return "\n".join(f"[{n}] {url}" for n, url in self.citations)
+
+    def describe(self) -> str:
+        return (f"✂️  Préparation : {self.original_chars} → {len(self.content)} caractères "
+                f"({self.known_sections} sections déjà connues, {self.off_topic_sections} hors sujet, "
+                f"{self.trimmed_chars} coupés au budget) ; citations : {self.known_citations} déjà connues, "
+                f"{self.duplicate_citations} en double, {len(self.citations)} gardées")
+
+
+def prepare(content: str, citations: Sequence[str], company_name: str, known: Iterable[str] = (),
+            budget: int = CONTENT_TOKEN_BUDGET) -> Prepared:
+    """
+    Réduit le texte d'une recherche et sa liste de citations (numérotées à partir de 1, comme les
+    renvois [n] de Perplexity). `known` : URL canoniques déjà stockées (known_urls)
+    """
+    known = set(known)
+    prepared = Prepared()
+    prepared.original_chars = len(content or "")
+
+    known_refs, seen = set(), set()
+    for n, url in enumerate(citations or [], 1):
+        key = news_dedup.canonical_url(url)
+        if not key:
+            continue
+        if key in known:
+            prepared.known_citations += 1
+            known_refs.add(n)
+        elif key in seen:
+            prepared.duplicate_citations += 1
+        else:
+            seen.add(key)
+            prepared.citations.append((n, url))
+
+    name_words = _name_words(company_name)
+    kept, used = [], 0
+    for section in re.split(r"\n\s*\n", content or ""):
+        if not section.strip():
+            continue
+        refs = {int(n) for n in _CITATION_REF.findall(section)}
+        urls = {news_dedup.canonical_url(u) for u in _URL.findall(section)}
+        section_words = news_dedup.words(section)
+        if len(section_words) >= MIN_SECTION_WORDS:
+            if (refs or urls) and refs <= known_refs and urls <= known:
+                prepared.known_sections += 1
+                continue
+            if not refs and not urls and not name_words & set(section_words):
+                prepared.off_topic_sections += 1
+                continue
+        # Budget atteint : la suite est coupée (Perplexity donne les résultats les plus pertinents d'abord)
+        used += estimate_tokens(section) + 1
+        if used > budget:
+            prepared.trimmed_chars += len(section)
+            continue
+        kept.append(section.strip("\n"))
+
+    prepared.content = "\n\n".join(kept)
+    return prepared
+
+
+def passages(content: str, refs: Iterable[int] = (), urls: Iterable[str] = (), titles: Iterable[str] = ()) -> str:
+    """
+    Sections du texte qui concernent des éléments choisis : renvoi [n] parmi `refs`, URL parmi `urls`,
+    ou, faute de renvoi, la majorité des mots d'un des `titles`
+    """
+    refs = set(refs)
+    urls = {news_dedup.canonical_url(u) for u in urls if u}
+    title_words = [set(w) for w in (news_dedup.words(t) for t in titles) if w]
+    kept = []
+    for section in re.split(r"\n\s*\n", content or ""):
+        if not section.strip():
+            continue
+        words = set(news_dedup.words(section))
+        if ({int(n) for n in _CITATION_REF.findall(section)} & refs
+                or {news_dedup.canonical_url(u) for u in _URL.findall(section)} & urls
+                or any(len(t & words) * 2 > len(t) for t in title_words)):
+            kept.append(section.strip("\n"))
+    return "\n\n".join(kept)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aperçu de la préparation d'un texte Perplexity")
+    parser.add_argument("--company", required=True)
+    parser.add_argument("--file", required=True, help="Texte brut de la recherche")
+    parser.add_argument("--citations", nargs="*", default=[], help="URLs citées, dans l'ordre")
+    parser.add_argument("--type", default="news", choices=list(KNOWN_FILES))
+    parser.add_argument("--budget", type=int, default=CONTENT_TOKEN_BUDGET)
+    args = parser.parse_args()
+
+    with open(args.file, "r", encoding="utf-8") as f:
+        content = f.read()
+    prepared = prepare(content, args.citations, args.company, known_urls(args.company, args.type), args.budget)
+    print(prepared.describe())
+    print(prepared.content)
+    print(prepared.citations_block())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Sélection des entreprises du TAM (TAM.csv)
+- Filtres : pays, sous-industrie, tranche d'effectif, listes explicites (inclusion / exclusion), limite
+- Sharding i/n par hash du nom : stable d'un run à l'autre et d'une machine à l'autre, indépendant de
+  l'ordre du CSV ; les n shards couvrent la sélection sans recouvrement
+- Fusion déterministe des fichiers produits par chaque shard (jobs_data.json dans l'ordre du TAM) ; les
+  shards écrivent leurs descriptions en clair, la fusion les range dans le store local (blob_store)
+
+Usage :
+    python company_selection.py list --country "United States" --industry Furniture Retail --shard 1/4
+    python enrich_jobs.py --country all --limit 0 --shard 2/4 --output jobs_data.shard-2-of-4.json
+    python company_selection.py merge jobs_data.shard-*.json --output jobs_data.json
+    python company_selection.py merge jobs_data.shard-*.json --blobs shard-*/blobs.sqlite --output jobs_data.json
+    python analyze_trends.py --shard 2/4 --output jobs_trends_analysis.shard-2-of-4.json
+    python company_selection.py merge jobs_trends_analysis.shard-*.json --output jobs_trends_analysis.json
+"""
+
+import argparse
+import csv
+import hashlib
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import blob_store
+from storage import read_json, write_json_atomic
+
+TAM_FILE = "TAM.csv"
+
+# Périmètre historique de l'enrichissement : 50 premières entreprises US
+DEFAULT_COUNTRIES = ("United States",)
+DEFAULT_LIMIT = 50
+
+# Séparateurs de milliers mal encodés dans TAM.csv ("3‚-000", "1,000", "5√¢¬Ä¬î9,999" pour un tiret cadratin)
+_THOUSANDS = re.compile(r"(?<=\d)(?:,|‚-?|\.(?=\d{3}\b))(?=\d{3}\b)")
+_RANGE_DASH = re.compile(r"√¢¬Ä¬î|—|–")
+
+
+def parse_employees(text: str) -> Optional[Tuple[int, int]]:
+    """
+    Tranche d'effectif (min, max) d'une cellule Employees, None si illisible.
+    "450" -> (450, 450), "1,000-5,000" -> (1000, 5000), "> 10,000" -> (10000, 10000), "1.2M" -> (1200000, 1200000)
+    """
+    text = _RANGE_DASH.sub("-", (text or "").strip())
+    text = _THOUSANDS.sub("", text)
+    millions = re.fullmatch(r"(\d+(?:\.\d+)?)\s*M", text, re.IGNORECASE)
+    if millions:
+        value = int(float(millions.group(1)) * 1_000_000)
+        return value, value
+    numbers = [int(n) for n in re.findall(r"\d+", text)]
+    if not numbers:
+        return None
+    return min(numbers), max(numbers)
+
+
+def parse_shard(text: str) -> Tuple[int, int]:
+    """"2/4" -> (2, 4) ; les shards sont numérotés de 1 à n"""
+    match = re.fullmatch(r"\s*(\d+)\s*(?:/|-of-|of)\s*(\d+)\s*", text or "")
+    if not match:
+        raise ValueError(f"Shard invalide : {text!r} (attendu i/n, ex. 2/4)")
+    index, count = int(match.group(1)), int(match.group(2))
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard invalide : {text!r} (1 <= i <= n)")
+    return index, count
+
+
+def shard_of(name: str, count: int) -> int:
+    """Shard (1..count) d'une entreprise : hash du nom normalisé, pas sa position dans le CSV"""
+    digest = hashlib.sha1(name.strip().lower().encode("utf-8")).hexdigest()
+    return int(digest[:8], 16) % count + 1
+
+
+def _company(row: Dict) -> Dict:
+    """Ligne de TAM.csv -> dict entreprise utilisé par les scripts (mêmes clés que jobs_data.json)"""
+    return {
+        'name': row.get('CompanyName', '').strip(),
+        'website': row.get('Website', '').strip(),
+        'linkedin': row.get('LinkedIn', '').strip(),
+        'industry': row.get('Sub Industry', '').strip(),
+        'employees': row.get('Employees', '').strip()
+    }
+
+
+class Selection:
+    """Critères de sélection ; un critère à None ne filtre pas"""
+
+    __slots__ = ("countries", "industries", "min_employees", "max_employees", "names", "exclude", "shard", "limit")
+
+    def __init__(self, countries: Optional[Iterable[str]] = None, industries: Optional[Iterable[str]] = None,
+                 min_employees: Optional[int] = None, max_employees: Optional[int] = None,
+                 names: Optional[Iterable[str]] = None, exclude: Optional[Iterable[str]] = None,
+                 shard: Optional[Tuple[int, int]] = None, limit: Optional[int] = None):
+        self.countries = {c.strip().lower() for c in countries} if countries else None
+        self.industries = {i.strip().lower() for i in industries} if industries else None
+        self.min_employees = min_employees
+        self.max_employees = max_employees
+        self.names = {n.strip().lower() for n in names} if names else None
+        self.exclude = {n.strip().lower() for n in exclude} if exclude else set()
+        self.shard = shard
+        self.limit = limit or None
+
+    def matches_row(self, row: Dict) -> bool:
+        """Critères portant sur les colonnes du TAM (pays, industrie, effectif)"""
+        if self.countries and row.get('Country', '').strip().lower() not in self.countries:
+            return False
+        if self.industries and row.get('Sub Industry', '').strip().lower() not in self.industries:
+            return False
+        if self.min_employees is not None or self.max_employees is not None:
+            band = parse_employees(row.get('Employees', ''))
+            if band is None:
+                return False
+            # Une tranche est retenue si elle recoupe [min, max]
+            if self.min_employees is not None and band[1] < self.min_employees:
+                return False
+            if self.max_employees is not None and band[0] > self.max_employees:
+                return False
+        return True
+
+    def matches_name(self, name: str) -> bool:
+        """Critères portant sur le nom (listes explicites, shard)"""
+        key = name.strip().lower()
+        if self.names is not None and key not in self.names:
+            return False
+        if key in self.exclude:
+            return False
+        if self.shard and shard_of(name, self.shard[1]) != self.shard[0]:
+            return False
+        return True
+
+    @property
+    def uses_tam(self) -> bool:
+        """Vrai si un critère nécessite les colonnes du TAM (sinon un filtre par nom suffit)"""
+        return bool(self.countries or self.industries
+                    or self.min_employees is not None or self.max_employees is not None)
+
+    def describe(self) -> str:
+        parts = []
+        if self.countries:
+            parts.append(f"country={','.join(sorted(self.countries))}")
+        if self.industries:
+            parts.append(f"industry={','.join(sorted(self.industries))}")
+        if self.min_employees is not None or self.max_employees is not None:
+            parts.append(f"employees={self.min_employees or 0}-{self.max_employees if self.max_employees is not None else '∞'}")
+        if self.names is not None:
+            parts.append(f"{len(self.names)} explicit")
+        if self.exclude:
+            parts.append(f"{len(self.exclude)} excluded")
+        if self.shard:
+            parts.append(f"shard {self.shard[0]}/{self.shard[1]}")
+        if self.limit:
+            parts.append(f"limit={self.limit}")
+        return ", ".join(parts) or "all"
+
+
+def default_selection(**overrides) -> Selection:
+    """Périmètre historique (50 premières entreprises US), critères surchargeables"""
+    options = {'countries': DEFAULT_COUNTRIES, 'limit': DEFAULT_LIMIT}
+    options.update(overrides)
+    return Selection(**options)
+
+
+def load_tam(csv_path: str = TAM_FILE) -> List[Dict]:
+    """Lignes brutes de TAM.csv, dans l'ordre du fichier"""
+    with open(csv_path, 'r', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def select_companies(selection: Optional[Selection] = None, csv_path: str = TAM_FILE) -> List[Dict]:
+    """Entreprises du TAM retenues par `selection` (ordre du CSV, doublons de nom ignorés)"""
+    selection = selection or default_selection()
+    companies = []
+    seen = set()
+    for row in load_tam(csv_path):
+        company = _company(row)
+        key = company['name'].lower()
+        if not company['name'] or key in seen:
+            continue
+        if selection.matches_row(row) and selection.matches_name(company['name']):
+            seen.add(key)
+            companies.append(company)
+            if selection.limit and len(companies) >= selection.limit:
+                break
+    return companies
+
+
+def entry_filter(selection: Optional[Selection], csv_path: str = TAM_FILE) -> Optional[Callable[[Dict], bool]]:
+    """
+    Prédicat sur une entrée de jobs_data.json ({'company': {...}, ...}) ; None si pas de sélection.
+    Les critères du TAM (pays, industrie, effectif) sont résolus via TAM.csv ; la limite ne s'applique pas
+    (elle borne la sélection d'origine, pas les résultats qui en découlent).
+    """
+    if selection is None:
+        return None
+    allowed = None
+    if selection.uses_tam:
+        allowed = {
+            _company(row)['name'].lower() for row in load_tam(csv_path) if selection.matches_row(row)
+        }
+
+    def keep(entry: Dict) -> bool:
+        name = entry['company']['name']
+        return selection.matches_name(name) and (allowed is None or name.lower() in allowed)
+
+    return keep
+
+
+def filter_entries(entries: List[Dict], selection: Optional[Selection], csv_path: str = TAM_FILE) -> List[Dict]:
+    """Restreint des entrées de jobs_data.json à une sélection (voir entry_filter)"""
+    keep = entry_filter(selection, csv_path)
+    if keep is None:
+        return entries
+    return [e for e in entries if keep(e)]
+
+
+def add_arguments(parser: argparse.ArgumentParser, default_scope: bool = False):
+    """
+    Options de sélection communes aux scripts.
+    default_scope : le périmètre par défaut est le périmètre historique (US, 50) ; '--country all' et
+                    '--limit 0' le lèvent
+    """
+    group = parser.add_argument_group("sélection des entreprises")
+    scope = f" (défaut : {', '.join(DEFAULT_COUNTRIES)})" if default_scope else ""
+    group.add_argument('--country', nargs='+', help=f"Pays du TAM ('all' pour tous){scope}")
+    group.add_argument('--industry', nargs='+', help="Sous-industries du TAM (ex. Furniture Retail)")
+    group.add_argument('--min-employees', type=int, help="Effectif minimum (tranche recoupant le seuil)")
+    group.add_argument('--max-employees', type=int, help="Effectif maximum")
+    group.add_argument('--only', nargs='+', metavar='COMPANY', help="Liste explicite d'entreprises")
+    group.add_argument('--only-file', help="Fichier texte : une entreprise par ligne")
+    group.add_argument('--exclude', nargs='+', metavar='COMPANY', help="Entreprises à exclure")
+    group.add_argument('--shard', type=parse_shard, metavar='I/N', help="Ne traiter que le shard I sur N (ex. 2/4)")
+    limit = f" (défaut : {DEFAULT_LIMIT}, 0 = sans limite)" if default_scope else ""
+    group.add_argument('--limit', type=int, help=f"Nombre maximum d'entreprises{limit}")
+
+
+def from_args(args, default_scope: bool = False) -> Optional[Selection]:
+    """Selection correspondant aux options d'add_arguments ; None si aucune option (sans default_scope)"""
+    names = list(args.only or [])
+    if args.only_file:
+        with open(args.only_file, 'r', encoding='utf-8') as f:
+            names += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+    countries = args.country
+    if countries and any(c.lower() == 'all' for c in countries):
+        countries = None
+    elif countries is None and default_scope:
+        countries = DEFAULT_COUNTRIES
+    limit = args.limit if args.limit is not None else (DEFAULT_LIMIT if default_scope else None)
+
+    options = {
+        'countries': countries, 'industries': args.industry,
+        'min_employees': args.min_employees, 'max_employees': args.max_employees,
+        'names': names or None, 'exclude': args.exclude, 'shard': args.shard, 'limit': limit,
+    }
+    if not default_scope and not any(v for v in options.values() if v is not None):
+        return None
+    return Selection(**options)
+
+
+def merge_results(paths: List[str], csv_path: str = TAM_FILE, blobs: Iterable[str] = ()) -> Dict:
+    """
+    Fusionne des jobs_data.json (un par shard) : ordre du TAM puis alphabétique pour les entreprises hors TAM ;
+    en cas de doublon, un résultat réussi l'emporte sur un échec, puis le dernier fichier de la liste.
+    Les descriptions en clair sont rangées dans le store local ; blobs : stores (blobs.sqlite) ou exports des
+    shards, importés pour les descriptions déjà externalisées. RuntimeError s'il manque des descriptions
+    """
+    by_name = {}
+    for path in sorted(paths):
+        for entry in read_json(path, {'companies': []}).get('companies', []):
+            name = entry['company']['name']
+            current = by_name.get(name)
+            if current is None or entry.get('success') or not current.get('success'):
+                by_name[name] = entry
+
+    order = {}
+    for row in load_tam(csv_path):
+        order.setdefault(row.get('CompanyName', '').strip(), len(order))
+    companies = sorted(by_name.values(), key=lambda e: (order.get(e['company']['name'], len(order)), e['company']['name']))
+
+    with blob_store.BlobStore() as store:
+        for path in blobs:
+            blob_store.import_store(path, store)
+        companies = [{**e, 'jobs': blob_store.externalize(e.get('jobs') or [], e['company']['name'], store)}
+                     for e in companies]
+        missing = blob_store.missing_hashes((job.get('description_hash') for e in companies for job in e['jobs']), store)
+    if missing:
+        raise RuntimeError(f"{len(missing)} descriptions des shards absentes de {blob_store.STORE_FILE} : "
+                           f"--blobs <blobs.sqlite ou export de chaque shard>")
+    return {
+        'total_companies': len(companies),
+        'total_jobs': sum(e.get('nb_jobs', 0) for e in companies if e.get('success')),
+        'companies_with_jobs': sum(1 for e in companies if e.get('success') and e.get('nb_jobs', 0) > 0),
+        'companies': companies
+    }
+
+
+def merge_outputs(paths: List[str], csv_path: str = TAM_FILE, blobs: Iterable[str] = ()) -> Dict:
+    """
+    Fusionne les sorties de plusieurs shards : jobs_data.json (liste 'companies') via merge_results,
+    sinon fichiers indexés par clé (analyses, news, interviews) : union, clés triées, dernier fichier prioritaire
+    """
+    first = read_json(sorted(paths)[0], {})
+    if isinstance(first.get('companies'), list):
+        return merge_results(paths, csv_path, blobs)
+    merged = {}
+    for path in sorted(paths):
+        merged.update(read_json(path, {}))
+    return dict(sorted(merged.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sélection des entreprises du TAM et fusion des shards")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    listing = sub.add_parser("list", help="Affiche les entreprises sélectionnées")
+    add_arguments(listing, default_scope=True)
+
+    merge = sub.add_parser("merge", help="Fusionne les sorties de plusieurs shards (jobs_data, analyses, news...)")
+    merge.add_argument("inputs", nargs='+', help="Fichier produit par chaque shard")
+    merge.add_argument("--output", required=True)
+    merge.add_argument("--blobs", nargs='+', default=[],
+                       help="jobs_data : store (blobs.sqlite) ou export (blob_store.py export) de chaque shard")
+
+    args = parser.parse_args()
+    if args.command == "list":
+        selection = from_args(args, default_scope=True)
+        companies = select_companies(selection)
+        for company in companies:
+            print(f"{company['name']:40} {company['industry']:18} {company['employees']}")
+        print(f"\n📊 {len(companies)} entreprises ({selection.describe()})")
+    else:
+        merged = merge_outputs(args.inputs, blobs=args.blobs)
+        write_json_atomic(args.output, merged)
+        count = merged['total_companies'] if isinstance(merged.get('companies'), list) else len(merged)
+        print(f"✅ {len(args.inputs)} shards → {args.output} : {count} entrées")
+
+
+if __name__ == "__main__":
+    main()
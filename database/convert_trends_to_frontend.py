@@ -3,86 +3,81 @@
 Convertit les analyses de tendances au format frontend
 """
 
-import json
-from datetime import datetime
+import argparse
+import time
 
-def convert_trends_to_frontend():
-    """Convertit jobs_trends_analysis.json vers le format data.json du frontend"""
+import blob_store
+from frontend_publish import publish_companies
+from storage import read_json
+
+
+def convert_company(company_name, company_input):
+    """Construit l'entrée frontend d'une entreprise à partir de ses jobs et de son analyse"""
+    company_info = company_input['company']
+    
+    # Convertir les jobs (le frontend lit les descriptions en clair)
+    converted_jobs = []
+    for job in blob_store.hydrate([dict(job) for job in company_input['jobs']]):
+        job_date = job.get('date_creation', '')[:10] if job.get('date_creation') else ''
+        
+        converted_job = {
+            "job_title": job.get('job_title', ''),
+            "job_url": job.get('job_board_url', ''),
+            "job_board": job.get('job_board', ''),
+            "location": job.get('location', ''),
+            "date": job_date,
+            "description": job.get('description', ''),
+            "analysis": None,  # On ne garde plus les analyses individuelles
+            "success": True
+        }
+        
+        converted_jobs.append(converted_job)
+    
+    return {
+        "name": company_name,
+        "industry": company_info.get('industry', ''),
+        "website": company_info.get('website', ''),
+        "employees": company_info.get('employees', ''),
+        "linkedin": company_info.get('linkedin', ''),
+        "jobs": converted_jobs,
+        "trends_analysis": company_input['trends_analysis']  # Nouvelle structure d'analyse
+    }
+
+
+def convert_trends_to_frontend(only=None, output_path='../public/data.json'):
+    """Convertit jobs_trends_analysis.json vers le format data.json du frontend
     
+    Seules les entreprises dont les jobs ou l'analyse ont changé sont reconstruites ;
+    `only` limite le rafraîchissement à quelques entreprises (refresh depuis le dashboard).
+    """
+    start = time.perf_counter()
     print("📂 Chargement des données...")
     
     # Charger les données originales
-    with open('jobs_data.json', 'r', encoding='utf-8') as f:
-        jobs_data = json.load(f)
+    jobs_data = read_json('jobs_data.json')
     
     # Charger les analyses de tendances
-    with open('jobs_trends_analysis.json', 'r', encoding='utf-8') as f:
-        trends_data = json.load(f)
+    trends_data = read_json('jobs_trends_analysis.json')
     
-    # Créer la structure pour le frontend
-    frontend_data = {
-        "companies": {},
-        "metadata": {
-            "started": datetime.now().isoformat(),
-            "completed": datetime.now().isoformat(),
-            "total_jobs": 0
-        }
-    }
-    
-    total_jobs = 0
-    
-    # Pour chaque entreprise avec des jobs
+    # Entrée par entreprise (avec des jobs) : c'est elle qui est hashée
+    inputs = {}
     for company_data in jobs_data['companies']:
         if not company_data.get('success') or company_data.get('nb_jobs', 0) == 0:
             continue
-        
-        company_info = company_data['company']
-        company_name = company_info['name']
-        jobs = company_data.get('jobs', [])
-        
-        # Récupérer l'analyse de tendances si elle existe
-        trends_analysis = None
-        if company_name in trends_data:
-            trends_analysis = trends_data[company_name].get('analysis')
-        
-        # Convertir les jobs
-        converted_jobs = []
-        for job in jobs:
-            job_date = job.get('date_creation', '')[:10] if job.get('date_creation') else ''
-            
-            converted_job = {
-                "job_title": job.get('job_title', ''),
-                "job_url": job.get('job_board_url', ''),
-                "job_board": job.get('job_board', ''),
-                "location": job.get('location', ''),
-                "date": job_date,
-                "description": job.get('description', ''),
-                "analysis": None,  # On ne garde plus les analyses individuelles
-                "success": True
-            }
-            
-            converted_jobs.append(converted_job)
-            total_jobs += 1
-        
-        # Ajouter l'entreprise au résultat
-        frontend_data['companies'][company_name] = {
-            "name": company_name,
-            "industry": company_info.get('industry', ''),
-            "website": company_info.get('website', ''),
-            "employees": company_info.get('employees', ''),
-            "linkedin": company_info.get('linkedin', ''),
-            "jobs": converted_jobs,
-            "trends_analysis": trends_analysis  # Nouvelle structure d'analyse
+        company_name = company_data['company']['name']
+        inputs[company_name] = {
+            "company": company_data['company'],
+            "jobs": company_data.get('jobs', []),
+            "trends_analysis": trends_data.get(company_name, {}).get('analysis'),
         }
     
-    frontend_data['metadata']['total_jobs'] = total_jobs
-    
-    # Sauvegarder
-    output_path = '../public/data.json'
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(frontend_data, f, indent=2, ensure_ascii=False)
+    result = publish_companies(output_path, "trends", inputs, convert_company, only=only)
+    frontend_data = result['output']
+    total_jobs = frontend_data['metadata'].get('total_jobs', 0)
     
-    print(f"\n✅ Conversion terminée !")
+    print(f"\n✅ Conversion terminée en {(time.perf_counter() - start) * 1000:.0f} ms !")
+    print(f"🔄 {len(result['rebuilt'])} entreprises reconstruites, {result['unchanged']} inchangées"
+          + (f", {len(result['removed'])} supprimées" if result['removed'] else ""))
     print(f"📊 {len(frontend_data['companies'])} entreprises")
     print(f"💼 {total_jobs} offres d'emploi")
     print(f"📁 Sauvegardé dans : {output_path}")
@@ -95,5 +90,8 @@ def convert_trends_to_frontend():
 
 
 if __name__ == "__main__":
-    convert_trends_to_frontend()
+    parser = argparse.ArgumentParser(description="Conversion des tendances vers public/data.json")
+    parser.add_argument('--company', nargs='+', help="Ne rafraîchir que ces entreprises")
+    args = parser.parse_args()
+    convert_trends_to_frontend(only=args.company)
 
@@ -3,10 +3,19 @@
 Convertit jobs_analysis_v2.json vers le format attendu par le frontend (data.json)
 """
 
-import json
+import argparse
 import csv
+import os
+import time
 from datetime import datetime
 
+import blob_store
+from frontend_publish import publish_companies
+from storage import read_json
+
+# Cache par process (workers compris) : TAM.csv n'est lu que si une entreprise est reconstruite
+_tam_cache = {}
+
 def load_tam_data():
     """Charge les données TAM pour enrichir les infos des entreprises"""
     tam_companies = {}
@@ -22,36 +31,20 @@ def load_tam_data():
             }
     return tam_companies
 
-def convert_v2_to_frontend(input_file='jobs_analysis_v2.json', output_file='../public/data.json'):
-    """Convertit le format V2 vers le format frontend"""
-    
-    print(f"📖 Lecture de {input_file}...")
-    with open(input_file, 'r', encoding='utf-8') as f:
-        v2_data = json.load(f)
-    
-    print(f"📊 Chargement des données TAM...")
-    tam_companies = load_tam_data()
-    
-    # Regrouper les jobs par entreprise
-    companies_data = {}
-    
-    for job_key, job_data in v2_data.items():
-        company_name = job_data['company_name']
-        
-        if company_name not in companies_data:
-            # Créer l'entrée de l'entreprise
-            tam_info = tam_companies.get(company_name, {})
-            companies_data[company_name] = {
-                'name': company_name,
-                'industry': tam_info.get('industry', 'Furniture'),
-                'website': job_data.get('company_website') or tam_info.get('website', ''),
-                'employees': tam_info.get('employees', 'N/A'),
-                'linkedin': job_data.get('company_linkedin') or tam_info.get('linkedin', ''),
-                'jobs': []
-            }
-        
-        # Convertir le job au format frontend
-        job = {
+def convert_company(company_name, company_input):
+    """Entrée frontend d'une entreprise à partir de ses jobs analysés (V2) et de TAM.csv"""
+    if not _tam_cache:
+        _tam_cache.update(load_tam_data())
+    jobs = blob_store.hydrate([dict(job) for job in company_input['jobs']])
+    tam_info = _tam_cache.get(company_name, {})
+    return {
+        'name': company_name,
+        'industry': tam_info.get('industry', 'Furniture'),
+        'website': jobs[0].get('company_website') or tam_info.get('website', ''),
+        'employees': tam_info.get('employees', 'N/A'),
+        'linkedin': jobs[0].get('company_linkedin') or tam_info.get('linkedin', ''),
+        # Convertir les jobs au format frontend
+        'jobs': [{
             'job_title': job_data['job_title'],
             'job_url': job_data.get('job_board_url', ''),
             'job_board': job_data.get('job_board', 'unknown'),
@@ -60,27 +53,38 @@ def convert_v2_to_frontend(input_file='jobs_analysis_v2.json', output_file='../p
             'description': job_data.get('description', ''),
             'analysis': job_data.get('analysis'),
             'success': True
-        }
-        
-        companies_data[company_name]['jobs'].append(job)
-    
-    # Créer le format final
-    output_data = {
-        'companies': companies_data,
-        'metadata': {
-            'started': datetime.now().isoformat(),
-            'completed': datetime.now().isoformat(),
-            'total_jobs': sum(len(c['jobs']) for c in companies_data.values())
-        }
+        } for job_data in jobs]
     }
+
+def convert_v2_to_frontend(input_file='jobs_analysis_v2.json', output_file='../public/data.json', only=None):
+    """Convertit le format V2 vers le format frontend
     
-    print(f"💾 Sauvegarde dans {output_file}...")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
+    Seules les entreprises dont les jobs analysés (ou TAM.csv) ont changé sont reconstruites ;
+    TAM.csv n'est relu que si au moins une entreprise doit l'être.
+    """
+    start = time.perf_counter()
+    print(f"📖 Lecture de {input_file}...")
+    v2_data = read_json(input_file)
     
-    print(f"\n✅ Conversion terminée !")
+    # Regrouper les jobs par entreprise
+    jobs_by_company = {}
+    for job_key, job_data in v2_data.items():
+        jobs_by_company.setdefault(job_data['company_name'], []).append(job_data)
+    
+    # La signature de TAM.csv fait partie de l'entrée : s'il change, tout est reconstruit
+    tam_stat = os.stat('TAM.csv')
+    tam_signature = [tam_stat.st_mtime_ns, tam_stat.st_size]
+    inputs = {name: {'jobs': jobs, 'tam': tam_signature} for name, jobs in jobs_by_company.items()}
+    
+    print(f"💾 Mise à jour de {output_file}...")
+    result = publish_companies(output_file, "v2", inputs, convert_company, only=only)
+    companies_data = result['output']['companies']
+    
+    print(f"\n✅ Conversion terminée en {(time.perf_counter() - start) * 1000:.0f} ms !")
+    print(f"🔄 {len(result['rebuilt'])} entreprises reconstruites, {result['unchanged']} inchangées"
+          + (f", {len(result['removed'])} supprimées" if result['removed'] else ""))
     print(f"📊 {len(companies_data)} entreprises")
-    print(f"📋 {output_data['metadata']['total_jobs']} jobs")
+    print(f"📋 {result['output']['metadata']['total_jobs']} jobs")
     
     # Statistiques par entreprise
     print(f"\n📈 Statistiques :")
@@ -90,5 +94,7 @@ def convert_v2_to_frontend(input_file='jobs_analysis_v2.json', output_file='../p
         print(f"   {company_name[:40]:40} | {jobs_count:3} jobs | {analyzed:3} analyzed")
 
 if __name__ == "__main__":
-    convert_v2_to_frontend()
-
+    parser = argparse.ArgumentParser(description="Conversion V2 vers public/data.json")
+    parser.add_argument('--company', nargs='+', help="Ne rafraîchir que ces entreprises")
+    args = parser.parse_args()
+    convert_v2_to_frontend(only=args.company)
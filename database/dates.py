@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Dates de publication et fenêtres de scraping
+- Parsing tolérant des dates renvoyées par les modèles ("2024-03-15", "March 5, 2024", "2024-05-??", "Dec 2023", "2024")
+  et des dates HTTP du frontend ("Fri, 02 May 2025 02:25:37 GMT")
+- Une date partielle représente une période (mois, année) : elle est dans la fenêtre si la période la recoupe
+- Fenêtre de scraping = max(aujourd'hui - days, dernier scraping) : un refresh court ne cherche que le nouveau
+"""
+
+import calendar
+import re
+import warnings
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy optionnel : repli en Python pur (mêmes résultats, plus lent)
+    np = None
+
+# Coupure historique : le paysage pré-COVID n'est pas pertinent
+HISTORY_START = date(2020, 1, 1)
+# En dessous de cette taille de fenêtre, les scrapers utilisent un prompt de recherche compact
+SHORT_WINDOW_DAYS = 90
+# Recouvrement avec le scraping précédent (dates de publication approximatives, fuseaux horaires)
+RESCRAPE_OVERLAP_DAYS = 1
+
+_MONTHS = {
+    name: number
+    for number, full in enumerate(calendar.month_name) if full
+    for name in (full.lower(), full[:3].lower())
+}
+_MONTHS['sept'] = 9
+
+# Une seule expression compilée, une alternative nommée par format
+_DATE_RE = re.compile(r"""
+    ^(?:
+        q(?P<q>[1-4])\s*(?P<q_y>\d{4}) | (?P<q_y2>\d{4})\s*q(?P<q2>[1-4])                      # Q4 2025, 2025 Q4
+      | (?P<iso_y>\d{4})(?:-(?P<iso_m>\d{2}|\?\?)(?:-(?P<iso_d>\d{2}|\?\?))?)?(?:[T\s].*)?    # 2025-12-15, 2025-12, 2025-??-??, 2025
+      | (?P<mdy_m>[a-z]+)\.?\s+(?P<mdy_d>\d{1,2})(?:st|nd|rd|th)?,?\s+(?P<mdy_y>\d{4})     # December 15, 2025
+      | (?:[a-z]{3},?\s+)?(?P<dmy_d>\d{1,2})\s+(?P<dmy_m>[a-z]+)\.?,?\s+(?P<dmy_y>\d{4})
+        (?:\s+\d{1,2}:\d{2}.*)?                                    # 15 December 2025, Fri, 02 May 2025 02:25:37 GMT
+      | (?P<my_m>[a-z]+)\.?,?\s+(?P<my_y>\d{4})                                             # December 2025
+      | (?P<us_m>\d{1,2})/(?P<us_d>\d{1,2})/(?P<us_y>\d{4})                                  # 12/15/2025
+    )$
+""", re.VERBOSE | re.IGNORECASE)
+
+
+def _month_period(year: int, month: int) -> Tuple[date, date]:
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+@lru_cache(maxsize=65536)
+def _parse(text: str) -> Optional[Tuple[date, date]]:
+    match = _DATE_RE.match(text)
+    if not match:
+        return None
+    g = match.groupdict()
+    try:
+        if g['q'] or g['q2']:
+            quarter, year = (g['q'], g['q_y']) if g['q'] else (g['q2'], g['q_y2'])
+            first_month = (int(quarter) - 1) * 3 + 1
+            return date(int(year), first_month, 1), _month_period(int(year), first_month + 2)[1]
+        if g['iso_y']:
+            year = int(g['iso_y'])
+            if not g['iso_m'] or g['iso_m'] == '??':
+                return date(year, 1, 1), date(year, 12, 31)
+            month = int(g['iso_m'])
+            if not g['iso_d'] or g['iso_d'] == '??':
+                return _month_period(year, month)
+            day = date(year, month, int(g['iso_d']))
+            return day, day
+        if g['mdy_m'] or g['dmy_m'] or g['us_m']:
+            if g['us_m']:
+                year, month, day = int(g['us_y']), int(g['us_m']), int(g['us_d'])
+            else:
+                prefix = 'mdy' if g['mdy_m'] else 'dmy'
+                month = _MONTHS.get(g[f'{prefix}_m'].lower())
+                if not month:
+                    return None
+                year, day = int(g[f'{prefix}_y']), int(g[f'{prefix}_d'])
+            value = date(year, month, day)
+            return value, value
+        if g['my_m']:
+            month = _MONTHS.get(g['my_m'].lower())
+            return _month_period(int(g['my_y']), month) if month else None
+        return None
+    except ValueError:  # 31 février, mois 13...
+        return None
+
+
+def parse_date_range(value: Any) -> Optional[Tuple[date, date]]:
+    """
+    Période (premier jour, dernier jour) désignée par une date de publication, ou None si illisible.
+    "2024-03-15" -> un jour, "March 2024" / "2024-03-??" -> le mois, "Q4 2025" -> le trimestre,
+    "2024" / "2024-??-??" -> l'année. Les chaînes déjà vues sont servies depuis un cache.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value, value
+    text = str(value).strip()
+    return _parse(text) if text else None
+
+
+def parse_date(value: Any) -> Optional[date]:
+    """Premier jour de la période désignée, ou None"""
+    period = parse_date_range(value)
+    return period[0] if period else None
+
+
+def normalize(value: Any) -> Optional[str]:
+    """Date normalisée "YYYY-MM-DD" (premier jour de la période), triable telle quelle ; None si illisible"""
+    day = parse_date(value)
+    return day.isoformat() if day else None
+
+
+def add_sort_keys(items: Iterable[Dict], field: str = "published_date", key: str = "date") -> None:
+    """
+    Stocke une fois pour toutes la date normalisée de chaque item (à l'ingestion) :
+    les tris suivants comparent des chaînes ISO sans re-parser `field`.
+    """
+    for item in items:
+        if not item.get(key):
+            item[key] = normalize(item.get(field))
+
+
+def item_sort_key(item: Dict, key: str = "date") -> str:
+    """Clé de tri d'un item passé par add_sort_keys (date illisible : "" , donc en dernier en tri décroissant)"""
+    return item.get(key) or ""
+
+
+# ---------------------------------------------------------------------------
+# Passes vectorisées (numpy datetime64) sur tout un jeu de données
+# ---------------------------------------------------------------------------
+
+def _timestamp_text(value: Any) -> Optional[str]:
+    """Horodatage ISO "YYYY-MM-DDTHH:MM:SS" si `value` en est un, sinon None"""
+    text = str(value or '').strip()
+    if len(text) >= 19 and text[4] == '-' and text[10] in 'T ' and text[13] == ':':
+        return text[:10] + 'T' + text[11:19]
+    return None
+
+
+def _strings(values: Sequence[Any]):
+    return np.array(['' if v is None else str(v).strip() for v in values])
+
+
+def _parse_iso_fast(strings, unit: str):
+    """Parse C de numpy quand toutes les valeurs sont ISO ("", "2024", "2024-03-15T10:00:00.123"...), sinon None"""
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")  # suffixe "Z" : numpy ne garde pas le fuseau
+            return strings.astype(f'datetime64[{unit}]')
+    except ValueError:
+        return None
+
+
+def _parse_unique(strings, unit: str, parse_one):
+    """Repli : chaque valeur distincte est parsée une seule fois via la table compilée"""
+    uniques, inverse = np.unique(strings, return_inverse=True)
+    parsed = np.array([parse_one(u) or 'NaT' for u in uniques], dtype=f'datetime64[{unit}]')
+    return parsed[inverse.reshape(-1)]
+
+
+def to_datetime64(values: Sequence[Any]):
+    """
+    Tableau numpy datetime64[D] (NaT si illisible).
+    Sans numpy : liste de `date` / None.
+    """
+    if np is None:
+        return [parse_date(v) for v in values]
+    if len(values) == 0:
+        return np.array([], dtype='datetime64[D]')
+    strings = _strings(values)
+    days = _parse_iso_fast(strings, 'D')
+    return days if days is not None else _parse_unique(strings, 'D', normalize)
+
+
+def ages_in_days(values: Sequence[Any], now: Optional[datetime] = None) -> List[Optional[int]]:
+    """
+    Âge en jours (arrondi à l'inférieur, comme timedelta.days) de chaque date ; None si illisible.
+    Les horodatages complets ("2023-06-14T00:41:30.644058") sont comparés à la seconde près.
+    """
+    now = now or datetime.now()
+    if np is None:
+        ages = []
+        for v in values:
+            stamp = _timestamp_text(v)
+            if stamp:
+                ages.append((now - datetime.fromisoformat(stamp)).days)
+            else:
+                day = parse_date(v)
+                ages.append((now - datetime(day.year, day.month, day.day)).days if day else None)
+        return ages
+
+    if len(values) == 0:
+        return []
+    strings = _strings(values)
+    moments = _parse_iso_fast(strings, 's')
+    if moments is None:
+        moments = _parse_unique(strings, 's', lambda v: _timestamp_text(v) or normalize(v))
+    with np.errstate(invalid='ignore'):  # NaT
+        ages = (np.datetime64(now.replace(microsecond=0), 's') - moments) // np.timedelta64(1, 'D')
+    return [None if missing else age for age, missing in zip(ages.tolist(), np.isnat(moments).tolist())]
+
+
+def bucket_counts(values: Sequence[Any], unit: str = "M") -> Dict[str, int]:
+    """Nombre de dates par période ("M" mois, "W" semaine, "D" jour), clés ISO triées ; dates illisibles ignorées"""
+    if np is None:
+        counts: Dict[str, int] = {}
+        for day in (parse_date(v) for v in values):
+            if day is None:
+                continue
+            if unit == "M":
+                label = day.strftime('%Y-%m')
+            elif unit == "W":
+                label = (day - timedelta(days=(day.weekday() - 3) % 7)).isoformat()  # semaines numpy : jeudi
+            else:
+                label = day.isoformat()
+            counts[label] = counts.get(label, 0) + 1
+        return dict(sorted(counts.items()))
+
+    days = to_datetime64(values)
+    days = days[~np.isnat(days)]
+    if days.size == 0:
+        return {}
+    labels, counts = np.unique(days.astype(f'datetime64[{unit}]'), return_counts=True)
+    return {str(label): int(count) for label, count in zip(labels, counts)}
+
+
+class ScrapeWindow:
+    """Fenêtre [start, end] de dates de publication recherchées pour une entreprise"""
+
+    __slots__ = ("start", "end", "requested_days", "incremental")
+
+    def __init__(self, start: date, end: date, requested_days: Optional[int] = None, incremental: bool = False):
+        self.start = start
+        self.end = end
+        self.requested_days = requested_days
+        self.incremental = incremental
+
+    @property
+    def days(self) -> int:
+        return max((self.end - self.start).days, 0)
+
+    @property
+    def is_short(self) -> bool:
+        return self.requested_days is not None and self.days <= SHORT_WINDOW_DAYS
+
+    @property
+    def years(self) -> List[int]:
+        """Années à cibler dans les requêtes (les deux dernières pour un scraping historique)"""
+        first = self.start.year if self.is_short else self.end.year - 1
+        return list(range(first, self.end.year + 1))
+
+    @property
+    def search_budget(self) -> Tuple[int, int]:
+        """(min, max) de recherches web à demander au modèle selon la taille de la fenêtre"""
+        if not self.is_short:
+            return 10, 15
+        if self.days <= 7:
+            return 2, 3
+        if self.days <= 30:
+            return 3, 5
+        return 5, 8
+
+    def contains(self, value: Any) -> bool:
+        """Vrai si la période de `value` recoupe la fenêtre (date illisible : conservée)"""
+        period = parse_date_range(value)
+        if period is None:
+            return True
+        first, last = period
+        return last >= self.start and first <= self.end
+
+    def filter(self, items: List[Dict], key: str = "published_date") -> Tuple[List[Dict], int]:
+        """Garde les items dans la fenêtre ; retourne (items gardés, nombre d'items écartés)"""
+        kept = [item for item in items if self.contains(item.get(key))]
+        return kept, len(items) - len(kept)
+
+    def describe(self) -> str:
+        if self.is_short:
+            return f"between {self.start:%B %d, %Y} and {self.end:%B %d, %Y} (last {self.days} days)"
+        return f"from {self.start:%B %d, %Y} onwards (ideally last 18-24 months)"
+
+    def to_metadata(self) -> Dict[str, Any]:
+        return {
+            "window_start": self.start.isoformat(),
+            "window_end": self.end.isoformat(),
+            "window_days": self.requested_days,
+            "incremental": self.incremental,
+        }
+
+
+def last_scraped(company_data: Optional[Dict]) -> Optional[date]:
+    """Date du dernier scraping réussi d'une entreprise (scrape_metadata.timestamp)"""
+    metadata = (company_data or {}).get("scrape_metadata") or {}
+    if not metadata.get("success") or not metadata.get("timestamp"):
+        return None
+    try:
+        return datetime.fromisoformat(metadata["timestamp"]).date()
+    except ValueError:
+        return None
+
+
+def scrape_window(days: Optional[int] = None, previous: Optional[Dict] = None, today: Optional[date] = None) -> ScrapeWindow:
+    """
+    Fenêtre à scraper pour une entreprise.
+    days     : profondeur demandée (None = historique complet depuis HISTORY_START)
+    previous : données déjà fusionnées de l'entreprise ; si fournies, on ne recherche que depuis le dernier scraping
+    """
+    today = today or date.today()
+    if days is None:
+        return ScrapeWindow(HISTORY_START, today)
+
+    start = today - timedelta(days=days)
+    incremental = False
+    scraped_on = last_scraped(previous)
+    if scraped_on and scraped_on - timedelta(days=RESCRAPE_OVERLAP_DAYS) > start:
+        start = scraped_on - timedelta(days=RESCRAPE_OVERLAP_DAYS)
+        incremental = True
+    return ScrapeWindow(max(start, HISTORY_START), today, days, incremental)
+
+
+def date_requirement(window: ScrapeWindow, noun: str = "news") -> str:
+    """Bloc "CRITICAL DATE REQUIREMENT" des prompts de scraping"""
+    if window.is_short:
+        return f"""⚠️⚠️⚠️ CRITICAL DATE REQUIREMENT - ABSOLUTE RULE ⚠️⚠️⚠️
+- ONLY include {noun} published {window.describe()}
+- ❌ If publication date is before {window.start:%B %d, %Y} → DO NOT INCLUDE IT (outside the requested window)
+- If nothing was published in this window, return an EMPTY list - this is an expected, valid answer
+- This is a HARD CUTOFF - no exceptions"""
+    years = ", ".join(str(y) for y in range(window.start.year, window.end.year + 1))
+    return f"""⚠️⚠️⚠️ CRITICAL DATE REQUIREMENT - ABSOLUTE RULE ⚠️⚠️⚠️
+- ONLY include {noun} from {years} (ideally last 18-24 months)
+- ❌ NEVER INCLUDE {noun} from {window.start.year - 1} or earlier
+- ❌ If publication date is before {window.start:%B %d, %Y} → DO NOT INCLUDE IT
+- The business landscape pre-COVID (before 2020) is completely different and irrelevant
+- This is a HARD CUTOFF - no exceptions, no "highly relevant" pre-{window.start.year} content"""
+
+
+def date_check(window: ScrapeWindow) -> str:
+    """Rappel de vérification des dates avant de renvoyer le JSON"""
+    return f"""- ⚠️ CRITICAL: Check each publication date - if before {window.start:%B %d, %Y}, EXCLUDE IT
+- ⚠️ ONLY valid dates: {window.describe()}"""
+
+
+def final_date_check(window: ScrapeWindow) -> str:
+    """Bloc "FINAL CHECK" des prompts (les items hors fenêtre sont de toute façon filtrés localement)"""
+    return f"""⚠️ FINAL CHECK BEFORE RETURNING JSON:
+- Go through each item and verify the published_date
+- If ANY item was published before {window.start:%B %d, %Y}, REMOVE IT from the output
+- ONLY valid dates: {window.describe()}"""
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Index vectoriel local des offres d'emploi, news et interviews (recherche par similarité, sans LLM)
+- Embeddings CPU : sentence-transformers si installé, sinon hashing de mots/bigrammes (aucun téléchargement)
+- Vecteurs float16 dans un memmap (embeddings/vectors.f16), métadonnées dans items.jsonl
+- Recherche approchée : LSH par hyperplans aléatoires (plusieurs tables, sondage à distance de Hamming 1),
+  re-classement exact des candidats ; recherche exhaustive tant que l'index est petit
+- Incrémental : un item n'est ré-embeddé que si son texte a changé ; les items disparus sont désactivés
+
+Usage :
+    python embedding_index.py build                                   # synchronise l'index avec les JSON
+    python embedding_index.py query "3D rendering product photography" --kind job --companies
+    python embedding_index.py like "Arhaus" "Ballard Designs"          # entreprises aux offres similaires
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+import blob_store
+import tracing
+from storage import read_json, write_json_atomic
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # optionnel : embeddings sémantiques plus fins
+    SentenceTransformer = None
+
+INDEX_DIR = "embeddings"
+JOBS_FILE = "jobs_data.json"
+NEWS_FILE = "company_news.json"
+INTERVIEWS_FILE = "management_interviews.json"
+
+HASHING_DIM = 512
+MINILM_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+LSH_TABLES = 8
+LSH_BITS = 12
+LSH_SEED = 20240101
+BRUTE_FORCE_LIMIT = 20000   # en dessous : produit scalaire sur tout l'index (plus rapide que le LSH)
+COMPACT_RATIO = 0.3         # proportion d'items inactifs déclenchant une compaction
+MAX_TEXT_CHARS = 4000
+
+_WORD_RE = re.compile(r"[a-z0-9][a-z0-9+#&'-]+")
+_STOPWORDS = frozenset("""
+    the and for with our you your are will this that from have has all who what their they been into
+    about more can not but its also other than such any each while within across per via job role work
+""".split())
+
+
+# ---------------------------------------------------------------------------
+# Embedders
+# ---------------------------------------------------------------------------
+
+class HashingEmbedder:
+    """Sac de mots et bigrammes haché (crc32) sur HASHING_DIM dimensions signées, pondération 1 + log(tf)"""
+
+    name = f"hashing-{HASHING_DIM}"
+    dim = HASHING_DIM
+
+    def _features(self, text):
+        words = [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+        counts = {}
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            counts[feature] = counts.get(feature, 0) + 1
+        return counts
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        rows, cols, values = [], [], []
+        for i, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                h = zlib.crc32(feature.encode("utf-8"))
+                rows.append(i)
+                cols.append(h % self.dim)
+                values.append((1.0 + np.log(count)) * (1.0 if h & 0x80000000 else -1.0))
+        if rows:
+            np.add.at(vectors, (np.array(rows), np.array(cols)), np.array(values, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-9)
+
+
+class MiniLMEmbedder:
+    """all-MiniLM-L6-v2 (384 dimensions) sur CPU"""
+
+    name = "minilm-l6-v2"
+    dim = 384
+
+    def __init__(self):
+        self.model = SentenceTransformer(MINILM_MODEL, device="cpu")
+
+    def embed(self, texts):
+        vectors = self.model.encode(list(texts), batch_size=64, normalize_embeddings=True, show_progress_bar=False)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def get_embedder(name=None):
+    """Embedder demandé ; par défaut MiniLM si sentence-transformers est installé, sinon hashing"""
+    if name == "hashing" or (name is None and SentenceTransformer is None):
+        return HashingEmbedder()
+    if SentenceTransformer is None:
+        raise RuntimeError("sentence-transformers est requis pour l'embedder minilm : pip install sentence-transformers")
+    return MiniLMEmbedder()
+
+
+# ---------------------------------------------------------------------------
+# Items à indexer
+# ---------------------------------------------------------------------------
+
+def _item_id(kind, *parts):
+    key = "|".join(str(p or "") for p in parts)
+    return f"{kind}:{hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _join(*parts):
+    return "\n".join(str(p) for p in parts if p)[:MAX_TEXT_CHARS]
+
+
+def collect_items(jobs_file=JOBS_FILE, news_file=NEWS_FILE, interviews_file=INTERVIEWS_FILE):
+    """Items {id, kind, company, title, url, date, text} issus des offres, news et interviews"""
+    items = []
+    jobs_data = read_json(jobs_file, {"companies": []})
+    blob_store.hydrate_companies(jobs_data.get("companies", []))
+    for company_data in jobs_data.get("companies", []):
+        company = (company_data.get("company") or {}).get("name")
+        for job in company_data.get("jobs") or []:
+            items.append({
+                "id": _item_id("job", company, job.get("job_title"), job.get("job_board_url") or job.get("job_url")),
+                "kind": "job", "company": company, "title": job.get("job_title"),
+                "url": job.get("job_board_url") or job.get("job_url"), "date": job.get("date_creation"),
+                "text": _join(job.get("job_title"), job.get("description")),
+            })
+    for kind, path, items_key in (("news", news_file, "news_items"), ("interview", interviews_file, "management_items")):
+        for company, company_data in read_json(path, {}).items():
+            for item in company_data.get(items_key) or []:
+                items.append({
+                    "id": _item_id(kind, company, item.get("url") or item.get("title")),
+                    "kind": kind, "company": company, "title": item.get("title"), "url": item.get("url"),
+                    "date": item.get("published_date"),
+                    "text": _join(
+                        item.get("title"), item.get("executive_title"), item.get("summary"),
+                        "; ".join(item.get("key_insights") or item.get("topics_discussed") or []),
+                    ),
+                })
+    # Un même id peut apparaître deux fois (offre republiée) : la dernière occurrence l'emporte
+    return list({item["id"]: item for item in items}.values())
+
+
+def _text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+class EmbeddingIndex:
+    """
+    Index sur disque :
+        manifest.json   embedder, dimension, nombre de lignes, capacité
+        vectors.f16     memmap float16 [capacité, dim]
+        codes.u16       memmap uint16 [capacité, LSH_TABLES] (signatures LSH)
+        items.jsonl     une ligne de métadonnées par ligne de vecteur (active ou non)
+    """
+
+    def __init__(self, directory=INDEX_DIR, embedder=None):
+        self.directory = directory
+        self.manifest = read_json(self._path("manifest.json"), None)
+        if embedder is None and self.manifest:
+            # Sans choix explicite : l'embedder qui a construit l'index
+            embedder = get_embedder("hashing" if self.manifest["embedder"].startswith("hashing") else "minilm")
+        self.embedder = embedder or get_embedder()
+        if self.manifest and (self.manifest["embedder"] != self.embedder.name or self.manifest["dim"] != self.embedder.dim):
+            print(f"⚠️  Index construit avec {self.manifest['embedder']} : reconstruction avec {self.embedder.name}")
+            remove_index(directory)
+            self.manifest = None
+        if self.manifest is None:
+            self.manifest = {"embedder": self.embedder.name, "dim": self.embedder.dim, "count": 0, "capacity": 0}
+            self.items = []
+        else:
+            with open(self._path("items.jsonl"), "r", encoding="utf-8") as f:
+                self.items = [json.loads(line) for line in f]
+        planes = np.random.default_rng(LSH_SEED).standard_normal((self.embedder.dim, LSH_TABLES * LSH_BITS))
+        self.planes = planes.astype(np.float32)
+        self._open()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _open(self):
+        capacity, dim = self.manifest["capacity"], self.manifest["dim"]
+        if capacity == 0:
+            self.vectors = np.zeros((0, dim), dtype=np.float16)
+            self.codes = np.zeros((0, LSH_TABLES), dtype=np.uint16)
+            return
+        self.vectors = np.memmap(self._path("vectors.f16"), dtype=np.float16, mode="r+", shape=(capacity, dim))
+        self.codes = np.memmap(self._path("codes.u16"), dtype=np.uint16, mode="r+", shape=(capacity, LSH_TABLES))
+
+    def _grow(self, needed):
+        """Agrandit les memmaps (capacité doublée) : les fichiers sont étendus, pas recopiés"""
+        capacity = self.manifest["capacity"]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        os.makedirs(self.directory, exist_ok=True)
+        self.vectors = self.codes = None
+        for name, row_bytes in (("vectors.f16", self.manifest["dim"] * 2), ("codes.u16", LSH_TABLES * 2)):
+            with open(self._path(name), "ab") as f:
+                f.truncate(new_capacity * row_bytes)
+        self.manifest["capacity"] = new_capacity
+        self._open()
+
+    def lsh_codes(self, vectors):
+        """Signature LSH_BITS bits par table (signe des projections sur des hyperplans aléatoires)"""
+        bits = (np.asarray(vectors, dtype=np.float32) @ self.planes) > 0
+        bits = bits.reshape(len(bits), LSH_TABLES, LSH_BITS)
+        return (bits * (1 << np.arange(LSH_BITS, dtype=np.uint16))).sum(-1).astype(np.uint16)
+
+    def _active_rows(self):
+        return np.array([i for i, item in enumerate(self.items) if item.get("active")], dtype=np.int64)
+
+    def sync(self, items, batch_size=256):
+        """
+        Met l'index en phase avec `items` : seuls les items nouveaux ou modifiés sont embeddés.
+        Retourne {"embedded", "unchanged", "removed"}.
+        """
+        current = {item["id"]: i for i, item in enumerate(self.items) if item.get("active")}
+        wanted = {item["id"] for item in items}
+        todo = []
+        for item in items:
+            text_hash = _text_hash(item["text"])
+            row = current.get(item["id"])
+            if row is not None and self.items[row]["text_hash"] == text_hash:
+                continue
+            if row is not None:
+                self.items[row]["active"] = False
+            todo.append((item, text_hash))
+
+        removed = 0
+        for item_id, row in current.items():
+            if item_id not in wanted:
+                self.items[row]["active"] = False
+                removed += 1
+
+        count = self.manifest["count"]
+        self._grow(count + len(todo))
+        for start in range(0, len(todo), batch_size):
+            batch = todo[start:start + batch_size]
+            with tracing.span("embed_batch", kind="api", api=self.embedder.name, items=len(batch)):
+                vectors = self.embedder.embed([item["text"] for item, _ in batch])
+            rows = slice(count, count + len(batch))
+            self.vectors[rows] = vectors.astype(np.float16)
+            self.codes[rows] = self.lsh_codes(vectors)
+            for item, text_hash in batch:
+                meta = {k: v for k, v in item.items() if k != "text"}
+                self.items.append({**meta, "text_hash": text_hash, "active": True})
+            count += len(batch)
+        self.manifest["count"] = count
+
+        inactive = count - len(self._active_rows())
+        if count and inactive / count > COMPACT_RATIO:
+            self.compact()
+        self.save()
+        return {"embedded": len(todo), "unchanged": len(items) - len(todo), "removed": removed}
+
+    def compact(self):
+        """Réécrit l'index sans les lignes inactives"""
+        rows = self._active_rows()
+        vectors = np.array(self.vectors[rows])
+        codes = np.array(self.codes[rows])
+        self.items = [self.items[i] for i in rows]
+        self.vectors = self.codes = None
+        for name in ("vectors.f16", "codes.u16"):
+            os.remove(self._path(name))
+        self.manifest.update(count=0, capacity=0)
+        self._grow(len(rows))
+        self.vectors[:len(rows)] = vectors
+        self.codes[:len(rows)] = codes
+        self.manifest["count"] = len(rows)
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if self.manifest["capacity"]:
+            self.vectors.flush()
+            self.codes.flush()
+        tmp = self._path("items.jsonl.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for item in self.items:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        os.replace(tmp, self._path("items.jsonl"))
+        active = [self.items[i] for i in self._active_rows()]
+        write_json_atomic(self._path("manifest.json"), {
+            **self.manifest,
+            "active": len(active),
+            "companies": sorted({item["company"] for item in active if item.get("company")}),
+            "updated_at": datetime.now().isoformat(),
+        })
+
+    # -----------------------------------------------------------------------
+    # Requêtes
+    # -----------------------------------------------------------------------
+
+    def _candidates(self, query, rows, min_candidates):
+        """Lignes dont une signature LSH est à distance de Hamming <= 1 (puis 2) de celle de la requête"""
+        if len(rows) <= BRUTE_FORCE_LIMIT:
+            return rows
+        xor = self.codes[rows] ^ self.lsh_codes(query[None, :])[0]
+        distances = np.unpackbits(xor.view(np.uint8), axis=1).reshape(len(rows), LSH_TABLES, 16).sum(-1)
+        for radius in (1, 2):
+            selected = rows[(distances <= radius).any(1)]
+            if len(selected) >= min_candidates:
+                return selected
+        return rows
+
+    def search_vector(self, query, k=10, kinds=None, exclude_companies=(), by_company=False):
+        rows = self._active_rows()
+        if kinds:
+            rows = rows[[self.items[i]["kind"] in kinds for i in rows]] if len(rows) else rows
+        if exclude_companies:
+            rows = rows[[self.items[i]["company"] not in exclude_companies for i in rows]] if len(rows) else rows
+        if len(rows) == 0:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        rows = self._candidates(query, rows, min_candidates=k * 20)
+        scores = self.vectors[rows].astype(np.float32) @ query
+
+        if by_company:
+            best = {}
+            for row, score in zip(rows.tolist(), scores.tolist()):
+                company = self.items[row]["company"]
+                if company not in best or score > best[company][0]:
+                    best[company] = (score, row)
+            ranked = sorted(best.items(), key=lambda entry: -entry[1][0])[:k]
+            return [{"company": company, "score": round(score, 4), "best_match": self._result(row)}
+                    for company, (score, row) in ranked]
+
+        top = np.argsort(-scores)[:k] if len(scores) <= k else np.argpartition(-scores, k)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [{**self._result(rows[i]), "score": round(float(scores[i]), 4)} for i in top]
+
+    def _result(self, row):
+        item = self.items[row]
+        return {key: item.get(key) for key in ("kind", "company", "title", "url", "date")}
+
+    def search(self, text, k=10, kinds=None, by_company=False):
+        """Top-k items (ou entreprises) les plus proches d'un texte libre"""
+        return self.search_vector(self.embedder.embed([text])[0], k, kinds, by_company=by_company)
+
+    def similar_companies(self, companies, k=10, kinds=("job",)):
+        """Entreprises dont les items ressemblent le plus à ceux de `companies` (centroïde des vecteurs)"""
+        rows = [i for i in self._active_rows() if self.items[i]["company"] in companies
+                and (not kinds or self.items[i]["kind"] in kinds)]
+        if not rows:
+            raise ValueError(f"Aucun item indexé pour : {', '.join(companies)}")
+        centroid = self.vectors[rows].astype(np.float32).mean(0)
+        centroid /= max(np.linalg.norm(centroid), 1e-9)
+        return self.search_vector(centroid, k, kinds, exclude_companies=set(companies), by_company=True)
+
+
+def remove_index(directory=INDEX_DIR):
+    for name in ("manifest.json", "items.jsonl", "vectors.f16", "codes.u16"):
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def build_index(directory=INDEX_DIR, embedder=None, rebuild=False):
+    """Synchronise l'index avec jobs_data.json, company_news.json et management_interviews.json"""
+    if rebuild:
+        remove_index(directory)
+    with tracing.span("collect_items", kind="load"):
+        items = collect_items()
+    index = EmbeddingIndex(directory, embedder)
+    with tracing.span("sync_index", items=len(items)):
+        stats = index.sync(items)
+    return index, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index vectoriel des offres, news et interviews")
+    parser.add_argument("--embedder", choices=["hashing", "minilm"], help="Défaut : minilm si disponible, sinon hashing")
+    parser.add_argument("--dir", default=INDEX_DIR, help="Dossier de l'index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Synchronise l'index (incrémental)")
+    build.add_argument("--rebuild", action="store_true", help="Reconstruit tout l'index")
+    query = sub.add_parser("query", help="Recherche par texte libre")
+    query.add_argument("text")
+    query.add_argument("--k", type=int, default=10)
+    query.add_argument("--kind", nargs="+", choices=["job", "news", "interview"])
+    query.add_argument("--companies", action="store_true", help="Regrouper les résultats par entreprise")
+    like = sub.add_parser("like", help="Entreprises similaires à des comptes de référence")
+    like.add_argument("company", nargs="+")
+    like.add_argument("--k", type=int, default=10)
+    like.add_argument("--kind", nargs="+", choices=["job", "news", "interview"], default=["job"])
+    args = parser.parse_args()
+
+    embedder = get_embedder(args.embedder) if args.embedder else None
+    if args.command == "build":
+        tracing.init("embeddings")
+        print("🧭 Synchronisation de l'index...")
+        index, stats = build_index(args.dir, embedder, rebuild=args.rebuild)
+        print(f"✅ [{index.embedder.name}] {stats['embedded']} items embeddés, {stats['unchanged']} inchangés, {stats['removed']} retirés "
+              f"({index.manifest['count']} lignes, {len(index._active_rows())} actives)")
+        tracing.finish()
+        return
+
+    index = EmbeddingIndex(args.dir, embedder)
+    if not index.manifest["count"]:
+        print("❌ Index vide : lancer d'abord `python embedding_index.py build`", file=sys.stderr)
+        sys.exit(1)
+    if args.command == "query":
+        results = index.search(args.text, args.k, args.kind, by_company=args.companies)
+    else:
+        results = index.similar_companies(args.company, args.k, args.kind)
+    for result in results:
+        print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
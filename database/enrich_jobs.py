@@ -1,18 +1,25 @@
 #!/usr/bin/env python3
 """
 Script d'enrichissement des offres d'emploi via l'API Mantiks
-Pour les 50 premières entreprises US du fichier TAM.csv
+Par défaut pour les 50 premières entreprises US du fichier TAM.csv (sélection configurable : company_selection)
 """
 
-import csv
+import argparse
 import requests
-import json
 import time
 import os
 from datetime import datetime
 import html
 from dotenv import load_dotenv
 
+import blob_store
+import company_selection
+import dates
+import lazy_report
+import parallel
+import tracing
+from storage import append_jsonl, loads, read_json, write_json_atomic
+
 # Charger les variables d'environnement depuis .env
 load_dotenv()
 
@@ -22,6 +29,16 @@ if not API_KEY:
     raise ValueError("MANTIKS_API_KEY environment variable is required")
 API_URL = "https://api.mantiks.io/company/jobs"
 
+JOBS_FILE = "jobs_data.json"
+
+def checkpoint_path(json_path=JOBS_FILE):
+    """Journal de reprise associé à un fichier de sortie (un par shard) : jobs_data.json -> jobs_data.checkpoint.jsonl"""
+    return os.path.splitext(json_path)[0] + ".checkpoint.jsonl"
+
+# Journal append-only des entreprises déjà interrogées (une ligne JSON par entreprise) :
+# un run interrompu reprend là où il s'est arrêté sans re-dépenser de crédits Mantiks
+CHECKPOINT_FILE = checkpoint_path()
+
 # Mots-clés de recherche pour les titres de poste
 JOB_KEYWORDS = [
     "digital strategy",
@@ -47,22 +64,8 @@ JOB_KEYWORDS = [
 ]
 
 def load_us_companies(csv_path, limit=50):
-    """Charge les entreprises US depuis le fichier CSV"""
-    companies = []
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            if row.get('Country', '').strip() == 'United States':
-                companies.append({
-                    'name': row.get('CompanyName', '').strip(),
-                    'website': row.get('Website', '').strip(),
-                    'linkedin': row.get('LinkedIn', '').strip(),
-                    'industry': row.get('Sub Industry', '').strip(),
-                    'employees': row.get('Employees', '').strip()
-                })
-            if len(companies) >= limit:
-                break
-    return companies
+    """Charge les entreprises US depuis le fichier CSV (périmètre historique, voir company_selection)"""
+    return company_selection.select_companies(company_selection.default_selection(limit=limit), csv_path)
 
 def clean_url(url):
     """Nettoie l'URL pour l'API (retire les suffixes de langue, etc.)"""
@@ -100,7 +103,9 @@ def fetch_jobs_for_company(company):
         params.append(('linkedin_url', company['linkedin']))
     
     try:
-        response = requests.get(API_URL, headers=headers, params=params, timeout=30)
+        with tracing.span("mantiks.company_jobs", kind="api", api="mantiks", company=company['name']) as api_span:
+            response = requests.get(API_URL, headers=headers, params=params, timeout=30)
+            api_span.set(status_code=response.status_code, success=response.status_code == 200)
         
         if response.status_code == 200:
             data = response.json()
@@ -126,19 +131,6 @@ def fetch_jobs_for_company(company):
             'nb_jobs': 0
         }
 
-def calculate_age_in_days(date_str):
-    """Calcule l'âge d'une offre en jours"""
-    if not date_str:
-        return None
-    try:
-        # Format: "2023-06-14T00:41:30.644058"
-        job_date = datetime.fromisoformat(date_str.replace('Z', '+00:00'))
-        now = datetime.now(job_date.tzinfo) if job_date.tzinfo else datetime.now()
-        delta = now - job_date
-        return delta.days
-    except:
-        return None
-
 def escape_html(text):
     """Échappe les caractères HTML spéciaux"""
     if text is None:
@@ -153,8 +145,143 @@ def truncate_description(description, max_length=500):
         return description
     return description[:max_length] + "..."
 
-def generate_html_report(results, output_path):
-    """Génère un rapport HTML avec tous les résultats"""
+def render_company_section(company_result, output_path, lazy=True):
+    """Section HTML d'une entreprise ; retourne (html, descriptions complètes à charger en différé ou None)"""
+    company = company_result['company']
+    jobs = company_result.get('jobs', [])
+    nb_jobs = company_result.get('nb_jobs', 0)
+    success = company_result.get('success', False)
+    error = company_result.get('error', '')
+    
+    key = lazy_report.payload_key(company['name'])
+    payload_attrs = ''
+    descriptions = None
+    if lazy and jobs:
+        descriptions = [job.get('description', '') for job in jobs]
+        payload_attrs = f' data-key="{key}" data-src="{lazy_report.payload_src(output_path, key)}"'
+    
+    html = f'''
+        <div class="company-section" data-company="{escape_html(company['name'].lower())}"{payload_attrs}>
+            <div class="company-header">
+                <div>
+                    <div class="company-name">{escape_html(company['name'])}</div>
+                    <div class="company-meta">
+                        <span class="meta-item">
+                            <span>🌐</span>
+                            <a href="{escape_html(company['website'])}" target="_blank" style="color: var(--text-secondary);">{escape_html(company['website'][:50])}...</a>
+                        </span>
+                        <span class="meta-item">
+                            <span>🏢</span>
+                            {escape_html(company['industry'])}
+                        </span>
+                        <span class="meta-item">
+                            <span>👥</span>
+                            {escape_html(company['employees'])} employees
+                        </span>
+                    </div>
+                </div>
+'''
+    
+    if not success:
+        html += f'''
+                <span class="error-badge">⚠️ Error: {escape_html(error[:50])}</span>
+            </div>
+            <div class="no-jobs-message">API call failed - {escape_html(error)}</div>
+        </div>
+'''
+    elif nb_jobs == 0:
+        html += '''
+                <span class="no-jobs-badge">No matching jobs</span>
+            </div>
+            <div class="no-jobs-message">No jobs found matching the keywords</div>
+        </div>
+'''
+    else:
+        html += f'''
+                <span class="job-count-badge">{nb_jobs} jobs found</span>
+            </div>
+            <table class="jobs-table">
+                <thead>
+                    <tr>
+                        <th style="width: 25%;">Job Title</th>
+                        <th style="width: 10%;">Job Board</th>
+                        <th style="width: 15%;">Location</th>
+                        <th style="width: 10%;">Date Posted</th>
+                        <th style="width: 8%;">Age</th>
+                        <th style="width: 32%;">Description</th>
+                    </tr>
+                </thead>
+                <tbody>
+'''
+        # Âges de toutes les offres de l'entreprise en une passe vectorisée
+        ages = dates.ages_in_days([job.get('date_creation') for job in jobs])
+        for idx, job in enumerate(jobs):
+            job_title = escape_html(job.get('job_title', 'N/A'))
+            job_url = escape_html(job.get('job_board_url', '#'))
+            job_board = job.get('job_board', 'unknown').lower()
+            location = escape_html(job.get('location', 'N/A'))
+            date_creation = job.get('date_creation', '')
+            last_seen = job.get('last_seen', '')
+            description = job.get('description', '')
+            
+            # Calculer l'âge
+            age_days = ages[idx]
+            age_class = 'age-fresh' if age_days and age_days <= 7 else ('age-recent' if age_days and age_days <= 30 else 'age-old')
+            age_text = f"{age_days} days" if age_days is not None else "N/A"
+            
+            # Formatter la date
+            date_display = date_creation[:10] if date_creation else 'N/A'
+            
+            # Board class
+            board_class = 'linkedin' if 'linkedin' in job_board else ('indeed' if 'indeed' in job_board else '')
+            
+            # Description tronquée
+            desc_preview = escape_html(truncate_description(description, 200))
+            job_id = f"job_{key}_{idx}"
+            if lazy:
+                desc_full = f'<div id="{job_id}" class="description-full" data-index="{idx}"></div>'
+            else:
+                desc_full = f'<div id="{job_id}" class="description-full">{escape_html(description)}</div>'
+            
+            html += f'''
+                    <tr data-job-title="{job_title.lower()}" data-board="{job_board}" data-age="{age_days if age_days else 999}">
+                        <td>
+                            <div class="job-title">
+                                <a href="{job_url}" target="_blank">{job_title}</a>
+                            </div>
+                        </td>
+                        <td>
+                            <span class="job-board {board_class}">{escape_html(job_board)}</span>
+                        </td>
+                        <td class="job-location">{location}</td>
+                        <td class="job-date">{date_display}</td>
+                        <td>
+                            <span class="age-badge {age_class}">{age_text}</span>
+                        </td>
+                        <td class="description-cell">
+                            <div class="desc-preview">{desc_preview}</div>
+                            <span class="description-toggle" onclick="toggleDescription('{job_id}')">Show full description ▼</span>
+                            {desc_full}
+                        </td>
+                    </tr>
+'''
+        
+        html += '''
+                </tbody>
+            </table>
+        </div>
+'''
+    
+    return html, descriptions
+
+def generate_html_report(results, output_path, lazy=True):
+    """Génère un rapport HTML avec tous les résultats
+    
+    lazy : les descriptions complètes sont écrites dans un fichier par entreprise (lazy_report) et chargées
+    au clic sur "Show full description" ; sinon elles sont incluses dans le HTML
+    """
+    descriptions = {}
+    blob_store.hydrate_companies(results['companies'])
     
     html_content = '''<!DOCTYPE html>
 <html lang="en">
@@ -534,133 +661,36 @@ def generate_html_report(results, output_path):
         </div>
 '''
     
-    # Générer les sections pour chaque entreprise
-    for company_result in results['companies']:
-        company = company_result['company']
-        jobs = company_result.get('jobs', [])
-        nb_jobs = company_result.get('nb_jobs', 0)
-        success = company_result.get('success', False)
-        error = company_result.get('error', '')
-        
-        html_content += f'''
-        <div class="company-section" data-company="{escape_html(company['name'].lower())}">
-            <div class="company-header">
-                <div>
-                    <div class="company-name">{escape_html(company['name'])}</div>
-                    <div class="company-meta">
-                        <span class="meta-item">
-                            <span>🌐</span>
-                            <a href="{escape_html(company['website'])}" target="_blank" style="color: var(--text-secondary);">{escape_html(company['website'][:50])}...</a>
-                        </span>
-                        <span class="meta-item">
-                            <span>🏢</span>
-                            {escape_html(company['industry'])}
-                        </span>
-                        <span class="meta-item">
-                            <span>👥</span>
-                            {escape_html(company['employees'])} employees
-                        </span>
-                    </div>
-                </div>
-'''
-        
-        if not success:
-            html_content += f'''
-                <span class="error-badge">⚠️ Error: {escape_html(error[:50])}</span>
-            </div>
-            <div class="no-jobs-message">API call failed - {escape_html(error)}</div>
-        </div>
-'''
-        elif nb_jobs == 0:
-            html_content += '''
-                <span class="no-jobs-badge">No matching jobs</span>
-            </div>
-            <div class="no-jobs-message">No jobs found matching the keywords</div>
-        </div>
-'''
-        else:
-            html_content += f'''
-                <span class="job-count-badge">{nb_jobs} jobs found</span>
-            </div>
-            <table class="jobs-table">
-                <thead>
-                    <tr>
-                        <th style="width: 25%;">Job Title</th>
-                        <th style="width: 10%;">Job Board</th>
-                        <th style="width: 15%;">Location</th>
-                        <th style="width: 10%;">Date Posted</th>
-                        <th style="width: 8%;">Age</th>
-                        <th style="width: 32%;">Description</th>
-                    </tr>
-                </thead>
-                <tbody>
-'''
-            for idx, job in enumerate(jobs):
-                job_title = escape_html(job.get('job_title', 'N/A'))
-                job_url = escape_html(job.get('job_board_url', '#'))
-                job_board = job.get('job_board', 'unknown').lower()
-                location = escape_html(job.get('location', 'N/A'))
-                date_creation = job.get('date_creation', '')
-                last_seen = job.get('last_seen', '')
-                description = job.get('description', '')
-                
-                # Calculer l'âge
-                age_days = calculate_age_in_days(date_creation)
-                age_class = 'age-fresh' if age_days and age_days <= 7 else ('age-recent' if age_days and age_days <= 30 else 'age-old')
-                age_text = f"{age_days} days" if age_days is not None else "N/A"
-                
-                # Formatter la date
-                date_display = date_creation[:10] if date_creation else 'N/A'
-                
-                # Board class
-                board_class = 'linkedin' if 'linkedin' in job_board else ('indeed' if 'indeed' in job_board else '')
-                
-                # Description tronquée
-                desc_preview = escape_html(truncate_description(description, 200))
-                desc_full = escape_html(description)
-                
-                job_id = f"job_{company['name'].replace(' ', '_')}_{idx}"
-                
-                html_content += f'''
-                    <tr data-job-title="{job_title.lower()}" data-board="{job_board}" data-age="{age_days if age_days else 999}">
-                        <td>
-                            <div class="job-title">
-                                <a href="{job_url}" target="_blank">{job_title}</a>
-                            </div>
-                        </td>
-                        <td>
-                            <span class="job-board {board_class}">{escape_html(job_board)}</span>
-                        </td>
-                        <td class="job-location">{location}</td>
-                        <td class="job-date">{date_display}</td>
-                        <td>
-                            <span class="age-badge {age_class}">{age_text}</span>
-                        </td>
-                        <td class="description-cell">
-                            <div class="desc-preview">{desc_preview}</div>
-                            <span class="description-toggle" onclick="toggleDescription('{job_id}')">Show full description ▼</span>
-                            <div id="{job_id}" class="description-full">{desc_full}</div>
-                        </td>
-                    </tr>
-'''
-            
-            html_content += '''
-                </tbody>
-            </table>
-        </div>
-'''
+    # Générer les sections pour chaque entreprise (rendu réparti sur les cœurs, ordre conservé)
+    sections = parallel.map_ordered(
+        render_company_section, [(r, output_path, lazy) for r in results['companies']],
+        star=True, name="render_companies"
+    )
+    for company_result, (section, company_descriptions) in zip(results['companies'], sections):
+        html_content += section
+        if company_descriptions is not None:
+            descriptions[lazy_report.payload_key(company_result['company']['name'])] = company_descriptions
     
     # Fermer le HTML
     html_content += '''
     </div>
     
-    <script>
+    <script>''' + lazy_report.LOADER_JS + '''
         function toggleDescription(id) {
             const elem = document.getElementById(id);
             const toggle = elem.previousElementSibling;
+            const section = elem.closest('.company-section');
             if (elem.style.display === 'block') {
                 elem.style.display = 'none';
                 toggle.textContent = 'Show full description ▼';
+            } else if (section.dataset.src && !elem.dataset.loaded) {
+                toggle.textContent = 'Loading...';
+                loadPayload(section.dataset.key, section.dataset.src).then(descriptions => {
+                    elem.textContent = descriptions[parseInt(elem.dataset.index)] || '';
+                    elem.dataset.loaded = '1';
+                    elem.style.display = 'block';
+                    toggle.textContent = 'Hide description ▲';
+                }).catch(() => { toggle.textContent = 'Description unavailable'; });
             } else {
                 elem.style.display = 'block';
                 toggle.textContent = 'Hide description ▲';
@@ -708,69 +738,169 @@ def generate_html_report(results, output_path):
 </html>
 '''
     
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    if lazy:
+        with tracing.span("write_report_payloads", kind="save", companies=len(descriptions)):
+            lazy_report.write_payloads(output_path, descriptions)
+    
+    with tracing.span("write_html_report", kind="save", path=output_path, size=len(html_content)):
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(html_content)
     
     print(f"✅ HTML report generated: {output_path}")
 
-def main():
+def load_checkpoint(path=CHECKPOINT_FILE):
+    """{entreprise: résultat} du journal ; la dernière ligne d'une entreprise l'emporte, une ligne tronquée est ignorée"""
+    entries = {}
+    if not os.path.exists(path):
+        return entries
+    with open(path, 'rb') as f:
+        for line in f:
+            try:
+                result = loads(line)
+            except ValueError:  # dernière ligne coupée par un crash
+                continue
+            entries[result['company']['name']] = result
+    return entries
+
+def append_checkpoint(result, path=CHECKPOINT_FILE):
+    """Ajoute le résultat d'une entreprise au journal (descriptions externalisées dans le store), sur disque avant de continuer"""
+    entry = {**result, 'jobs': blob_store.externalize(result.get('jobs', []), result['company']['name'])}
+    with tracing.span("checkpoint", kind="save", path=path, company=result['company']['name']):
+        append_jsonl(path, entry)
+
+def clear_checkpoint(path=CHECKPOINT_FILE):
+    """Supprime le journal une fois jobs_data.json écrit"""
+    if os.path.exists(path):
+        os.remove(path)
+
+def fetch_all_companies(companies, checkpoint=None):
+    """Interroge Mantiks pour chaque entreprise (séquentiel, avec pause anti rate-limit)
+    
+    checkpoint : chemin du journal où chaque résultat est ajouté dès sa réception
+    """
+    company_results = []
+    with tracing.span("fetch_jobs", companies=len(companies)):
+        for i, company in enumerate(companies, 1):
+            print(f"[{i}/{len(companies)}] {company['name']}...", end=" ")
+            
+            with tracing.span(company['name'], kind="company") as company_span:
+                result = fetch_jobs_for_company(company)
+                company_span.set(success=result['success'], nb_jobs=result['nb_jobs'])
+            result['company'] = company
+            company_results.append(result)
+            if checkpoint:
+                append_checkpoint(result, checkpoint)
+            
+            if result['success']:
+                print(f"✅ {result['nb_jobs']} jobs found")
+            else:
+                print(f"❌ Error: {result.get('error', 'Unknown')[:50]}")
+            
+            # Petite pause pour éviter le rate limiting
+            time.sleep(0.5)
+    return company_results
+
+def build_results(company_results):
+    """Construit la structure jobs_data.json (totaux recalculés) à partir des résultats par entreprise"""
+    return {
+        'total_companies': len(company_results),
+        'total_jobs': sum(r.get('nb_jobs', 0) for r in company_results if r.get('success')),
+        'companies_with_jobs': sum(1 for r in company_results if r.get('success') and r.get('nb_jobs', 0) > 0),
+        'companies': company_results
+    }
+
+def save_results(results, json_path=JOBS_FILE, inline=False):
+    """Sauvegarde les données JSON pour l'analyse OpenAI
+    
+    Les descriptions vont dans le store compressé (blob_store) : le JSON ne garde que description_hash.
+    inline : descriptions gardées en clair (sortie d'un shard, fusionnée sur une autre machine que son store)
+    """
+    if inline:
+        companies = blob_store.hydrate_companies(results['companies'])
+    else:
+        with blob_store.BlobStore() as store:
+            companies = [
+                {**r, 'jobs': blob_store.externalize(r.get('jobs', []), r['company']['name'], store)}
+                for r in results['companies']
+            ]
+    with tracing.span("save_jobs_data", kind="save", path=json_path):
+        write_json_atomic(json_path, {**results, 'companies': companies})
+    print(f"✅ JSON data saved: {json_path}")
+
+def split_known(companies, checkpoint, retry_failed=False, json_path=JOBS_FILE):
+    """
+    Sépare les entreprises à interroger de celles déjà connues.
+    Retourne (à interroger, {entreprise: résultat connu}).
+    - par défaut : reprise, les entreprises du journal sont sautées
+    - retry_failed : résultats du journal et de jobs_data.json, seules les entreprises en échec sont réinterrogées
+    """
+    known = {}
+    if retry_failed:
+        previous = read_json(json_path, {'companies': []})
+        known = {r['company']['name']: r for r in previous.get('companies', [])}
+    known.update(checkpoint)
+    if retry_failed:
+        to_fetch = [c for c in companies if c['name'] in known and not known[c['name']].get('success')]
+    else:
+        to_fetch = [c for c in companies if c['name'] not in known]
+    return to_fetch, known
+
+def main(single_file=False, retry_failed=False, fresh=False, selection=None, json_path=JOBS_FILE):
+    """
+    selection : company_selection.Selection (défaut : 50 premières entreprises US)
+    json_path : fichier de sortie (un par shard), son journal de reprise est checkpoint_path(json_path)
+    """
     print("=" * 60)
     print("🚀 Job Enrichment Script - Mantiks API")
     print("=" * 60)
+    tracing.init("enrich")
+    
+    # Charger les entreprises sélectionnées
+    csv_path = company_selection.TAM_FILE
+    selection = selection or company_selection.default_selection()
+    print(f"\n📂 Loading companies from {csv_path} ({selection.describe()})...")
+    companies = company_selection.select_companies(selection, csv_path)
+    print(f"✅ Loaded {len(companies)} companies")
     
-    # Charger les entreprises US
-    csv_path = "TAM.csv"
-    print(f"\n📂 Loading US companies from {csv_path}...")
-    companies = load_us_companies(csv_path, limit=50)
-    print(f"✅ Loaded {len(companies)} US companies")
+    checkpoint = checkpoint_path(json_path)
+    if fresh:
+        clear_checkpoint(checkpoint)
+    to_fetch, known = split_known(companies, load_checkpoint(checkpoint), retry_failed, json_path)
+    if known:
+        mode = "retrying failed companies" if retry_failed else "resuming from checkpoint"
+        print(f"♻️  {len(companies) - len(to_fetch)} companies already fetched, {len(to_fetch)} to fetch ({mode})")
     
     # Afficher les mots-clés utilisés
     print(f"\n🔑 Keywords used for search:")
     for kw in JOB_KEYWORDS:
         print(f"   • {kw}")
     
-    # Résultats
-    results = {
-        'total_companies': len(companies),
-        'total_jobs': 0,
-        'companies_with_jobs': 0,
-        'companies': []
-    }
-    
     # Enrichir chaque entreprise
     print(f"\n🔍 Fetching jobs for each company...")
     print("-" * 60)
     
-    for i, company in enumerate(companies, 1):
-        print(f"[{i}/{len(companies)}] {company['name']}...", end=" ")
-        
-        result = fetch_jobs_for_company(company)
-        result['company'] = company
-        results['companies'].append(result)
-        
-        if result['success']:
-            nb_jobs = result['nb_jobs']
-            results['total_jobs'] += nb_jobs
-            if nb_jobs > 0:
-                results['companies_with_jobs'] += 1
-            print(f"✅ {nb_jobs} jobs found")
-        else:
-            print(f"❌ Error: {result.get('error', 'Unknown')[:50]}")
-        
-        # Petite pause pour éviter le rate limiting
-        time.sleep(0.5)
+    try:
+        fetched = {r['company']['name']: r for r in fetch_all_companies(to_fetch, checkpoint=checkpoint)}
+    except KeyboardInterrupt:
+        print(f"\n⏸️  Interrupted - progress kept in {checkpoint}, rerun to resume")
+        tracing.finish()
+        raise SystemExit(130)
+    
+    # Ordre du TAM conservé ; avec --retry-failed, les entreprises hors sélection déjà présentes restent à la fin
+    selected = {c['name'] for c in companies}
+    merged = [fetched.get(c['name']) or known.get(c['name']) for c in companies]
+    merged = [r for r in merged if r] + [r for name, r in known.items() if name not in selected]
+    results = build_results(merged)
     
     # Générer le rapport HTML
     print("\n" + "=" * 60)
     print("📊 Generating HTML report...")
-    output_path = "jobs_enrichment_report.html"
-    generate_html_report(results, output_path)
+    output_path = "jobs_enrichment_report.html" if json_path == JOBS_FILE else os.path.splitext(json_path)[0] + "_report.html"
+    with tracing.span("html_report"):
+        generate_html_report(results, output_path, lazy=not single_file)
     
-    # Sauvegarder les données JSON pour l'analyse OpenAI
-    json_path = "jobs_data.json"
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
-    print(f"✅ JSON data saved: {json_path}")
+    save_results(results, json_path, inline=selection.shard is not None)
+    clear_checkpoint(checkpoint)
     
     # Résumé final
     print("\n" + "=" * 60)
@@ -781,7 +911,20 @@ def main():
     print(f"   Total jobs found: {results['total_jobs']}")
     print(f"\n   Report saved to: {output_path}")
     print("=" * 60)
+    
+    tracing.finish()
 
 if __name__ == "__main__":
-    main()
-
+    parser = argparse.ArgumentParser(description="Enrichissement des offres d'emploi via Mantiks")
+    parser.add_argument('--single-file', action='store_true',
+                        help="Rapport autonome (descriptions complètes dans le HTML) au lieu du chargement différé")
+    parser.add_argument('--retry-failed', action='store_true',
+                        help="Ne réinterroge que les entreprises dont le dernier appel a échoué (success: false)")
+    parser.add_argument('--fresh', action='store_true',
+                        help="Ignore le journal de reprise et réinterroge toutes les entreprises")
+    parser.add_argument('--output', default=JOBS_FILE,
+                        help="Fichier de sortie (ex. jobs_data.shard-2-of-4.json), fusion : company_selection.py merge")
+    company_selection.add_arguments(parser, default_scope=True)
+    args = parser.parse_args()
+    main(single_file=args.single_file, retry_failed=args.retry_failed, fresh=args.fresh,
+         selection=company_selection.from_args(args, default_scope=True), json_path=args.output)
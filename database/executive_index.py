@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Index des dirigeants par entreprise (interviews management)
+- Noms normalisés : titre collé au nom séparé ("Jane Doe (CMO)", "Jane Doe, CMO"), civilités et suffixes
+  retirés, accents et casse ignorés ; valeurs vides ("Not specified", "—") écartées
+- Alias : prénom + nom sans les initiales du milieu, diminutifs courants (Bill / William), initiale du
+  prénom ("R. Vachris") rattachée au seul dirigeant de même nom
+- Historique des titres : chaque titre avec ses dates de première / dernière apparition ; le titre
+  courant est le plus récemment vu
+- Liens interview -> dirigeant par URL canonique ; chaque item reçoit `executive_id`
+- Mise à jour incrémentale : seules les interviews pas encore liées sont résolues, les recherches
+  (alias, URL) sont des accès directs aux dictionnaires de executive_index.json
+- Index partagé par database/management_interviews.json (scraper) et ../public/management_interviews.json
+  (merge_service) : les liens d'interviews absentes ne sont retirés que sur demande (prune), quand
+  l'appelant a la liste complète des interviews de l'entreprise
+
+Usage :
+    python executive_index.py --build management_interviews.json ../public/management_interviews.json
+    python executive_index.py --build management_interviews.json ../public/management_interviews.json --prune
+    python executive_index.py --company "Costco"                    # dirigeants et titres
+    python executive_index.py --company "Costco" --lookup "R. Vachris"
+"""
+
+import argparse
+import re
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import dates
+import news_dedup
+from storage import locked_json, read_json
+
+INDEX_FILE = "executive_index.json"
+
+PLACEHOLDER_NAMES = {
+    "", "not specified", "unspecified", "unknown", "n a", "na", "none", "null", "various", "multiple",
+    "multiple executives", "company", "spokesperson", "company spokesperson", "staff", "team", "executive",
+}
+HONORIFICS = {"mr", "mrs", "ms", "miss", "dr", "prof", "sir", "dame"}
+SUFFIXES = {"jr", "sr", "ii", "iii", "iv", "phd", "mba", "cpa", "esq"}
+
+# Diminutifs -> prénom de référence (pour l'alias seulement : le nom affiché reste celui reçu)
+NICKNAMES = {
+    "bill": "william", "will": "william", "bob": "robert", "rob": "robert", "bobby": "robert",
+    "mike": "michael", "jim": "james", "jimmy": "james", "tom": "thomas", "joe": "joseph",
+    "dave": "david", "steve": "steven", "stephen": "steven", "chris": "christopher", "kate": "katherine",
+    "katie": "katherine", "kathy": "katherine", "liz": "elizabeth", "beth": "elizabeth", "rick": "richard",
+    "rich": "richard", "dick": "richard", "dan": "daniel", "danny": "daniel", "matt": "matthew",
+    "tony": "anthony", "andy": "andrew", "jen": "jennifer", "jenny": "jennifer", "ben": "benjamin",
+    "sam": "samuel", "ted": "edward", "ed": "edward", "greg": "gregory", "jeff": "jeffrey",
+    "jon": "jonathan", "nick": "nicholas", "pat": "patricia", "sue": "susan", "alex": "alexander",
+    "doug": "douglas", "larry": "lawrence", "charlie": "charles", "chuck": "charles", "fred": "frederick",
+}
+
+# Abréviations de titres, pour comparer deux libellés d'un même poste
+TITLE_ABBREVIATIONS = {
+    "ceo": "chief executive officer", "cfo": "chief financial officer", "cmo": "chief marketing officer",
+    "cto": "chief technology officer", "cio": "chief information officer", "coo": "chief operating officer",
+    "cdo": "chief digital officer", "cco": "chief commercial officer", "evp": "executive vice president",
+    "svp": "senior vice president", "vp": "vice president",
+}
+
+_TITLE_SPLIT = re.compile(r"\s*(?:\(([^)]*)\)|,\s+|\s+[-–—|]\s+)\s*")
+
+
+def normalize_name(raw: Optional[str]) -> Optional[Tuple[str, Optional[str]]]:
+    """(nom affiché, titre trouvé dans le nom ou None) ; None si le nom est vide ou générique"""
+    if not raw or not str(raw).strip():
+        return None
+    text = " ".join(str(raw).split())
+    title = None
+    match = _TITLE_SPLIT.search(text)
+    if match:
+        rest = text[match.end():].strip(" )")
+        title = (match.group(1) or rest or "").strip() or None
+        if title and " ".join(news_dedup.words(title)) in SUFFIXES:
+            title = None  # "Jane Doe, Jr." : suffixe, pas un titre
+        text = text[:match.start()]
+    tokens = [t for t in text.replace(".", ". ").split() if t]
+    while tokens and news_dedup.words(tokens[0]) and news_dedup.words(tokens[0])[0] in HONORIFICS:
+        tokens.pop(0)
+    while tokens and news_dedup.words(tokens[-1]) and news_dedup.words(tokens[-1])[0] in SUFFIXES:
+        tokens.pop()
+    display = " ".join(tokens).replace(" .", ".").strip(" ,")
+    if " ".join(news_dedup.words(display)) in PLACEHOLDER_NAMES or not news_dedup.words(display):
+        return None
+    return display, title
+
+
+def name_keys(display: str) -> List[str]:
+    """Clés d'alias d'un nom : complet, prénom + nom, prénom de référence + nom"""
+    tokens = news_dedup.words(display)
+    keys = [" ".join(tokens)]
+    if len(tokens) >= 2:
+        first, last = tokens[0], tokens[-1]
+        keys.append(f"{first} {last}")
+        keys.append(f"{NICKNAMES.get(first, first)} {last}")
+    return list(dict.fromkeys(keys))
+
+
+def title_key(title: Optional[str]) -> str:
+    return " ".join(TITLE_ABBREVIATIONS.get(w, w) for w in news_dedup.words(title or "") if w not in ("and", "of", "the"))
+
+
+def _slug(display: str) -> str:
+    tokens = news_dedup.words(display)
+    return "-".join([tokens[0], tokens[-1]] if len(tokens) >= 2 else tokens)
+
+
+class ExecutiveIndex:
+    """
+    Vue sur le dictionnaire de executive_index.json (modifié en place) :
+    {entreprise: {"executives": {id: dirigeant}, "aliases": {clé: id}, "interviews": {url: id}}}
+    """
+
+    def __init__(self, data: Optional[Dict] = None):
+        self.data = data if data is not None else {}
+
+    def _company(self, company: str) -> Dict:
+        return self.data.setdefault(company, {"executives": {}, "aliases": {}, "interviews": {}})
+
+    # -- Recherches ---------------------------------------------------------------------------------
+
+    def resolve(self, company: str, name: Optional[str]) -> Optional[str]:
+        """Identifiant du dirigeant désigné par `name` (alias, puis initiale du prénom), ou None"""
+        normalized = normalize_name(name)
+        if not normalized or company not in self.data:
+            return None
+        entry = self.data[company]
+        for key in name_keys(normalized[0]):
+            if key in entry["aliases"]:
+                return entry["aliases"][key]
+        tokens = news_dedup.words(normalized[0])
+        if len(tokens) >= 2 and len(tokens[0]) == 1:
+            # "R. Vachris" : rattaché seulement s'il n'y a qu'un dirigeant possible
+            matches = [
+                exec_id for exec_id, executive in entry["executives"].items()
+                if news_dedup.words(executive["name"])[-1] == tokens[-1]
+                and news_dedup.words(executive["name"])[0].startswith(tokens[0])
+            ]
+            if len(matches) == 1:
+                return matches[0]
+        return None
+
+    def get(self, company: str, exec_id: str) -> Optional[Dict]:
+        return self.data.get(company, {}).get("executives", {}).get(exec_id)
+
+    def executive_for(self, company: str, url: str) -> Optional[Dict]:
+        """Dirigeant lié à une interview (par URL)"""
+        exec_id = self.data.get(company, {}).get("interviews", {}).get(news_dedup.canonical_url(url))
+        return self.get(company, exec_id) if exec_id else None
+
+    # -- Mises à jour -------------------------------------------------------------------------------
+
+    def _register(self, company: str, name: str) -> Optional[str]:
+        """Identifiant du dirigeant (créé au besoin) ; les alias du nom reçu sont ajoutés"""
+        normalized = normalize_name(name)
+        if not normalized:
+            return None
+        display = normalized[0]
+        entry = self._company(company)
+        exec_id = self.resolve(company, display)
+        if exec_id is None:
+            base = exec_id = _slug(display)
+            n = 2
+            while exec_id in entry["executives"]:
+                exec_id = f"{base}-{n}"
+                n += 1
+            entry["executives"][exec_id] = {"name": display, "titles": [], "interviews": []}
+        executive = entry["executives"][exec_id]
+        # Nom affiché : la forme la plus complète reçue ("Ron Vachris" plutôt que "R. Vachris")
+        if len(news_dedup.words(display)[0]) > len(news_dedup.words(executive["name"])[0]):
+            executive["name"] = display
+        for key in name_keys(display):
+            entry["aliases"].setdefault(key, exec_id)
+        return exec_id
+
+    def _observe_title(self, executive: Dict, title: Optional[str], seen: Optional[str]):
+        """Ajoute une occurrence de titre (seen : "YYYY-MM-DD" ou None si non daté)"""
+        key = title_key(title)
+        if not key:
+            return
+        for entry in executive["titles"]:
+            if title_key(entry["title"]) == key:
+                if seen:
+                    entry["first_seen"] = min(filter(None, (entry.get("first_seen"), seen)))
+                    entry["last_seen"] = max(filter(None, (entry.get("last_seen"), seen)))
+                return
+        if not seen and executive["titles"]:
+            return  # titre non daté (liste du modèle) : n'ajoute pas de changement de poste
+        executive["titles"].append({"title": title.strip(), "first_seen": seen, "last_seen": seen})
+        executive["titles"].sort(key=lambda t: t.get("first_seen") or "")
+
+    def add_interview(self, company: str, item: Dict) -> Optional[str]:
+        """Lie une interview à son dirigeant ; nom et titre de l'item nettoyés, `executive_id` ajouté"""
+        normalized = normalize_name(item.get("executive_name"))
+        if not normalized:
+            return None
+        display, embedded_title = normalized
+        exec_id = self._register(company, display)
+        executive = self.data[company]["executives"][exec_id]
+        if item.get("executive_name") != display:
+            item["executive_name"] = display
+        if embedded_title and not item.get("executive_title"):
+            item["executive_title"] = embedded_title
+        self._observe_title(executive, item.get("executive_title"),
+                            item.get("date") or dates.normalize(item.get("published_date")))
+        url = news_dedup.canonical_url(item.get("url"))
+        if url:
+            self.data[company]["interviews"][url] = exec_id
+            if url not in executive["interviews"]:
+                executive["interviews"].append(url)
+        item["executive_id"] = exec_id
+        return exec_id
+
+    def add_identified(self, company: str, identified: Dict) -> Optional[str]:
+        """Dirigeant listé par le modèle (key_executives_identified) : pertinence et compteur rapporté"""
+        exec_id = self._register(company, identified.get("name"))
+        if exec_id is None:
+            return None
+        executive = self.data[company]["executives"][exec_id]
+        embedded_title = normalize_name(identified.get("name"))[1]
+        self._observe_title(executive, identified.get("title") or embedded_title, None)
+        if identified.get("relevance"):
+            executive["relevance"] = identified["relevance"]
+        executive["reported_count"] = max(executive.get("reported_count") or 0, identified.get("content_count") or 0)
+        return exec_id
+
+    def update(self, company: str, items: Iterable[Dict], identified: Iterable[Dict] = (),
+               prune: bool = False) -> int:
+        """
+        Met l'index à jour avec les interviews de l'entreprise ; seules celles pas encore liées sont
+        résolues. prune : `items` est la liste complète, les liens des autres interviews sont retirés
+        (jamais pour une fusion ou un refresh fenêtré : l'index est partagé par plusieurs fichiers).
+        Retourne le nb de nouveaux liens.
+        """
+        links = self._company(company)["interviews"]
+        current, added = set(), 0
+        for item in items:
+            url = news_dedup.canonical_url(item.get("url"))
+            if url and url in links and item.get("executive_id") == links[url]:
+                current.add(url)
+                continue
+            if self.add_interview(company, item) and url:
+                current.add(url)
+                added += 1
+        if prune:
+            self.prune(company, current)
+        for identified_exec in identified or ():
+            self.add_identified(company, identified_exec)
+        return added
+
+    def prune(self, company: str, keep: Iterable[str]) -> int:
+        """Retire les liens des interviews dont l'URL canonique n'est pas dans `keep` ; retourne leur nombre"""
+        entry = self.data.get(company)
+        if not entry:
+            return 0
+        links = entry["interviews"]
+        removed = set(links) - set(keep)
+        for url in removed:
+            exec_id = links.pop(url)
+            executive = entry["executives"].get(exec_id)
+            if executive and url in executive["interviews"]:
+                executive["interviews"].remove(url)
+        return len(removed)
+
+    def apply(self, company: str, entry: Dict, identified: Optional[Iterable[Dict]] = None,
+              prune: bool = False) -> Dict:
+        """Met à jour l'index depuis une entrée de management_interviews.json et y réécrit les dirigeants"""
+        if identified is None:
+            identified = entry.get("key_executives_identified") or []
+        self.update(company, entry.get("management_items") or [], identified, prune)
+        entry["key_executives_identified"] = self.key_executives(company)
+        return entry
+
+    # -- Vues ---------------------------------------------------------------------------------------
+
+    @staticmethod
+    def current_title(executive: Dict) -> str:
+        titles = executive.get("titles") or []
+        if not titles:
+            return ""
+        return max(titles, key=lambda t: t.get("last_seen") or "")["title"]
+
+    def key_executives(self, company: str) -> List[Dict]:
+        """Forme `key_executives_identified` du frontend, par nombre d'interviews décroissant"""
+        result = []
+        for exec_id, executive in self.data.get(company, {}).get("executives", {}).items():
+            result.append({
+                "id": exec_id,
+                "name": executive["name"],
+                "title": self.current_title(executive),
+                "relevance": executive.get("relevance", ""),
+                "content_count": max(len(executive["interviews"]), executive.get("reported_count") or 0),
+                "other_titles": [t["title"] for t in executive["titles"]
+                                 if t["title"] != self.current_title(executive)],
+            })
+        result.sort(key=lambda e: e["content_count"], reverse=True)
+        return result
+
+
+@contextmanager
+def open_index(path: str = INDEX_FILE):
+    """Index lu puis réécrit atomiquement sous verrou (comme storage.locked_json)"""
+    with locked_json(path, {}) as data:
+        yield ExecutiveIndex(data)
+
+
+def update_companies(entries: Dict[str, Dict], path: str = INDEX_FILE) -> None:
+    """Met à jour l'index pour {entreprise: entrée de management_interviews.json} (entrées modifiées en place)"""
+    with open_index(path) as index:
+        for company, entry in entries.items():
+            if isinstance(entry, dict):
+                index.apply(company, entry)
+
+
+def build(paths: List[str], path: str = INDEX_FILE, prune: bool = False) -> Dict[str, int]:
+    """
+    Met l'index à jour depuis des fichiers d'interviews, chacun relu et réécrit sous son verrou (pris avant
+    celui de l'index, comme merge_service). prune : retire d'abord les liens des interviews absentes de tous
+    ces fichiers ; celles ajoutées entre-temps sont reliées par la passe suivante. Retourne {fichier: nb d'entreprises}
+    """
+    if prune:
+        keep = {}
+        for interviews_path in paths:
+            for company, entry in read_json(interviews_path, {}).items():
+                if isinstance(entry, dict):
+                    keep.setdefault(company, set()).update(
+                        news_dedup.canonical_url(item.get("url")) for item in entry.get("management_items") or []
+                    )
+        with open_index(path) as index:
+            for company in list(index.data):
+                index.prune(company, keep.get(company, ()))
+
+    counts = {}
+    for interviews_path in paths:
+        with locked_json(interviews_path, {}) as data, open_index(path) as index:
+            for company, entry in data.items():
+                if isinstance(entry, dict):
+                    index.apply(company, entry)
+            counts[interviews_path] = len(data)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index des dirigeants (interviews management)")
+    parser.add_argument("--build", nargs="+", metavar="FILE",
+                        help="Met l'index à jour depuis ces fichiers et y réécrit key_executives_identified")
+    parser.add_argument("--company", help="Affiche les dirigeants d'une entreprise")
+    parser.add_argument("--lookup", help="Résout un nom (avec --company)")
+    parser.add_argument("--index", default=INDEX_FILE)
+    parser.add_argument("--prune", action="store_true",
+                        help="Avec --build : retire les liens des interviews absentes de tous les fichiers")
+    args = parser.parse_args()
+
+    if args.build:
+        for path, count in build(args.build, args.index, args.prune).items():
+            print(f"✅ {path} : {count} entreprises indexées")
+
+    if args.company:
+        index = ExecutiveIndex(read_json(args.index, {}))
+        if args.lookup:
+            exec_id = index.resolve(args.company, args.lookup)
+            executive = index.get(args.company, exec_id) if exec_id else None
+            print(f"🔎 {args.lookup} → {executive['name'] + ' (' + exec_id + ')' if executive else 'inconnu'}")
+        for executive in index.key_executives(args.company):
+            others = f" (aussi : {', '.join(executive['other_titles'])})" if executive["other_titles"] else ""
+            print(f"   {executive['name'][:30]:30} {executive['title'][:40]:40} {executive['content_count']:3}{others}")
+
+
+if __name__ == "__main__":
+    main()
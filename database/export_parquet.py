@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Export colonnaire (Parquet) des jobs, analyses et news pour les requêtes analytiques
+- Tables "longues" : une ligne par job / outil / persona / rôle / news, jointes par company et job_id
+- Chaînes répétitives (entreprise, industrie, catégorie, outil...) encodées en dictionnaire, compression zstd
+- Petit helper de requête : lecture des seules colonnes utiles + filtres poussés au niveau des row groups
+
+Usage :
+    python export_parquet.py                         # écrit analytics/*.parquet
+    python export_parquet.py --query tools           # outils les plus cités
+    python export_parquet.py --query scores          # score moyen par industrie
+    python export_parquet.py --query news            # news par catégorie
+
+Nécessite pyarrow (pip install pyarrow).
+"""
+
+import argparse
+import json
+import os
+from datetime import datetime
+
+import blob_store
+import dates
+import tracing
+from storage import read_json, write_json_atomic
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pc = pq = None
+
+ANALYTICS_DIR = "analytics"
+JOBS_FILE = "jobs_data.json"
+V2_FILE = "jobs_analysis_v2.json"
+DETAILED_FILE = "jobs_analysis_detailed.json"
+TRENDS_FILE = "jobs_trends_analysis.json"
+NEWS_FILE = "company_news.json"
+INTERVIEWS_FILE = "management_interviews.json"
+
+# Colonnes encodées en dictionnaire (faible cardinalité)
+DICTIONARY_COLUMNS = {
+    "company", "industry", "employees", "job_board", "source", "category", "tool",
+    "department", "level", "kind", "format", "analysis_source",
+}
+
+SCHEMAS = {
+    "companies": [
+        ("company", "string"), ("industry", "string"), ("employees", "string"), ("website", "string"),
+        ("nb_jobs", "int32"), ("signal_strength", "int8"), ("news_fit_score", "int8"),
+        ("news_count", "int32"), ("interviews_count", "int32"),
+    ],
+    "jobs": [
+        ("job_id", "int32"), ("company", "string"), ("industry", "string"), ("job_title", "string"),
+        ("job_board", "string"), ("location", "string"), ("date", "date32"),
+        ("relevance_score", "int8"), ("analysis_source", "string"), ("description_length", "int32"),
+    ],
+    "tools": [("job_id", "int32"), ("company", "string"), ("category", "string"), ("tool", "string")],
+    "personas": [("job_id", "int32"), ("company", "string"), ("persona", "string")],
+    "team_roles": [
+        ("job_id", "int32"), ("company", "string"), ("department", "string"), ("level", "string"), ("role", "string"),
+    ],
+    "news": [
+        ("company", "string"), ("kind", "string"), ("title", "string"), ("source", "string"), ("url", "string"),
+        ("date", "date32"), ("category", "string"), ("format", "string"), ("executive_name", "string"),
+        ("relevance_score", "int8"),
+    ],
+}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow est requis pour l'export Parquet : pip install pyarrow")
+
+
+def _score(value):
+    """Score 0-10 en entier, None si absent/illisible"""
+    try:
+        return max(0, min(10, int(round(float(value)))))
+    except (TypeError, ValueError):
+        return None
+
+
+def _description_length(job, sizes):
+    """Taille de la description : en clair, ou lue dans le store (sans décompression) via description_hash"""
+    if job.get("description"):
+        return len(job["description"])
+    return sizes.get(job.get("description_hash"), 0)
+
+
+def _first(entry, *keys):
+    """Premier champ texte non vide d'une entrée {"tool": ..., "evidence": ...} (ou la chaîne elle-même)"""
+    if isinstance(entry, str):
+        return entry.strip() or None
+    if isinstance(entry, dict):
+        for key in keys:
+            if entry.get(key):
+                return str(entry[key]).strip()
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Aplatissement
+# ---------------------------------------------------------------------------
+
+class Rows:
+    """Colonnes accumulées par table (listes Python, converties une seule fois en tableaux Arrow)"""
+
+    def __init__(self):
+        self.tables = {name: {col: [] for col, _ in schema} for name, schema in SCHEMAS.items()}
+
+    def add(self, table, **values):
+        for col, column in self.tables[table].items():
+            column.append(values.get(col))
+
+    def count(self, table):
+        return len(self.tables[table]["company"])
+
+
+def _add_analysis(rows, job_id, company, analysis):
+    """Outils, personas et rôles d'une analyse (schémas v2 et "detailed")"""
+    tools = analysis.get("tools_ecosystem") or {}
+    for category, entries in tools.items():
+        for entry in entries or []:
+            tool = _first(entry, "tool", "platform", "name")
+            if tool:
+                rows.add("tools", job_id=job_id, company=company, category=category, tool=tool)
+
+    missions = analysis.get("missions_fit") or {}
+    for entry in missions.get("key_personas") or []:
+        persona = _first(entry, "name", "persona", "role")
+        if persona:
+            rows.add("personas", job_id=job_id, company=company, persona=persona)
+
+    team = analysis.get("team_structure") or {}
+    for department, content in team.items():
+        if isinstance(content, dict) and "role" in content:
+            # "detailed" : reports_to = {"role": ..., "evidence": ...}
+            rows.add("team_roles", job_id=job_id, company=company, department="other",
+                     level=department, role=_first(content, "role"))
+        elif isinstance(content, dict):
+            # v2 : {"marketing": {"key_decision_makers": [...], "managers": [...], ...}}
+            for level, entries in content.items():
+                for entry in entries or []:
+                    role = _first(entry, "role", "title")
+                    if role:
+                        rows.add("team_roles", job_id=job_id, company=company,
+                                 department=department, level=level, role=role)
+        elif isinstance(content, list):
+            # "detailed" : decision_makers / collaborates_with = [...]
+            for entry in content:
+                role = _first(entry, "role", "team")
+                if role:
+                    rows.add("team_roles", job_id=job_id, company=company,
+                             department="other", level=department, role=role)
+
+
+def _iter_analyzed_jobs():
+    """(company, infos entreprise, job, analyse, source) depuis l'analyse v2, sinon l'analyse détaillée"""
+    v2 = read_json(V2_FILE, None)
+    if v2:
+        for job in v2.values():
+            yield job["company_name"], {"website": job.get("company_website")}, job, job.get("analysis") or {}, "v2"
+        return
+    detailed = read_json(DETAILED_FILE, {"companies": {}})
+    for company, info in detailed.get("companies", {}).items():
+        for job in info.get("jobs", []):
+            yield company, info, job, job.get("analysis") or {}, "detailed"
+
+
+def collect_rows():
+    rows = Rows()
+    jobs_data = read_json(JOBS_FILE, {"companies": []})
+    companies = {c["company"]["name"]: c for c in jobs_data.get("companies", []) if c.get("company")}
+
+    analyzed = list(_iter_analyzed_jobs())
+    with blob_store.BlobStore() as store:
+        sizes = store.sizes(
+            [job.get("description_hash") for _, _, job, _, _ in analyzed]
+            + [job.get("description_hash") for c in companies.values() for job in c.get("jobs", [])]
+        )
+
+    job_id = 0
+    analyzed_companies = {}
+    for company, info, job, analysis, source in analyzed:
+        company_info = companies.get(company, {}).get("company") or info
+        analyzed_companies[company] = company_info
+        job_id += 1
+        rows.add(
+            "jobs", job_id=job_id, company=company, industry=company_info.get("industry"),
+            job_title=job.get("job_title"), job_board=job.get("job_board"), location=job.get("location"),
+            date=dates.parse_date(job.get("date_creation") or job.get("date")),
+            relevance_score=_score(analysis.get("relevance_score")), analysis_source=source,
+            description_length=_description_length(job, sizes),
+        )
+        _add_analysis(rows, job_id, company, analysis)
+
+    # Jobs non analysés : présents dans jobs_data.json mais pas dans l'analyse
+    for company, company_data in companies.items():
+        if company in analyzed_companies:
+            continue
+        for job in company_data.get("jobs", []):
+            job_id += 1
+            rows.add(
+                "jobs", job_id=job_id, company=company, industry=company_data["company"].get("industry"),
+                job_title=job.get("job_title"), job_board=job.get("job_board"), location=job.get("location"),
+                date=dates.parse_date(job.get("date_creation")), analysis_source=None,
+                description_length=_description_length(job, sizes),
+            )
+
+    news = read_json(NEWS_FILE, {})
+    interviews = read_json(INTERVIEWS_FILE, {})
+    for kind, data, items_key in (("news", news, "news_items"), ("interview", interviews, "management_items")):
+        for company, company_news in data.items():
+            for item in company_news.get(items_key) or []:
+                rows.add(
+                    "news", company=company, kind=kind, title=item.get("title"), source=item.get("source"),
+                    url=item.get("url"), date=dates.parse_date(item.get("published_date")),
+                    category=item.get("category"), format=item.get("format"),
+                    executive_name=item.get("executive_name"), relevance_score=_score(item.get("relevance_score")),
+                )
+
+    trends = read_json(TRENDS_FILE, {})
+    all_companies = {**{name: c.get("company", {}) for name, c in companies.items()}, **{
+        name: info for name, info in analyzed_companies.items() if name not in companies
+    }}
+    for company, info in all_companies.items():
+        analysis = (trends.get(company) or {}).get("analysis") or {}
+        assessment = (news.get(company) or {}).get("overall_assessment") or {}
+        rows.add(
+            "companies", company=company, industry=info.get("industry"), employees=str(info.get("employees") or ""),
+            website=info.get("website"), nb_jobs=len((companies.get(company) or {}).get("jobs") or []),
+            signal_strength=_score(analysis.get("overall_signal_strength")),
+            news_fit_score=_score(assessment.get("presti_fit_score")),
+            news_count=len((news.get(company) or {}).get("news_items") or []),
+            interviews_count=len((interviews.get(company) or {}).get("management_items") or []),
+        )
+    return rows
+
+
+def to_table(name, columns):
+    """Construit la table Arrow typée ; les colonnes de DICTIONARY_COLUMNS sont encodées en dictionnaire"""
+    arrays, fields = [], []
+    for col, type_name in SCHEMAS[name]:
+        arrow_type = getattr(pa, type_name)()
+        array = pa.array(columns[col], type=arrow_type)
+        if col in DICTIONARY_COLUMNS:
+            array = array.dictionary_encode()
+        arrays.append(array)
+        fields.append(pa.field(col, array.type))
+    return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def export_snapshot(output_dir=ANALYTICS_DIR):
+    """Écrit un fichier Parquet par table + manifest.json ; retourne {table: nb lignes}"""
+    _require_pyarrow()
+    os.makedirs(output_dir, exist_ok=True)
+    with tracing.span("collect_rows", kind="load"):
+        rows = collect_rows()
+
+    counts = {}
+    for name, columns in rows.tables.items():
+        table = to_table(name, columns)
+        path = os.path.join(output_dir, f"{name}.parquet")
+        with tracing.span(f"write_{name}", kind="save", path=path, rows=table.num_rows):
+            tmp = path + ".tmp"
+            pq.write_table(table, tmp, compression="zstd", use_dictionary=True)
+            os.replace(tmp, path)
+        counts[name] = table.num_rows
+
+    manifest = {
+        "exported_at": datetime.now().isoformat(),
+        "tables": counts,
+        "companies": sorted(set(rows.tables["companies"]["company"])),
+    }
+    write_json_atomic(os.path.join(output_dir, "manifest.json"), manifest)
+    return counts
+
+
+# ---------------------------------------------------------------------------
+# Requêtes
+# ---------------------------------------------------------------------------
+
+def load(table, columns=None, filters=None, output_dir=ANALYTICS_DIR):
+    """
+    Lit une table en ne décodant que `columns` ; `filters` au format pyarrow, ex. [("industry", "=", "Furniture")]
+    """
+    _require_pyarrow()
+    return pq.read_table(os.path.join(output_dir, f"{table}.parquet"), columns=columns, filters=filters)
+
+
+def top_values(table, column, limit=20, filters=None):
+    """[(valeur, occurrences)] les plus fréquentes d'une colonne"""
+    data = load(table, columns=[column], filters=filters)
+    counts = pc.value_counts(data.column(column).combine_chunks()).to_pylist()
+    counts = [(c["values"], c["counts"]) for c in counts if c["values"] is not None]
+    return sorted(counts, key=lambda c: -c[1])[:limit]
+
+
+def aggregate(table, by, value, filters=None):
+    """[{by: ..., moyenne, nombre}] trié par moyenne décroissante"""
+    data = load(table, columns=[by, value], filters=filters)
+    data = data.set_column(0, by, pc.cast(data.column(by), pa.string()))
+    grouped = data.group_by(by).aggregate([(value, "mean"), (value, "count")])
+    return sorted(grouped.to_pylist(), key=lambda r: -(r[f"{value}_mean"] or 0))
+
+
+QUERIES = {
+    "tools": lambda: [{"tool": t, "jobs": n} for t, n in top_values("tools", "tool")],
+    "scores": lambda: aggregate("jobs", "industry", "relevance_score"),
+    "news": lambda: [{"category": c, "items": n} for c, n in top_values("news", "category")],
+    "personas": lambda: [{"persona": p, "jobs": n} for p, n in top_values("personas", "persona")],
+    "roles": lambda: [{"role": r, "jobs": n} for r, n in top_values("team_roles", "role")],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export Parquet des jobs, analyses et news")
+    parser.add_argument("--query", choices=list(QUERIES), help="Exécute une requête sur le dernier export")
+    parser.add_argument("--output-dir", default=ANALYTICS_DIR, help="Dossier des fichiers Parquet")
+    args = parser.parse_args()
+
+    if args.query:
+        for row in QUERIES[args.query]():
+            print(json.dumps(row, ensure_ascii=False, default=str))
+        return
+
+    tracing.init("export_parquet")
+    print("📦 Export Parquet des jobs, analyses et news...")
+    counts = export_snapshot(args.output_dir)
+    for name, count in counts.items():
+        size = os.path.getsize(os.path.join(args.output_dir, f"{name}.parquet"))
+        print(f"   {name:12} : {count:6} lignes ({size / 1024:.1f} Ko)")
+    print(f"✅ Export terminé dans {args.output_dir}/")
+    tracing.finish()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Publication incrémentale de public/data.json
+- Un hash de contenu par entreprise (entrée du convertisseur + source du module qui la construit) est
+  conservé dans frontend_hashes.json : modifier le convertisseur reconstruit les entreprises
+- Seules les entreprises modifiées sont reconstruites ; les autres sont reprises telles quelles
+  depuis le data.json existant, qui est patché en place (écriture atomique, compacte : le frontend la télécharge)
+- Changer de convertisseur (trends <-> v2) force une reconstruction complète
+"""
+
+import importlib.util
+import sys
+from datetime import datetime
+
+import parallel
+import tracing
+from storage import content_hash, read_json, write_json_atomic
+
+HASHES_FILE = "frontend_hashes.json"
+
+
+def source_hash(module_name):
+    """Hash du fichier source d'un module (sans l'importer) ; None s'il est introuvable"""
+    module = sys.modules.get(module_name)
+    path = getattr(module, '__file__', None)
+    if path is None:
+        spec = importlib.util.find_spec(module_name)
+        path = spec.origin if spec else None
+    if not path or not path.endswith('.py'):
+        return None
+    with open(path, 'rb') as f:
+        return content_hash(f.read().decode('utf-8'))
+
+
+def publish_companies(output_file, converter, inputs, build_company, only=None, hashes_file=HASHES_FILE):
+    """
+    Patche `output_file` avec les entreprises dont l'entrée a changé.
+
+    inputs        : {nom: entrée hashable du convertisseur}
+    build_company : fonction (nom, entrée) -> entrée frontend de l'entreprise, définie au niveau module :
+                    les entreprises à reconstruire sont réparties sur un pool de process (parallel)
+    only          : noms à rafraîchir (les autres ne sont ni recalculés ni supprimés)
+    Retourne {'rebuilt': [...], 'removed': [...], 'unchanged': int, 'output': data}
+    Le hash d'une entreprise couvre aussi le source du module de build_company (code du convertisseur).
+    """
+    code = source_hash(build_company.__module__)
+    with tracing.span("load_frontend", kind="load", file=output_file):
+        output = read_json(output_file, None)
+    state = read_json(hashes_file, {})
+    entry = state.get(output_file, {})
+
+    full_rebuild = output is None or entry.get('converter') != converter
+    if full_rebuild:
+        output = {'companies': {}, 'metadata': {'started': datetime.now().isoformat()}}
+        known = {}
+    else:
+        known = entry.get('companies', {})
+
+    companies = output.setdefault('companies', {})
+    # Sans sortie exploitable, un rafraîchissement ciblé devient une reconstruction complète
+    scope = set(inputs) if only is None or full_rebuild else set(only) & set(inputs)
+
+    rebuilt = []
+    hashes = {}
+    for name in inputs:
+        if name not in scope:
+            continue
+        h = content_hash({'code': code, 'input': inputs[name]})
+        if not full_rebuild and known.get(name) == h and name in companies:
+            continue
+        hashes[name] = h
+        rebuilt.append(name)
+
+    built = parallel.map_ordered(build_company, [(name, inputs[name]) for name in rebuilt],
+                                 star=True, name="build_companies")
+    for name, company in zip(rebuilt, built):
+        companies[name] = company
+        known[name] = hashes[name]
+
+    if only is None or full_rebuild:
+        removed = [name for name in companies if name not in inputs]
+    else:
+        removed = [name for name in only if name in companies and name not in inputs]
+    for name in removed:
+        companies.pop(name, None)
+        known.pop(name, None)
+
+    if not rebuilt and not removed and not full_rebuild:
+        return {'rebuilt': [], 'removed': [], 'unchanged': len(companies), 'output': output}
+
+    # Ordre stable : celui des entrées, les entreprises hors périmètre restent à la fin
+    ordered = {name: companies[name] for name in inputs if name in companies}
+    ordered.update({name: c for name, c in companies.items() if name not in ordered})
+    output['companies'] = ordered
+
+    metadata = output.setdefault('metadata', {})
+    metadata.setdefault('started', datetime.now().isoformat())
+    metadata['completed'] = datetime.now().isoformat()
+    metadata['total_jobs'] = sum(len(c.get('jobs', [])) for c in ordered.values())
+
+    with tracing.span("save_frontend", kind="save", file=output_file, rebuilt=len(rebuilt)):
+        write_json_atomic(output_file, output)
+        state[output_file] = {'converter': converter, 'companies': known}
+        write_json_atomic(hashes_file, state)
+
+    return {
+        'rebuilt': rebuilt,
+        'removed': removed,
+        'unchanged': len(ordered) - len(rebuilt),
+        'output': output,
+    }
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Vélocité d'embauche calculée localement (NumPy) à partir des dates de publication
+- Toutes les offres de toutes les entreprises en une passe : tableau [entreprise, catégorie, semaine]
+- Par catégorie de rôle : volume sur 3 mois, rythme mensuel, accélération vs les 3 mois précédents,
+  pente du rythme glissant sur 4 semaines, rupture de rythme (change-point)
+- Remplace les champs que le LLM devinait à partir de 20 extraits (job_count, hiring_velocity,
+  analysis_period) ; le LLM ne garde que l'interprétation qualitative
+
+Usage :
+    python hiring_velocity.py                               # toutes les entreprises de jobs_data.json
+    python hiring_velocity.py --company "California Closets"
+    python hiring_velocity.py --as-of 2025-06-30            # date de référence imposée
+"""
+
+import argparse
+import json
+import re
+import sys
+from datetime import date
+
+import numpy as np
+
+import dates
+import jobs_loader
+
+WINDOW_WEEKS = 52        # Mantiks renvoie les offres de la dernière année (age_in_days=365)
+RECENT_WEEKS = 13        # période analysée : 3 mois
+RATE_WEEKS = 4           # rythme glissant
+MIN_SEGMENT_WEEKS = 4    # longueur minimale de part et d'autre d'une rupture
+CHANGE_THRESHOLD = 3.0   # écart de moyennes / écart-type de Poisson
+MIN_POSTINGS = 5         # en dessous, pas de rupture significative
+
+# Mots-clés (titre de l'offre) par catégorie, mêmes thèmes que le prompt de analyze_trends
+CATEGORIES = {
+    "digital_growth_product": [
+        "e-?commerce", "digital", "online", "web", "site", "growth", "crm", "cdp", "lifecycle", "email",
+        "seo", "sem", "performance", "acquisition", "conversion", "product marketing", "product manager",
+        "merchandis", "marketplace", "omnichannel", "analytics",
+    ],
+    "visual_content_creative": [
+        "creative", "content", "design", "art director", "art department", "photo", "visual", "brand",
+        "graphic", "stylist", "styling", "studio", "video", "3d", "render", "copywriter", "social media",
+        "catalog",
+    ],
+}
+CATEGORY_NAMES = list(CATEGORIES)
+ALL = "all"
+
+_CATEGORY_PATTERNS = [re.compile(r"\b(?:" + "|".join(words) + r")", re.IGNORECASE) for words in CATEGORIES.values()]
+
+
+def classify_title(title):
+    """Catégories (indices dans CATEGORY_NAMES) auxquelles appartient un intitulé ; un titre peut en avoir deux"""
+    return [i for i, pattern in enumerate(_CATEGORY_PATTERNS) if pattern.search(title or "")]
+
+
+def _velocity_label(per_month, acceleration, recent):
+    """slow / moderate / fast / accelerating (valeurs de TrendCategory.hiring_velocity côté frontend)"""
+    if recent >= 3 and acceleration >= 0.5:
+        return "accelerating"
+    if per_month >= 4:
+        return "fast"
+    if per_month >= 1.5:
+        return "moderate"
+    return "slow"
+
+
+def weekly_counts(companies, as_of=None):
+    """
+    Comptes hebdomadaires de toutes les entreprises en une passe.
+    Retourne (counts [entreprise, ALL + catégories, semaine], date de référence en datetime64[D] (NaT sans
+    aucune date), masque des entreprises ayant au moins une date exploitable).
+    La semaine WINDOW_WEEKS - 1 se termine à la même date de référence pour toutes les entreprises : `as_of`,
+    sinon la date du snapshot (dernier last_seen / date_creation de toutes les offres, au plus aujourd'hui).
+    Une entreprise qui ne publie plus a donc des semaines récentes vides.
+    """
+    company_idx, created, seen, categories = [], [], [], []
+    for i, company_data in enumerate(companies):
+        for job in company_data.get("jobs") or []:
+            company_idx.append(i)
+            created.append(job.get("date_creation") or job.get("date"))
+            seen.append(job.get("last_seen"))
+            categories.append(classify_title(job.get("job_title")))
+
+    counts = np.zeros((len(companies), len(CATEGORY_NAMES) + 1, WINDOW_WEEKS), dtype=np.int32)
+    has_dates = np.zeros(len(companies), dtype=bool)
+    if not company_idx:
+        return counts, np.datetime64("NaT", "D"), has_dates
+
+    company_idx = np.array(company_idx)
+    created = dates.to_datetime64(created)
+    seen = dates.to_datetime64(seen)
+    posted = np.where(np.isnat(created), seen, created)  # date de création manquante : vue pour la 1re fois
+    valid = ~np.isnat(posted)
+    has_dates[company_idx[valid]] = True
+
+    if as_of is not None:
+        reference = np.datetime64(as_of, "D")
+    else:
+        latest = np.fmax(posted, seen)
+        latest = latest[~np.isnat(latest)]
+        if not len(latest):
+            return counts, np.datetime64("NaT", "D"), has_dates
+        reference = min(latest.max(), np.datetime64(date.today(), "D"))
+
+    weeks_ago = np.full(len(posted), -1, dtype=np.int64)
+    weeks_ago[valid] = (reference - posted[valid]).astype(np.int64) // 7
+    in_window = (weeks_ago >= 0) & (weeks_ago < WINDOW_WEEKS)
+    week = WINDOW_WEEKS - 1 - weeks_ago
+
+    np.add.at(counts, (company_idx[in_window], 0, week[in_window]), 1)
+    for k in range(len(CATEGORY_NAMES)):
+        member = np.array([k in c for c in categories]) & in_window
+        np.add.at(counts, (company_idx[member], k + 1, week[member]), 1)
+    return counts, reference, has_dates
+
+
+def series_metrics(counts):
+    """
+    Métriques vectorisées sur le dernier axe (semaines) d'un tableau [..., WINDOW_WEEKS].
+    Retourne un dict de tableaux de forme [...].
+    """
+    counts = counts.astype(np.float64)
+    recent = counts[..., -RECENT_WEEKS:].sum(-1)
+    previous = counts[..., -2 * RECENT_WEEKS:-RECENT_WEEKS].sum(-1)
+    acceleration = (recent - previous) / np.maximum(previous, 1)
+
+    # Rythme glissant (offres / semaine sur RATE_WEEKS) et sa pente sur la période récente (moindres carrés)
+    rolling = np.lib.stride_tricks.sliding_window_view(counts, RATE_WEEKS, axis=-1).mean(-1)[..., -RECENT_WEEKS:]
+    x = np.arange(RECENT_WEEKS) - (RECENT_WEEKS - 1) / 2
+    slope = (rolling * x).sum(-1) / (x ** 2).sum()
+
+    # Rupture : découpage qui maximise l'écart de moyennes avant/après, normalisé par un bruit de Poisson
+    cumulative = np.cumsum(counts, axis=-1)
+    total = cumulative[..., -1:]
+    splits = np.arange(MIN_SEGMENT_WEEKS, WINDOW_WEEKS - MIN_SEGMENT_WEEKS + 1)
+    before = cumulative[..., splits - 1] / splits
+    after = (total - cumulative[..., splits - 1]) / (WINDOW_WEEKS - splits)
+    rate = np.maximum(total / WINDOW_WEEKS, 1 / WINDOW_WEEKS)
+    score = np.abs(after - before) / np.sqrt(rate * (1 / splits + 1 / (WINDOW_WEEKS - splits)))
+    best = score.argmax(-1)
+    best_score = np.take_along_axis(score, best[..., None], -1)[..., 0]
+
+    return {
+        "recent": recent,
+        "previous": previous,
+        "acceleration": acceleration,
+        "slope": slope,
+        "change_week": splits[best],
+        "change_score": best_score,
+        "change_before": np.take_along_axis(before, best[..., None], -1)[..., 0],
+        "change_after": np.take_along_axis(after, best[..., None], -1)[..., 0],
+        "change_flag": (best_score >= CHANGE_THRESHOLD) & (total[..., 0] >= MIN_POSTINGS),
+    }
+
+
+def _category_summary(metrics, index, weekly, reference):
+    recent = int(metrics["recent"][index])
+    previous = int(metrics["previous"][index])
+    per_month = recent / 3
+    acceleration = float(metrics["acceleration"][index])
+    change_point = None
+    if metrics["change_flag"][index]:
+        week_start = reference - np.timedelta64((WINDOW_WEEKS - int(metrics["change_week"][index])) * 7 - 1, "D")
+        before, after = float(metrics["change_before"][index]), float(metrics["change_after"][index])
+        change_point = {
+            "week_of": str(week_start),
+            "direction": "up" if after > before else "down",
+            "per_week_before": round(before, 2),
+            "per_week_after": round(after, 2),
+        }
+    return {
+        "job_count": recent,
+        "previous_count": previous,
+        "per_month": round(per_month, 2),
+        "acceleration": round(acceleration, 2),
+        "trend_slope": round(float(metrics["slope"][index]), 3),
+        "hiring_velocity": _velocity_label(per_month, acceleration, recent),
+        "change_point": change_point,
+        "weekly": weekly[-RECENT_WEEKS:].tolist(),
+    }
+
+
+def compute_all(companies, as_of=None):
+    """
+    {nom: métriques} pour toutes les entreprises (entrées de jobs_data.json), à une date de référence commune
+    (as_of : date ou "YYYY-MM-DD", défaut : date du snapshot, voir weekly_counts)
+    """
+    counts, ref, has_dates = weekly_counts(companies, as_of)
+    metrics = series_metrics(counts)
+    results = {}
+    for i, company_data in enumerate(companies):
+        name = company_data["company"]["name"]
+        if not has_dates[i]:
+            results[name] = None
+            continue
+        jobs = company_data.get("jobs") or []
+        summaries = {
+            label: _category_summary(metrics, (i, k), counts[i, k], ref)
+            for k, label in enumerate([ALL] + CATEGORY_NAMES)
+        }
+        results[name] = {
+            "analysis_period": {
+                "start_date": str(ref - np.timedelta64(RECENT_WEEKS * 7 - 1, "D")),
+                "end_date": str(ref),
+                "total_jobs": summaries[ALL]["job_count"],
+            },
+            "total_postings": len(jobs),
+            "monthly": dates.bucket_counts([j.get("date_creation") or j.get("last_seen") for j in jobs], "M"),
+            "categories": summaries,
+        }
+    return results
+
+
+def _describe(summary):
+    text = (f"{summary['job_count']} postings in the last 3 months vs {summary['previous_count']} in the prior 3 months "
+            f"({summary['acceleration']:+.0%}), {summary['per_month']}/month, velocity: {summary['hiring_velocity']}")
+    change = summary["change_point"]
+    if change:
+        text += (f"; rate shift {change['direction']} from week of {change['week_of']} "
+                 f"({change['per_week_before']} → {change['per_week_after']} per week)")
+    return text
+
+
+def prompt_section(metrics):
+    """Bloc texte injecté dans le prompt de analyze_trends (chiffres exacts, à ne pas recalculer)"""
+    lines = [
+        f"Period: {metrics['analysis_period']['start_date']} to {metrics['analysis_period']['end_date']} "
+        f"({metrics['total_postings']} postings over the last 12 months)",
+        f"- All roles: {_describe(metrics['categories'][ALL])}",
+    ]
+    for name in CATEGORY_NAMES:
+        lines.append(f"- {name}: {_describe(metrics['categories'][name])}")
+    lines.append("Monthly postings: " + ", ".join(f"{month}: {n}" for month, n in metrics["monthly"].items()))
+    return "\n".join(lines)
+
+
+def apply_to_analysis(analysis, metrics):
+    """Remplace les champs quantitatifs de l'analyse LLM par les valeurs calculées"""
+    analysis["analysis_period"] = dict(metrics["analysis_period"])
+    trends = analysis.setdefault("trends", {})
+    for name in CATEGORY_NAMES:
+        summary = metrics["categories"][name]
+        category = trends.setdefault(name, {})
+        category["job_count"] = summary["job_count"]
+        category["hiring_velocity"] = summary["hiring_velocity"]
+    analysis["hiring_metrics"] = metrics
+    return analysis
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vélocité d'embauche par entreprise et catégorie de rôle")
+    parser.add_argument("--input", default="jobs_data.json", help="Fichier jobs_data.json")
+    parser.add_argument("--company", nargs="+", help="Ne calculer que ces entreprises")
+    parser.add_argument("--as-of", type=date.fromisoformat, help="Date de référence YYYY-MM-DD (défaut : date du snapshot)")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON complète")
+    args = parser.parse_args()
+
+    # Titres et dates suffisent : pas de relecture des descriptions
+    companies = list(jobs_loader.iter_companies(args.input, only=args.company, hydrate=False))
+    results = compute_all(companies, args.as_of)
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return
+    for name, metrics in results.items():
+        if not metrics:
+            print(f"   {name[:35]:35} | aucune date exploitable")
+            continue
+        cats = metrics["categories"]
+        print(f"   {name[:35]:35} | 3 mois : {cats[ALL]['job_count']:3} "
+              f"({cats[ALL]['acceleration']:+.0%}) | digital : {cats['digital_growth_product']['hiring_velocity']:12} "
+              f"| visuel : {cats['visual_content_creative']['hiring_velocity']}")
+
+
+if __name__ == "__main__":
+    main()
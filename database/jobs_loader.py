@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Lecture en flux de jobs_data.json
+- Les entrées de `companies` sont décodées une par une (json.JSONDecoder.raw_decode sur des blocs de
+  1 Mo) : le fichier n'est jamais chargé en entier, le pic mémoire est celui de la plus grosse entreprise
+- Les descriptions externalisées sont relues entreprise par entreprise (une seule connexion au store)
+- iter_jobs() produit les offres aplaties (models.Job) au fil de la lecture : les analyses peuvent
+  envoyer leurs premiers prompts avant la fin du parsing
+
+Usage :
+    python jobs_loader.py                     # nombre d'entreprises / d'offres et pic mémoire
+    python jobs_loader.py --country all --shard 1/4
+"""
+
+import argparse
+import json
+from typing import Dict, Iterable, Iterator, Optional
+
+import blob_store
+import company_selection
+from models import Job
+
+JOBS_FILE = "jobs_data.json"
+CHUNK_SIZE = 1 << 20  # 1 Mo
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    """Tampon de lecture : décode des valeurs JSON successives en ne gardant que le texte non consommé"""
+
+    def __init__(self, f, chunk_size: int = CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Prochain caractère significatif (espaces sautés), '' en fin de fichier"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"JSON invalide : '{char}' attendu, '{found}' trouvé")
+        self.pos += 1
+
+    def value(self):
+        """Décode la valeur suivante ; relit des blocs tant qu'elle est incomplète"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # Un nombre en fin de tampon peut être tronqué : on ne le valide qu'avec la suite
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iter_entries(path: str = JOBS_FILE, key: str = "companies") -> Iterator[Dict]:
+    """Éléments de la liste `key` de l'objet racine, décodés un par un (les autres clés sont ignorées)"""
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _Reader(f)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            name = reader.value()
+            reader.expect(":")
+            if name == key and reader.peek() == "[":
+                reader.expect("[")
+                if reader.peek() != "]":
+                    while True:
+                        yield reader.value()
+                        if reader.peek() != ",":
+                            break
+                        reader.expect(",")
+                reader.expect("]")
+            else:
+                reader.value()  # autre clé (metadata...) : décodée puis jetée
+            if reader.peek() != ",":
+                break
+            reader.expect(",")
+        reader.expect("}")
+
+
+def iter_companies(path: str = JOBS_FILE, selection: Optional[company_selection.Selection] = None,
+                   only: Optional[Iterable[str]] = None, hydrate: bool = True) -> Iterator[Dict]:
+    """
+    Entrées de jobs_data.json une par une, restreintes à une sélection et/ou à des noms (`only`).
+    hydrate : descriptions relues depuis le store avant de rendre l'entrée
+    """
+    keep = company_selection.entry_filter(selection)
+    only = set(only) if only is not None else None
+    store = blob_store.BlobStore() if hydrate else None
+    try:
+        for entry in iter_entries(path):
+            name = entry["company"]["name"]
+            if only is not None and name not in only:
+                continue
+            if keep is not None and not keep(entry):
+                continue
+            if store is not None and entry.get("jobs"):
+                blob_store.hydrate(entry["jobs"], store)
+            yield entry
+    finally:
+        if store is not None:
+            store.close()
+
+
+def iter_jobs(path: str = JOBS_FILE, selection: Optional[company_selection.Selection] = None,
+              only: Optional[Iterable[str]] = None, hydrate: bool = True) -> Iterator[Job]:
+    """Offres aplaties (forme de jobs_analysis_v2.json) au fil de la lecture de jobs_data.json"""
+    for entry in iter_companies(path, selection, only, hydrate):
+        company = entry["company"]
+        for job in entry.get("jobs") or []:
+            yield Job.flatten(company, job)
+
+
+def main():
+    import resource
+
+    parser = argparse.ArgumentParser(description="Lecture en flux de jobs_data.json")
+    parser.add_argument("--input", default=JOBS_FILE)
+    parser.add_argument("--no-hydrate", action="store_true", help="Ne relit pas les descriptions du store")
+    company_selection.add_arguments(parser)
+    args = parser.parse_args()
+
+    companies = jobs = 0
+    for entry in iter_companies(args.input, company_selection.from_args(args), hydrate=not args.no_hydrate):
+        companies += 1
+        jobs += len(entry.get("jobs") or [])
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"📁 {companies} entreprises, {jobs} offres — pic mémoire {peak_mb:.0f} Mo")
+
+
+if __name__ == "__main__":
+    main()
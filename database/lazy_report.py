@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Rapports HTML à chargement différé
+- Le rapport devient une coquille légère (navigation, filtres) + un fichier de données par entreprise
+- Les fichiers de données sont des scripts .js (pas des .json) : fetch() est bloqué sur file://,
+  une balise <script> ne l'est pas, le rapport reste ouvrable par double-clic
+- Seuls les fichiers dont le contenu a changé sont réécrits ; ceux des entreprises disparues sont supprimés
+"""
+
+import hashlib
+import json
+import os
+import re
+
+# Chargeur inséré dans la coquille : loadPayload(clé, src) -> Promise des données de l'entreprise
+LOADER_JS = '''
+        const reportPayloads = {};
+        const reportPending = {};
+        window.reportPayload = function (key, data) {
+            reportPayloads[key] = data;
+            (reportPending[key] || []).forEach(p => p.resolve(data));
+            delete reportPending[key];
+        };
+        function loadPayload(key, src) {
+            if (key in reportPayloads) return Promise.resolve(reportPayloads[key]);
+            return new Promise((resolve, reject) => {
+                if (!reportPending[key]) {
+                    reportPending[key] = [];
+                    const script = document.createElement('script');
+                    script.src = src;
+                    script.onerror = () => {
+                        (reportPending[key] || []).forEach(p => p.reject(new Error('Cannot load ' + src)));
+                        delete reportPending[key];
+                    };
+                    document.head.appendChild(script);
+                }
+                reportPending[key].push({ resolve, reject });
+            });
+        }
+'''
+
+
+def payload_dir(output_path):
+    """Dossier des données d'un rapport : jobs_analysis_detailed.html -> jobs_analysis_detailed_files/"""
+    return os.path.splitext(output_path)[0] + "_files"
+
+
+def payload_key(name):
+    """Clé stable et sûre (nom de fichier, attribut HTML, chaîne JS) pour une entreprise"""
+    slug = re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")[:40] or "company"
+    return f"{slug}-{hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]}"
+
+
+def payload_src(output_path, key):
+    """Chemin du fichier de données d'une clé, relatif au rapport"""
+    return f"{os.path.basename(payload_dir(output_path))}/{key}.js"
+
+
+def write_payloads(output_path, payloads):
+    """
+    Écrit {clé: données JSON} dans payload_dir(output_path), un fichier .js par clé.
+    Retourne {clé: chemin relatif au rapport} (valeur de src pour loadPayload).
+    """
+    directory = payload_dir(output_path)
+    os.makedirs(directory, exist_ok=True)
+    sources = {}
+    written = set()
+    for key, data in payloads.items():
+        filename = f"{key}.js"
+        content = f"reportPayload({json.dumps(key)}, {json.dumps(data, ensure_ascii=False)});\n"
+        path = os.path.join(directory, filename)
+        existing = None
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                existing = f.read()
+        if existing != content:
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp, path)
+        written.add(filename)
+        sources[key] = payload_src(output_path, key)
+
+    for filename in os.listdir(directory):
+        if filename.endswith(".js") and filename not in written:
+            os.remove(os.path.join(directory, filename))
+    return sources
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Fusion des résultats de scraping dans les fichiers du frontend
+(public/news_data.json, public/management_interviews.json)
+- Dédoublonnage des items (URL canonique, quasi-doublons : news_dedup), tri par date de publication (plus récent d'abord)
+- Dirigeants tenus par executive_index (noms normalisés, alias, titres dans le temps, interviews liées)
+- Écriture atomique sous verrou : plusieurs refresh concurrents ne perdent plus de données
+- Fusion par lots : N entreprises, une seule lecture/écriture du fichier
+
+Usage :
+    python merge_service.py --type news --source company_news_test.json --dest ../public/news_data.json
+    python merge_service.py --type interviews --source management_interviews.json \
+        --dest ../public/management_interviews.json --company "California Closets"
+"""
+
+import argparse
+import json
+import sys
+from contextlib import nullcontext
+from datetime import datetime
+
+import dates
+import executive_index
+import news_dedup
+import tracing
+from storage import locked_json, read_json
+
+ITEMS_KEYS = {
+    "news": "news_items",
+    "interviews": "management_items",
+}
+
+
+def merge_items(existing_items, new_items):
+    """Ajoute les nouveaux items ni déjà connus ni quasi-doublons ; retourne (items triés, nb ajoutés)"""
+    unique_new = news_dedup.new_items(existing_items, new_items)
+    merged = existing_items + unique_new
+    # Date normalisée stockée dans chaque item à l'ingestion : le tri ne re-parse plus published_date
+    dates.add_sort_keys(merged)
+    merged.sort(key=dates.item_sort_key, reverse=True)
+    return merged, len(unique_new)
+
+
+def merge_executives(existing_execs, new_execs):
+    """
+    Fusionne les dirigeants par nom brut : titre et pertinence mis à jour, content_count additionné
+    (sans index ; merge_company passe par executive_index quand il est fourni)
+    """
+    by_name = {e.get('name'): e for e in existing_execs}
+    for new_exec in new_execs:
+        current = by_name.get(new_exec.get('name'))
+        if current:
+            by_name[new_exec.get('name')] = {
+                **current,
+                'title': new_exec.get('title') or current.get('title'),
+                'relevance': new_exec.get('relevance') or current.get('relevance'),
+                'content_count': (current.get('content_count') or 0) + (new_exec.get('content_count') or 0),
+            }
+        else:
+            by_name[new_exec.get('name')] = new_exec
+    return list(by_name.values())
+
+
+def merge_company(existing, new, data_type, company_name, executives=None):
+    """
+    Fusionne les données d'une entreprise ; toute la structure existante est conservée.
+    executives : executive_index.ExecutiveIndex ouvert par l'appelant (interviews)
+    """
+    items_key = ITEMS_KEYS[data_type]
+    existing = existing or {}
+    existing_items = existing.get(items_key) or []
+    new_items = new.get(items_key) or []
+    merged_items, added = merge_items(existing_items, new_items)
+
+    merged = {
+        **existing,
+        'company_name': new.get('company_name') or existing.get('company_name') or company_name,
+        items_key: merged_items,
+        'search_date': datetime.now().strftime('%Y-%m-%d'),
+        'scrape_metadata': new.get('scrape_metadata') or existing.get('scrape_metadata'),
+    }
+
+    if data_type == "interviews" and executives is not None:
+        executives.apply(company_name, merged, new.get('key_executives_identified') or [])
+    elif data_type == "interviews":
+        key_executives = merge_executives(
+            existing.get('key_executives_identified') or [],
+            new.get('key_executives_identified') or [],
+        )
+        if key_executives:
+            merged['key_executives_identified'] = key_executives
+
+    # overall_assessment : remplacé seulement si le nouveau scraping en fournit un
+    if new.get('overall_assessment'):
+        merged['overall_assessment'] = new['overall_assessment']
+    elif existing.get('overall_assessment'):
+        merged['overall_assessment'] = existing['overall_assessment']
+
+    stats = {
+        'newItemsCount': added,
+        'existingItemsCount': len(existing_items),
+        'totalItemsCount': len(merged_items),
+    }
+    return merged, stats
+
+
+def merge_into(dest_file, new_data, data_type):
+    """
+    Fusionne {entreprise: données} dans `dest_file` en une seule écriture atomique sous verrou.
+    Retourne {entreprise: stats}.
+    """
+    if data_type not in ITEMS_KEYS:
+        raise ValueError(f"Type invalide : {data_type} (attendu : {', '.join(ITEMS_KEYS)})")
+
+    stats = {}
+    with tracing.span("merge", kind="save", path=dest_file, companies=len(new_data)):
+        index = executive_index.open_index() if data_type == "interviews" else nullcontext()
+        with locked_json(dest_file, {}) as existing, index as executives:
+            for company_name, company_data in new_data.items():
+                existing[company_name], stats[company_name] = merge_company(
+                    existing.get(company_name), company_data, data_type, company_name, executives
+                )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fusion des résultats de scraping dans les fichiers du frontend")
+    parser.add_argument('--type', required=True, choices=list(ITEMS_KEYS), help="news ou interviews")
+    parser.add_argument('--source', required=True, help="Fichier JSON {entreprise: données} à fusionner")
+    parser.add_argument('--dest', required=True, help="Fichier du frontend à mettre à jour")
+    parser.add_argument('--company', nargs='+', help="Ne fusionner que ces entreprises")
+    args = parser.parse_args()
+
+    source = read_json(args.source, {})
+    if args.company:
+        missing = [c for c in args.company if c not in source]
+        if missing:
+            print(f"❌ Entreprises absentes de {args.source} : {', '.join(missing)}", file=sys.stderr)
+            sys.exit(1)
+        source = {c: source[c] for c in args.company}
+
+    stats = merge_into(args.dest, source, args.type)
+    # Dernière ligne de stdout : stats JSON (lue par l'API refresh-data)
+    print(json.dumps(stats, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Modèles des enregistrements du pipeline : Company, Job, JobAnalysis, NewsItem, Interview
+- Classes à __slots__ : pas de dict par instance (~2x moins de mémoire par offre aplatie qu'un dict),
+  accès aux champs par attribut
+- Lecture/écriture des formes JSON existantes sans perte : les clés inconnues sont conservées
+  dans `extra`, l'ordre des clés d'origine est restitué (tuple partagé entre enregistrements)
+- Interface de mapping (get, [], in, keys, items) : un enregistrement remplace un dict dans le
+  code existant sans réécrire les accès
+- storage.dumps sérialise directement les enregistrements (to_dict)
+"""
+
+from typing import Dict, Iterable, List
+
+# Tuples d'ordre des clés partagés : des milliers d'offres de même forme n'en stockent qu'un
+_KEY_ORDERS: Dict[tuple, tuple] = {}
+
+
+def _intern(keys: tuple) -> tuple:
+    return _KEY_ORDERS.setdefault(keys, keys)
+
+
+class Record:
+    """Base des modèles : FIELDS en slots, reste en `extra`, ordre des clés dans `_keys`"""
+
+    __slots__ = ("_keys", "extra")
+    FIELDS: tuple = ()
+    _FIELD_SET: frozenset = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+
+    def __init__(self, **values):
+        for field in self.FIELDS:
+            setattr(self, field, None)
+        self._keys = ()
+        self.extra = None
+        for key, value in values.items():
+            self[key] = value
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Record":
+        record = cls.__new__(cls)
+        fields = cls._FIELD_SET
+        extra = None
+        for field in cls.FIELDS:
+            setattr(record, field, data.get(field))
+        for key, value in data.items():
+            if key not in fields:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        record._keys = _intern(tuple(data))
+        record.extra = extra
+        return record
+
+    @classmethod
+    def from_dicts(cls, items: Iterable[Dict]) -> List["Record"]:
+        return [cls.from_dict(item) for item in items]
+
+    def to_dict(self, exclude: Iterable[str] = ()) -> Dict:
+        """Forme JSON d'origine (mêmes clés, même ordre) ; `exclude` retire des clés"""
+        fields = self._FIELD_SET
+        extra = self.extra or {}
+        return {
+            key: (getattr(self, key) if key in fields else extra[key])
+            for key in self._keys if key not in exclude
+        }
+
+    # Interface de mapping ------------------------------------------------
+
+    def __contains__(self, key) -> bool:
+        return key in self._keys
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        if key in self._FIELD_SET:
+            return getattr(self, key)
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        if key in self._FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+        if key not in self._keys:
+            self._keys = _intern(self._keys + (key,))
+
+    def __delitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        if key in self._FIELD_SET:
+            setattr(self, key, None)
+        else:
+            del self.extra[key]
+        self._keys = _intern(tuple(k for k in self._keys if k != key))
+
+    def get(self, key, default=None):
+        if key not in self._keys:
+            return default
+        return self[key]
+
+    def keys(self):
+        return self._keys
+
+    def items(self):
+        return ((key, self[key]) for key in self._keys)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Record):
+            other = other.to_dict()
+        return isinstance(other, dict) and self.to_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Company(Record):
+    """Entreprise du TAM (entrée 'company' de jobs_data.json)"""
+
+    FIELDS = ("name", "website", "linkedin", "industry", "employees")
+    __slots__ = FIELDS
+
+
+class Job(Record):
+    """
+    Offre d'emploi : forme Mantiks (jobs_data.json) et formes aplaties des analyses
+    (company_name/company_website/... ajoutés, job_url/date pour le rapport détaillé)
+    """
+
+    FIELDS = (
+        "company_name", "company_website", "company_linkedin", "industry", "employees", "website",
+        "job_title", "job_board_url", "job_url", "job_board", "location",
+        "date_creation", "date", "last_seen", "description", "description_hash",
+        "analysis", "analyzed_at", "success", "analysis_success", "tokens_used", "cached_tokens",
+    )
+    __slots__ = FIELDS
+
+    @classmethod
+    def flatten(cls, company: Dict, job: Dict) -> "Job":
+        """Offre précédée des champs de son entreprise (forme de jobs_analysis_v2.json)"""
+        return cls.from_dict({
+            'company_name': company['name'],
+            'company_website': company.get('website', ''),
+            'company_linkedin': company.get('linkedin', ''),
+            **job
+        })
+
+
+class JobAnalysis(Record):
+    """Analyse d'une offre (v2 : value_proposition ; détaillée : missions_fit, sales_insights...)"""
+
+    FIELDS = (
+        "relevance_score", "value_proposition", "missions_fit", "team_structure",
+        "tools_ecosystem", "sales_recommendation", "sales_insights",
+    )
+    __slots__ = FIELDS
+
+
+class NewsItem(Record):
+    """Actualité d'une entreprise (news_items de company_news.json)"""
+
+    FIELDS = (
+        "title", "source", "url", "published_date", "summary",
+        "relevance_score", "relevance_reason", "key_insights", "category",
+    )
+    __slots__ = FIELDS
+
+
+class Interview(Record):
+    """Interview / prise de parole d'un dirigeant (management_items de management_interviews.json)"""
+
+    FIELDS = (
+        "title", "source", "url", "published_date", "format", "executive_name", "executive_title",
+        "summary", "key_quotes", "topics_discussed", "relevance_score", "relevance_reason", "sales_insights",
+    )
+    __slots__ = FIELDS
+
+
+def encode(obj):
+    """Hook `default` des sérialiseurs JSON : enregistrement -> dict"""
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Dédoublonnage local des news / interviews
+- URL canonique : schéma, www./m./amp., paramètres de suivi (utm_*, fbclid...), AMP, fragment,
+  slash final ; deux URL qui ne diffèrent que par ce bruit désignent le même article
+- Quasi-doublons : un même sujet repris par plusieurs médias (titres réécrits) est détecté par
+  shingles de mots (Jaccard sur titre, puis titre + résumé)
+- Avant structuration : les passages répétés d'une recherche thématique à l'autre et les citations
+  en double sont retirés du prompt ; à la fusion : les items déjà connus ne sont pas ré-ajoutés
+
+Usage :
+    python news_dedup.py company_news.json            # doublons détectés par entreprise (sans écrire)
+    python news_dedup.py company_news.json --write    # réécrit le fichier dédoublonné
+"""
+
+import argparse
+import re
+import unicodedata
+import zlib
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from storage import read_json, write_json_atomic
+
+# Paramètres de requête de suivi (et bascule AMP), sans effet sur le contenu. Les clés génériques
+# (source, ref, cid, share...) portent parfois l'identifiant de l'article sur certains CMS : gardées
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "_ga", "_gl", "ref_src", "ref_url",
+    "cmpid", "ocid", "sr_share", "taid", "smid", "guccounter", "guce_referrer", "guce_referrer_sig",
+    "s_cid", "amp", "outputtype",
+}
+TRACKING_PREFIXES = ("utm_", "mc_", "pk_", "mtm_", "hsa_", "oly_")
+HOST_PREFIXES = ("www.", "m.", "amp.", "mobile.")
+AMP_CACHE = re.compile(r"^[\w-]+\.cdn\.ampproject\.org$")
+
+SHINGLE_SIZE = 3
+SAME_URL_THRESHOLD = 0.5    # même URL : doublon si les titres partagent assez de mots (pages de liste, wiki...)
+TITLE_THRESHOLD = 0.6       # titres réécrits d'une même dépêche
+TEXT_THRESHOLD = 0.5        # titre + résumé
+BLOCK_THRESHOLD = 0.8       # passages de recherche (avant structuration)
+MIN_BLOCK_WORDS = 8         # en dessous, le passage (titre de section, puce courte) est gardé tel quel
+
+
+def canonical_url(url: Optional[str]) -> str:
+    """Forme canonique d'une URL d'article ('' si vide) : sans schéma ni bruit, comparable telle quelle"""
+    if not url:
+        return ""
+    url = url.strip()
+    if "://" not in url:
+        url = "https://" + url
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url.lower()
+    host = (parts.hostname or "").lower()
+    if port and port not in (80, 443):
+        host += f":{port}"
+    path = parts.path
+
+    # Cache AMP de Google : /c/s/<hôte>/<chemin>
+    if AMP_CACHE.match(host):
+        segments = path.split("/")
+        if len(segments) > 3 and segments[1] == "c":
+            start = 3 if segments[2] == "s" else 2
+            host, path = segments[start].lower(), "/" + "/".join(segments[start + 1:])
+
+    for prefix in HOST_PREFIXES:
+        if host.startswith(prefix) and host.count(".") > 1:
+            host = host[len(prefix):]
+            break
+
+    # Variantes AMP du chemin : /amp, /amp/, .amp, .amp.html
+    path = re.sub(r"/amp/?$", "/", path)
+    path = re.sub(r"/amp/", "/", path)
+    path = re.sub(r"\.amp(\.html)?$", r"\1", path)
+    path = re.sub(r"/index\.html?$", "/", path)
+    path = re.sub(r"/{2,}", "/", path).rstrip("/")
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    canonical = host + path
+    if query:
+        canonical += "?" + urlencode(sorted(query))
+    return canonical
+
+
+def words(text: str) -> List[str]:
+    """Mots normalisés (minuscules, sans accents ni ponctuation)"""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def shingles(text: str, k: int = SHINGLE_SIZE) -> frozenset:
+    """Ensemble des k-grammes de mots (hachés) ; les textes plus courts que k donnent un seul shingle"""
+    tokens = words(text)
+    if len(tokens) < k:
+        return frozenset([zlib.crc32(" ".join(tokens).encode())]) if tokens else frozenset()
+    return frozenset(zlib.crc32(" ".join(tokens[i:i + k]).encode()) for i in range(len(tokens) - k + 1))
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def containment(a: frozenset, b: frozenset) -> float:
+    """Part de `a` contenue dans `b` (un passage court recopié dans un plus long)"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a)
+
+
+class _Signature:
+    """URL canonique, mots et shingles d'un item, calculés une fois"""
+
+    __slots__ = ("url", "words", "title", "text")
+
+    def __init__(self, item: Dict):
+        self.url = canonical_url(item.get("url"))
+        title = item.get("title") or ""
+        self.words = frozenset(words(title))
+        self.title = shingles(title)
+        self.text = shingles(f"{title} {item.get('summary') or ''}")
+
+    def matches(self, other: "_Signature", url_only: bool = False) -> bool:
+        """
+        Même article ou même sujet. Une URL commune ne suffit que si `url_only` : les modèles citent
+        parfois une page de liste (/press, wiki...) pour plusieurs sujets distincts
+        """
+        if self.url and self.url == other.url:
+            if url_only or not self.words or not other.words:
+                return True
+            if jaccard(self.words, other.words) >= SAME_URL_THRESHOLD:
+                return True
+        return (jaccard(self.title, other.title) >= TITLE_THRESHOLD
+                or jaccard(self.text, other.text) >= TEXT_THRESHOLD)
+
+
+def cluster(items: Sequence[Dict], url_only: bool = False) -> List[List[int]]:
+    """Groupes d'indices d'items doublons (union-find), dans l'ordre de première apparition"""
+    signatures = [_Signature(item) for item in items]
+    parent = list(range(len(items)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, sig in enumerate(signatures):
+        for j in range(i):
+            if find(i) != find(j) and sig.matches(signatures[j], url_only):
+                parent[find(i)] = find(j)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(items)):
+        groups.setdefault(find(i), []).append(i)
+    return sorted(groups.values(), key=lambda g: g[0])
+
+
+def dedup_items(items: Sequence[Dict]) -> List[Dict]:
+    """Un item par groupe de doublons : le premier (ordre d'entrée conservé)"""
+    return [items[group[0]] for group in cluster(items)]
+
+
+def new_items(existing: Sequence[Dict], candidates: Sequence[Dict]) -> List[Dict]:
+    """
+    Candidats qui ne doublonnent ni un item existant ni un candidat précédent. Comme l'ancienne
+    fusion par URL, une URL déjà connue (au sens canonique) suffit à écarter un candidat
+    """
+    existing = list(existing)
+    groups = cluster(existing + list(candidates), url_only=True)
+    offset = len(existing)
+    return [candidates[g[0] - offset] for g in groups if g[0] >= offset]
+
+
+def dedup_urls(urls: Iterable[str]) -> List[str]:
+    """URLs uniques au sens canonique (première forme rencontrée conservée)"""
+    seen, unique = set(), []
+    for url in urls:
+        key = canonical_url(url)
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(url)
+    return unique
+
+
+def dedup_passages(texts: Sequence[str]) -> Tuple[List[str], int]:
+    """
+    Retire des textes de recherche les passages (paragraphes / puces) déjà présents dans un passage
+    précédent, du même texte ou d'un autre. Retourne (textes réduits, caractères retirés).
+    """
+    kept: List[frozenset] = []
+    result, removed = [], 0
+    for text in texts:
+        blocks = re.split(r"\n\s*\n|\n(?=\s*(?:[-*•]|\d+\.)\s)", text or "")
+        out = []
+        for block in blocks:
+            sig = shingles(block)
+            if len(words(block)) >= MIN_BLOCK_WORDS and any(
+                containment(sig, previous) >= BLOCK_THRESHOLD for previous in kept
+            ):
+                removed += len(block)
+                continue
+            if len(words(block)) >= MIN_BLOCK_WORDS:
+                kept.append(sig)
+            out.append(block)
+        result.append("\n\n".join(b.strip("\n") for b in out if b.strip()))
+    return result, removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dédoublonnage des news / interviews par entreprise")
+    parser.add_argument("file", help="company_news.json, management_interviews.json ou fichier de public/")
+    parser.add_argument("--write", action="store_true", help="Réécrit le fichier dédoublonné")
+    args = parser.parse_args()
+
+    data = read_json(args.file, {})
+    total_before = total_after = 0
+    for company, entry in data.items():
+        if not isinstance(entry, dict):
+            continue
+        for key in ("news_items", "management_items"):
+            items = entry.get(key)
+            if not items:
+                continue
+            unique = dedup_items(items)
+            total_before += len(items)
+            total_after += len(unique)
+            if len(unique) < len(items):
+                print(f"   {company[:40]:40} {key:17} {len(items):4} → {len(unique):4}")
+                entry[key] = unique
+    print(f"🧹 {total_before} items → {total_after} ({total_before - total_after} doublons)")
+    if args.write and total_after < total_before:
+        write_json_atomic(args.file, data)
+        print(f"✅ {args.file} réécrit")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Pool de process pour les étapes CPU (rendu HTML des rapports, conversion frontend)
+- Découpage par entreprise (ou par job), résultats renvoyés dans l'ordre des entrées
+- Les fonctions passées doivent être définies au niveau module (picklables)
+- Repli séquentiel si peu d'éléments, un seul worker, ou si le pool ne peut pas démarrer
+  (sandbox sans sémaphores POSIX, interpréteur embarqué...)
+
+Configuration :
+    WORKERS=8        nombre de process (défaut : nombre de cœurs ; WORKERS=1 désactive le pool)
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import tracing
+
+# En dessous, lancer des process coûte plus cher que le rendu lui-même
+MIN_ITEMS = 8
+
+
+def worker_count(items=None):
+    """Nombre de process à utiliser (borné par le nombre d'éléments)"""
+    try:
+        workers = int(os.environ.get("WORKERS", "0")) or os.cpu_count() or 1
+    except ValueError:
+        workers = os.cpu_count() or 1
+    if items is not None:
+        workers = min(workers, items)
+    return max(1, workers)
+
+
+def _init_worker():
+    # Le fichier de trace ouvert par le parent est hérité : seul le parent y écrit
+    tracing.tracer.detach()
+
+
+def _star(args):
+    func, item = args
+    return func(*item)
+
+
+def map_ordered(func, items, star=False, name="parallel_map"):
+    """
+    [func(item) for item in items] réparti sur un pool de process, dans l'ordre des entrées.
+    star : chaque élément est un tuple d'arguments (func(*item))
+    """
+    items = list(items)
+    workers = worker_count(len(items))
+    with tracing.span(name, items=len(items), workers=workers if len(items) >= MIN_ITEMS else 1) as span:
+        if workers > 1 and len(items) >= MIN_ITEMS:
+            # Quelques lots par worker : équilibre la charge sans multiplier les allers-retours pickle
+            chunksize = max(1, len(items) // (workers * 4))
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                    if star:
+                        return list(pool.map(_star, [(func, item) for item in items], chunksize=chunksize))
+                    return list(pool.map(func, items, chunksize=chunksize))
+            except (OSError, NotImplementedError, BrokenProcessPool) as e:
+                span.set(fallback=f"{type(e).__name__}: {e}"[:200])
+        if star:
+            return [func(*item) for item in items]
+        return [func(item) for item in items]
@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+Orchestrateur du pipeline (in-process) avec graphe de dépendances déclaré
+- Chaque étape déclare ses dépendances, son entrée par entreprise et son fichier de sortie
+- Détection des entreprises obsolètes par hash de contenu (par étape et par entreprise)
+- Les branches indépendantes (analyse v2, tendances, news, interviews) tournent en parallèle
+  après l'enrichissement ; seules les entreprises dont l'entrée a changé sont recalculées
+
+Usage :
+    python pipeline.py                                  # tout le graphe
+    python pipeline.py frontend                         # une cible + ses dépendances
+    python pipeline.py news interviews --dry-run        # affiche le plan sans rien exécuter
+    python pipeline.py trends --force trends            # force le recalcul d'une étape
+    python pipeline.py trends --companies "California Closets"
+    python pipeline.py news interviews --budget-dollars 2      # les entreprises les plus prioritaires d'abord
+"""
+
+import argparse
+import asyncio
+import importlib
+import os
+import sys
+from datetime import datetime
+
+import company_selection
+import frontend_publish
+import jobs_loader
+import scheduler
+import tracing
+from storage import content_hash, read_json, write_json_atomic
+
+sys.stdout.reconfigure(line_buffering=True)
+
+STATE_FILE = "pipeline_state.json"
+TAM_FILE = "TAM.csv"
+JOBS_FILE = "jobs_data.json"
+V2_FILE = "jobs_analysis_v2.json"
+TRENDS_FILE = "jobs_trends_analysis.json"
+NEWS_FILE = "company_news.json"
+INTERVIEWS_FILE = "management_interviews.json"
+FRONTEND_FILE = "../public/data.json"
+ANALYTICS_MANIFEST = "analytics/manifest.json"
+EMBEDDINGS_MANIFEST = "embeddings/manifest.json"
+
+
+def jobs_by_company():
+    """{nom: entrée de jobs_data.json}"""
+    data = read_json(JOBS_FILE, {'companies': []})
+    return {c['company']['name']: c for c in data.get('companies', []) if c.get('company')}
+
+
+def with_jobs(company_data):
+    return company_data.get('success') and company_data.get('nb_jobs', 0) > 0
+
+
+# ---------------------------------------------------------------------------
+# Entrées (ce qui est hashé) et sorties valides, par étape
+# ---------------------------------------------------------------------------
+
+def enrich_inputs():
+    enrich_jobs = importlib.import_module('enrich_jobs')
+    companies = company_selection.select_companies(csv_path=TAM_FILE)
+    return {c['name']: {'company': c, 'keywords': enrich_jobs.JOB_KEYWORDS} for c in companies}
+
+
+def enrich_outputs():
+    return {name for name, c in jobs_by_company().items() if c.get('success')}
+
+
+def v2_inputs():
+    return {name: c['jobs'] for name, c in jobs_by_company().items() if c.get('jobs')}
+
+
+def v2_outputs():
+    analyzed = set(read_json(V2_FILE, {}))
+    return {
+        name for name, c in jobs_by_company().items() if c.get('jobs')
+        and all(f"{name}_{job['job_title']}" in analyzed for job in c['jobs'])
+    }
+
+
+def trends_inputs():
+    return {
+        name: {'company': c['company'], 'jobs': c['jobs']}
+        for name, c in jobs_by_company().items() if with_jobs(c)
+    }
+
+
+def trends_outputs():
+    return set(read_json(TRENDS_FILE, {}))
+
+
+def scrape_inputs():
+    return {name: c['company'] for name, c in jobs_by_company().items()}
+
+
+def scrape_outputs(path):
+    return {
+        name for name, c in read_json(path, {}).items()
+        if c.get('scrape_metadata', {}).get('success')
+    }
+
+
+def verify_inputs():
+    """URLs à vérifier par entreprise (news + interviews)"""
+    news = read_json(NEWS_FILE, {})
+    interviews = read_json(INTERVIEWS_FILE, {})
+    return {
+        name: sorted(
+            item.get('url') or ''
+            for entry in (news.get(name), interviews.get(name)) if isinstance(entry, dict)
+            for key in ('news_items', 'management_items') for item in entry.get(key) or []
+        )
+        for name in set(news) | set(interviews)
+    }
+
+
+def verify_outputs():
+    """Entreprises dont chaque item porte un url_check"""
+    done = {}
+    for path in (NEWS_FILE, INTERVIEWS_FILE):
+        for name, entry in read_json(path, {}).items():
+            if not isinstance(entry, dict):
+                continue
+            items = (entry.get('news_items') or []) + (entry.get('management_items') or [])
+            done[name] = done.get(name, True) and all('url_check' in item for item in items if item.get('url'))
+    return {name for name, ok in done.items() if ok}
+
+
+def frontend_inputs():
+    trends = read_json(TRENDS_FILE, {})
+    # Le code du convertisseur fait partie de l'entrée : le modifier rend toutes les entreprises obsolètes
+    code = frontend_publish.source_hash('convert_trends_to_frontend')
+    return {
+        name: {'company': c['company'], 'jobs': c['jobs'], 'trends': trends.get(name, {}).get('analysis'), 'code': code}
+        for name, c in jobs_by_company().items() if with_jobs(c)
+    }
+
+
+def frontend_outputs():
+    return set(read_json(FRONTEND_FILE, {'companies': {}}).get('companies', {}))
+
+
+def export_inputs():
+    analyzed = {}
+    for job in read_json(V2_FILE, {}).values():
+        analyzed.setdefault(job['company_name'], []).append(job.get('analysis'))
+    trends = read_json(TRENDS_FILE, {})
+    news = read_json(NEWS_FILE, {})
+    interviews = read_json(INTERVIEWS_FILE, {})
+    return {
+        name: {
+            'jobs': c.get('jobs'), 'analyses': analyzed.get(name),
+            'trends': trends.get(name, {}).get('analysis'),
+            'news': news.get(name), 'interviews': interviews.get(name),
+        }
+        for name, c in jobs_by_company().items()
+    }
+
+
+def export_outputs():
+    return set(read_json(ANALYTICS_MANIFEST, {}).get('companies', []))
+
+
+def embeddings_inputs():
+    news = read_json(NEWS_FILE, {})
+    interviews = read_json(INTERVIEWS_FILE, {})
+    return {
+        name: {
+            'jobs': c.get('jobs'),
+            'news': news.get(name, {}).get('news_items'),
+            'interviews': interviews.get(name, {}).get('management_items'),
+        }
+        for name, c in jobs_by_company().items()
+    }
+
+
+def embeddings_outputs():
+    return set(read_json(EMBEDDINGS_MANIFEST, {}).get('companies', []))
+
+
+# ---------------------------------------------------------------------------
+# Exécution des étapes (reçoivent la liste des entreprises obsolètes)
+# ---------------------------------------------------------------------------
+
+def _run_enrich_sync(stale):
+    enrich_jobs = importlib.import_module('enrich_jobs')
+    companies = company_selection.select_companies(csv_path=TAM_FILE)
+    # Entreprises déjà interrogées par un run interrompu : reprises depuis le journal
+    fresh = {name: r for name, r in enrich_jobs.load_checkpoint().items() if name in stale}
+    fresh.update({r['company']['name']: r for r in enrich_jobs.fetch_all_companies(
+        [c for c in companies if c['name'] in stale and c['name'] not in fresh],
+        checkpoint=enrich_jobs.CHECKPOINT_FILE,
+    )})
+    existing = jobs_by_company()
+    # Ordre du TAM conservé ; les entreprises hors sélection déjà présentes sont gardées à la fin
+    merged = [fresh.get(c['name']) or existing.get(c['name']) for c in companies]
+    merged = [r for r in merged if r]
+    selected = {c['name'] for c in companies}
+    merged += [r for name, r in existing.items() if name not in selected]
+    results = enrich_jobs.build_results(merged)
+    enrich_jobs.generate_html_report(results, "jobs_enrichment_report.html")
+    enrich_jobs.save_results(results, JOBS_FILE)
+    enrich_jobs.clear_checkpoint()
+
+
+async def run_enrich(stale):
+    await asyncio.to_thread(_run_enrich_sync, stale)
+
+
+async def run_v2(stale):
+    analyze_jobs_v2 = importlib.import_module('analyze_jobs_v2')
+    jobs = jobs_loader.iter_jobs(JOBS_FILE, only=stale)
+    await analyze_jobs_v2.process_and_save(jobs, V2_FILE, refresh_companies=stale)
+
+
+async def run_trends(stale):
+    analyze_trends = importlib.import_module('analyze_trends')
+    # Ordre de priorité du scheduler conservé
+    rank = {name: i for i, name in enumerate(stale)}
+    companies = jobs_loader.iter_companies(JOBS_FILE, only=stale, hydrate=False)
+    subset = {'companies': sorted(companies, key=lambda c: rank[c['company']['name']])}
+    await analyze_trends.process_all_companies(subset, TRENDS_FILE, refresh_companies=stale)
+
+
+async def run_news(stale):
+    scraper = importlib.import_module('scrape_company_news_async')
+    await scraper.process_all_companies(JOBS_FILE, NEWS_FILE, only=stale)
+
+
+async def run_interviews(stale):
+    scraper = importlib.import_module('scrape_management_interviews')
+    await scraper.process_all_companies(JOBS_FILE, INTERVIEWS_FILE, only=stale)
+
+
+async def run_verify_urls(stale):
+    url_verifier = importlib.import_module('url_verifier')
+    for path in (NEWS_FILE, INTERVIEWS_FILE):
+        await url_verifier.verify_file(path, companies=stale)
+
+
+async def run_frontend(stale):
+    converter = importlib.import_module('convert_trends_to_frontend')
+    await asyncio.to_thread(converter.convert_trends_to_frontend)
+
+
+async def run_export(stale):
+    # Snapshot complet : quelques Mo de Parquet, plus simple que de patcher les row groups
+    export_parquet = importlib.import_module('export_parquet')
+    await asyncio.to_thread(export_parquet.export_snapshot, os.path.dirname(ANALYTICS_MANIFEST))
+
+
+async def run_embeddings(stale):
+    # L'index est incrémental par item : seuls les textes nouveaux ou modifiés sont embeddés
+    embedding_index = importlib.import_module('embedding_index')
+    await asyncio.to_thread(embedding_index.build_index, os.path.dirname(EMBEDDINGS_MANIFEST))
+
+
+STAGES = {
+    'enrich': {
+        'description': "Enrichissement Mantiks (jobs par entreprise)",
+        'deps': [],
+        'inputs': enrich_inputs,
+        'outputs': enrich_outputs,
+        'run': run_enrich,
+    },
+    'analyze_v2': {
+        'description': "Analyse exhaustive des offres (GPT-4o-mini)",
+        'deps': ['enrich'],
+        'inputs': v2_inputs,
+        'outputs': v2_outputs,
+        'run': run_v2,
+    },
+    'trends': {
+        'description': "Analyse des tendances d'embauche",
+        'deps': ['enrich'],
+        'inputs': trends_inputs,
+        'outputs': trends_outputs,
+        'run': run_trends,
+    },
+    'news': {
+        'description': "Scraping des actualités",
+        'deps': ['enrich'],
+        'inputs': scrape_inputs,
+        'outputs': lambda: scrape_outputs(NEWS_FILE),
+        'run': run_news,
+    },
+    'interviews': {
+        'description': "Scraping des interviews management",
+        'deps': ['enrich'],
+        'inputs': scrape_inputs,
+        'outputs': lambda: scrape_outputs(INTERVIEWS_FILE),
+        'run': run_interviews,
+    },
+    'verify_urls': {
+        'description': "Vérification des URLs des news / interviews (statut, dates de publication)",
+        'deps': ['news', 'interviews'],
+        'inputs': verify_inputs,
+        'outputs': verify_outputs,
+        'run': run_verify_urls,
+    },
+    'frontend': {
+        'description': "Conversion vers public/data.json",
+        'deps': ['trends'],
+        'inputs': frontend_inputs,
+        'outputs': frontend_outputs,
+        'run': run_frontend,
+    },
+    'export': {
+        'description': "Export Parquet pour l'analytique (analytics/)",
+        'deps': ['analyze_v2', 'trends', 'news', 'interviews'],
+        'inputs': export_inputs,
+        'outputs': export_outputs,
+        'run': run_export,
+    },
+    'embeddings': {
+        'description': "Index vectoriel des offres, news et interviews (embeddings/)",
+        'deps': ['news', 'interviews'],
+        'inputs': embeddings_inputs,
+        'outputs': embeddings_outputs,
+        'run': run_embeddings,
+    },
+}
+
+
+def resolve_stages(targets=None):
+    """Ensemble des étapes à exécuter : les cibles et toutes leurs dépendances (ordre topologique)"""
+    ordered = []
+
+    def visit(name, path=()):
+        if name not in STAGES:
+            raise ValueError(f"Étape inconnue : {name} (disponibles : {', '.join(STAGES)})")
+        if name in path:
+            raise ValueError(f"Cycle de dépendances : {' -> '.join(path + (name,))}")
+        for dep in STAGES[name]['deps']:
+            visit(dep, path + (name,))
+        if name not in ordered:
+            ordered.append(name)
+
+    for target in targets or list(STAGES):
+        visit(target)
+    return ordered
+
+
+def plan_stage(name, state, force=False, companies=None):
+    """
+    Calcule les hashes d'entrée, la liste des entreprises obsolètes d'une étape et les sorties adoptées
+    ({entreprise: hash} : sortie existante sans état, dont le hash actuel est à enregistrer)
+    """
+    stage_state = state.get(name, {})
+    hashes = {company: content_hash(payload) for company, payload in STAGES[name]['inputs']().items()}
+    if companies is not None:
+        hashes = {c: h for c, h in hashes.items() if c in companies}
+    have_output = STAGES[name]['outputs']()
+
+    stale, adopted = [], {}
+    for company, h in hashes.items():
+        if force:
+            stale.append(company)
+        elif company in stage_state:
+            if stage_state[company] != h or company not in have_output:
+                stale.append(company)
+        elif company not in have_output:
+            stale.append(company)
+        else:
+            # Pas encore d'état : une sortie existante est adoptée telle quelle (premier run), avec le hash
+            # de l'entrée actuelle pour qu'un changement ultérieur la rende obsolète
+            adopted[company] = h
+    return hashes, stale, adopted
+
+
+def save_state(state):
+    write_json_atomic(STATE_FILE, state)
+
+
+async def run_pipeline(targets=None, force=(), skip=(), companies=None, dry_run=False, budget=None):
+    """
+    Exécute le graphe ; retourne {étape: statut}
+    budget : scheduler.Budget partagé par les étapes planifiées par priorité (news, interviews, tendances)
+    """
+    selected = resolve_stages(targets)
+    state = read_json(STATE_FILE, {})
+    force = set(STAGES) if 'all' in force else set(force)
+    companies = set(companies) if companies else None
+    statuses = {}
+    tasks = {}
+
+    async def execute(name, dep_tasks):
+        dep_statuses = await asyncio.gather(*dep_tasks)
+        if any(s in ('failed', 'blocked') for s in dep_statuses):
+            print(f"⏭️  [{name}] ignorée : une dépendance a échoué")
+            statuses[name] = 'blocked'
+            return 'blocked'
+        if name in skip:
+            print(f"⏭️  [{name}] ignorée (--skip), sortie existante utilisée")
+            statuses[name] = 'skipped'
+            return 'skipped'
+
+        hashes, stale, adopted = plan_stage(name, state, name in force, companies)
+        if adopted and not dry_run:
+            state.setdefault(name, {}).update(adopted)
+            save_state(state)
+        if not stale:
+            print(f"✅ [{name}] à jour ({len(hashes)} entreprises)")
+            statuses[name] = 'fresh'
+            return 'fresh'
+        if name in scheduler.STAGE_COSTS:
+            # Les plus prioritaires d'abord ; hors budget, une entreprise reste obsolète pour le run suivant
+            planned = scheduler.plan(name, stale, jobs_by_company(), budget)
+            if len(planned) < len(stale):
+                print(f"💰 [{name}] {len(stale) - len(planned)} entreprises reportées (budget atteint)")
+            stale = planned
+            if not stale:
+                statuses[name] = 'deferred'
+                return 'deferred'
+        if dry_run:
+            preview = ', '.join(stale[:5]) + ('...' if len(stale) > 5 else '')
+            print(f"📝 [{name}] {len(stale)}/{len(hashes)} entreprises à recalculer : {preview}")
+            statuses[name] = 'planned'
+            return 'planned'
+
+        print(f"🚀 [{name}] {STAGES[name]['description']} : {len(stale)}/{len(hashes)} entreprises à recalculer")
+        try:
+            with tracing.span(name, kind="stage", stale=len(stale), total=len(hashes)):
+                await STAGES[name]['run'](stale)
+        except Exception as e:
+            print(f"❌ [{name}] échec : {e}")
+            statuses[name] = 'failed'
+            return 'failed'
+
+        # On n'enregistre le hash que pour les entreprises réellement produites
+        have_output = STAGES[name]['outputs']()
+        stage_state = state.setdefault(name, {})
+        recorded = 0
+        for company in stale:
+            if company in have_output:
+                stage_state[company] = hashes[company]
+                recorded += 1
+        save_state(state)
+        print(f"✅ [{name}] terminé : {recorded}/{len(stale)} entreprises à jour")
+        statuses[name] = 'ok'
+        return 'ok'
+
+    def schedule(name):
+        if name not in tasks:
+            deps = [schedule(d) for d in STAGES[name]['deps'] if d in selected]
+            tasks[name] = asyncio.ensure_future(execute(name, deps))
+        return tasks[name]
+
+    await asyncio.gather(*(schedule(name) for name in selected))
+
+    # Entrées obsolètes (entreprises sorties du périmètre) : on nettoie l'état
+    if not dry_run and companies is None:
+        for name in selected:
+            if statuses.get(name) in ('ok', 'fresh') and name in state:
+                current = set(STAGES[name]['inputs']())
+                state[name] = {c: h for c, h in state[name].items() if c in current}
+        save_state(state)
+
+    return statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Orchestrateur du pipeline presti.ai")
+    parser.add_argument('targets', nargs='*', help=f"Étapes cibles (défaut : toutes) : {', '.join(STAGES)}")
+    parser.add_argument('--force', nargs='+', default=[], help="Étapes à recalculer entièrement ('all' pour tout)")
+    parser.add_argument('--skip', nargs='+', default=[], help="Étapes à ne pas exécuter (leur sortie actuelle est utilisée)")
+    parser.add_argument('--companies', nargs='+', help="Limiter aux entreprises données")
+    parser.add_argument('--dry-run', action='store_true', help="Affiche le plan sans rien exécuter")
+    scheduler.add_arguments(parser)
+    args = parser.parse_args()
+    budget = scheduler.from_args(args)
+
+    start_time = datetime.now()
+    print("=" * 70)
+    print("🎯 presti.ai - Pipeline")
+    print("=" * 70)
+    stages = resolve_stages(args.targets)
+    print(f"📋 Étapes : {' → '.join(stages)}\n")
+
+    tracing.init("pipeline")
+    statuses = asyncio.run(run_pipeline(args.targets, args.force, args.skip, args.companies, args.dry_run, budget))
+
+    print("\n" + "=" * 70)
+    for name in stages:
+        print(f"   {name:12} : {statuses.get(name, '-')}")
+    if budget is not None:
+        print(budget.describe())
+    print(f"⏱️  Durée totale : {datetime.now() - start_time}")
+    print("=" * 70)
+    tracing.finish()
+
+    if any(s in ('failed', 'blocked') for s in statuses.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Disposition des prompts pour le cache de prompt d'OpenAI
+- Le cache porte sur le plus long préfixe identique à l'octet près entre deux appels (à partir de
+  1024 tokens, par tranches de 128) : instructions statiques d'abord, contexte de l'entreprise
+  ensuite, texte de l'offre en dernier
+- Les tokens servis depuis le cache (usage.prompt_tokens_details.cached_tokens) sont relevés à
+  chaque appel et agrégés par tracing (colonne "cache" du résumé)
+"""
+
+MIN_CACHED_TOKENS = 1024
+
+
+def static_prefix(*parts: str) -> str:
+    """Message système : blocs statiques joints une fois pour toutes (aucun champ à formater)"""
+    return "\n\n".join(part.strip() for part in parts)
+
+
+def messages(prefix: str, company_context: str, job_text: str = "") -> list:
+    """Messages dans l'ordre le plus stable : préfixe statique, entreprise, offre"""
+    user = company_context if not job_text else f"{company_context}\n\n{job_text}"
+    return [
+        {"role": "system", "content": prefix},
+        {"role": "user", "content": user},
+    ]
+
+
+def usage_attrs(usage) -> dict:
+    """Attributs de span / résultat tirés de response.usage (cached_tokens à 0 si non renseigné)"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "tokens": usage.total_tokens,
+        "prompt_tokens": usage.prompt_tokens,
+        "cached_tokens": (getattr(details, "cached_tokens", None) or 0) if details else 0,
+    }
+
+
+def describe(prefix: str) -> str:
+    """Taille estimée du préfixe (~4 caractères par token) et éligibilité au cache"""
+    estimate = len(prefix) // 4
+    if estimate >= MIN_CACHED_TOKENS:
+        return f"🧊 Préfixe statique ~{estimate} tokens : mis en cache par OpenAI après le premier appel"
+    return f"🧊 Préfixe statique ~{estimate} tokens : sous le seuil de cache d'OpenAI ({MIN_CACHED_TOKENS})"
@@ -1,45 +1,31 @@
 #!/usr/bin/env python3
 """
 Script principal pour exécuter l'analyse complète des tendances
-Enchaîne automatiquement :
+Enchaîne automatiquement, via l'orchestrateur in-process (pipeline.py) :
 1. Analyse des tendances (analyze_trends.py)
 2. Conversion vers le frontend (convert_trends_to_frontend.py)
+Seules les entreprises dont les offres ont changé depuis le dernier run sont recalculées.
+
+Options :
+    --all      exécute tout le graphe (enrichissement, analyses, news, interviews, frontend)
+    --force    recalcule toutes les entreprises, même à jour
 """
 
-import subprocess
+import argparse
+import asyncio
 import sys
 import os
 from datetime import datetime
 
+import pipeline
+import tracing
+
 def print_header(text):
     """Affiche un en-tête stylisé"""
     print("\n" + "="*70)
     print(f"  {text}")
     print("="*70 + "\n")
 
-def run_command(script_name, description):
-    """Exécute un script Python et gère les erreurs"""
-    print(f"🚀 {description}...")
-    print(f"📝 Exécution de : {script_name}\n")
-    
-    try:
-        result = subprocess.run(
-            [sys.executable, script_name],
-            check=True,
-            capture_output=False,
-            text=True
-        )
-        print(f"\n✅ {description} terminé avec succès !\n")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"\n❌ Erreur lors de {description}")
-        print(f"Code de sortie : {e.returncode}\n")
-        return False
-    except FileNotFoundError:
-        print(f"\n❌ Fichier introuvable : {script_name}")
-        print("Assurez-vous d'être dans le répertoire 'database/'\n")
-        return False
-
 def check_prerequisites():
     """Vérifie que les fichiers nécessaires existent"""
     required_files = [
@@ -63,31 +49,37 @@ def check_prerequisites():
     return True
 
 def main():
+    parser = argparse.ArgumentParser(description="Analyse complète des tendances")
+    parser.add_argument('--all', action='store_true', help="Exécute tout le graphe, enrichissement Mantiks compris")
+    parser.add_argument('--force', action='store_true', help="Recalcule toutes les entreprises")
+    args = parser.parse_args()
+
     start_time = datetime.now()
     
     print_header("🎯 PRESTI.AI - ANALYSE COMPLÈTE DES TENDANCES")
     
     print("📋 Ce script va exécuter :")
+    if args.all:
+        print("   0️⃣  Enrichissement, analyse v2, news et interviews (en parallèle)")
     print("   1️⃣  Analyse des tendances (GPT-4o-mini)")
     print("   2️⃣  Conversion vers le format frontend")
     print()
     
     # Vérifier les prérequis
     print("🔍 Vérification des prérequis...")
-    if not check_prerequisites():
+    if not args.all and not check_prerequisites():
         sys.exit(1)
     print("✅ Tous les fichiers nécessaires sont présents\n")
     
-    # Étape 1 : Analyse des tendances
-    print_header("ÉTAPE 1/2 : ANALYSE DES TENDANCES")
-    if not run_command('analyze_trends.py', 'Analyse des tendances'):
-        print("⚠️  L'analyse a échoué. Arrêt du processus.")
-        sys.exit(1)
-    
-    # Étape 2 : Conversion frontend
-    print_header("ÉTAPE 2/2 : CONVERSION VERS LE FRONTEND")
-    if not run_command('convert_trends_to_frontend.py', 'Conversion vers le frontend'):
-        print("⚠️  La conversion a échoué.")
+    # Étapes 1 et 2 : orchestrées par le pipeline (seules les entreprises modifiées sont recalculées)
+    targets = None if args.all else ['frontend']
+    skip = () if args.all else ('enrich',)
+    force = ('all',) if args.force else ()
+    tracing.init("full_analysis")
+    statuses = asyncio.run(pipeline.run_pipeline(targets, force=force, skip=skip))
+    tracing.finish()
+    if any(s in ('failed', 'blocked') for s in statuses.values()):
+        print("⚠️  Le pipeline a échoué. Arrêt du processus.")
         sys.exit(1)
     
     # Résumé final
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Planification par priorité des rafraîchissements (news, interviews, tendances)
+- Priorité par entreprise et par étape : ancienneté du dernier rafraîchissement, valeur de l'entreprise
+  (presti_fit_score des news, overall_signal_strength des tendances), offres publiées depuis le dernier
+  rafraîchissement, tranche d'effectif
+- File de priorité (heapq) : les entreprises les plus utiles passent en premier ; avec un budget global
+  (appels API et/ou dollars estimés par run), celles qui ne rentrent pas sont reportées au run suivant
+- Le budget est partagé entre les étapes d'un même run (pipeline.py --budget-calls / --budget-dollars)
+
+Usage :
+    python scheduler.py news                          # ordre de passage des news, avec le détail des scores
+    python scheduler.py trends --budget-dollars 0.5 --top 20
+"""
+
+import argparse
+import heapq
+import math
+import os
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+import company_selection
+import dates
+from storage import read_json
+
+JOBS_FILE = "jobs_data.json"
+NEWS_FILE = "company_news.json"
+INTERVIEWS_FILE = "management_interviews.json"
+TRENDS_FILE = "jobs_trends_analysis.json"
+
+# Coût estimé d'une entreprise par étape : (appels API, dollars). Web search gpt-4o pour les news et
+# interviews, un appel gpt-4o-mini pour les tendances ; surchargeable par SCHEDULER_<ÉTAPE>_DOLLARS
+STAGE_COSTS = {
+    "news": (1, 0.05),
+    "interviews": (1, 0.05),
+    "trends": (1, 0.004),
+}
+# Âge (jours) à partir duquel un rafraîchissement est pleinement dû
+REFRESH_DAYS = {"news": 30, "interviews": 60, "trends": 30}
+
+WEIGHTS = {"age": 0.4, "value": 0.3, "jobs": 0.2, "size": 0.1}
+DEFAULT_VALUE = 5           # entreprise jamais notée : valeur moyenne
+NEW_JOBS_SATURATION = 20    # au-delà, les nouvelles offres ne comptent plus davantage
+SIZE_SATURATION = 10_000    # effectif (échelle log) au-delà duquel la taille ne compte plus davantage
+
+_file_cache: Dict[str, tuple] = {}
+
+
+def _load(path: str) -> Dict:
+    """Fichier JSON relu seulement s'il a changé (plusieurs étapes par run)"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    cached = _file_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, read_json(path, {}))
+        _file_cache[path] = cached
+    return cached[1]
+
+
+def _score(value) -> Optional[float]:
+    try:
+        return max(0.0, min(10.0, float(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+def stage_cost(stage: str) -> tuple:
+    calls, dollars = STAGE_COSTS[stage]
+    override = os.getenv(f"SCHEDULER_{stage.upper()}_DOLLARS")
+    return calls, float(override) if override else dollars
+
+
+def last_refresh(stage: str, company_name: str) -> Optional[date]:
+    """Date du dernier rafraîchissement réussi de l'entreprise pour l'étape, None si jamais"""
+    if stage == "trends":
+        analyzed_at = (_load(TRENDS_FILE).get(company_name) or {}).get("analyzed_at")
+        try:
+            return datetime.fromisoformat(analyzed_at).date() if analyzed_at else None
+        except ValueError:
+            return None
+    path = NEWS_FILE if stage == "news" else INTERVIEWS_FILE
+    return dates.last_scraped(_load(path).get(company_name))
+
+
+def company_value(company_name: str) -> Optional[float]:
+    """Meilleur des deux scores connus (fit presti.ai des news, signal des tendances), sur 10"""
+    news = _load(NEWS_FILE).get(company_name) or {}
+    trends = _load(TRENDS_FILE).get(company_name) or {}
+    scores = [
+        _score((news.get("overall_assessment") or {}).get("presti_fit_score")),
+        _score((trends.get("analysis") or {}).get("overall_signal_strength")),
+    ]
+    scores = [s for s in scores if s]  # 0 : score des réponses en échec, traité comme inconnu
+    return max(scores) if scores else None
+
+
+class Priority:
+    """Score de priorité d'une entreprise pour une étape, avec ses composantes"""
+
+    __slots__ = ("company", "score", "age_days", "value", "new_jobs", "employees")
+
+    def __init__(self, company: str, score: float, age_days: Optional[int], value: Optional[float],
+                 new_jobs: int, employees: Optional[int]):
+        self.company = company
+        self.score = score
+        self.age_days = age_days
+        self.value = value
+        self.new_jobs = new_jobs
+        self.employees = employees
+
+    def describe(self) -> str:
+        age = f"{self.age_days} j" if self.age_days is not None else "jamais"
+        value = f"{self.value:g}/10" if self.value is not None else "-"
+        employees = self.employees if self.employees is not None else "-"
+        return (f"{self.company[:35]:35} {self.score:5.3f} | âge {age:>7} | valeur {value:>6} | "
+                f"+{self.new_jobs:3} offres | effectif {employees}")
+
+
+def priority(stage: str, entry: Dict, today: Optional[date] = None) -> Priority:
+    """Priorité (0-1) d'une entrée de jobs_data.json pour une étape"""
+    today = today or date.today()
+    company = entry.get("company") or {}
+    name = company.get("name", "")
+
+    refreshed = last_refresh(stage, name)
+    age_days = (today - refreshed).days if refreshed else None
+    age = 1.0 if age_days is None else min(max(age_days, 0) / REFRESH_DAYS[stage], 1.0)
+
+    value = company_value(name)
+    value_part = (value if value is not None else DEFAULT_VALUE) / 10
+
+    new_jobs = 0
+    for job in entry.get("jobs") or []:
+        created = dates.parse_date(job.get("date_creation") or job.get("date"))
+        if refreshed is None or (created and created > refreshed):
+            new_jobs += 1
+    jobs_part = min(new_jobs / NEW_JOBS_SATURATION, 1.0)
+
+    band = company_selection.parse_employees(str(company.get("employees") or ""))
+    employees = band[1] if band else None
+    size_part = min(math.log10(max(employees, 1)) / math.log10(SIZE_SATURATION), 1.0) if employees else 0.0
+
+    score = (WEIGHTS["age"] * age + WEIGHTS["value"] * value_part
+             + WEIGHTS["jobs"] * jobs_part + WEIGHTS["size"] * size_part)
+    return Priority(name, round(score, 4), age_days, value, new_jobs, employees)
+
+
+class Budget:
+    """
+    Budget global d'un run : nombre d'appels API et/ou dollars estimés (None = sans limite).
+    Partagé entre les étapes, consommé entreprise par entreprise dans l'ordre de priorité
+    """
+
+    __slots__ = ("max_calls", "max_dollars", "calls", "dollars", "deferred")
+
+    def __init__(self, max_calls: Optional[int] = None, max_dollars: Optional[float] = None):
+        self.max_calls = max_calls
+        self.max_dollars = max_dollars
+        self.calls = 0
+        self.dollars = 0.0
+        self.deferred: Dict[str, int] = {}
+
+    def reserve(self, stage: str) -> bool:
+        """Réserve le coût d'une entreprise ; False (rien n'est réservé) si le budget est dépassé"""
+        calls, dollars = stage_cost(stage)
+        if self.max_calls is not None and self.calls + calls > self.max_calls:
+            return False
+        if self.max_dollars is not None and self.dollars + dollars > self.max_dollars + 1e-9:
+            return False
+        self.calls += calls
+        self.dollars += dollars
+        return True
+
+    def describe(self) -> str:
+        calls = f"{self.calls}/{self.max_calls}" if self.max_calls is not None else str(self.calls)
+        dollars = f"${self.dollars:.2f}/${self.max_dollars:.2f}" if self.max_dollars is not None else f"${self.dollars:.2f}"
+        deferred = sum(self.deferred.values())
+        return f"💰 Budget : {calls} appels, {dollars} estimés ; {deferred} rafraîchissements reportés"
+
+
+def plan(stage: str, companies: Iterable[str], entries: Dict[str, Dict], budget: Optional[Budget] = None,
+         today: Optional[date] = None) -> List[str]:
+    """
+    Entreprises à rafraîchir pour l'étape, par priorité décroissante, dans la limite du budget.
+    entries : {nom: entrée de jobs_data.json} (offres et effectif) ; un nom absent garde une priorité
+    calculée sans offres ni effectif
+    """
+    heap = []
+    for i, name in enumerate(dict.fromkeys(companies)):
+        p = priority(stage, entries.get(name) or {"company": {"name": name}}, today)
+        heap.append((-p.score, i, name))
+    heapq.heapify(heap)
+
+    ordered = []
+    while heap:
+        _, _, name = heapq.heappop(heap)
+        if budget is not None and not budget.reserve(stage):
+            # Même coût pour toutes les entreprises de l'étape : le reste ne rentre pas non plus
+            budget.deferred[stage] = budget.deferred.get(stage, 0) + len(heap) + 1
+            break
+        ordered.append(name)
+    return ordered
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    group = parser.add_argument_group("budget du run")
+    group.add_argument('--budget-calls', type=int, help="Nombre maximum d'appels API (les plus prioritaires d'abord)")
+    group.add_argument('--budget-dollars', type=float, help="Dépense maximale estimée en dollars")
+
+
+def from_args(args) -> Optional[Budget]:
+    """Budget des options d'add_arguments ; None si aucune limite"""
+    if args.budget_calls is None and args.budget_dollars is None:
+        return None
+    return Budget(args.budget_calls, args.budget_dollars)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ordre de rafraîchissement par priorité")
+    parser.add_argument("stage", choices=list(STAGE_COSTS))
+    parser.add_argument("--jobs", default=JOBS_FILE)
+    parser.add_argument("--top", type=int, default=30, help="Nombre d'entreprises affichées")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    entries = {c["company"]["name"]: c for c in read_json(args.jobs, {"companies": []}).get("companies", [])
+               if c.get("company")}
+    budget = from_args(args)
+    ordered = plan(args.stage, entries, entries, budget)
+    today = date.today()
+    print(f"📋 {args.stage} : {len(ordered)}/{len(entries)} entreprises planifiées")
+    for rank, name in enumerate(ordered[:args.top], 1):
+        print(f"{rank:4}. {priority(args.stage, entries[name], today).describe()}")
+    if budget is not None:
+        print(budget.describe())
+
+
+if __name__ == "__main__":
+    main()
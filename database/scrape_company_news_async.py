@@ -10,6 +10,13 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
+
+import company_selection
+import dates
+import merge_service
+import scheduler
+import tracing
+from storage import read_json, write_json_atomic
 # aiofiles not needed - using sync file operations
 
 # Charger les variables d'environnement depuis .env
@@ -22,95 +29,17 @@ if not OPENAI_API_KEY:
 MAX_CONCURRENT_REQUESTS = 5  # Nombre de requêtes simultanées
 client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
-async def get_company_news(company_name: str, company_website: str = "", industry: str = "") -> Dict[str, Any]:
-    """
-    Récupère les actualités d'une entreprise en utilisant OpenAI Web Search (ASYNC)
-    
-    Args:
-        company_name: Nom de l'entreprise
-        company_website: Site web de l'entreprise (optionnel)
-        industry: Industrie de l'entreprise (optionnel)
-        
-    Returns:
-        Dict contenant les actualités structurées
-    """
-    
-    print(f"\n🔍 Recherche des actualités pour {company_name}...")
-    
-    # Build the prompt to target relevant news
-    prompt = f"""You are an expert in researching company news for business analysis.
-
-Target company: {company_name}
-Industry: {industry if industry else "Not specified"}
-Website: {company_website if company_website else "Not specified"}
-
-Context: Presti is an AI solution that helps home & furniture companies generate lifestyle product images at scale, independently of their supply chain. Key benefits:
-- Generate hundreds/thousands of product visuals quickly without physical photoshoots
-- Create visuals before products are physically available (no supply chain dependency)
-- Perfect for large catalogs with many SKUs, multiple angles, colors, and contexts
-- Reduce time-to-market, costs, and carbon footprint of traditional photography
-- Ideal for: e-commerce catalogs, websites, marketing campaigns, social media, A/B testing
-
-⚠️⚠️⚠️ CRITICAL DATE REQUIREMENT - ABSOLUTE RULE ⚠️⚠️⚠️
-- ONLY include news from 2020, 2021, 2022, 2023, 2024 (ideally last 18-24 months)
-- ❌ NEVER INCLUDE news from 2019 or earlier (2019, 2018, 2017, 2016, 2015, 2014, 2013, etc.)
-- ❌ If publication date is before January 1, 2020 → DO NOT INCLUDE IT
-- The business landscape pre-COVID (before 2020) is completely different and irrelevant
-- This is a HARD CUTOFF - no exceptions, no "highly relevant" pre-2020 content
-
-IMPORTANT: Provide ALL content in ENGLISH ONLY.
-
-MISSION: Search BROADLY for any news about {company_name} that could indicate opportunities for Presti. Cast a WIDE NET and include:
-
-✅ **DEFINITELY INCLUDE** (any of these topics):
-- **E-commerce & Digital**: Website launches/redesigns, e-commerce growth, online sales expansion, digital channel improvements
-- **Catalog & Product**: New collections, product launches, catalog expansions, SKU increases, product line extensions, new materials/finishes/colors, new references
-- **Visual & Content**: Product imagery, photography, content production, 3D visualization, AR/VR, view-in-room features, generative AI for visuals, visual technology
-- **Digital Transformation**: Post-crisis recovery, digital initiatives, technology investments, modernization, replatforming
-- **Customization & Personalization**: Custom products, made-to-order, personalization programs, configurators, modular products with multiple configurations
-- **Omnichannel & Multi-channel**: Integrated online/offline, unified commerce, consistent brand experience
-- **International & Expansion**: New markets, regional expansion, geographic growth, multi-market strategies
-- **Supply Chain & Operations**: Production challenges, inventory issues, time-to-market improvements, operational efficiency, scaling operations
-- **Marketing & Campaigns**: Seasonal campaigns, promotional content, brand storytelling, social media strategies, marketing automation
-- **Private Label & Own Brand**: Exclusive collections, in-house brands, proprietary product lines
-- **Technology & Innovation**: AI/ML adoption, Generative AI, automation, platform migrations, tech stack improvements
-- **Sustainability & ESG**: Environmental initiatives, waste reduction, carbon footprint (relevant because Presti reduces physical photoshoots)
-- **Business Performance**: Revenue growth, market positioning, competitive advantages that require visual content to stay at the top
-- **Brand Strategy**: Brand repositioning, premiumization, luxury positioning, brand elevation, moving upmarket, quality upgrades
-- **Physical Presence & Events**: Trade shows participation (KBIS, High Point Market, Maison&Objet, IMM Cologne), showrooms opening/redesign, pop-up stores, temporary exhibitions, design weeks (requiring marketing materials and consistent visuals)
-
-✅ **ALSO CONSIDER** (broader context):
-- Company restructuring or recovery (bankruptcy exit, new leadership, strategic pivots)
-- Store openings/showrooms IF they mention online content needs, catalog updates, or omnichannel consistency
-- Partnerships with tech/platform providers
-- Customer experience improvements requiring visual content
-- M&A activity that might consolidate/expand product catalogs
-- Trade show participation or design weeks (need for marketing materials, product showcases)
-- New finishes, materials, or color options (each requires new product visuals)
-
-❌ **IGNORE ONLY**:
-- Pure physical store news with NO digital/online angle
-- HR/workplace culture news (unless about hiring digital/creative teams)
-- Financial results with no strategic implications
-- Legal issues or controversies
-
-SCORING GUIDANCE (but be flexible - good digital transformation stories can score 8-10 even if not in "high priority"):
-- **8-10**: Strong immediate need for visual content at scale
-- **6-8**: Clear opportunity with digital/catalog angle
-- **4-6**: Relevant context, potential future opportunity
-- **1-3**: Weak relevance
-
-IMPORTANT: Be INCLUSIVE rather than exclusive. If unsure, INCLUDE the article - better to have more relevant news than to miss important signals.
-
-🔍 WEB SEARCH METHODOLOGY - CRITICAL INSTRUCTIONS:
+def full_search_patterns(company_name: str, company_website: str, years: List[int]) -> str:
+    """Méthodologie de recherche complète (scraping historique)"""
+    return f"""🔍 WEB SEARCH METHODOLOGY - CRITICAL INSTRUCTIONS:
 
 You have access to web search. Use it EXTENSIVELY with MULTIPLE search patterns to find comprehensive coverage.
 
 **SEARCH PATTERN 1 - General News & Announcements:**
 From mainstream and business news outlets, try these exact queries:
 - "{company_name} recent news"
-- "{company_name} news 2024"
-- "{company_name} news 2025"
+- "{company_name} news {years[-2]}"
+- "{company_name} news {years[-1]}"
 - "{company_name} announcements"
 - "{company_name} press release"
 - "{company_name} latest updates"
@@ -188,8 +117,8 @@ Industry-specific sources are GOLD for relevant insights:
 
 **SEARCH PATTERN 5 - Time-Based Searches:**
 Use date filters to get recent content:
-- "{company_name} 2024"
-- "{company_name} 2025"
+- "{company_name} {years[-2]}"
+- "{company_name} {years[-1]}"
 - "{company_name} last 12 months"
 - "{company_name} recent developments"
 
@@ -199,30 +128,18 @@ Leaders often share strategic insights:
 - "{company_name} leadership"
 - "{company_name} executive"
 
-CRITICAL: Use web search MULTIPLE TIMES with DIFFERENT query patterns. Don't stop after one search - try at least 10-15 different searches to find comprehensive coverage.
-
-For each relevant news item, provide:
-1. Exact title (in English)
-2. Source (site/publication name)
-3. Full URL
-4. Publication date (format: "Month DD, YYYY" or "YYYY-MM-DD")
-5. Short summary (2-3 sentences, in English)
-6. Relevance score (1-10) - Use the priority levels above as guide
-7. Why it's relevant for Presti (in English)
-8. Key actionable insights for sales approach (in English)
-9. Category based on the PRIMARY signal detected
+CRITICAL: Use web search MULTIPLE TIMES with DIFFERENT query patterns. Don't stop after one search - try at least 10-15 different searches to find comprehensive coverage."""
 
-TARGET: 15-20 relevant news items with REAL URLs. Use MULTIPLE SEARCH QUERIES to ensure comprehensive coverage.
-⚠️ IMPORTANT: ONLY include items where you have a real, clickable URL from web search results.
-Better to return 12 high-quality items with real sources than 20 items with hallucinated/placeholder URLs.
 
-⚡ MANDATORY SEARCH STRATEGY - YOU MUST USE WEB SEARCH MULTIPLE TIMES:
+def full_search_strategy(company_name: str, years: List[int]) -> str:
+    """Stratégie de recherche obligatoire (10-15 recherches, scraping historique)"""
+    return f"""⚡ MANDATORY SEARCH STRATEGY - YOU MUST USE WEB SEARCH MULTIPLE TIMES:
 
 DO NOT rely on a single web search. Execute MULTIPLE searches (minimum 10-15 searches) using these patterns:
 
 1️⃣ **General News Discovery (3-4 searches):**
    - "{company_name} recent news"
-   - "{company_name} news 2024" OR "{company_name} news 2025"
+   - "{company_name} news {years[-2]}" OR "{company_name} news {years[-1]}"
    - "{company_name} announcements"
    - "{company_name} press release"
 
@@ -254,7 +171,152 @@ DO NOT rely on a single web search. Execute MULTIPLE searches (minimum 10-15 sea
 - Then go SPECIFIC (thematic searches) to find targeted articles
 - Use TRADE PUBLICATIONS for B2B insights (they're goldmines!)
 - Check COMPANY SOURCES for first-party content
-- Vary your search terms - different words = different results
+- Vary your search terms - different words = different results"""
+
+
+def window_search_patterns(company_name: str, company_website: str, window: dates.ScrapeWindow) -> str:
+    """Recherche compacte pour une fenêtre courte : quelques requêtes datées au lieu de 10-15"""
+    min_searches, max_searches = window.search_budget
+    month = f"{window.end:%B %Y}"
+    site_query = f'\n- "site:{company_website} news"' if company_website else ""
+    return f"""🔍 WEB SEARCH - SHORT DATE WINDOW:
+Only content published {window.describe()} is wanted; older coverage is out of scope.
+Run {min_searches}-{max_searches} web searches, no more, restricted to recent results:
+- "{company_name} news {month}"
+- "{company_name} announcement" OR "{company_name} press release"
+- "{company_name} Furniture Today" OR "{company_name} Business of Home" OR "{company_name} Retail Dive"
+- "{company_name} new collection" OR "{company_name} e-commerce" OR "{company_name} launch"{site_query}
+
+Stop searching as soon as these searches are done."""
+
+
+def window_search_strategy(window: dates.ScrapeWindow) -> str:
+    min_searches, max_searches = window.search_budget
+    return f"""⚡ SEARCH BUDGET: {min_searches}-{max_searches} searches maximum for this {window.days}-day window.
+Do not run broad historical or thematic searches: anything published before {window.start:%B %d, %Y} is discarded."""
+
+
+async def get_company_news(company_name: str, company_website: str = "", industry: str = "",
+                           window: Optional[dates.ScrapeWindow] = None) -> Dict[str, Any]:
+    """
+    Récupère les actualités d'une entreprise en utilisant OpenAI Web Search (ASYNC)
+    
+    Args:
+        company_name: Nom de l'entreprise
+        company_website: Site web de l'entreprise (optionnel)
+        industry: Industrie de l'entreprise (optionnel)
+        window: Fenêtre de dates recherchée (défaut : historique complet depuis 2020)
+        
+    Returns:
+        Dict contenant les actualités structurées
+    """
+    
+    window = window or dates.scrape_window()
+    print(f"\n🔍 Recherche des actualités pour {company_name} ({window.describe()})...")
+    
+    # Fenêtre courte : prompt de recherche compact (2-8 recherches au lieu de 10-15)
+    years = window.years
+    date_requirement = dates.date_requirement(window, "news")
+    date_check = dates.date_check(window)
+    final_check = dates.final_date_check(window)
+    if window.is_short:
+        search_patterns = window_search_patterns(company_name, company_website, window)
+        search_strategy = window_search_strategy(window)
+        target = "TARGET: only NEW items published in the window - a handful (or zero) is normal for a short window."
+        # Pas d'objectif chiffré : il pousserait le modèle à compléter avec des articles hors fenêtre
+        quality = "Better to return 2 high-quality items with real sources than to pad the list - zero items is a valid answer."
+        volume = "- TARGET: only articles published in the window, ONLY with real URLs - there is no minimum count"
+        coverage = ("- Stop once the window is covered: NEVER add older or unverified articles to reach a count\n"
+                    "- Better to return 1 VERIFIED article than several from outside the window")
+        reminder = f"REMINDER: Only NEW items published {window.describe()} with REAL URLs - a handful (or zero) is normal."
+    else:
+        search_patterns = full_search_patterns(company_name, company_website, years)
+        search_strategy = full_search_strategy(company_name, years)
+        target = "TARGET: 15-20 relevant news items with REAL URLs. Use MULTIPLE SEARCH QUERIES to ensure comprehensive coverage."
+        quality = "Better to return 12 high-quality items with real sources than 20 items with hallucinated/placeholder URLs."
+        volume = "- TARGET: 15-20 articles, but ONLY with real URLs from web search results"
+        coverage = ("- Keep searching until you have 15-20 items with REAL URLs\n"
+                    "- Better to have 12 VERIFIED articles than 20 hallucinated ones - COMPREHENSIVE coverage with REAL sources")
+        reminder = "REMINDER: Target 15-20 news items with REAL URLs from web search results. Cast a WIDE NET across multiple sources and topics."
+    
+    # Build the prompt to target relevant news
+    prompt = f"""You are an expert in researching company news for business analysis.
+
+Target company: {company_name}
+Industry: {industry if industry else "Not specified"}
+Website: {company_website if company_website else "Not specified"}
+
+Context: Presti is an AI solution that helps home & furniture companies generate lifestyle product images at scale, independently of their supply chain. Key benefits:
+- Generate hundreds/thousands of product visuals quickly without physical photoshoots
+- Create visuals before products are physically available (no supply chain dependency)
+- Perfect for large catalogs with many SKUs, multiple angles, colors, and contexts
+- Reduce time-to-market, costs, and carbon footprint of traditional photography
+- Ideal for: e-commerce catalogs, websites, marketing campaigns, social media, A/B testing
+
+{date_requirement}
+
+IMPORTANT: Provide ALL content in ENGLISH ONLY.
+
+MISSION: Search BROADLY for any news about {company_name} that could indicate opportunities for Presti. Cast a WIDE NET and include:
+
+✅ **DEFINITELY INCLUDE** (any of these topics):
+- **E-commerce & Digital**: Website launches/redesigns, e-commerce growth, online sales expansion, digital channel improvements
+- **Catalog & Product**: New collections, product launches, catalog expansions, SKU increases, product line extensions, new materials/finishes/colors, new references
+- **Visual & Content**: Product imagery, photography, content production, 3D visualization, AR/VR, view-in-room features, generative AI for visuals, visual technology
+- **Digital Transformation**: Post-crisis recovery, digital initiatives, technology investments, modernization, replatforming
+- **Customization & Personalization**: Custom products, made-to-order, personalization programs, configurators, modular products with multiple configurations
+- **Omnichannel & Multi-channel**: Integrated online/offline, unified commerce, consistent brand experience
+- **International & Expansion**: New markets, regional expansion, geographic growth, multi-market strategies
+- **Supply Chain & Operations**: Production challenges, inventory issues, time-to-market improvements, operational efficiency, scaling operations
+- **Marketing & Campaigns**: Seasonal campaigns, promotional content, brand storytelling, social media strategies, marketing automation
+- **Private Label & Own Brand**: Exclusive collections, in-house brands, proprietary product lines
+- **Technology & Innovation**: AI/ML adoption, Generative AI, automation, platform migrations, tech stack improvements
+- **Sustainability & ESG**: Environmental initiatives, waste reduction, carbon footprint (relevant because Presti reduces physical photoshoots)
+- **Business Performance**: Revenue growth, market positioning, competitive advantages that require visual content to stay at the top
+- **Brand Strategy**: Brand repositioning, premiumization, luxury positioning, brand elevation, moving upmarket, quality upgrades
+- **Physical Presence & Events**: Trade shows participation (KBIS, High Point Market, Maison&Objet, IMM Cologne), showrooms opening/redesign, pop-up stores, temporary exhibitions, design weeks (requiring marketing materials and consistent visuals)
+
+✅ **ALSO CONSIDER** (broader context):
+- Company restructuring or recovery (bankruptcy exit, new leadership, strategic pivots)
+- Store openings/showrooms IF they mention online content needs, catalog updates, or omnichannel consistency
+- Partnerships with tech/platform providers
+- Customer experience improvements requiring visual content
+- M&A activity that might consolidate/expand product catalogs
+- Trade show participation or design weeks (need for marketing materials, product showcases)
+- New finishes, materials, or color options (each requires new product visuals)
+
+❌ **IGNORE ONLY**:
+- Pure physical store news with NO digital/online angle
+- HR/workplace culture news (unless about hiring digital/creative teams)
+- Financial results with no strategic implications
+- Legal issues or controversies
+
+SCORING GUIDANCE (but be flexible - good digital transformation stories can score 8-10 even if not in "high priority"):
+- **8-10**: Strong immediate need for visual content at scale
+- **6-8**: Clear opportunity with digital/catalog angle
+- **4-6**: Relevant context, potential future opportunity
+- **1-3**: Weak relevance
+
+IMPORTANT: Be INCLUSIVE rather than exclusive. If unsure, INCLUDE the article - better to have more relevant news than to miss important signals.
+
+{search_patterns}
+
+For each relevant news item, provide:
+1. Exact title (in English)
+2. Source (site/publication name)
+3. Full URL
+4. Publication date (format: "Month DD, YYYY" or "YYYY-MM-DD")
+5. Short summary (2-3 sentences, in English)
+6. Relevance score (1-10) - Use the priority levels above as guide
+7. Why it's relevant for Presti (in English)
+8. Key actionable insights for sales approach (in English)
+9. Category based on the PRIMARY signal detected
+
+{target}
+⚠️ IMPORTANT: ONLY include items where you have a real, clickable URL from web search results.
+{quality}
+
+{search_strategy}
 
 📰 HOW TO USE WEB SEARCH RESULTS - CRITICAL INSTRUCTIONS:
 ⚠️ **URLS ARE MANDATORY - NO EXCEPTIONS**:
@@ -266,24 +328,23 @@ DO NOT rely on a single web search. Execute MULTIPLE searches (minimum 10-15 sea
 
 Other requirements:
 - Get ACTUAL publication dates (format: "Month DD, YYYY" or "YYYY-MM-DD")
-- ⚠️ CRITICAL: Check the year - if before 2020, EXCLUDE IT (2019, 2018, 2017, 2016, 2015, 2014, 2013... = EXCLUDE)
-- ⚠️ ONLY valid years: 2020, 2021, 2022, 2023, 2024
+{date_check}
 - Use EXACT titles from the articles found in search results
 - Read enough of each article to write an accurate 2-3 sentence summary
-- Prioritize articles from the LAST 18-24 MONTHS
+- Prioritize articles published {window.describe()}
 - If you find 10+ articles from one search, GREAT - include the best 3-5 and move to next search
 - If a search yields few results, try rephrasing the query
 
 REMINDER: Web search gives you real URLs - use them. If no URL is found, the source doesn't exist. Don't hallucinate.
 
 CRITICALLY IMPORTANT - QUALITY WITH REAL SOURCES:
-- TARGET: 15-20 articles, but ONLY with real URLs from web search results
+{volume}
 - ⚠️ **NO HALLUCINATIONS**: If you can't find a real URL, don't include the article
 - Include articles about digital transformation, website launches/redesigns, e-commerce growth
 - Include articles about post-crisis recovery, company reinvention, strategic pivots
 - Include articles with specific numbers/metrics (e.g., "e-commerce grew 157%", "launched 500 SKUs")
 - Include articles from various sources: trade publications, business news, company blog, LinkedIn, tech sites
-- Look for articles from 2020 onwards (ideally LAST 18-24 MONTHS)
+- Look for articles published {window.describe()}
 - Include articles about new stores/showrooms IF they mention online/digital aspects or omnichannel consistency
 - Include articles about partnerships, technology investments, hiring in digital/creative roles
 - Include seasonal campaigns, product launches, sustainability initiatives
@@ -292,22 +353,17 @@ CRITICALLY IMPORTANT - QUALITY WITH REAL SOURCES:
 - Include articles about TRADE SHOWS participation (KBIS, High Point Market, Maison&Objet, etc.) - need for marketing materials
 - Include articles about BRAND REPOSITIONING, premiumization, moving upmarket (need for premium-quality visuals)
 - Include articles about CATALOG EXPANSIONS, new references, SKU growth (direct need for product imagery at scale)
-- Keep searching until you have 15-20 items with REAL URLs
-- Better to have 12 VERIFIED articles than 20 hallucinated ones - COMPREHENSIVE coverage with REAL sources
+{coverage}
 
-REMINDER: Target 15-20 news items with REAL URLs from web search results. Cast a WIDE NET across multiple sources and topics.
+{reminder}
 ⚠️ CRITICAL: Only include items with verifiable URLs. No URL = Don't include it. Quality over quantity.
 
-⚠️ FINAL CHECK BEFORE RETURNING JSON:
-- Go through each item and verify the published_date year
-- If ANY item has year < 2020, REMOVE IT from the output
-- Examples of INVALID years to exclude: 2019, 2018, 2017, 2016, 2015, 2014, 2013, 2012, 2011, 2010, etc.
-- ONLY valid years: 2020, 2021, 2022, 2023, 2024
+{final_check}
 
 Format your response in JSON with this structure:
 {{
   "company_name": "{company_name}",
-  "search_date": "2025-01-02",
+  "search_date": "{window.end.isoformat()}",
   "news_items": [
     {{
       "title": "...",
@@ -338,19 +394,22 @@ REMEMBER: ALL TEXT MUST BE IN ENGLISH."""
 
     try:
         # Utilisation de la Responses API ASYNC avec web_search
-        response = await client.responses.create(
-            model="gpt-4o",
-            tools=[
-                {
-                    "type": "web_search",
-                    "external_web_access": True
-                }
-            ],
-            tool_choice="auto",
-            input=prompt,
-            temperature=0.3,
-            max_output_tokens=4000,
-        )
+        with tracing.span("responses.web_search", kind="api", api="openai.responses", model="gpt-4o", company=company_name) as api_span:
+            response = await client.responses.create(
+                model="gpt-4o",
+                tools=[
+                    {
+                        "type": "web_search",
+                        "external_web_access": True
+                    }
+                ],
+                tool_choice="auto",
+                input=prompt,
+                temperature=0.3,
+                max_output_tokens=4000,
+            )
+            if getattr(response, 'usage', None):
+                api_span.set(tokens=response.usage.total_tokens)
         
         # Extraction du contenu de la Responses API
         result_text = response.output_text if hasattr(response, 'output_text') else ""
@@ -389,12 +448,20 @@ REMEMBER: ALL TEXT MUST BE IN ENGLISH."""
                 "raw_response": result_text
             }
         
+        # Items hors fenêtre écartés localement (pas de nouvel appel au modèle)
+        news_data["news_items"], dropped = window.filter(news_data.get("news_items", []))
+        if dropped:
+            print(f"🗓️  {dropped} actualités hors fenêtre écartées pour {company_name}")
+        
         # Ajout des métadonnées
         news_data["scrape_metadata"] = {
             "timestamp": datetime.now().isoformat(),
             "model": "gpt-4o",
-            "success": len(news_data.get("news_items", [])) > 0,
-            "web_search_used": True
+            # Fenêtre courte : aucun nouvel item est un résultat valide
+            "success": len(news_data.get("news_items", [])) > 0 or (window.is_short and "raw_response" not in news_data),
+            "web_search_used": True,
+            "dropped_out_of_window": dropped,
+            **window.to_metadata()
         }
         
         print(f"✅ {len(news_data.get('news_items', []))} actualités trouvées pour {company_name}")
@@ -416,21 +483,25 @@ REMEMBER: ALL TEXT MUST BE IN ENGLISH."""
             "scrape_metadata": {
                 "timestamp": datetime.now().isoformat(),
                 "model": "gpt-4o",
-                "success": False
+                "success": False,
+                **window.to_metadata()
             }
         }
 
 
-async def process_single_company(company_name: str, company_info: Dict, semaphore: asyncio.Semaphore) -> tuple[str, Dict]:
+async def process_single_company(company_name: str, company_info: Dict, semaphore: asyncio.Semaphore,
+                                 window: Optional[dates.ScrapeWindow] = None) -> tuple[str, Dict]:
     """
     Traite une seule entreprise avec limitation de concurrence
     """
-    async with semaphore:
-        news = await get_company_news(
-            company_name=company_name,
-            company_website=company_info.get("website", ""),
-            industry=company_info.get("industry", "")
-        )
+    with tracing.span(company_name, kind="company"):
+        async with tracing.queued(semaphore, api="openai.responses"):
+            news = await get_company_news(
+                company_name=company_name,
+                company_website=company_info.get("website", ""),
+                industry=company_info.get("industry", ""),
+                window=window
+            )
         return company_name, news
 
 
@@ -438,23 +509,32 @@ def save_results_periodically(news_data: Dict, output_file: str):
     """
     Sauvegarde périodique des résultats (synchrone car file I/O est rapide)
     """
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(news_data, f, indent=2, ensure_ascii=False)
+    with tracing.span("save_results", kind="save", path=output_file, entries=len(news_data)):
+        write_json_atomic(output_file, news_data)
 
 
-async def process_all_companies(input_file: str = "jobs_data.json", output_file: str = "company_news.json"):
+async def process_all_companies(input_file: str = "jobs_data.json", output_file: str = "company_news.json",
+                                only: Optional[List[str]] = None, days: Optional[int] = None,
+                                selection: Optional[company_selection.Selection] = None,
+                                budget: Optional[scheduler.Budget] = None):
     """
     Traite toutes les entreprises de manière ASYNCHRONE avec workers parallèles
+    
+    only: si fourni, (re)traite uniquement ces entreprises, même si déjà traitées avec succès
+    days: refresh sur les N derniers jours ; chaque entreprise n'est recherchée que depuis son
+          dernier scraping et les nouveaux items sont fusionnés avec les existants
+    selection: restreint les entreprises de input_file (company_selection : shard, filtres)
+    budget: plafond d'appels / de dollars ; les entreprises sont traitées par priorité (scheduler), celles
+            hors budget sont reportées. Avec `only`, l'ordre donné est conservé (déjà planifié par l'appelant)
     """
     
     print("🚀 Démarrage du scraping ASYNCHRONE des actualités...")
     print(f"⚡ Mode: {MAX_CONCURRENT_REQUESTS} requêtes simultanées")
     
     # Chargement des données existantes
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = read_json(input_file)
     
-    companies_list = data.get("companies", [])
+    companies_list = company_selection.filter_entries(data.get("companies", []), selection)
     companies = {}
     for company_data in companies_list:
         if "company" in company_data and "name" in company_data["company"]:
@@ -467,17 +547,28 @@ async def process_all_companies(input_file: str = "jobs_data.json", output_file:
     news_data = {}
     if os.path.exists(output_file):
         try:
-            with open(output_file, 'r', encoding='utf-8') as f:
-                news_data = json.load(f)
+            news_data = read_json(output_file)
             print(f"📂 {len(news_data)} actualités déjà récupérées")
         except:
             news_data = {}
     
     # Filtrer les entreprises déjà traitées avec succès
-    companies_to_process = {
-        name: info for name, info in companies.items()
-        if name not in news_data or not news_data[name].get("scrape_metadata", {}).get("success")
-    }
+    if only is not None:
+        companies_to_process = {name: companies[name] for name in only if name in companies}
+    elif days is not None:
+        companies_to_process = companies
+    else:
+        companies_to_process = {
+            name: info for name, info in companies.items()
+            if name not in news_data or not news_data[name].get("scrape_metadata", {}).get("success")
+        }
+    
+    if only is None:
+        entries = {c["company"]["name"]: c for c in companies_list if c.get("company")}
+        planned = scheduler.plan("news", companies_to_process, entries, budget)
+        if len(planned) < len(companies_to_process):
+            print(f"💰 {len(companies_to_process) - len(planned)} entreprises reportées (budget atteint)")
+        companies_to_process = {name: companies_to_process[name] for name in planned}
     
     print(f"🔄 {len(companies_to_process)} entreprises à traiter")
     
@@ -490,7 +581,10 @@ async def process_all_companies(input_file: str = "jobs_data.json", output_file:
     
     # Créer les tâches pour toutes les entreprises
     tasks = [
-        process_single_company(name, info, semaphore)
+        process_single_company(
+            name, info, semaphore,
+            window=dates.scrape_window(days, news_data.get(name)) if days is not None else None
+        )
         for name, info in companies_to_process.items()
     ]
     
@@ -501,6 +595,9 @@ async def process_all_companies(input_file: str = "jobs_data.json", output_file:
     for coro in asyncio.as_completed(tasks):
         try:
             company_name, company_news = await coro
+            if days is not None and company_name in news_data:
+                # Refresh fenêtré : fusion avec les items déjà collectés
+                company_news, _ = merge_service.merge_company(news_data[company_name], company_news, "news", company_name)
             news_data[company_name] = company_news
             completed += 1
             
@@ -531,16 +628,18 @@ async def process_all_companies(input_file: str = "jobs_data.json", output_file:
     print(f"   - Moyenne par entreprise: {total_news/len(news_data):.1f}")
 
 
-async def test_single_company(company_name: str = "California Closets"):
+async def test_single_company(company_name: str = "California Closets", merge_into: Optional[str] = None,
+                              days: Optional[int] = None):
     """
     Test sur une seule entreprise pour validation (ASYNC)
+    
+    days: fenêtre de recherche ; avec merge_into, elle démarre au dernier scraping de l'entreprise
     """
     
     print(f"🧪 Test ASYNC sur {company_name}...")
     
     # Chargement des infos de l'entreprise
-    with open("jobs_data.json", 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = read_json("jobs_data.json")
     
     companies_list = data.get("companies", [])
     company_info = {}
@@ -556,18 +655,26 @@ async def test_single_company(company_name: str = "California Closets"):
         return
     
     # Récupération des news
+    previous = read_json(merge_into, {}).get(company_name) if merge_into else None
+    window = dates.scrape_window(days, previous) if days is not None else None
     news = await get_company_news(
         company_name=company_name,
         company_website=company_info.get("website", ""),
-        industry=company_info.get("industry", "")
+        industry=company_info.get("industry", ""),
+        window=window
     )
     
     # Sauvegarde du test
-    with open("company_news_test.json", 'w', encoding='utf-8') as f:
-        json.dump({company_name: news}, f, indent=2, ensure_ascii=False)
-    
-    print(f"\n✅ Test terminé!")
-    print(f"📁 Résultat sauvegardé dans company_news_test.json")
+    if merge_into:
+        # Refresh depuis le dashboard : fusion directe (verrou + écriture atomique), sans fichier intermédiaire partagé
+        stats = merge_service.merge_into(merge_into, {company_name: news}, "news")
+        print(f"\n✅ Fusionné dans {merge_into}")
+        print(f"MERGE_STATS {json.dumps(stats[company_name])}")
+    else:
+        with tracing.span("save_results", kind="save", path="company_news_test.json"):
+            write_json_atomic("company_news_test.json", {company_name: news})
+        print(f"\n✅ Test terminé!")
+        print(f"📁 Résultat sauvegardé dans company_news_test.json")
     print(f"\n📊 Résumé:")
     print(f"   - Actualités trouvées: {len(news.get('news_items', []))}")
     print(f"   - Score Presti: {news.get('overall_assessment', {}).get('presti_fit_score', 0)}/10")
@@ -586,7 +693,11 @@ if __name__ == "__main__":
     parser.add_argument('mode', nargs='?', default='full', help='Mode: test or full (default: full)')
     parser.add_argument('--company', type=str, help='Company name to scrape (for single company mode)')
     parser.add_argument('--days', type=int, help='Number of days to look back (e.g., 7, 30, 90)')
+    parser.add_argument('--merge-into', type=str, help='Merge the single-company result into this frontend file (locked, atomic)')
     parser.add_argument('test_company', nargs='?', help='Company name for test mode (positional arg)')
+    parser.add_argument('--output', default='company_news.json', help='Output file for full mode (one per shard)')
+    company_selection.add_arguments(parser)
+    scheduler.add_arguments(parser)
     
     args = parser.parse_args()
     
@@ -595,13 +706,17 @@ if __name__ == "__main__":
         # Mode test sur une seule entreprise
         company = args.company or args.test_company or "California Closets"
         
-        # TODO: In future, pass days parameter to the scraping function
-        # to modify the prompt with specific date range
         if args.days:
             print(f"🔍 Searching for news from last {args.days} days for {company}")
         
-        asyncio.run(test_single_company(company))
+        tracing.init("news_single")
+        asyncio.run(test_single_company(company, merge_into=args.merge_into, days=args.days))
+        tracing.finish()
     else:
         # Mode complet avec workers parallèles
-        asyncio.run(process_all_companies())
+        tracing.init("news")
+        asyncio.run(process_all_companies(output_file=args.output, days=args.days,
+                                          selection=company_selection.from_args(args),
+                                          budget=scheduler.from_args(args)))
+        tracing.finish()
 
@@ -12,9 +12,16 @@ import aiohttp
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 import argparse
+import time
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+import cascade
+import citation_filter
+import news_dedup
+import prompt_cache
+import tracing
+
 # Charger les variables d'environnement depuis .env
 load_dotenv()
 
@@ -132,28 +139,31 @@ Search extensively."""
     }
     
     try:
-        async with session.post(PERPLEXITY_URL, headers=headers, json=payload, timeout=90) as response:
-            if response.status != 200:
-                error_text = await response.text()
-                print(f"❌ Erreur Perplexity (status {response.status})")
-                return None
+        with tracing.span("perplexity.search", kind="api", api="perplexity", model="sonar",
+                          company=company_name, search_type=search_type) as api_span:
+            async with session.post(PERPLEXITY_URL, headers=headers, json=payload, timeout=90) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    print(f"❌ Erreur Perplexity (status {response.status})")
+                    return None
             
-            result = await response.json()
+                result = await response.json()
             
-            if 'choices' not in result or len(result['choices']) == 0:
-                print(f"⚠️ Aucun résultat Perplexity")
-                return None
+                if 'choices' not in result or len(result['choices']) == 0:
+                    print(f"⚠️ Aucun résultat Perplexity")
+                    return None
             
-            content = result['choices'][0]['message']['content']
-            citations = result.get('citations', [])
+                content = result['choices'][0]['message']['content']
+                citations = result.get('citations', [])
+                api_span.set(citations=len(citations), tokens=(result.get('usage') or {}).get('total_tokens', 0))
             
-            print(f"✅ Perplexity : {len(content)} caractères, {len(citations)} citations")
+                print(f"✅ Perplexity : {len(content)} caractères, {len(citations)} citations")
             
-            return {
-                "raw_content": content,
-                "citations": citations,
-                "company_name": company_name
-            }
+                return {
+                    "raw_content": content,
+                    "citations": citations,
+                    "company_name": company_name
+                }
     
     except Exception as e:
         print(f"❌ Erreur Perplexity: {e}")
@@ -162,16 +172,29 @@ Search extensively."""
 
 async def structure_with_openai(
     perplexity_data: Dict[str, Any],
-    search_type: str = "news"
-) -> Optional[Dict[str, Any]]:
+    search_type: str = "news",
+    tiers: Optional[cascade.Cascade] = None
+) -> Optional[List[Dict[str, Any]]]:
     """
     ÉTAPE 2 : Structuration avec OpenAI (JSON propre et fiable)
+    Retourne [] si rien de nouveau n'est à structurer, None en cas d'erreur
+    tiers : cascade (tri court par le modèle léger, structuration par le modèle fort des seuls éléments
+            au-dessus du seuil)
     """
     
     company_name = perplexity_data['company_name']
     raw_content = perplexity_data['raw_content']
     citations = perplexity_data['citations']
     
+    prepared = citation_filter.prepare(raw_content, citations, company_name,
+                                       citation_filter.known_urls(company_name, search_type))
+    print(prepared.describe())
+    if not prepared.content:
+        print(f"⏭️  Rien de nouveau à structurer pour {company_name}")
+        return []
+    raw_content = prepared.content
+    citations_block = prepared.citations_block()
+    
     print(f"\n📊 [OpenAI] Structuration des données pour {company_name}...")
     
     if search_type == "news":
@@ -216,7 +239,7 @@ SEARCH RESULT:
 {raw_content}
 
 CITATIONS (verified URLs):
-{json.dumps(citations, indent=2)}
+{citations_block}
 
 Extract every article mentioned. Ensure all URLs are from the citations list above.
 Return ONLY the JSON object, no other text."""
@@ -261,43 +284,124 @@ SEARCH RESULT:
 {raw_content}
 
 CITATIONS (verified URLs):
-{json.dumps(citations, indent=2)}
+{citations_block}
 
 Return ONLY the JSON object."""
     
+    items_key = 'articles' if search_type == "news" else 'interviews'
+    label = "articles structurés" if search_type == "news" else "interviews structurées"
+    
+    if tiers is None:
+        items, _ = await _structure_call("gpt-4o", system_prompt, user_prompt, items_key)
+        if items is not None:
+            print(f"✅ OpenAI : {len(items)} {label}")
+        return items
+    
+    # Cascade : tri court par le modèle léger (titre, URL, score), puis structuration par le modèle fort
+    # des seuls éléments au-dessus du seuil, à partir de leurs passages et citations
+    step = cascade.stats(tiers.stage)
+    screened = await cascade.screen_items(
+        openai_client, tiers, cascade.screen_prefix(system_prompt, instructions=cascade.LIST_SCREEN_INSTRUCTIONS),
+        f"Company: {company_name}",
+        f"SEARCH RESULT:\n{raw_content}\n\nCITATIONS (verified URLs):\n{citations_block}"
+    )
+    if screened is None:
+        started = time.perf_counter()
+        items, tokens = await _structure_call(tiers.full_model, system_prompt, user_prompt, items_key)
+        step.add("full", tokens, (time.perf_counter() - started) * 1000, runs=len(items or []))
+        for item in items or []:
+            item['structuring_model'] = tiers.full_model
+        return items
+    
+    high = [item for item in screened if item['escalate']]
+    print(f"✅ OpenAI ({tiers.screen_model}) : {len(screened)} éléments triés, {len(high)} au-dessus du seuil {tiers.threshold}")
+    items = [_screened_item(tiers, item, search_type) for item in screened]
+    if not high:
+        return items
+    
+    refs = {item['ref'] for item in high if isinstance(item.get('ref'), int)}
+    urls = {item.get('url') for item in high if item.get('url')}
+    wanted = {news_dedup.canonical_url(url) for url in urls}
+    selected_citations = "\n".join(
+        f"[{n}] {url}" for n, url in prepared.citations if n in refs or news_dedup.canonical_url(url) in wanted
+    )
+    selected = "\n".join(f"- {item.get('title', '')} | {item.get('url', '')}" for item in high)
+    full_prompt = f"""Structure ONLY the following items about {company_name} (same output format, same URLs):
+{selected}
+
+SEARCH RESULT (passages about these items):
+{citation_filter.passages(raw_content, refs, urls, [item.get('title', '') for item in high])}
+
+CITATIONS (verified URLs):
+{selected_citations}
+
+Return ONLY the JSON object."""
+    started = time.perf_counter()
+    refined, tokens = await _structure_call(tiers.full_model, system_prompt, full_prompt, items_key)
+    step.add("full", tokens, (time.perf_counter() - started) * 1000, runs=len(high))
+    by_url = {news_dedup.canonical_url(item.get('url')): item for item in refined or [] if item.get('url')}
+    replaced = 0
+    for i, item in enumerate(screened):
+        full = by_url.get(news_dedup.canonical_url(item.get('url')))
+        if item['escalate'] and full is not None:
+            items[i] = {**full, 'structuring_model': tiers.full_model}
+            replaced += 1
+    print(f"✅ OpenAI ({tiers.full_model}) : {replaced}/{len(high)} éléments structurés")
+    return items
+
+
+def _screened_item(tiers: cascade.Cascade, item: Dict[str, Any], search_type: str) -> Dict[str, Any]:
+    """Élément issu du tri : champs courts seulement (complété par le modèle fort s'il est escaladé)"""
+    structured = {
+        "title": item.get("title"),
+        "source": item.get("source"),
+        "url": item.get("url"),
+        "published_date": item.get("date"),
+        "date": item.get("date"),
+        "summary": "",
+        "presti_score": item.get("relevance_score"),
+        "relevance_reason": item["reason"],
+        "structuring_model": tiers.screen_model,
+    }
+    if search_type != "news":
+        structured["executive"] = item.get("executive")
+    return structured
+
+
+async def _structure_call(model: str, system_prompt: str, user_prompt: str, items_key: str):
+    """Appel de structuration : (éléments ou None en cas d'erreur, tokens consommés)"""
     try:
-        response = await openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.1
-        )
+        with tracing.span("chat.completions", kind="api", api="openai.chat", model=model) as api_span:
+            response = await openai_client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.1
+            )
+            api_span.set(**prompt_cache.usage_attrs(response.usage))
         
         content = response.choices[0].message.content
         structured_data = json.loads(content)
-        
-        if search_type == "news":
-            articles = structured_data.get('articles', [])
-            print(f"✅ OpenAI : {len(articles)} articles structurés")
-            return articles
-        else:
-            interviews = structured_data.get('interviews', [])
-            print(f"✅ OpenAI : {len(interviews)} interviews structurées")
-            return interviews
+        return structured_data.get(items_key, []), response.usage.total_tokens
     
     except Exception as e:
         print(f"❌ Erreur OpenAI: {e}")
-        return None
+        return None, 0
+
+
+def _structuring_model(tiers: Optional[cascade.Cascade]) -> str:
+    return "gpt-4o" if tiers is None else f"{tiers.screen_model} -> {tiers.full_model} (>= {tiers.threshold})"
 
 
 async def scrape_company_news(
     session: aiohttp.ClientSession,
     company_name: str,
     company_website: str = "",
-    industry: str = ""
+    industry: str = "",
+    tiers: Optional[cascade.Cascade] = None
 ) -> Optional[Dict[str, Any]]:
     """
     Pipeline complet : Perplexity → OpenAI pour Company News
@@ -312,9 +416,10 @@ async def scrape_company_news(
         return None
     
     # Étape 2 : Structuration OpenAI
-    structured_articles = await structure_with_openai(perplexity_result, "news")
+    structured_articles = await structure_with_openai(perplexity_result, "news", tiers)
     
-    if not structured_articles:
+    # [] : rien de nouveau depuis le dernier scraping, ce n'est pas un échec
+    if structured_articles is None:
         return None
     
     return {
@@ -324,7 +429,7 @@ async def scrape_company_news(
         "scrape_metadata": {
             "timestamp": datetime.now().isoformat(),
             "search_engine": "perplexity-sonar",
-            "structuring_model": "gpt-4o",
+            "structuring_model": _structuring_model(tiers),
             "success": True,
             "articles_found": len(structured_articles)
         }
@@ -335,7 +440,8 @@ async def scrape_management_interviews(
     session: aiohttp.ClientSession,
     company_name: str,
     company_website: str = "",
-    industry: str = ""
+    industry: str = "",
+    tiers: Optional[cascade.Cascade] = None
 ) -> Optional[Dict[str, Any]]:
     """
     Pipeline complet : Perplexity → OpenAI pour Management Interviews
@@ -350,9 +456,10 @@ async def scrape_management_interviews(
         return None
     
     # Étape 2 : Structuration OpenAI
-    structured_interviews = await structure_with_openai(perplexity_result, "interviews")
+    structured_interviews = await structure_with_openai(perplexity_result, "interviews", tiers)
     
-    if not structured_interviews:
+    # [] : rien de nouveau depuis le dernier scraping, ce n'est pas un échec
+    if structured_interviews is None:
         return None
     
     return {
@@ -362,7 +469,7 @@ async def scrape_management_interviews(
         "scrape_metadata": {
             "timestamp": datetime.now().isoformat(),
             "search_engine": "perplexity-sonar",
-            "structuring_model": "gpt-4o",
+            "structuring_model": _structuring_model(tiers),
             "success": True,
             "interviews_found": len(structured_interviews)
         }
@@ -373,26 +480,28 @@ async def scrape_company(
     company_name: str,
     company_website: str = "",
     industry: str = "",
-    include_interviews: bool = False
+    include_interviews: bool = False,
+    tiers: Optional[cascade.Cascade] = None
 ) -> Dict[str, Any]:
     """
     Scrape complet d'une entreprise (news + optionnellement interviews)
     """
-    async with aiohttp.ClientSession() as session:
-        results = {}
+    with tracing.span(company_name, kind="company"):
+        async with aiohttp.ClientSession() as session:
+            results = {}
         
-        # Company News
-        news = await scrape_company_news(session, company_name, company_website, industry)
-        if news:
-            results['news'] = news
+            # Company News
+            news = await scrape_company_news(session, company_name, company_website, industry, tiers)
+            if news:
+                results['news'] = news
         
-        # Management Interviews (optionnel)
-        if include_interviews:
-            interviews = await scrape_management_interviews(session, company_name, company_website, industry)
-            if interviews:
-                results['interviews'] = interviews
+            # Management Interviews (optionnel)
+            if include_interviews:
+                interviews = await scrape_management_interviews(session, company_name, company_website, industry, tiers)
+                if interviews:
+                    results['interviews'] = interviews
         
-        return results
+            return results
 
 
 async def main():
@@ -400,8 +509,14 @@ async def main():
     parser = argparse.ArgumentParser(description='Scraper HYBRIDE : Perplexity + OpenAI')
     parser.add_argument('--company', type=str, help='Nom d\'une entreprise')
     parser.add_argument('--interviews', action='store_true', help='Inclure management interviews')
+    parser.add_argument('--cascade', type=int, nargs='?', const=cascade.DEFAULT_THRESHOLD, metavar='SEUIL',
+                        help="Structuration gpt-4o-mini, reprise par gpt-4o des seuls articles notés >= SEUIL")
     
     args = parser.parse_args()
+    tiers = None
+    if args.cascade is not None:
+        tiers = cascade.Cascade.from_env("news", args.cascade, full_model="gpt-4o")
+        print(tiers.describe())
     
     if not args.company:
         print("❌ Veuillez spécifier --company <nom>")
@@ -434,8 +549,11 @@ async def main():
         company_info['name'],
         company_info['website'],
         company_info['industry'],
-        args.interviews
+        args.interviews,
+        tiers
     )
+    if tiers is not None:
+        cascade.stats(tiers.stage).print_summary()
     
     # Sauvegarder
     output_file = f'hybrid_{args.company.replace(" ", "_")}_results.json'
@@ -463,5 +581,7 @@ async def main():
 
 
 if __name__ == "__main__":
+    tracing.init("news_hybrid_async")
     asyncio.run(main())
+    tracing.finish()
 
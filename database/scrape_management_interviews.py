@@ -11,6 +11,14 @@ from typing import List, Dict, Any, Optional
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+import company_selection
+import dates
+import executive_index
+import merge_service
+import scheduler
+import tracing
+from storage import read_json, write_json_atomic
+
 # Charger les variables d'environnement depuis .env
 load_dotenv()
 
@@ -21,65 +29,9 @@ if not OPENAI_API_KEY:
 MAX_CONCURRENT_REQUESTS = 5  # Nombre de requêtes simultanées
 client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
-async def get_management_interviews(company_name: str, company_website: str = "", industry: str = "") -> Dict[str, Any]:
-    """
-    Récupère les interviews et articles du management d'une entreprise en utilisant OpenAI Web Search (ASYNC)
-    
-    Args:
-        company_name: Nom de l'entreprise
-        company_website: Site web de l'entreprise (optionnel)
-        industry: Industrie de l'entreprise (optionnel)
-        
-    Returns:
-        Dict contenant les interviews structurées
-    """
-    
-    print(f"\n🎤 Recherche des interviews management pour {company_name}...")
-    
-    # Build the prompt to target management interviews
-    prompt = f"""You are an expert in researching executive interviews and leadership content for business intelligence.
-
-Target company: {company_name}
-Industry: {industry if industry else "Not specified"}
-Website: {company_website if company_website else "Not specified"}
-
-Context: Presti is an AI solution that helps home & furniture companies generate lifestyle product images at scale, independently of their supply chain. We need to understand the strategic priorities and vision of key decision-makers to tailor our sales approach.
-
-TARGET PERSONAS & JOB TITLES TO FOCUS ON:
-
-🎯 **PRIMARY TARGETS** (C-Level & VPs in relevant functions):
-- CEO / Chief Executive Officer / President / Managing Director
-- CMO / Chief Marketing Officer / VP Marketing / Head of Marketing
-- CDO / Chief Digital Officer / VP Digital / Digital Director
-- Chief E-commerce Officer / VP E-commerce / E-commerce Director / Head of E-commerce
-- CTO / Chief Technology Officer / VP Technology / Head of Technology
-- Chief Creative Officer / Creative Director / VP Creative
-- Chief Design Officer / VP Design / Design Director / Head of Design
-- VP Innovation / Innovation Director
-- VP Brand / Brand Director / Head of Brand
-- VP Product / Product Director
-- VP Content / Content Director
-
-🎯 **SECONDARY TARGETS** (Directors & Managers):
-- Director of E-commerce / E-commerce Manager
-- Director of Digital Marketing / Digital Marketing Manager
-- Director of Content / Content Manager
-- Director of Product Marketing
-- Director of Visual Merchandising
-- Director of Customer Experience
-- Art Director
-- Photography Director / Head of Photography
-
-⚠️⚠️⚠️ CRITICAL DATE REQUIREMENT - ABSOLUTE RULE ⚠️⚠️⚠️
-- ONLY include content from 2020, 2021, 2022, 2023, 2024 (ideally last 18-24 months)
-- ❌ NEVER INCLUDE content from 2019 or earlier (2019, 2018, 2017, 2016, 2015, 2014, 2013, etc.)
-- ❌ If publication date is before January 1, 2020 → DO NOT INCLUDE IT
-- The business landscape pre-COVID (before 2020) is completely different and irrelevant
-- This is a HARD CUTOFF - no exceptions, no "highly relevant" pre-2020 content
-
-IMPORTANT: Provide ALL content in ENGLISH ONLY.
-
-🔍 WEB SEARCH METHODOLOGY - MANAGEMENT INTERVIEWS:
+def full_search_patterns(company_name: str, company_website: str) -> str:
+    """Méthodologie de recherche complète (scraping historique, 10-15 recherches)"""
+    return f"""🔍 WEB SEARCH METHODOLOGY - MANAGEMENT INTERVIEWS:
 
 You have access to web search. Use it EXTENSIVELY with MULTIPLE search patterns focused on PEOPLE and INTERVIEWS.
 
@@ -177,7 +129,98 @@ First-party content from the company:
 5️⃣ **Company Sources (2 searches):**
    - "{company_name} LinkedIn"
    - "{company_name} blog" OR "{company_name} leadership"
+"""
+
+
+def window_search_patterns(company_name: str, company_website: str, window: dates.ScrapeWindow) -> str:
+    """Recherche compacte pour une fenêtre courte : quelques requêtes datées au lieu de 10-15"""
+    min_searches, max_searches = window.search_budget
+    month = f"{window.end:%B %Y}"
+    site_query = f'\n- "site:{company_website} leadership"' if company_website else ""
+    return f"""🔍 WEB SEARCH - SHORT DATE WINDOW:
+Only content published {window.describe()} is wanted; older coverage is out of scope.
+⚡ SEARCH BUDGET: run {min_searches}-{max_searches} web searches, no more, restricted to recent results:
+- "{company_name} CEO interview {month}"
+- "{company_name} executive interview" OR "{company_name} podcast" OR "{company_name} keynote"
+- "{company_name} CMO" OR "{company_name} Chief Digital Officer" OR "{company_name} VP E-commerce"{site_query}
+
+Do not run broad historical searches: anything published before {window.start:%B %d, %Y} is discarded.
+A handful of items (or none) is a normal result for a short window."""
+
+
+async def get_management_interviews(company_name: str, company_website: str = "", industry: str = "",
+                                    window: Optional[dates.ScrapeWindow] = None) -> Dict[str, Any]:
+    """
+    Récupère les interviews et articles du management d'une entreprise en utilisant OpenAI Web Search (ASYNC)
+    
+    Args:
+        company_name: Nom de l'entreprise
+        company_website: Site web de l'entreprise (optionnel)
+        industry: Industrie de l'entreprise (optionnel)
+        window: Fenêtre de dates recherchée (défaut : historique complet depuis 2020)
+        
+    Returns:
+        Dict contenant les interviews structurées
+    """
+    
+    window = window or dates.scrape_window()
+    print(f"\n🎤 Recherche des interviews management pour {company_name} ({window.describe()})...")
+    
+    # Fenêtre courte : prompt de recherche compact (2-8 recherches au lieu de 10-15)
+    date_requirement = dates.date_requirement(window, "content")
+    date_check = dates.date_check(window)
+    final_check = dates.final_date_check(window)
+    if window.is_short:
+        search_patterns = window_search_patterns(company_name, company_website, window)
+        # Pas d'objectif chiffré : il pousserait le modèle à compléter avec des contenus hors fenêtre
+        volume = "- TARGET: only content published in the window, ONLY with real URLs - there is no minimum count"
+        verified = "- Better to return 1 VERIFIED interview (or none) than content from outside the window"
+        minimum = "- Returning few or zero items is normal for a short window - never pad with older content"
+    else:
+        search_patterns = full_search_patterns(company_name, company_website)
+        volume = "- TARGET: 10-15 items, but ONLY with real URLs from web search results"
+        verified = "- Better to have 8 VERIFIED interviews than 15 hallucinated ones"
+        minimum = "- Must find 10-15 items minimum"
+    
+    # Build the prompt to target management interviews
+    prompt = f"""You are an expert in researching executive interviews and leadership content for business intelligence.
+
+Target company: {company_name}
+Industry: {industry if industry else "Not specified"}
+Website: {company_website if company_website else "Not specified"}
+
+Context: Presti is an AI solution that helps home & furniture companies generate lifestyle product images at scale, independently of their supply chain. We need to understand the strategic priorities and vision of key decision-makers to tailor our sales approach.
+
+TARGET PERSONAS & JOB TITLES TO FOCUS ON:
+
+🎯 **PRIMARY TARGETS** (C-Level & VPs in relevant functions):
+- CEO / Chief Executive Officer / President / Managing Director
+- CMO / Chief Marketing Officer / VP Marketing / Head of Marketing
+- CDO / Chief Digital Officer / VP Digital / Digital Director
+- Chief E-commerce Officer / VP E-commerce / E-commerce Director / Head of E-commerce
+- CTO / Chief Technology Officer / VP Technology / Head of Technology
+- Chief Creative Officer / Creative Director / VP Creative
+- Chief Design Officer / VP Design / Design Director / Head of Design
+- VP Innovation / Innovation Director
+- VP Brand / Brand Director / Head of Brand
+- VP Product / Product Director
+- VP Content / Content Director
+
+🎯 **SECONDARY TARGETS** (Directors & Managers):
+- Director of E-commerce / E-commerce Manager
+- Director of Digital Marketing / Digital Marketing Manager
+- Director of Content / Content Manager
+- Director of Product Marketing
+- Director of Visual Merchandising
+- Director of Customer Experience
+- Art Director
+- Photography Director / Head of Photography
 
+{date_requirement}
+
+IMPORTANT: Provide ALL content in ENGLISH ONLY.
+
+{search_patterns}
 🎯 EXECUTION APPROACH:
 - Start with C-LEVEL searches (CEO, CMO, CDO)
 - Then search by STRATEGIC TOPICS (digital, e-commerce, marketing)
@@ -220,15 +263,15 @@ First-party content from the company:
 - **1-3**: Minimal executive insights or generic content
 
 CRITICALLY IMPORTANT - QUALITY OVER QUANTITY:
-- TARGET: 10-15 items, but ONLY with real URLs from web search results
+{volume}
 - ⚠️ **NO HALLUCINATIONS**: If you can't find a real URL, don't include the item
 - Focus on QUALITY over quantity - we want substantive interviews with verifiable sources
 - Each item MUST feature a named executive with their title
 - Each item MUST have a real, clickable URL (no placeholders, no brackets)
 - Include the FULL NAME of the executive and their EXACT TITLE
 - Extract SPECIFIC QUOTES or insights when possible
-- Look for content from 2020 onwards (ideally LAST 18-24 MONTHS)
-- Better to have 8 VERIFIED interviews than 15 hallucinated ones
+- Look for content published {window.describe()}
+{verified}
 - If an executive is quoted extensively in a company news article, include it (with real URL)
 
 📰 HOW TO USE WEB SEARCH RESULTS - CRITICAL INSTRUCTIONS:
@@ -248,8 +291,7 @@ CRITICALLY IMPORTANT - QUALITY OVER QUANTITY:
 
 Other requirements:
 - Get ACTUAL publication dates (use specific dates like "Nov 02, 2023", not "recent")
-- ⚠️ CRITICAL: Check the year - if before 2020, EXCLUDE IT (2019, 2018, 2017, 2016, 2015, 2014, 2013... = EXCLUDE)
-- ⚠️ ONLY valid years: 2020, 2021, 2022, 2023, 2024
+{date_check}
 - Use EXACT titles from articles/videos/podcasts as they appear in search results
 - Include the EXECUTIVE'S FULL NAME and EXACT TITLE as mentioned in the source
 - Extract 2-3 KEY QUOTES or insights from the executive (only if found in the source)
@@ -261,16 +303,12 @@ IMPORTANT: Aim for 10-15 relevant items with REAL URLs. Use MULTIPLE SEARCH QUER
 However, ONLY include items where you have a real, clickable URL from web search results.
 Better to return 8 high-quality items with real sources than 15 items with hallucinated/placeholder URLs.
 
-⚠️ FINAL CHECK BEFORE RETURNING JSON:
-- Go through each item and verify the published_date year
-- If ANY item has year < 2020, REMOVE IT from the output
-- Examples of INVALID years to exclude: 2019, 2018, 2017, 2016, 2015, 2014, 2013, 2012, 2011, 2010, etc.
-- ONLY valid years: 2020, 2021, 2022, 2023, 2024
+{final_check}
 
 Format your response in JSON with this structure:
 {{
   "company_name": "{company_name}",
-  "search_date": "2025-01-06",
+  "search_date": "{window.end.isoformat()}",
   "management_items": [
     {{
       "title": "Exact title of interview/article/talk",
@@ -313,25 +351,28 @@ CRITICAL for overall_assessment:
 REMEMBER: 
 - ALL TEXT MUST BE IN ENGLISH
 - Focus on QUALITY interviews/insights with STRATEGIC RELEVANCE
-- Must find 10-15 items minimum
+{minimum}
 - Each item MUST include executive name and title
 - Extract ACTUAL QUOTES when available"""
 
     try:
         # Utilisation de la Responses API ASYNC avec web_search
-        response = await client.responses.create(
-            model="gpt-4o",
-            tools=[
-                {
-                    "type": "web_search",
-                    "external_web_access": True
-                }
-            ],
-            tool_choice="auto",
-            input=prompt,
-            temperature=0.3,
-            max_output_tokens=4000,
-        )
+        with tracing.span("responses.web_search", kind="api", api="openai.responses", model="gpt-4o", company=company_name) as api_span:
+            response = await client.responses.create(
+                model="gpt-4o",
+                tools=[
+                    {
+                        "type": "web_search",
+                        "external_web_access": True
+                    }
+                ],
+                tool_choice="auto",
+                input=prompt,
+                temperature=0.3,
+                max_output_tokens=4000,
+            )
+            if getattr(response, 'usage', None):
+                api_span.set(tokens=response.usage.total_tokens)
         
         # Extraction du contenu de la Responses API
         result_text = response.output_text if hasattr(response, 'output_text') else ""
@@ -372,12 +413,20 @@ REMEMBER:
                 "raw_response": result_text
             }
         
+        # Items hors fenêtre écartés localement (pas de nouvel appel au modèle)
+        interviews_data["management_items"], dropped = window.filter(interviews_data.get("management_items", []))
+        if dropped:
+            print(f"🗓️  {dropped} contenus hors fenêtre écartés pour {company_name}")
+        
         # Ajout des métadonnées
         interviews_data["scrape_metadata"] = {
             "timestamp": datetime.now().isoformat(),
             "model": "gpt-4o",
-            "success": len(interviews_data.get("management_items", [])) > 0,
-            "web_search_used": True
+            # Fenêtre courte : aucun nouvel item est un résultat valide
+            "success": len(interviews_data.get("management_items", [])) > 0 or (window.is_short and "raw_response" not in interviews_data),
+            "web_search_used": True,
+            "dropped_out_of_window": dropped,
+            **window.to_metadata()
         }
         
         print(f"✅ {len(interviews_data.get('management_items', []))} interviews trouvées pour {company_name}")
@@ -401,21 +450,25 @@ REMEMBER:
             "scrape_metadata": {
                 "timestamp": datetime.now().isoformat(),
                 "model": "gpt-4o",
-                "success": False
+                "success": False,
+                **window.to_metadata()
             }
         }
 
 
-async def process_single_company(company_name: str, company_info: Dict, semaphore: asyncio.Semaphore) -> tuple[str, Dict]:
+async def process_single_company(company_name: str, company_info: Dict, semaphore: asyncio.Semaphore,
+                                 window: Optional[dates.ScrapeWindow] = None) -> tuple[str, Dict]:
     """
     Traite une seule entreprise avec limitation de concurrence
     """
-    async with semaphore:
-        interviews = await get_management_interviews(
-            company_name=company_name,
-            company_website=company_info.get("website", ""),
-            industry=company_info.get("industry", "")
-        )
+    with tracing.span(company_name, kind="company"):
+        async with tracing.queued(semaphore, api="openai.responses"):
+            interviews = await get_management_interviews(
+                company_name=company_name,
+                company_website=company_info.get("website", ""),
+                industry=company_info.get("industry", ""),
+                window=window
+            )
         return company_name, interviews
 
 
@@ -423,23 +476,32 @@ def save_results_periodically(interviews_data: Dict, output_file: str):
     """
     Sauvegarde périodique des résultats
     """
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(interviews_data, f, indent=2, ensure_ascii=False)
+    with tracing.span("save_results", kind="save", path=output_file, entries=len(interviews_data)):
+        write_json_atomic(output_file, interviews_data)
 
 
-async def process_all_companies(input_file: str = "jobs_data.json", output_file: str = "management_interviews.json"):
+async def process_all_companies(input_file: str = "jobs_data.json", output_file: str = "management_interviews.json",
+                                only: Optional[List[str]] = None, days: Optional[int] = None,
+                                selection: Optional[company_selection.Selection] = None,
+                                budget: Optional[scheduler.Budget] = None):
     """
     Traite toutes les entreprises de manière ASYNCHRONE avec workers parallèles
+    
+    only: si fourni, (re)traite uniquement ces entreprises, même si déjà traitées avec succès
+    days: refresh sur les N derniers jours ; chaque entreprise n'est recherchée que depuis son
+          dernier scraping et les nouveaux items sont fusionnés avec les existants
+    selection: restreint les entreprises de input_file (company_selection : shard, filtres)
+    budget: plafond d'appels / de dollars ; les entreprises sont traitées par priorité (scheduler), celles
+            hors budget sont reportées. Avec `only`, l'ordre donné est conservé (déjà planifié par l'appelant)
     """
     
     print("🚀 Démarrage du scraping ASYNCHRONE des interviews management...")
     print(f"⚡ Mode: {MAX_CONCURRENT_REQUESTS} requêtes simultanées")
     
     # Chargement des données existantes
-    with open(input_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = read_json(input_file)
     
-    companies_list = data.get("companies", [])
+    companies_list = company_selection.filter_entries(data.get("companies", []), selection)
     companies = {}
     for company_data in companies_list:
         if "company" in company_data and "name" in company_data["company"]:
@@ -452,17 +514,28 @@ async def process_all_companies(input_file: str = "jobs_data.json", output_file:
     interviews_data = {}
     if os.path.exists(output_file):
         try:
-            with open(output_file, 'r', encoding='utf-8') as f:
-                interviews_data = json.load(f)
+            interviews_data = read_json(output_file)
             print(f"📂 {len(interviews_data)} interviews déjà récupérées")
         except:
             interviews_data = {}
     
     # Filtrer les entreprises déjà traitées avec succès
-    companies_to_process = {
-        name: info for name, info in companies.items()
-        if name not in interviews_data or not interviews_data[name].get("scrape_metadata", {}).get("success")
-    }
+    if only is not None:
+        companies_to_process = {name: companies[name] for name in only if name in companies}
+    elif days is not None:
+        companies_to_process = companies
+    else:
+        companies_to_process = {
+            name: info for name, info in companies.items()
+            if name not in interviews_data or not interviews_data[name].get("scrape_metadata", {}).get("success")
+        }
+    
+    if only is None:
+        entries = {c["company"]["name"]: c for c in companies_list if c.get("company")}
+        planned = scheduler.plan("interviews", companies_to_process, entries, budget)
+        if len(planned) < len(companies_to_process):
+            print(f"💰 {len(companies_to_process) - len(planned)} entreprises reportées (budget atteint)")
+        companies_to_process = {name: companies_to_process[name] for name in planned}
     
     print(f"🔄 {len(companies_to_process)} entreprises à traiter")
     
@@ -475,7 +548,10 @@ async def process_all_companies(input_file: str = "jobs_data.json", output_file:
     
     # Créer les tâches pour toutes les entreprises
     tasks = [
-        process_single_company(name, info, semaphore)
+        process_single_company(
+            name, info, semaphore,
+            window=dates.scrape_window(days, interviews_data.get(name)) if days is not None else None
+        )
         for name, info in companies_to_process.items()
     ]
     
@@ -486,6 +562,13 @@ async def process_all_companies(input_file: str = "jobs_data.json", output_file:
     for coro in asyncio.as_completed(tasks):
         try:
             company_name, company_interviews = await coro
+            with executive_index.open_index() as executives:
+                if days is not None and company_name in interviews_data:
+                    # Refresh fenêtré : fusion avec les items déjà collectés
+                    company_interviews, _ = merge_service.merge_company(interviews_data[company_name], company_interviews, "interviews", company_name, executives)
+                else:
+                    # Rescrape complet : la liste reçue remplace celle de ce fichier
+                    executives.apply(company_name, company_interviews, prune=days is None)
             interviews_data[company_name] = company_interviews
             completed += 1
             
@@ -516,16 +599,18 @@ async def process_all_companies(input_file: str = "jobs_data.json", output_file:
     print(f"   - Moyenne par entreprise: {total_interviews/len(interviews_data):.1f}")
 
 
-async def test_single_company(company_name: str = "California Closets"):
+async def test_single_company(company_name: str = "California Closets", merge_into: Optional[str] = None,
+                              days: Optional[int] = None):
     """
     Test sur une seule entreprise pour validation (ASYNC)
+    
+    days: fenêtre de recherche ; avec merge_into, elle démarre au dernier scraping de l'entreprise
     """
     
     print(f"🧪 Test ASYNC sur {company_name}...")
     
     # Chargement des infos de l'entreprise
-    with open("jobs_data.json", 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    data = read_json("jobs_data.json")
     
     companies_list = data.get("companies", [])
     company_info = {}
@@ -541,18 +626,26 @@ async def test_single_company(company_name: str = "California Closets"):
         return
     
     # Récupération des interviews
+    previous = read_json(merge_into, {}).get(company_name) if merge_into else None
+    window = dates.scrape_window(days, previous) if days is not None else None
     interviews = await get_management_interviews(
         company_name=company_name,
         company_website=company_info.get("website", ""),
-        industry=company_info.get("industry", "")
+        industry=company_info.get("industry", ""),
+        window=window
     )
     
     # Sauvegarde du test
-    with open("management_interviews_test.json", 'w', encoding='utf-8') as f:
-        json.dump({company_name: interviews}, f, indent=2, ensure_ascii=False)
-    
-    print(f"\n✅ Test terminé!")
-    print(f"📁 Résultat sauvegardé dans management_interviews_test.json")
+    if merge_into:
+        # Refresh depuis le dashboard : fusion directe (verrou + écriture atomique), sans fichier intermédiaire partagé
+        stats = merge_service.merge_into(merge_into, {company_name: interviews}, "interviews")
+        print(f"\n✅ Fusionné dans {merge_into}")
+        print(f"MERGE_STATS {json.dumps(stats[company_name])}")
+    else:
+        with tracing.span("save_results", kind="save", path="management_interviews_test.json"):
+            write_json_atomic("management_interviews_test.json", {company_name: interviews})
+        print(f"\n✅ Test terminé!")
+        print(f"📁 Résultat sauvegardé dans management_interviews_test.json")
     print(f"\n📊 Résumé:")
     print(f"   - Interviews trouvées: {len(interviews.get('management_items', []))}")
     print(f"   - Executives identifiés: {len(interviews.get('key_executives_identified', []))}")
@@ -573,7 +666,11 @@ if __name__ == "__main__":
     parser.add_argument('mode', nargs='?', default='full', help='Mode: test or full (default: full)')
     parser.add_argument('--company', type=str, help='Company name to scrape (for single company mode)')
     parser.add_argument('--days', type=int, help='Number of days to look back (e.g., 7, 30, 90)')
+    parser.add_argument('--merge-into', type=str, help='Merge the single-company result into this frontend file (locked, atomic)')
     parser.add_argument('test_company', nargs='?', help='Company name for test mode (positional arg)')
+    parser.add_argument('--output', default='management_interviews.json', help='Output file for full mode (one per shard)')
+    company_selection.add_arguments(parser)
+    scheduler.add_arguments(parser)
     
     args = parser.parse_args()
     
@@ -582,13 +679,17 @@ if __name__ == "__main__":
         # Mode test sur une seule entreprise
         company = args.company or args.test_company or "California Closets"
         
-        # TODO: In future, pass days parameter to the scraping function
-        # to modify the prompt with specific date range
         if args.days:
             print(f"🔍 Searching for interviews from last {args.days} days for {company}")
         
-        asyncio.run(test_single_company(company))
+        tracing.init("interviews_single")
+        asyncio.run(test_single_company(company, merge_into=args.merge_into, days=args.days))
+        tracing.finish()
     else:
         # Mode complet avec workers parallèles
-        asyncio.run(process_all_companies())
+        tracing.init("interviews")
+        asyncio.run(process_all_companies(output_file=args.output, days=args.days,
+                                          selection=company_selection.from_args(args),
+                                          budget=scheduler.from_args(args)))
+        tracing.finish()
 
@@ -15,6 +15,10 @@ import argparse
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+import citation_filter
+import prompt_cache
+import tracing
+
 # Charger les variables d'environnement depuis .env
 load_dotenv()
 
@@ -162,28 +166,31 @@ Search broadly and prioritize content with actionable strategic insights about d
     }
     
     try:
-        async with session.post(PERPLEXITY_URL, headers=headers, json=payload, timeout=90) as response:
-            if response.status != 200:
-                error_text = await response.text()
-                print(f"❌ Erreur Perplexity (status {response.status})")
-                return None
+        with tracing.span("perplexity.search", kind="api", api="perplexity", model="sonar",
+                          company=company_name, search_type=search_type) as api_span:
+            async with session.post(PERPLEXITY_URL, headers=headers, json=payload, timeout=90) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    print(f"❌ Erreur Perplexity (status {response.status})")
+                    return None
             
-            result = await response.json()
+                result = await response.json()
             
-            if 'choices' not in result or len(result['choices']) == 0:
-                print(f"⚠️ Aucun résultat Perplexity")
-                return None
+                if 'choices' not in result or len(result['choices']) == 0:
+                    print(f"⚠️ Aucun résultat Perplexity")
+                    return None
             
-            content = result['choices'][0]['message']['content']
-            citations = result.get('citations', [])
+                content = result['choices'][0]['message']['content']
+                citations = result.get('citations', [])
+                api_span.set(citations=len(citations), tokens=(result.get('usage') or {}).get('total_tokens', 0))
             
-            print(f"✅ Perplexity : {len(content)} caractères, {len(citations)} citations")
+                print(f"✅ Perplexity : {len(content)} caractères, {len(citations)} citations")
             
-            return {
-                "raw_content": content,
-                "citations": citations,
-                "company_name": company_name
-            }
+                return {
+                    "raw_content": content,
+                    "citations": citations,
+                    "company_name": company_name
+                }
     
     except Exception as e:
         print(f"❌ Erreur Perplexity: {e}")
@@ -196,12 +203,22 @@ async def structure_with_openai(
 ) -> Optional[Dict[str, Any]]:
     """
     ÉTAPE 2 : Structuration avec OpenAI (JSON propre et fiable)
+    Retourne [] si rien de nouveau n'est à structurer, None en cas d'erreur
     """
     
     company_name = perplexity_data['company_name']
     raw_content = perplexity_data['raw_content']
     citations = perplexity_data['citations']
     
+    prepared = citation_filter.prepare(raw_content, citations, company_name,
+                                       citation_filter.known_urls(company_name, search_type))
+    print(prepared.describe())
+    if not prepared.content:
+        print(f"⏭️  Rien de nouveau à structurer pour {company_name}")
+        return []
+    raw_content = prepared.content
+    citations_block = prepared.citations_block()
+    
     print(f"\n📊 [OpenAI] Structuration des données pour {company_name}...")
     
     if search_type == "news":
@@ -263,7 +280,7 @@ SEARCH RESULT:
 {raw_content}
 
 CITATIONS (verified URLs):
-{json.dumps(citations, indent=2)}
+{citations_block}
 
 INSTRUCTIONS:
 1. Extract EVERY article mentioned (aim for 15-25 articles minimum)
@@ -351,7 +368,7 @@ SEARCH RESULT:
 {raw_content}
 
 CITATIONS (verified URLs):
-{json.dumps(citations, indent=2)}
+{citations_block}
 
 CRITICAL INSTRUCTIONS:
 1. Extract EVERY interview/article mentioned (aim for 10-15 minimum)
@@ -367,15 +384,17 @@ CRITICAL INSTRUCTIONS:
 Return ONLY the JSON object with the exact structure specified in the system prompt."""
     
     try:
-        response = await openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.1
-        )
+        with tracing.span("chat.completions", kind="api", api="openai.chat", model="gpt-4o", company=company_name) as api_span:
+            response = await openai_client.chat.completions.create(
+                model="gpt-4o",
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                response_format={"type": "json_object"},
+                temperature=0.1
+            )
+            api_span.set(**prompt_cache.usage_attrs(response.usage))
         
         content = response.choices[0].message.content
         structured_data = json.loads(content)
@@ -415,7 +434,8 @@ async def scrape_company_news(
     # Étape 2 : Structuration OpenAI
     structured_articles = await structure_with_openai(perplexity_result, "news")
     
-    if not structured_articles:
+    # [] : rien de nouveau depuis le dernier scraping, ce n'est pas un échec
+    if structured_articles is None:
         return None
     
     return {
@@ -453,7 +473,8 @@ async def scrape_management_interviews(
     # Étape 2 : Structuration OpenAI
     structured_interviews = await structure_with_openai(perplexity_result, "interviews")
     
-    if not structured_interviews:
+    # [] : rien de nouveau depuis le dernier scraping, ce n'est pas un échec
+    if structured_interviews is None:
         return None
     
     return {
@@ -479,21 +500,22 @@ async def scrape_company(
     """
     Scrape complet d'une entreprise (news + optionnellement interviews)
     """
-    async with aiohttp.ClientSession() as session:
-        results = {}
+    with tracing.span(company_name, kind="company"):
+        async with aiohttp.ClientSession() as session:
+            results = {}
         
-        # Company News
-        news = await scrape_company_news(session, company_name, company_website, industry)
-        if news:
-            results['news'] = news
+            # Company News
+            news = await scrape_company_news(session, company_name, company_website, industry)
+            if news:
+                results['news'] = news
         
-        # Management Interviews (optionnel)
-        if include_interviews:
-            interviews = await scrape_management_interviews(session, company_name, company_website, industry)
-            if interviews:
-                results['interviews'] = interviews
+            # Management Interviews (optionnel)
+            if include_interviews:
+                interviews = await scrape_management_interviews(session, company_name, company_website, industry)
+                if interviews:
+                    results['interviews'] = interviews
         
-        return results
+            return results
 
 
 async def main():
@@ -564,5 +586,7 @@ async def main():
 
 
 if __name__ == "__main__":
+    tracing.init("news_hybrid")
     asyncio.run(main())
+    tracing.finish()
 
@@ -14,6 +14,11 @@ import argparse
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+import citation_filter
+import dates
+import news_dedup
+import tracing
+
 # Charger les variables d'environnement depuis .env
 load_dotenv()
 
@@ -29,46 +34,6 @@ PERPLEXITY_URL = "https://api.perplexity.ai/chat/completions"
 openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
 
 
-def normalize_date_for_sorting(date_str: str) -> str:
-    """
-    Convertir la date en format YYYY-MM-DD pour le tri chronologique.
-    Garde published_date dans son format original.
-    
-    Args:
-        date_str: Date au format "December 2025", "2025-12-15", "2025", etc.
-    
-    Returns:
-        Date normalisée au format YYYY-MM-DD
-    """
-    if not date_str or date_str == "N/A":
-        return "2025-01-01"
-    
-    # Déjà au format YYYY-MM-DD
-    if len(date_str) == 10 and date_str[4] == '-' and date_str[7] == '-':
-        return date_str
-    
-    # Format "Month YYYY" (ex: "December 2025")
-    months = {
-        'january': '01', 'february': '02', 'march': '03', 'april': '04',
-        'may': '05', 'june': '06', 'july': '07', 'august': '08',
-        'september': '09', 'october': '10', 'november': '11', 'december': '12'
-    }
-    
-    for month_name, month_num in months.items():
-        if month_name.lower() in date_str.lower():
-            # Extraire l'année
-            parts = date_str.split()
-            year = parts[-1] if len(parts) > 0 else "2025"
-            return f"{year}-{month_num}-01"
-    
-    # Juste une année "2025"
-    if len(date_str) == 4 and date_str.isdigit():
-        return f"{date_str}-01-01"
-    
-    # Fallback
-    return "2025-01-01"
-
-
 async def search_perplexity_theme(
     session: aiohttp.ClientSession,
     company_name: str,
@@ -185,22 +150,24 @@ Focus on these roles: {theme_data['roles']}"""
     }
     
     try:
-        async with session.post(PERPLEXITY_URL, headers=headers, json=payload, timeout=90) as response:
-            if response.status != 200:
-                print(f"    ⚠️ Erreur {response.status} pour thème {theme}")
-                return {"theme": theme, "content": "", "citations": []}
-            
-            result = await response.json()
-            content = result['choices'][0]['message']['content']
-            citations = result.get('citations', [])
-            
-            print(f"    ✓ {len(citations)} citations trouvées")
-            
-            return {
-                "theme": theme,
-                "content": content,
-                "citations": citations
-            }
+        with tracing.span(f"sonar.{theme}", kind="api", api="perplexity", company=company_name, theme=theme) as api_span:
+            async with session.post(PERPLEXITY_URL, headers=headers, json=payload, timeout=90) as response:
+                api_span.set(status_code=response.status, success=response.status == 200)
+                if response.status != 200:
+                    print(f"    ⚠️ Erreur {response.status} pour thème {theme}")
+                    return {"theme": theme, "content": "", "citations": []}
+                
+                result = await response.json()
+                content = result['choices'][0]['message']['content']
+                citations = result.get('citations', [])
+                
+                print(f"    ✓ {len(citations)} citations trouvées")
+                
+                return {
+                    "theme": theme,
+                    "content": content,
+                    "citations": citations
+                }
     
     except Exception as e:
         print(f"    ❌ Erreur pour thème {theme}: {e}")
@@ -230,18 +197,27 @@ async def scrape_company_news_multi(
         
         all_results = await asyncio.gather(*tasks)
         
-        # Combiner tous les contenus et citations
+        # Préparation locale avant le prompt : articles déjà connus, sections hors sujet et dépassement du
+        # budget par thème retirés, puis passages repris d'un thème à l'autre et citations en double
+        known = citation_filter.known_urls(company_name, "news")
+        prepared = [
+            citation_filter.prepare(r['content'], r['citations'], company_name, known, citation_filter.THEME_TOKEN_BUDGET)
+            for r in all_results
+        ]
+        contents, removed_chars = news_dedup.dedup_passages([p.content for p in prepared])
         combined_content = "\n\n---THEME SEPARATOR---\n\n".join([
-            f"THEME: {r['theme']}\n{r['content']}"
-            for r in all_results if r['content']
+            f"THEME: {r['theme']}\n{content}"
+            for r, content in zip(all_results, contents) if content
         ])
         
-        all_citations = []
-        for r in all_results:
-            all_citations.extend(r['citations'])
+        all_citations = news_dedup.dedup_urls(url for p in prepared for url in p.urls)
+        citations_block = "\n".join(all_citations)
         
         print(f"\n✅ {len(all_results)} recherches terminées")
-        print(f"📊 Total: {len(combined_content)} caractères, {len(all_citations)} citations")
+        print(f"✂️  {sum(p.original_chars for p in prepared)} → {len(combined_content)} caractères "
+              f"({removed_chars} dédoublonnés, {sum(p.trimmed_chars for p in prepared)} coupés au budget), "
+              f"{sum(p.known_sections + p.off_topic_sections for p in prepared)} sections retirées")
+        print(f"📊 Citations : {len(all_citations)} gardées, {sum(p.known_citations for p in prepared)} déjà connues")
         
         # Structurer avec OpenAI
         print(f"\n📊 [OpenAI] Structuration de tous les articles...")
@@ -347,7 +323,7 @@ COMBINED SEARCH RESULTS:
 {combined_content}
 
 ALL CITATIONS:
-{json.dumps(list(set(all_citations)), indent=2)}
+{citations_block}
 
 CRITICAL INSTRUCTIONS:
 1. Extract unique articles (aim for 15-20 articles)
@@ -391,25 +367,30 @@ FILTERING EXAMPLES:
 
 Return ONLY the JSON object."""
         
-        response = await openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.1
-        )
+        # Rien de nouveau (tout est déjà connu) : pas d'appel de structuration
+        structured_data = {}
+        if combined_content:
+            with tracing.span("chat.completions.structuring", kind="api", api="openai.chat", model="gpt-4o", company=company_name) as api_span:
+                response = await openai_client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    response_format={"type": "json_object"},
+                    temperature=0.1
+                )
+                api_span.set(tokens=response.usage.total_tokens)
+            
+            structured_data = json.loads(response.choices[0].message.content)
+        else:
+            print("⏭️  Rien de nouveau à structurer")
         
-        structured_data = json.loads(response.choices[0].message.content)
-        articles = structured_data.get('articles', [])
+        articles = news_dedup.dedup_items(structured_data.get('articles', []))
         
         # Post-processing: Ajouter champ "date" normalisé pour le tri, garder published_date original
-        for article in articles:
-            original_date = article.get('published_date', '')
-            # published_date garde le format original (ex: "December 2025")
-            # date est normalisé pour le tri (ex: "2025-12-01")
-            article['date'] = normalize_date_for_sorting(original_date)
+        # (published_date garde le format original, ex: "December 2025" ; date est normalisé, ex: "2025-12-01")
+        dates.add_sort_keys(articles)
         
         print(f"✅ {len(articles)} articles uniques structurés")
         
@@ -451,18 +432,27 @@ async def scrape_management_interviews_multi(
         
         all_results = await asyncio.gather(*tasks)
         
-        # Combiner tous les contenus
+        # Préparation locale avant le prompt : articles déjà connus, sections hors sujet et dépassement du
+        # budget par thème retirés, puis passages repris d'un thème à l'autre et citations en double
+        known = citation_filter.known_urls(company_name, "interviews")
+        prepared = [
+            citation_filter.prepare(r['content'], r['citations'], company_name, known, citation_filter.THEME_TOKEN_BUDGET)
+            for r in all_results
+        ]
+        contents, removed_chars = news_dedup.dedup_passages([p.content for p in prepared])
         combined_content = "\n\n---THEME SEPARATOR---\n\n".join([
-            f"THEME: {r['theme']}\n{r['content']}"
-            for r in all_results if r['content']
+            f"THEME: {r['theme']}\n{content}"
+            for r, content in zip(all_results, contents) if content
         ])
         
-        all_citations = []
-        for r in all_results:
-            all_citations.extend(r['citations'])
+        all_citations = news_dedup.dedup_urls(url for p in prepared for url in p.urls)
+        citations_block = "\n".join(all_citations)
         
         print(f"\n✅ {len(all_results)} recherches terminées")
-        print(f"📊 Total: {len(combined_content)} caractères, {len(all_citations)} citations")
+        print(f"✂️  {sum(p.original_chars for p in prepared)} → {len(combined_content)} caractères "
+              f"({removed_chars} dédoublonnés, {sum(p.trimmed_chars for p in prepared)} coupés au budget), "
+              f"{sum(p.known_sections + p.off_topic_sections for p in prepared)} sections retirées")
+        print(f"📊 Citations : {len(all_citations)} gardées, {sum(p.known_citations for p in prepared)} déjà connues")
         
         # Structurer avec OpenAI
         print(f"\n📊 [OpenAI] Structuration de toutes les interviews...")
@@ -563,7 +553,7 @@ COMBINED SEARCH RESULTS:
 {combined_content}
 
 ALL CITATIONS:
-{json.dumps(list(set(all_citations)), indent=2)}
+{citations_block}
 
 CRITICAL INSTRUCTIONS:
 1. Extract unique interviews (aim for 10-12 HIGH-QUALITY interviews)
@@ -597,26 +587,31 @@ FILTERING EXAMPLES:
 
 Return ONLY the JSON object with the exact structure specified in the system prompt."""
         
-        response = await openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            response_format={"type": "json_object"},
-            temperature=0.1
-        )
+        # Rien de nouveau (tout est déjà connu) : pas d'appel de structuration
+        structured_data = {}
+        if combined_content:
+            with tracing.span("chat.completions.structuring", kind="api", api="openai.chat", model="gpt-4o", company=company_name) as api_span:
+                response = await openai_client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    response_format={"type": "json_object"},
+                    temperature=0.1
+                )
+                api_span.set(tokens=response.usage.total_tokens)
+            
+            structured_data = json.loads(response.choices[0].message.content)
+        else:
+            print("⏭️  Rien de nouveau à structurer")
         
-        structured_data = json.loads(response.choices[0].message.content)
-        interviews = structured_data.get('interviews', [])
+        interviews = news_dedup.dedup_items(structured_data.get('interviews', []))
         
         # Post-processing: Ajouter champ "date" normalisé pour le tri, garder published_date original
+        # (published_date garde le format original, ex: "December 2025" ; date est normalisé, ex: "2025-12-01")
+        dates.add_sort_keys(interviews)
         for interview in interviews:
-            original_date = interview.get('published_date', '')
-            # published_date garde le format original (ex: "December 2025")
-            # date est normalisé pour le tri (ex: "2025-12-01")
-            interview['date'] = normalize_date_for_sorting(original_date)
-            
             # S'assurer que relevance_score existe (frontend l'attend)
             if 'relevance_score' not in interview:
                 interview['relevance_score'] = interview.get('presti_score', 5)
@@ -660,21 +655,25 @@ async def main():
     print(f"🏢 Entreprise : {args.company}")
     print(f"{'='*80}")
     
+    tracing.init("news_multi")
     results = {}
     
     # Company News
-    news = await scrape_company_news_multi(args.company)
+    with tracing.span(args.company, kind="company", stage="news"):
+        news = await scrape_company_news_multi(args.company)
     results['news'] = news
     
     # Management Interviews
     if args.interviews:
-        interviews = await scrape_management_interviews_multi(args.company)
+        with tracing.span(args.company, kind="company", stage="interviews"):
+            interviews = await scrape_management_interviews_multi(args.company)
         results['interviews'] = interviews
     
     # Sauvegarder
     output_file = f'multi_{args.company.replace(" ", "_")}_results.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, indent=2, ensure_ascii=False)
+    with tracing.span("save_results", kind="save", path=output_file):
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
     
     print(f"\n{'='*80}")
     print(f"✅ Résultats sauvegardés dans {output_file}")
@@ -683,6 +682,8 @@ async def main():
     if args.interviews:
         print(f"🎤 Management Interviews : {len(interviews['interviews'])} interviews")
     print(f"{'='*80}\n")
+    
+    tracing.finish()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Accès disque partagé par les scripts du pipeline
+- Sérialisation JSON rapide : orjson si installé (5-10x plus rapide), sinon json de la stdlib
+- Sortie compacte pour les fichiers lus par des programmes (public/*.json, journaux .jsonl),
+  indentée pour les fichiers de travail relus à la main ; JSON_PRETTY=1/0 force l'un ou l'autre
+- Écriture JSON atomique (fichier temporaire dans le même dossier + os.replace), en gardant les permissions
+  du fichier remplacé (ou celles d'un open() classique : le web server doit pouvoir lire public/)
+- Verrou de fichier (fcntl.flock sur <fichier>.lock) pour les read-modify-write concurrents
+- Hash de contenu stable (états du pipeline et de la publication frontend)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de flock, les écritures restent atomiques
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:  # repli : json de la stdlib (même format de sortie)
+    orjson = None
+
+from models import encode
+
+# Dossiers dont les fichiers sont consommés par le frontend : toujours compacts
+COMPACT_DIRS = ("public",)
+
+# umask du process, lu une fois (os.umask ne se lit qu'en le modifiant)
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def dumps(data, pretty=False):
+    """JSON en bytes UTF-8 (caractères non ASCII conservés) ; pretty : indentation de 2 espaces
+
+    Les enregistrements de models.py sont sérialisés sous leur forme JSON d'origine
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        try:
+            return orjson.dumps(data, default=encode, option=option)
+        except TypeError:  # entier > 64 bits, type exotique : la stdlib tranche
+            pass
+    if pretty:
+        return json.dumps(data, indent=2, ensure_ascii=False, default=encode).encode('utf-8')
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=encode).encode('utf-8')
+
+
+def loads(payload):
+    """Décode du JSON (bytes ou str)"""
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+def content_hash(obj):
+    """Hash stable d'un objet JSON (ordre des clés normalisé) ; json de la stdlib pour que le hash ne
+    dépende pas du backend installé"""
+    payload = json.dumps(obj, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def is_pretty(path):
+    """Format par défaut d'un fichier : compact pour public/ et les .jsonl, indenté sinon (JSON_PRETTY force)"""
+    forced = os.environ.get("JSON_PRETTY")
+    if forced is not None and forced.strip() != "":
+        return forced.strip().lower() not in ("0", "false", "no", "off")
+    if path.endswith(".jsonl"):
+        return False
+    parts = os.path.abspath(path).split(os.sep)
+    return not any(d in parts[:-1] for d in COMPACT_DIRS)
+
+
+def read_json(path, default=None):
+    """Charge un fichier JSON, ou retourne `default` s'il n'existe pas"""
+    if not os.path.exists(path):
+        return default
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def _file_mode(path):
+    """Permissions à donner au fichier écrit : celles du fichier existant, sinon 0o666 moins l'umask"""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+def write_json_atomic(path, data, pretty=None):
+    """Écrit `data` dans `path` sans jamais exposer un fichier à moitié écrit
+
+    pretty : None = selon le fichier (is_pretty), True/False pour forcer
+    """
+    if pretty is None:
+        pretty = is_pretty(path)
+    payload = dumps(data, pretty)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp crée le fichier en 0600, que os.replace conserverait
+        os.chmod(tmp_path, _file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def append_jsonl(path, record, sync=True):
+    """Ajoute une ligne JSON compacte à un journal ; sync : sur disque avant de rendre la main"""
+    with open(path, 'ab') as f:
+        f.write(dumps(record) + b"\n")
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+
+
+@contextmanager
+def file_lock(path):
+    """Verrou exclusif inter-process associé à `path` (bloquant)"""
+    lock_path = path + ".lock"
+    with open(lock_path, 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def locked_json(path, default=None):
+    """
+    Read-modify-write sous verrou :
+
+        with locked_json("../public/news_data.json", {}) as data:
+            data["X"] = ...
+
+    Le fichier n'est réécrit (atomiquement) que si le bloc se termine sans erreur.
+    """
+    with file_lock(path):
+        data = read_json(path, default)
+        yield data
+        write_json_atomic(path, data)
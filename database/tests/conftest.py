@@ -0,0 +1,7 @@
+"""Les scripts de database/ s'importent par leur nom (lancés depuis ce dossier) : idem pour les tests"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("TRACE", "0")
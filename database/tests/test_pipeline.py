@@ -0,0 +1,54 @@
+"""Détection des entreprises obsolètes de pipeline.py, sur une étape factice"""
+
+import asyncio
+
+import pytest
+
+import pipeline
+from storage import read_json
+
+
+@pytest.fixture
+def stage(tmp_path, monkeypatch):
+    """Étape 'fake' : entrées et sorties en mémoire, appels de run enregistrés"""
+    monkeypatch.chdir(tmp_path)
+    inputs = {"Arhaus": {"jobs": 3}, "Costco": {"jobs": 5}}
+    outputs = {"Arhaus", "Costco"}
+    runs = []
+
+    async def run(stale):
+        runs.append(sorted(stale))
+        outputs.update(stale)
+
+    monkeypatch.setattr(pipeline, "STAGES", {"fake": {
+        "description": "Étape factice",
+        "deps": [],
+        "inputs": lambda: {name: dict(payload) for name, payload in inputs.items()},
+        "outputs": lambda: set(outputs),
+        "run": run,
+    }})
+    return inputs, outputs, runs
+
+
+def test_existing_outputs_are_adopted_with_their_hash(stage):
+    inputs, _, runs = stage
+    assert asyncio.run(pipeline.run_pipeline()) == {"fake": "fresh"}
+    assert runs == []
+    assert set(read_json(pipeline.STATE_FILE, {})["fake"]) == {"Arhaus", "Costco"}
+
+    inputs["Costco"]["jobs"] = 6
+    hashes, stale, adopted = pipeline.plan_stage("fake", read_json(pipeline.STATE_FILE, {}))
+    assert stale == ["Costco"]
+    assert adopted == {}
+
+    assert asyncio.run(pipeline.run_pipeline()) == {"fake": "ok"}
+    assert runs == [["Costco"]]
+    assert read_json(pipeline.STATE_FILE, {})["fake"]["Costco"] == hashes["Costco"]
+
+
+def test_missing_output_is_stale_and_dry_run_records_nothing(stage):
+    inputs, outputs, runs = stage
+    outputs.discard("Arhaus")
+    assert asyncio.run(pipeline.run_pipeline(dry_run=True)) == {"fake": "planned"}
+    assert runs == []
+    assert read_json(pipeline.STATE_FILE, {}) == {}
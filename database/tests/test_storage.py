@@ -0,0 +1,35 @@
+"""Écriture atomique de storage.py : permissions du fichier remplacé"""
+
+import os
+import stat
+
+import pytest
+
+import storage
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="permissions POSIX")
+
+
+def mode(path):
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_file_gets_default_permissions(tmp_path):
+    path = str(tmp_path / "data.json")
+    storage.write_json_atomic(path, {"a": 1})
+    assert mode(path) == 0o666 & ~storage._UMASK
+    assert storage.read_json(path) == {"a": 1}
+
+
+def test_existing_permissions_are_kept(tmp_path):
+    path = str(tmp_path / "data.json")
+    storage.write_json_atomic(path, {"a": 1})
+    os.chmod(path, 0o644)
+    storage.write_json_atomic(path, {"a": 2})
+    assert mode(path) == 0o644
+
+    os.chmod(path, 0o640)
+    with storage.locked_json(path, {}) as data:
+        data["b"] = 3
+    assert mode(path) == 0o640
+    assert storage.read_json(path) == {"a": 2, "b": 3}
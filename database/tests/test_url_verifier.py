@@ -0,0 +1,197 @@
+"""url_verifier contre un serveur aiohttp local (aucun accès réseau)"""
+
+import asyncio
+import socket
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+import url_verifier
+from storage import read_json, write_json_atomic
+from url_verifier import UrlVerifier
+
+ARTICLE = """<html><head>
+<title>Fallback title</title>
+<meta property="og:title" content="Arhaus launches a 3D room planner">
+<meta property="article:published_time" content="2025-03-04T10:00:00Z">
+</head><body>...</body></html>"""
+
+
+def free_port():
+    """Port libre (libéré à la fermeture : rien n'y écoute tant que le test ne s'y lie pas)"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def stub_server(port=0):
+    """Serveur local : (base_url, {chemin: [méthodes reçues]}) ; un port fixe garde les mêmes URLs d'un run à l'autre"""
+    hits = {}
+
+    async def handler(request):
+        hits.setdefault(request.path, []).append(request.method)
+        path = request.path
+        if path == "/no-head":
+            if request.method == "HEAD":
+                return web.Response(status=405)
+            return web.Response(text=ARTICLE, content_type="text/html")
+        if path in ("/gone-404", "/gone-410", "/forbidden", "/rate-limited"):
+            status = {"/gone-404": 404, "/gone-410": 410, "/forbidden": 403, "/rate-limited": 429}[path]
+            return web.Response(status=status)
+        if path == "/old-url":
+            raise web.HTTPMovedPermanently("/article")
+        if path == "/article":
+            return web.Response(text=ARTICLE, content_type="text/html")
+        return web.Response(status=500)
+
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}", hits
+    finally:
+        await runner.cleanup()
+
+
+def verify(urls, cache_file=None, metadata=False, port=0):
+    """Vérifie des chemins du serveur local ; retourne ({chemin: Verification}, hits, stats)"""
+    async def run():
+        async with stub_server(port) as (base, hits):
+            async with UrlVerifier(cache_file, timeout=5) as verifier:
+                results = {path: await verifier.verify(base + path, metadata) for path in urls}
+            return results, hits, verifier.stats
+    return asyncio.run(run())
+
+
+def test_head_refused_falls_back_to_get():
+    results, hits, stats = verify(["/no-head"])
+    result = results["/no-head"]
+    assert hits["/no-head"] == ["HEAD", "GET"]
+    assert result.state == "ok" and result.method == "GET"
+    assert stats["head"] == 1 and stats["get"] == 1
+
+
+def test_get_reads_page_metadata():
+    results, _, _ = verify(["/article"], metadata=True)
+    assert results["/article"].title == "Arhaus launches a 3D room planner"
+    assert results["/article"].published == "2025-03-04"
+
+
+def test_404_and_410_are_dead():
+    results, _, _ = verify(["/gone-404", "/gone-410"])
+    assert results["/gone-404"].state == "dead"
+    assert results["/gone-410"].state == "dead"
+
+
+def test_403_and_429_are_inconclusive():
+    results, _, _ = verify(["/forbidden", "/rate-limited"])
+    for path in ("/forbidden", "/rate-limited"):
+        assert not results[path].dead
+        assert results[path].state == "blocked"
+
+
+def test_redirect_is_followed():
+    results, hits, _ = verify(["/old-url"])
+    result = results["/old-url"]
+    assert result.state == "ok"
+    assert result.final_url.endswith("/article")
+    assert "/article" in hits
+
+    item = {"title": "Old", "url": result.url}
+    url_verifier.apply_verification(item, result)
+    assert item["url_check"]["final_url"].endswith("/article")
+
+
+def test_connection_refused_is_an_error_not_dead():
+    port = free_port()
+
+    async def run():
+        async with UrlVerifier(None, timeout=5) as verifier:
+            return await verifier.verify(f"http://127.0.0.1:{port}/article")
+
+    result = asyncio.run(run())
+    assert result.error == "connection"
+    assert result.state == "error" and not result.dead
+
+
+def test_dns_failure_is_inconclusive(tmp_path):
+    cache_file = str(tmp_path / "cache.json")
+
+    async def run():
+        async with UrlVerifier(cache_file, timeout=5) as verifier:
+            return await verifier.verify("http://article.example.invalid/story")
+
+    result = asyncio.run(run())
+    assert result.error == "dns"
+    assert result.state == "error" and not result.dead
+
+    # Mis en cache avec le TTL des échecs : redemandé le lendemain
+    cached = url_verifier.Verification.from_dict(next(iter(read_json(cache_file).values())))
+    checked = datetime.fromisoformat(cached.checked_at)
+    assert cached.fresh(checked + timedelta(hours=23), url_verifier.TTL_DAYS, url_verifier.FAILURE_TTL_DAYS)
+    assert not cached.fresh(checked + timedelta(days=2), url_verifier.TTL_DAYS, url_verifier.FAILURE_TTL_DAYS)
+
+
+def test_cache_is_reused_within_ttl(tmp_path):
+    cache_file = str(tmp_path / "cache.json")
+    port = free_port()
+    verify(["/article", "/rate-limited"], cache_file, port=port)
+    assert len(read_json(cache_file)) == 2
+
+    # Deuxième run : les deux URLs sont servies par le cache, aucune requête
+    _, hits, stats = verify(["/article", "/rate-limited"], cache_file, port=port)
+    assert hits == {}
+    assert stats["cached"] == 2
+
+
+def test_cache_expires_after_ttl(tmp_path):
+    cache_file = str(tmp_path / "cache.json")
+    port = free_port()
+    verify(["/article", "/rate-limited"], cache_file, port=port)
+
+    # Vérifiées il y a 3 jours : le succès (TTL 7 j) reste valable, l'échec (TTL 1 j) est redemandé
+    cache = read_json(cache_file)
+    three_days_ago = (datetime.now() - timedelta(days=3)).isoformat(timespec="seconds")
+    for entry in cache.values():
+        entry["checked_at"] = three_days_ago
+    write_json_atomic(cache_file, cache)
+
+    _, hits, stats = verify(["/article", "/rate-limited"], cache_file, port=port)
+    assert "/article" not in hits
+    assert "/rate-limited" in hits
+    assert stats["cached"] == 1
+
+
+def test_verify_file_keeps_items_merged_during_verification(tmp_path, monkeypatch):
+    path = str(tmp_path / "news.json")
+    verify_items = url_verifier.verify_items
+
+    async def run():
+        async with stub_server() as (base, _):
+            write_json_atomic(path, {"Arhaus": {"news_items": [
+                {"title": "Arhaus launches a 3D room planner", "url": base + "/article", "published_date": "2025"},
+                {"title": "Removed story", "url": base + "/gone-404", "published_date": "2025-01-01"},
+            ]}})
+
+            async def concurrent_merge(verifier, items, metadata="missing"):
+                # Un scraper fusionne un nouvel item pendant la vérification
+                data = read_json(path)
+                data["Arhaus"]["news_items"].append({"title": "New story", "url": base + "/new"})
+                write_json_atomic(path, data)
+                return await verify_items(verifier, items, metadata)
+
+            monkeypatch.setattr(url_verifier, "verify_items", concurrent_merge)
+            await url_verifier.verify_file(path, drop_dead=True, cache_file=None)
+
+    asyncio.run(run())
+    items = read_json(path)["Arhaus"]["news_items"]
+    assert [item["title"] for item in items] == ["Arhaus launches a 3D room planner", "New story"]
+    assert items[0]["url_check"]["state"] == "ok"
+    assert items[0]["published_date"] == "2025-03-04"
+    assert "url_check" not in items[1]
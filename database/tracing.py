@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Instrumentation par spans du pipeline (stage, company, job, api, retry, save)
+- Timings monotones (perf_counter_ns), indépendants de l'horloge système
+- Export JSONL (un span par ligne) + format Chrome trace optionnel (chrome://tracing, Perfetto)
+- Résumé de fin de run : latences p50/p95/p99 par API, temps passé en I/O disque et en file d'attente
+
+Configuration via variables d'environnement (.env) :
+    TRACE=0                 désactive l'écriture des fichiers (le résumé reste affiché)
+    TRACE_DIR=traces        dossier de sortie des traces
+    TRACE_CHROME=1          écrit aussi <run>.chrome.json
+"""
+
+import asyncio
+import contextvars
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+
+SPAN_KINDS = ("stage", "company", "job", "api", "retry", "save", "load", "queue")
+IO_KINDS = ("save", "load")
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def _env_flag(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off", "")
+
+
+def percentile(sorted_values, pct):
+    """Percentile (méthode nearest-rank) sur une liste déjà triée"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Span:
+    """Un intervalle mesuré ; `set()` permet d'ajouter des attributs en cours de route"""
+
+    __slots__ = ("id", "parent_id", "name", "kind", "attrs", "start_ns", "end_ns", "lane", "status")
+
+    def __init__(self, span_id, parent_id, name, kind, attrs, lane):
+        self.id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attrs = attrs
+        self.lane = lane
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.status = "ok"
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    @property
+    def duration_ms(self):
+        end = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_record(self, origin_ns):
+        return {
+            "id": self.id,
+            "parent": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ms": round((self.start_ns - origin_ns) / 1e6, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "lane": self.lane,
+            "attrs": self.attrs,
+        }
+
+
+class Tracer:
+    """Collecte les spans d'un run et les écrit au fil de l'eau en JSONL"""
+
+    def __init__(self):
+        self.run_name = None
+        self.origin_ns = time.perf_counter_ns()
+        self.started_at = datetime.now()
+        self.spans = []
+        self.jsonl_path = None
+        self.chrome_path = None
+        self._file = None
+        self._ids = itertools.count(1)
+        self._lanes = {}
+        self._lock = threading.Lock()
+
+    def init(self, run_name, trace_dir=None, write_files=None, chrome=None):
+        """Démarre un run ; à appeler une fois au début du main() de chaque script"""
+        self.close()
+        self.run_name = run_name
+        self.origin_ns = time.perf_counter_ns()
+        self.started_at = datetime.now()
+        self.spans = []
+        self._lanes = {}
+
+        if write_files is None:
+            write_files = _env_flag("TRACE", True)
+        if chrome is None:
+            chrome = _env_flag("TRACE_CHROME", False)
+
+        self.jsonl_path = None
+        self.chrome_path = None
+        if write_files:
+            trace_dir = trace_dir or os.environ.get("TRACE_DIR", "traces")
+            os.makedirs(trace_dir, exist_ok=True)
+            base = os.path.join(trace_dir, f"{run_name}_{self.started_at.strftime('%Y%m%d_%H%M%S')}")
+            self.jsonl_path = base + ".jsonl"
+            self.chrome_path = base + ".chrome.json" if chrome else None
+            self._file = open(self.jsonl_path, "w", encoding="utf-8", buffering=1)
+            self._write({
+                "type": "run",
+                "run": run_name,
+                "started_at": self.started_at.isoformat(),
+                "pid": os.getpid(),
+            })
+        return self
+
+    def _write(self, record):
+        if self._file:
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+    def _lane(self):
+        """Identifiant de "piste" : la tâche asyncio courante, sinon le thread"""
+        try:
+            key = id(asyncio.current_task())
+        except RuntimeError:
+            key = None
+        if not key:
+            key = threading.get_ident()
+        with self._lock:
+            return self._lanes.setdefault(key, len(self._lanes) + 1)
+
+    @contextmanager
+    def span(self, name, kind="stage", **attrs):
+        parent = _current_span.get()
+        span = Span(next(self._ids), parent.id if parent else None, name, kind, attrs, self._lane())
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.attrs.setdefault("error", f"{type(e).__name__}: {e}"[:200])
+            raise
+        finally:
+            span.end_ns = time.perf_counter_ns()
+            _current_span.reset(token)
+            with self._lock:
+                self.spans.append(span)
+                self._write(span.to_record(self.origin_ns))
+
+    @asynccontextmanager
+    async def queued(self, semaphore, name="queue_wait", **attrs):
+        """Comme `async with semaphore`, en mesurant le temps d'attente d'un slot"""
+        with self.span(name, kind="queue", **attrs):
+            await semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+    def summary(self):
+        """Agrège les spans terminés : latences par API, stages, I/O disque, attente"""
+        by_api = defaultdict(list)
+        by_stage = defaultdict(float)
+        io = defaultdict(lambda: {"count": 0, "total_ms": 0.0})
+        queue = defaultdict(lambda: {"count": 0, "total_ms": 0.0})
+        retries = defaultdict(int)
+        errors = defaultdict(int)
+        prompt_tokens = defaultdict(int)
+        cached_tokens = defaultdict(int)
+
+        for s in self.spans:
+            if s.kind == "api":
+                by_api[s.attrs.get("api", s.name)].append(s.duration_ms)
+                if s.status == "error" or s.attrs.get("success") is False:
+                    errors[s.attrs.get("api", s.name)] += 1
+                prompt_tokens[s.attrs.get("api", s.name)] += s.attrs.get("prompt_tokens") or 0
+                cached_tokens[s.attrs.get("api", s.name)] += s.attrs.get("cached_tokens") or 0
+            elif s.kind == "stage":
+                by_stage[s.name] += s.duration_ms
+            elif s.kind in IO_KINDS:
+                io[s.kind]["count"] += 1
+                io[s.kind]["total_ms"] += s.duration_ms
+            elif s.kind == "queue":
+                key = s.attrs.get("api", s.name)
+                queue[key]["count"] += 1
+                queue[key]["total_ms"] += s.duration_ms
+            elif s.kind == "retry":
+                retries[s.attrs.get("api", s.name)] += 1
+
+        apis = {}
+        for api, durations in by_api.items():
+            durations.sort()
+            apis[api] = {
+                "count": len(durations),
+                "errors": errors.get(api, 0),
+                "retries": retries.get(api, 0),
+                "p50_ms": round(percentile(durations, 50), 1),
+                "p95_ms": round(percentile(durations, 95), 1),
+                "p99_ms": round(percentile(durations, 99), 1),
+                "max_ms": round(durations[-1], 1),
+                "total_ms": round(sum(durations), 1),
+                "prompt_tokens": prompt_tokens.get(api, 0),
+                "cached_tokens": cached_tokens.get(api, 0),
+            }
+
+        return {
+            "run": self.run_name,
+            "wall_ms": round((time.perf_counter_ns() - self.origin_ns) / 1e6, 1),
+            "apis": apis,
+            "stages": {k: round(v, 1) for k, v in by_stage.items()},
+            "disk_io": {k: {"count": v["count"], "total_ms": round(v["total_ms"], 1)} for k, v in io.items()},
+            "queue_wait": {k: {"count": v["count"], "total_ms": round(v["total_ms"], 1)} for k, v in queue.items()},
+        }
+
+    def print_summary(self, summary=None):
+        summary = summary or self.summary()
+        print("\n" + "=" * 70)
+        print(f"⏱️  TRACE SUMMARY - {summary['run']} ({summary['wall_ms'] / 1000:.1f}s)")
+        print("=" * 70)
+        if summary["apis"]:
+            print(f"   {'API':28} {'calls':>6} {'err':>4} {'p50':>9} {'p95':>9} {'p99':>9} {'cache':>6}")
+            for api, st in sorted(summary["apis"].items()):
+                # Part des tokens d'entrée servis depuis le cache de prompt (APIs qui le rapportent)
+                prompt = st.get('prompt_tokens', 0)
+                cache = f"{100 * st.get('cached_tokens', 0) / prompt:5.0f}%" if prompt else f"{'-':>6}"
+                print(f"   {api[:28]:28} {st['count']:6} {st['errors']:4} "
+                      f"{st['p50_ms']:8.0f}ms {st['p95_ms']:8.0f}ms {st['p99_ms']:8.0f}ms {cache}")
+        for kind, st in summary["disk_io"].items():
+            print(f"   💾 Disk {kind:5} : {st['count']} ops, {st['total_ms'] / 1000:.2f}s")
+        for key, st in summary["queue_wait"].items():
+            print(f"   ⏳ Queue {key[:20]:20} : {st['total_ms'] / 1000:.2f}s cumulated over {st['count']} waits")
+        for stage, total in summary["stages"].items():
+            print(f"   🧩 Stage {stage[:30]:30} : {total / 1000:.2f}s")
+        if self.jsonl_path:
+            print(f"   📁 Trace: {self.jsonl_path}")
+        if self.chrome_path:
+            print(f"   📁 Chrome trace: {self.chrome_path}")
+        print("=" * 70)
+
+    def write_chrome_trace(self, path):
+        """Export au format Chrome trace (événements complets "X", timestamps en µs)"""
+        pid = os.getpid()
+        events = [{
+            "name": "process_name", "ph": "M", "pid": pid,
+            "args": {"name": self.run_name or "pipeline"},
+        }]
+        for s in sorted(self.spans, key=lambda s: s.start_ns):
+            events.append({
+                "name": s.name,
+                "cat": s.kind,
+                "ph": "X",
+                "ts": (s.start_ns - self.origin_ns) / 1e3,
+                "dur": (s.end_ns - s.start_ns) / 1e3,
+                "pid": pid,
+                "tid": s.lane,
+                "args": {**s.attrs, "status": s.status},
+            })
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False, default=str)
+
+    def finish(self, print_summary=True):
+        """Termine le run : résumé dans le JSONL, export Chrome, affichage"""
+        summary = self.summary()
+        self._write({"type": "summary", **summary})
+        if self.chrome_path:
+            self.write_chrome_trace(self.chrome_path)
+        if print_summary:
+            self.print_summary(summary)
+        self.close()
+        return summary
+
+    def detach(self):
+        """Dans un process fils (fork) : ne plus écrire dans le fichier de trace hérité du parent"""
+        self._file = None
+        self.chrome_path = None
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+tracer = Tracer()
+
+# Raccourcis au niveau module : `with tracing.span(...)`, `async with tracing.queued(...)`
+init = tracer.init
+span = tracer.span
+queued = tracer.queued
+finish = tracer.finish
+summary = tracer.summary
+
+
+def load_trace(path):
+    """Relit un fichier JSONL de trace (spans uniquement)"""
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if "kind" in record:
+                spans.append(record)
+    return spans
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Résumé / conversion d'une trace JSONL")
+    parser.add_argument("trace", help="Fichier .jsonl produit par un script du pipeline")
+    parser.add_argument("--chrome", type=str, help="Écrit aussi la trace au format Chrome vers ce chemin")
+    args = parser.parse_args()
+
+    replay = Tracer()
+    replay.run_name = os.path.basename(args.trace)
+    records = load_trace(args.trace)
+    for r in records:
+        s = Span(r["id"], r["parent"], r["name"], r["kind"], r["attrs"], r.get("lane", 1))
+        s.start_ns = replay.origin_ns + int(r["start_ms"] * 1e6)
+        s.end_ns = s.start_ns + int(r["duration_ms"] * 1e6)
+        s.status = r.get("status", "ok")
+        replay.spans.append(s)
+
+    result = replay.summary()
+    result["wall_ms"] = round(max((r["start_ms"] + r["duration_ms"] for r in records), default=0), 1)
+    replay.print_summary(result)
+    if args.chrome:
+        replay.write_chrome_trace(args.chrome)
+        print(f"✅ Chrome trace: {args.chrome}")
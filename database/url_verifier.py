@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+Vérification locale des URLs des news / interviews scrapées
+- Client HTTP mutualisé (une session aiohttp, pool de connexions) et concurrence bornée par domaine
+- HEAD d'abord ; GET si le serveur refuse HEAD, en cas d'erreur, ou si les métadonnées de la page
+  sont nécessaires (og:title, date de publication)
+- Cache persistant par URL canonique (url_verification_cache.json) avec TTL : une URL vérifiée n'est
+  pas redemandée avant expiration (plus court pour les échecs, souvent transitoires)
+- Chaque item reçoit `url_check` (statut, URL finale, titre de la page) ; la date de la page complète
+  `published_date` absente ou trop vague, et corrige une date incohérente (l'originale est gardée dans
+  `published_date_reported`)
+
+Usage :
+    python url_verifier.py company_news.json                     # rapport, sans écrire
+    python url_verifier.py ../public/news_data.json --write      # url_check + dates corrigées
+    python url_verifier.py company_news.json --write --drop-dead --company "Arhaus"
+    python url_verifier.py company_news.json --metadata all      # GET sur toutes les pages
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import socket
+import time
+from datetime import datetime, timedelta
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+import dates
+import news_dedup
+import tracing
+from storage import locked_json, read_json
+
+CACHE_FILE = "url_verification_cache.json"
+TTL_DAYS = 7
+FAILURE_TTL_DAYS = 1
+MAX_CONNECTIONS = 20
+PER_DOMAIN = 2
+TIMEOUT_SECONDS = 15
+MAX_BYTES = 512 * 1024          # le <head> suffit : on ne lit pas les pages entières
+DATE_TOLERANCE_DAYS = 2         # écart toléré entre la date annoncée et celle de la page
+USER_AGENT = "Mozilla/5.0 (compatible; presti-url-verifier/1.0)"
+
+# Réponses qui ne disent rien de l'article (bot bloqué, limite de débit) : ni vivant ni mort
+BLOCKED_STATUSES = {401, 403, 429, 999}
+DEAD_STATUSES = {404, 410}
+HEAD_REFUSED = {403, 405, 406, 501}
+
+METADATA_MODES = ("missing", "all", "none")
+ITEMS_KEYS = ("news_items", "management_items")
+# Champs qu'une vérification écrit sur un item (reportés sur le fichier relu sous verrou)
+VERIFIED_FIELDS = ("url_check", "published_date", "date", "published_date_reported", "title")
+
+# Balises de date, par ordre de confiance
+DATE_META = (
+    "article:published_time", "og:published_time", "datepublished", "publishdate", "pubdate",
+    "publish-date", "parsely-pub-date", "sailthru.date", "dc.date", "dc.date.issued", "date",
+    "article:modified_time",
+)
+_JSONLD_DATE = re.compile(r'"datePublished"\s*:\s*"([^"]+)"')
+
+
+class _MetaParser(HTMLParser):
+    """<title>, balises <meta> (property / name / itemprop) et premier <time datetime>"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.meta: Dict[str, str] = {}
+        self.title = ""
+        self.time = None
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "meta":
+            key = (attrs.get("property") or attrs.get("name") or attrs.get("itemprop") or "").lower()
+            if key and attrs.get("content") and key not in self.meta:
+                self.meta[key] = attrs["content"].strip()
+        elif tag == "title":
+            self._in_title = True
+        elif tag == "time" and self.time is None and attrs.get("datetime"):
+            self.time = attrs["datetime"]
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+
+
+def parse_metadata(html: str) -> Dict[str, Optional[str]]:
+    """{'title', 'published'} d'une page (published : "YYYY-MM-DD" ou None)"""
+    parser = _MetaParser()
+    try:
+        parser.feed(html)
+    except Exception:
+        pass  # HTML invalide : on garde ce qui a été lu
+    title = parser.meta.get("og:title") or parser.meta.get("twitter:title") or " ".join(parser.title.split())
+    candidates = [parser.meta.get(key) for key in DATE_META]
+    jsonld = _JSONLD_DATE.search(html)
+    candidates += [jsonld.group(1) if jsonld else None, parser.time]
+    published = None
+    for value in candidates:
+        # Horodatage ISO : seule la partie date compte (2025-03-04T10:00:00Z -> 2025-03-04)
+        value = value[:10] if value and re.match(r"\d{4}-\d{2}-\d{2}", value) else value
+        published = dates.normalize(value) if value else None
+        if published:
+            break
+    return {"title": title or None, "published": published}
+
+
+class Verification:
+    """Résultat de la vérification d'une URL (forme stockée dans le cache et dans `url_check`)"""
+
+    __slots__ = ("url", "status", "final_url", "method", "title", "published", "error", "checked_at")
+
+    def __init__(self, url: str, status: Optional[int] = None, final_url: Optional[str] = None,
+                 method: Optional[str] = None, title: Optional[str] = None, published: Optional[str] = None,
+                 error: Optional[str] = None, checked_at: Optional[str] = None):
+        self.url = url
+        self.status = status
+        self.final_url = final_url
+        self.method = method
+        self.title = title
+        self.published = published
+        self.error = error
+        self.checked_at = checked_at or datetime.now().isoformat(timespec="seconds")
+
+    @property
+    def ok(self) -> bool:
+        return self.status is not None and self.status < 400
+
+    @property
+    def dead(self) -> bool:
+        """
+        Article introuvable de façon certaine (404/410, URL invalide). Un échec DNS n'en est pas un : sur une
+        machine sans résolution fiable, toutes les URLs échoueraient et seraient retirées (--drop-dead)
+        """
+        return self.status in DEAD_STATUSES or self.error == "invalid_url"
+
+    @property
+    def state(self) -> str:
+        if self.ok:
+            return "ok"
+        if self.dead:
+            return "dead"
+        return "blocked" if self.status in BLOCKED_STATUSES else "error"
+
+    def fresh(self, now: datetime, ttl_days: float, failure_ttl_days: float) -> bool:
+        ttl = ttl_days if self.ok or self.dead else failure_ttl_days
+        try:
+            return now - datetime.fromisoformat(self.checked_at) < timedelta(days=ttl)
+        except ValueError:
+            return False
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__ if getattr(self, name) is not None}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Verification":
+        return cls(**{name: data.get(name) for name in cls.__slots__})
+
+
+class UrlVerifier:
+    """
+    Vérificateur à utiliser comme contexte asynchrone (session ouverte, cache relu puis sauvegardé) :
+
+        async with UrlVerifier() as verifier:
+            result = await verifier.verify(url, metadata=True)
+    """
+
+    def __init__(self, cache_file: Optional[str] = CACHE_FILE, ttl_days: float = TTL_DAYS,
+                 failure_ttl_days: float = FAILURE_TTL_DAYS, per_domain: int = PER_DOMAIN,
+                 max_connections: int = MAX_CONNECTIONS, timeout: float = TIMEOUT_SECONDS):
+        self.cache_file = cache_file
+        self.ttl_days = ttl_days
+        self.failure_ttl_days = failure_ttl_days
+        self.per_domain = per_domain
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.cache: Dict[str, Dict] = {}
+        self.session: Optional[aiohttp.ClientSession] = None
+        self._domains: Dict[str, asyncio.Semaphore] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {"cached": 0, "head": 0, "get": 0}
+
+    async def __aenter__(self) -> "UrlVerifier":
+        if self.cache_file:
+            self.cache = read_json(self.cache_file, {})
+        connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.per_domain,
+                                         ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.5"},
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+        self.save()
+
+    def save(self):
+        if self.cache_file:
+            with tracing.span("save_url_cache", kind="save", path=self.cache_file, entries=len(self.cache)):
+                # Fusion sous verrou : deux vérifications concurrentes ne s'écrasent pas
+                with locked_json(self.cache_file, {}) as on_disk:
+                    on_disk.update(self.cache)
+
+    def _domain(self, url: str) -> asyncio.Semaphore:
+        host = news_dedup.canonical_url(url).split("/", 1)[0]
+        if host not in self._domains:
+            self._domains[host] = asyncio.Semaphore(self.per_domain)
+        return self._domains[host]
+
+    async def verify(self, url: str, metadata: bool = False) -> Verification:
+        """Vérifie une URL (cache d'abord) ; metadata : GET obligatoire pour lire titre et date"""
+        key = news_dedup.canonical_url(url)
+        cached = self.cache.get(key)
+        if cached:
+            result = Verification.from_dict(cached)
+            usable = not metadata or result.method == "GET" or not result.ok
+            if usable and result.fresh(datetime.now(), self.ttl_days, self.failure_ttl_days):
+                self.stats["cached"] += 1
+                return result
+        # Une même URL demandée plusieurs fois en parallèle (items en double) : un seul aller-retour
+        task_key = f"{key}|{metadata}"
+        if task_key not in self._inflight:
+            self._inflight[task_key] = asyncio.ensure_future(self._fetch(url, metadata))
+        try:
+            result = await self._inflight[task_key]
+        finally:
+            self._inflight.pop(task_key, None)
+        self.cache[key] = result.to_dict()
+        return result
+
+    async def _fetch(self, url: str, metadata: bool) -> Verification:
+        if not urlsplit(url).scheme:
+            url = "https://" + url
+        if urlsplit(url).scheme not in ("http", "https") or not urlsplit(url).hostname:
+            return Verification(url, error="invalid_url")
+        async with tracing.queued(self._domain(url), api="http.verify"):
+            if not metadata:
+                result = await self._request(url, "HEAD")
+                # HEAD refusé, erreur serveur ou réseau : nouvelle tentative en GET (inutile si le domaine ne résout pas)
+                if result.error == "dns" or (result.status is not None and result.status not in HEAD_REFUSED
+                                             and result.status < 500):
+                    return result
+            return await self._request(url, "GET")
+
+    async def _request(self, url: str, method: str) -> Verification:
+        self.stats[method.lower()] += 1
+        with tracing.span(method, kind="api", api="http.verify", method=method) as span:
+            try:
+                async with self.session.request(method, url, allow_redirects=True) as response:
+                    span.set(status_code=response.status, success=response.status < 400)
+                    result = Verification(url, response.status, str(response.url), method)
+                    content_type = response.headers.get("Content-Type", "")
+                    if method == "GET" and response.status < 400 and "html" in content_type:
+                        raw = await response.content.read(MAX_BYTES)
+                        page = parse_metadata(raw.decode(response.charset or "utf-8", errors="replace"))
+                        result.title, result.published = page["title"], page["published"]
+                    return result
+            except aiohttp.ClientConnectorError as e:
+                span.set(success=False, error=str(e)[:200])
+                # Échec de résolution : domaine inventé ou DNS indisponible, non concluant (TTL des échecs)
+                error = "dns" if isinstance(e.os_error, socket.gaierror) else "connection"
+                return Verification(url, method=method, error=error)
+            except (aiohttp.InvalidURL, ValueError):
+                span.set(success=False)
+                return Verification(url, method=method, error="invalid_url")
+            except asyncio.TimeoutError:
+                span.set(success=False, error="timeout")
+                return Verification(url, method=method, error="timeout")
+            except aiohttp.ClientError as e:
+                span.set(success=False, error=str(e)[:200])
+                return Verification(url, method=method, error=type(e).__name__)
+
+
+def needs_metadata(item: Dict, mode: str = "missing") -> bool:
+    """GET nécessaire : date absente ou plus vague qu'un jour, ou titre absent (mode "missing")"""
+    if mode == "all":
+        return True
+    if mode == "none":
+        return False
+    period = dates.parse_date_range(item.get("published_date"))
+    return not item.get("title") or period is None or period[0] != period[1]
+
+
+def apply_verification(item: Dict, result: Verification) -> Optional[str]:
+    """
+    Reporte la vérification sur l'item ; retourne "filled" / "refined" / "corrected" si la date de
+    publication a été complétée, précisée ou corrigée (None sinon)
+    """
+    check = {"status": result.status, "state": result.state, "checked_at": result.checked_at}
+    if result.final_url and news_dedup.canonical_url(result.final_url) != news_dedup.canonical_url(item.get("url")):
+        check["final_url"] = result.final_url
+    if result.error:
+        check["error"] = result.error
+    if result.title:
+        check["page_title"] = result.title
+        if item.get("title"):
+            # Titre de la page très différent : URL probablement attribuée au mauvais article
+            check["title_match"] = round(news_dedup.jaccard(
+                frozenset(news_dedup.words(result.title)), frozenset(news_dedup.words(item["title"]))), 2)
+        else:
+            item["title"] = result.title
+    item["url_check"] = check
+
+    page_date = result.published
+    if not page_date:
+        return None
+    period = dates.parse_date_range(item.get("published_date"))
+    if period is None:
+        change = "filled"
+    else:
+        day = dates.parse_date(page_date)
+        tolerance = timedelta(days=DATE_TOLERANCE_DAYS)
+        if period[0] - tolerance <= day <= period[1] + tolerance:
+            if period[0] == period[1]:
+                return None
+            change = "refined"
+        else:
+            change = "corrected"
+            item["published_date_reported"] = item.get("published_date")
+    item["published_date"] = page_date
+    item["date"] = page_date
+    check["date_source"] = "page"
+    return change
+
+
+async def verify_items(verifier: UrlVerifier, items: List[Dict], metadata: str = "missing") -> Dict[str, int]:
+    """Vérifie les items en parallèle (bornés par domaine) ; compteurs par état et par correction de date"""
+    counts: Dict[str, int] = {}
+    targets = [item for item in items if item.get("url")]
+    results = await asyncio.gather(*(
+        verifier.verify(item["url"], needs_metadata(item, metadata)) for item in targets
+    ))
+    for item, result in zip(targets, results):
+        counts[result.state] = counts.get(result.state, 0) + 1
+        change = apply_verification(item, result)
+        if change:
+            counts[change] = counts.get(change, 0) + 1
+    return counts
+
+
+async def verify_file(path: str, companies: Optional[Iterable[str]] = None, metadata: str = "missing",
+                      write: bool = True, drop_dead: bool = False,
+                      cache_file: Optional[str] = CACHE_FILE) -> Dict[str, Dict[str, int]]:
+    """
+    Vérifie les items de `path` ({entreprise: {news_items | management_items}}) ;
+    retourne {entreprise: compteurs}
+    """
+    data = read_json(path, {})
+    only = set(companies) if companies is not None else None
+    selected = {
+        name: entry for name, entry in data.items()
+        if isinstance(entry, dict) and (only is None or name in only)
+    }
+    report: Dict[str, Dict[str, int]] = {}
+    verified: Dict[str, Dict[str, Dict[str, Dict]]] = {}  # {entreprise: {clé: {URL canonique: item}}}
+    async with UrlVerifier(cache_file) as verifier:
+        with tracing.span("verify_urls", path=path, companies=len(selected)):
+            for name, entry in selected.items():
+                for key in ITEMS_KEYS:
+                    items = entry.get(key)
+                    if not items:
+                        continue
+                    counts = await verify_items(verifier, items, metadata)
+                    verified.setdefault(name, {})[key] = {
+                        news_dedup.canonical_url(item["url"]): item for item in items if item.get("url")
+                    }
+                    if drop_dead:
+                        entry[key] = [item for item in items if item.get("url_check", {}).get("state") != "dead"]
+                        counts["dropped"] = len(items) - len(entry[key])
+                    totals = report.setdefault(name, {})
+                    for k, v in counts.items():
+                        totals[k] = totals.get(k, 0) + v
+                    dates.add_sort_keys(entry[key])
+        print(f"🌐 Requêtes : {verifier.stats['head']} HEAD, {verifier.stats['get']} GET, "
+              f"{verifier.stats['cached']} servies par le cache")
+
+    if write:
+        # Relecture sous verrou : les listes ont pu recevoir des items (scraper, merge_service) pendant la
+        # vérification ; seuls les champs vérifiés sont reportés, item par item (URL canonique)
+        with locked_json(path, {}) as current:
+            for name in report:
+                if isinstance(current.get(name), dict):
+                    for key in ITEMS_KEYS:
+                        if key in selected[name] and current[name].get(key):
+                            current[name][key] = report_verified(current[name][key], verified[name].get(key, {}),
+                                                                 drop_dead)
+    return report
+
+
+def report_verified(items: List[Dict], verified: Dict[str, Dict], drop_dead: bool = False) -> List[Dict]:
+    """
+    Reporte sur `items` les champs de vérification des items vérifiés ({URL canonique: item}) ; les
+    items inconnus de la vérification (ajoutés entre-temps) sont laissés tels quels
+    """
+    kept = []
+    for item in items:
+        source = verified.get(news_dedup.canonical_url(item.get("url")))
+        if source is not None:
+            if drop_dead and source.get("url_check", {}).get("state") == "dead":
+                continue
+            for field in VERIFIED_FIELDS:
+                if field in source and (field != "title" or not item.get("title")):
+                    item[field] = source[field]
+        kept.append(item)
+    return kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vérification des URLs des news / interviews")
+    parser.add_argument("file", help="company_news.json, management_interviews.json ou fichier de public/")
+    parser.add_argument("--company", nargs="+", help="Ne vérifier que ces entreprises")
+    parser.add_argument("--metadata", default="missing", choices=METADATA_MODES,
+                        help="GET pour lire titre et date : si la date manque ou est vague (défaut), toujours, jamais")
+    parser.add_argument("--write", action="store_true", help="Écrit url_check et les dates corrigées")
+    parser.add_argument("--drop-dead", action="store_true", help="Retire les items dont l'URL n'existe pas (404/410)")
+    parser.add_argument("--cache", default=CACHE_FILE, help="Cache des vérifications ('' pour le désactiver)")
+    args = parser.parse_args()
+
+    tracing.init("url_verifier")
+    started = time.perf_counter()
+    report = asyncio.run(verify_file(args.file, args.company, args.metadata, args.write, args.drop_dead,
+                                     args.cache or None))
+    totals: Dict[str, int] = {}
+    for name, counts in report.items():
+        for k, v in counts.items():
+            totals[k] = totals.get(k, 0) + v
+        if counts.get("dead") or counts.get("corrected"):
+            print(f"   {name[:40]:40} {json.dumps(counts, ensure_ascii=False)}")
+    print(f"✅ {len(report)} entreprises vérifiées en {time.perf_counter() - started:.1f}s : "
+          f"{json.dumps(totals, ensure_ascii=False)}")
+    if args.write:
+        print(f"💾 {args.file} mis à jour")
+    tracing.finish()
+
+
+if __name__ == "__main__":
+    main()
@@ -62,11 +62,13 @@ export function ManagementInterviewsTab({ items: rawItems, companyName, executiv
     
     items.forEach(item => {
       if (item.executive_name) {
-        const existing = executiveMap.get(item.executive_name);
+        // executive_id (executive_index.py) groups aliases of the same person
+        const key = item.executive_id || item.executive_name;
+        const existing = executiveMap.get(key);
         if (existing) {
           existing.content_count += 1;
         } else {
-          executiveMap.set(item.executive_name, {
+          executiveMap.set(key, {
             name: item.executive_name,
             title: item.executive_title || '',
             content_count: 1,
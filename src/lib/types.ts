@@ -106,6 +106,34 @@ export interface TrendCategory {
   evidence: string[];
 }
 
+// Vélocité d'embauche calculée localement (database/hiring_velocity.py)
+export interface HiringVelocityCategory {
+  job_count: number;
+  previous_count: number;
+  per_month: number;
+  acceleration: number;
+  trend_slope: number;
+  hiring_velocity: TrendCategory["hiring_velocity"];
+  change_point: {
+    week_of: string;
+    direction: "up" | "down";
+    per_week_before: number;
+    per_week_after: number;
+  } | null;
+  weekly: number[];
+}
+
+export interface HiringMetrics {
+  analysis_period: TrendsAnalysis["analysis_period"];
+  total_postings: number;
+  monthly: Record<string, number>;
+  categories: {
+    all: HiringVelocityCategory;
+    digital_growth_product: HiringVelocityCategory;
+    visual_content_creative: HiringVelocityCategory;
+  };
+}
+
 export interface TrendsAnalysis {
   company_name: string;
   analysis_period: {
@@ -119,6 +147,7 @@ export interface TrendsAnalysis {
     digital_growth_product: TrendCategory;
     visual_content_creative: TrendCategory;
   };
+  hiring_metrics?: HiringMetrics;
 }
 
 export interface Company {
@@ -222,6 +251,7 @@ export interface ManagementInterviewItem {
   format: "interview" | "podcast" | "keynote" | "article" | "panel" | "LinkedIn_post" | "webinar" | "profile";
   executive_name: string;
   executive_title: string;
+  executive_id?: string; // database/executive_index.py
   summary: string;
   key_quotes: string[];
   topics_discussed: string[];
@@ -231,10 +261,12 @@ export interface ManagementInterviewItem {
 }
 
 export interface KeyExecutive {
+  id?: string; // database/executive_index.py
   name: string;
   title: string;
   relevance: string;
   content_count: number;
+  other_titles?: string[];
 }
 
 export interface ManagementOverallAssessment {